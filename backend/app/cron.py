@@ -0,0 +1,122 @@
+from typing import FrozenSet, Optional, Tuple
+from datetime import datetime, timedelta
+
+# Standard five-field cron: minute hour day-of-month month day-of-week (Sunday is 0 or 7)
+FIELD_RANGES = ((0, 59), (0, 23), (1, 31), (1, 12), (0, 7))
+MONTH_NAMES = {name: index + 1 for index, name in enumerate(
+    ("jan", "feb", "mar", "apr", "may", "jun", "jul", "aug", "sep", "oct", "nov", "dec")
+)}
+DAY_NAMES = {name: index for index, name in enumerate(("sun", "mon", "tue", "wed", "thu", "fri", "sat"))}
+MACROS = {
+    "@yearly": "0 0 1 1 *",
+    "@annually": "0 0 1 1 *",
+    "@monthly": "0 0 1 * *",
+    "@weekly": "0 0 * * 0",
+    "@daily": "0 0 * * *",
+    "@midnight": "0 0 * * *",
+    "@hourly": "0 * * * *",
+}
+# A schedule with no fire in this many years (e.g. 30 February) never fires; leap
+# days can be eight years apart
+SEARCH_YEARS = 9
+
+
+def _value(token: str, names: dict, field: str) -> int:
+    token = token.lower()
+    if token in names:
+        return names[token]
+    if not token.isdigit():
+        raise ValueError(f"Invalid {field} value '{token}'")
+    return int(token)
+
+
+def _parse_field(text: str, index: int) -> FrozenSet[int]:
+    field = ("minute", "hour", "day of month", "month", "day of week")[index]
+    low, high = FIELD_RANGES[index]
+    names = MONTH_NAMES if index == 3 else DAY_NAMES if index == 4 else {}
+    values = set()
+    for part in text.split(","):
+        base, _, step_text = part.partition("/")
+        step = _value(step_text, {}, field) if step_text else 1
+        if step < 1:
+            raise ValueError(f"Invalid {field} step '{step_text}'")
+        if base == "*":
+            start, end = low, high
+        elif "-" in base:
+            start_text, end_text = base.split("-", 1)
+            start, end = _value(start_text, names, field), _value(end_text, names, field)
+        else:
+            start = _value(base, names, field)
+            # "5/15" runs from 5 to the end of the range
+            end = high if step_text else start
+        if not low <= start <= end <= high:
+            raise ValueError(f"{field.capitalize()} '{part}' is outside {low}-{high}")
+        values.update(range(start, end + 1, step))
+    if index == 4 and 7 in values:
+        values.discard(7)
+        values.add(0)
+    return frozenset(values)
+
+
+class CronExpression:
+    """
+    A parsed five-field cron expression (or @daily-style macro), evaluated in UTC.
+
+    Lists, ranges, steps and month/day names are supported. As in cron, when both
+    day fields are restricted a day matches if either does.
+    """
+
+    def __init__(self, expression: str):
+        self.expression = expression.strip()
+        fields = MACROS.get(self.expression.lower(), self.expression).split()
+        if len(fields) != 5:
+            raise ValueError(f"Cron expression '{expression}' must have 5 fields")
+        parsed = [_parse_field(text, index) for index, text in enumerate(fields)]
+        self.minutes, self.hours, self.days, self.months, self.weekdays = parsed
+        self._sorted_minutes: Tuple[int, ...] = tuple(sorted(self.minutes))
+        self.any_day = fields[2].startswith("*")
+        self.any_weekday = fields[4].startswith("*")
+
+    def _day_matches(self, moment: datetime) -> bool:
+        day_match = moment.day in self.days
+        # datetime weeks start on Monday, cron weeks on Sunday
+        weekday_match = (moment.weekday() + 1) % 7 in self.weekdays
+        if self.any_day:
+            return weekday_match
+        if self.any_weekday:
+            return day_match
+        return day_match or weekday_match
+
+    def next_after(self, moment: datetime) -> Optional[datetime]:
+        """
+        The first fire time strictly after `moment`, or None if the schedule never fires.
+        Skips whole months, days and hours that cannot match instead of testing each minute.
+        """
+        moment = moment.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        last_year = moment.year + SEARCH_YEARS
+        while moment.year <= last_year:
+            if moment.month not in self.months:
+                year, month = (moment.year + 1, 1) if moment.month == 12 else (moment.year, moment.month + 1)
+                moment = moment.replace(year=year, month=month, day=1, hour=0, minute=0)
+            elif not self._day_matches(moment):
+                moment = moment.replace(hour=0, minute=0) + timedelta(days=1)
+            elif moment.hour not in self.hours:
+                moment = moment.replace(minute=0) + timedelta(hours=1)
+            else:
+                minute = next((value for value in self._sorted_minutes if value >= moment.minute), None)
+                if minute is not None:
+                    return moment.replace(minute=minute)
+                moment = moment.replace(minute=0) + timedelta(hours=1)
+        return None
+
+    def __repr__(self) -> str:
+        return f"CronExpression({self.expression!r})"
+
+
+def validate_cron(expression: Optional[str]) -> Optional[str]:
+    """
+    Field validator helper: the expression unchanged when it parses
+    """
+    if expression is not None:
+        CronExpression(expression)
+    return expression
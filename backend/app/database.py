@@ -1,7 +1,11 @@
 from motor.motor_asyncio import AsyncIOMotorClient
-from pymongo.errors import ConnectionFailure
+from pymongo.errors import ConnectionFailure, OperationFailure
+from pymongo.read_preferences import SecondaryPreferred
 import os
-from contextlib import asynccontextmanager
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from .indexes import sync_indexes
+from .pool_monitor import PoolMonitor
 
 MONGO_URL = os.getenv("MONGO_URL", "mongodb://localhost:27017")
 DATABASE_NAME = os.getenv("DATABASE_NAME", "gravitypm")
@@ -11,11 +15,21 @@ MAX_POOL_SIZE = int(os.getenv("MONGO_MAX_POOL_SIZE", "10"))
 MIN_POOL_SIZE = int(os.getenv("MONGO_MIN_POOL_SIZE", "2"))
 MAX_IDLE_TIME_MS = int(os.getenv("MONGO_MAX_IDLE_TIME_MS", "30000"))
 
+# Read routing: writes and read-your-writes paths use the primary; report reads may be
+# served by a secondary lagging at most this long (the server minimum is 90 seconds)
+REPORT_MAX_STALENESS_SECONDS = int(os.getenv("MONGO_REPORT_MAX_STALENESS_SECONDS", "90"))
+PRIMARY_READS = "primary"
+REPORT_READS = "reports"
+
 client: AsyncIOMotorClient | None = None
 database = None
+pool_monitor = PoolMonitor(MAX_POOL_SIZE)
+# Same database with secondaryPreferred reads; writes through it still go to the primary
+report_database = None
+_read_route: ContextVar[str] = ContextVar("mongo_read_route", default=PRIMARY_READS)
 
 async def connect_to_mongo():
-    global client, database
+    global client, database, report_database
     try:
         client = AsyncIOMotorClient(
             MONGO_URL,
@@ -27,9 +41,14 @@ async def connect_to_mongo():
             serverSelectionTimeoutMS=5000,
             # Retry settings
             retryWrites=True,
-            retryReads=True
+            retryReads=True,
+            # Pool checkout and wait metrics
+            event_listeners=[pool_monitor]
         )
         database = client[DATABASE_NAME]
+        report_database = client.get_database(
+            DATABASE_NAME, read_preference=SecondaryPreferred(max_staleness=REPORT_MAX_STALENESS_SECONDS)
+        )
         # Test the connection
         await client.admin.command('ping')
         print(f"Connected to MongoDB with pool size: {MAX_POOL_SIZE}")
@@ -44,8 +63,55 @@ async def close_mongo_connection():
         print("Disconnected from MongoDB")
 
 def get_database():
+    if _read_route.get() == REPORT_READS and report_database is not None:
+        return report_database
     return database
 
+class LiveDatabase:
+    """
+    Service attribute resolving the database handle on each access, so a service created
+    at import time (before connect_to_mongo) still uses the connection opened at startup.
+    Assigning a handle, as tests do with a mock, pins it on that instance.
+    """
+
+    def __set_name__(self, owner, name):
+        self.attribute = f"_{name}"
+
+    def __get__(self, instance, owner=None):
+        if instance is None:
+            return self
+        pinned = instance.__dict__.get(self.attribute)
+        return get_database() if pinned is None else pinned
+
+    def __set__(self, instance, value):
+        instance.__dict__[self.attribute] = value
+
+    def __delete__(self, instance):
+        instance.__dict__.pop(self.attribute, None)
+
+def route_database(db):
+    """
+    The handle to read through on the current route: a service's own primary handle is
+    swapped for the report handle inside report reads
+    """
+    if db is None or db is database:
+        return get_database()
+    return db
+
+@contextmanager
+def read_route(route: str):
+    """Route reads made inside the block (and the tasks it starts) to `route`"""
+    token = _read_route.set(route)
+    try:
+        yield
+    finally:
+        _read_route.reset(token)
+
+async def report_reads():
+    """FastAPI dependency serving an endpoint's reads from a secondary when one is fresh enough"""
+    with read_route(REPORT_READS):
+        yield
+
 @asynccontextmanager
 async def get_database_session():
     """Context manager for database sessions with transaction support"""
@@ -55,60 +121,54 @@ async def get_database_session():
     finally:
         await session.end_session()
 
-async def create_indexes():
+async def create_indexes(rebuild_changed: bool = False, drop_unmanaged: bool = False):
     """
-    Create necessary indexes for collections to improve query performance.
+    Bring the live indexes in line with the declared index spec (app.indexes.INDEX_SPEC).
+    Only missing indexes are created unless rebuilding or dropping is requested.
     """
     db = get_database()
     if db is None:
         raise Exception("Database connection is not established")
 
-    # Users collection indexes
-    await db.users.create_index("username", unique=True)
-    await db.users.create_index("email", unique=True)
-    await db.users.create_index("created_at")
-    await db.users.create_index("last_login")
-
-    # Projects collection indexes
-    await db.projects.create_index("owner_id")
-    await db.projects.create_index("status")
-    await db.projects.create_index("created_at")
-    await db.projects.create_index("updated_at")
-    await db.projects.create_index([("name", 1), ("status", 1)])
-
-    # Tasks collection indexes
-    await db.tasks.create_index("assignee_id")
-    await db.tasks.create_index("status")
-    await db.tasks.create_index("due_date")
-    await db.tasks.create_index("project_id")
-    await db.tasks.create_index("priority")
-    await db.tasks.create_index([("status", 1), ("due_date", 1)])
-    await db.tasks.create_index([("assignee_id", 1), ("status", 1)])
-
-    # Resources collection indexes
-    await db.resources.create_index("project_id")
-    await db.resources.create_index("type")
-    await db.resources.create_index("status")
-    await db.resources.create_index([("project_id", 1), ("type", 1)])
-
-    # Rules collection indexes
-    await db.rules.create_index("project_id")
-    await db.rules.create_index("type")
-    await db.rules.create_index("active")
-    await db.rules.create_index([("project_id", 1), ("active", 1)])
+    report = await sync_indexes(db, rebuild_changed=rebuild_changed, drop_unmanaged=drop_unmanaged)
+    for collection_name, result in report.items():
+        for action in ("created", "rebuilt", "dropped"):
+            if result[action]:
+                print(f"{collection_name}: {action} {', '.join(result[action])}")
+        if result["changed"]:
+            print(f"{collection_name}: options differ from spec on {', '.join(result['changed'])}")
+        if result["unmanaged"]:
+            print(f"{collection_name}: indexes not in spec: {', '.join(result['unmanaged'])}")
 
     print("Database indexes created successfully")
+    return report
 
 async def get_connection_stats():
-    """Get database connection pool statistics"""
+    """Get database connection pool statistics and a pool size recommendation"""
     if client:
-        return {
-            "pool_size": len(client._topology._servers),
-            "active_connections": sum(len(server._pool._pending) for server in client._topology._servers.values()),
-            "available_connections": sum(server._pool._size for server in client._topology._servers.values())
-        }
+        return {**pool_monitor.stats(), "sizing": pool_monitor.recommend_pool_size()}
     return {}
 
+async def replication_lag():
+    """
+    Seconds each secondary's last applied write trails the primary's; empty outside a replica set
+    """
+    if client is None:
+        return {}
+    try:
+        status = await client.admin.command("replSetGetStatus")
+    except OperationFailure:
+        return {}
+    members = status.get("members", [])
+    primary = next((member for member in members if member.get("stateStr") == "PRIMARY"), None)
+    if primary is None:
+        return {}
+    return {
+        member["name"]: max((primary["optimeDate"] - member["optimeDate"]).total_seconds(), 0.0)
+        for member in members
+        if member.get("stateStr") == "SECONDARY" and member.get("optimeDate")
+    }
+
 async def health_check():
     """Database health check"""
     try:
@@ -126,7 +186,10 @@ async def health_check():
             "status": "healthy",
             "connections": status.get("connections", {}),
             "opcounters": status.get("opcounters", {}),
-            "mem": status.get("mem", {})
+            "mem": status.get("mem", {}),
+            "pool": await get_connection_stats(),
+            "replication_lag_seconds": await replication_lag(),
+            "report_max_staleness_seconds": REPORT_MAX_STALENESS_SECONDS
         }
     except Exception as e:
         return {
@@ -2,12 +2,72 @@
 """
 Database migration script for creating indexes.
 Run this script to initialize database indexes for better query performance.
+
+Indexes are diffed against the declared spec in app.indexes, so running it again
+only applies what changed. --prune drops indexes the spec does not declare and
+--advise reports query shapes the profiler and slow-query log saw without an index.
 """
 
+import argparse
 import asyncio
-from app.database import connect_to_mongo, create_indexes, close_mongo_connection
+from datetime import datetime
+from pymongo import UpdateOne
+from app.database import connect_to_mongo, create_indexes, close_mongo_connection, get_database
 
-async def main():
+async def migrate_resource_allocations():
+    """
+    Move allocations embedded on resource documents into the resource_allocations collection.
+    Allocations are upserted on (resource, task, window) before the embedded copy is removed,
+    so a run interrupted between the two steps can simply be run again. Runs on every startup.
+    """
+    db = get_database()
+    resources = db.resources.find(
+        {"allocations.0": {"$exists": True}},
+        {"project_id": 1, "allocations": 1}
+    )
+    migrated = 0
+    async for resource in resources:
+        resource_id = str(resource["_id"])
+        await db.resource_allocations.bulk_write([
+            UpdateOne(
+                {
+                    "resource_id": resource_id,
+                    "task_id": allocation.get("task_id"),
+                    "start_date": allocation.get("start_date"),
+                    "end_date": allocation.get("end_date")
+                },
+                {"$setOnInsert": {
+                    "resource_id": resource_id,
+                    "project_id": resource.get("project_id"),
+                    **allocation,
+                    "created_at": datetime.utcnow()
+                }},
+                upsert=True
+            )
+            for allocation in resource["allocations"]
+        ], ordered=False)
+        await db.resources.update_one(
+            {"_id": resource["_id"]},
+            {"$unset": {"allocations": ""}, "$inc": {"allocation_version": 1}}
+        )
+        migrated += 1
+    return migrated
+
+def print_advice(findings):
+    if not findings:
+        print("No unindexed query shapes found")
+        return
+    for finding in findings:
+        print(
+            f"{finding['collection']} {finding['shape']}: {finding['count']} samples, "
+            f"{finding['total_millis']}ms total, {finding['docs_examined']} examined for {finding['returned']} returned"
+        )
+        for suggestion in finding["suggested_indexes"]:
+            declared = suggestion["declared_index"]
+            status = f"declared as {declared}" if declared else "not declared"
+            print(f"    suggested {suggestion['keys']} ({status})")
+
+async def main(prune: bool = False, advise: bool = False):
     """
     Main function to run database migration.
     """
@@ -15,8 +75,17 @@ async def main():
         print("Connecting to MongoDB...")
         await connect_to_mongo()
 
-        print("Creating indexes...")
-        await create_indexes()
+        print("Applying index spec...")
+        await create_indexes(rebuild_changed=True, drop_unmanaged=prune)
+
+        print("Migrating resource allocations...")
+        migrated = await migrate_resource_allocations()
+        print(f"Migrated allocations of {migrated} resources")
+
+        if advise:
+            from app.index_advisor import advise as advise_indexes
+            print("Sampling slow queries...")
+            print_advice(await advise_indexes(get_database()))
 
         print("Migration completed successfully!")
 
@@ -27,4 +96,8 @@ async def main():
         await close_mongo_connection()
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--prune", action="store_true", help="drop indexes not declared in the index spec")
+    parser.add_argument("--advise", action="store_true", help="report unindexed query shapes")
+    args = parser.parse_args()
+    asyncio.run(main(prune=args.prune, advise=args.advise))
@@ -0,0 +1,234 @@
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+import json
+import os
+from pymongo import ASCENDING
+from .indexes import INDEX_SPEC, IndexSpec
+from .repository import get_query_plans, query_shape
+
+# Operations slower than this are written to the profiler and the slow-query log
+SLOW_QUERY_MS = int(os.getenv("MONGO_SLOW_QUERY_MS", "100"))
+PROFILE_SAMPLE_SIZE = int(os.getenv("MONGO_PROFILE_SAMPLE_SIZE", "1000"))
+# A query examining this many documents per document returned is treated as unindexed
+SCAN_RATIO = 10
+
+EQUALITY_OPERATORS = {"$eq", "$in"}
+# Clauses that combine sub-queries rather than constrain a field
+LOGICAL_OPERATORS = {"$and", "$or", "$nor"}
+
+
+def _split_namespace(namespace: str) -> str:
+    return namespace.split(".", 1)[1] if "." in namespace else namespace
+
+
+def _command_query(command: Dict[str, Any]) -> Tuple[Optional[Dict], Optional[Dict]]:
+    """
+    Filter and sort of a profiled or logged command, whichever command it was
+    """
+    if "filter" in command:
+        return command.get("filter"), command.get("sort")
+    if "q" in command:
+        return command.get("q"), None
+    if "query" in command:
+        return command.get("query"), command.get("sort")
+    pipeline = command.get("pipeline") or []
+    if pipeline and "$match" in pipeline[0]:
+        sort = pipeline[1].get("$sort") if len(pipeline) > 1 else None
+        return pipeline[0]["$match"], sort
+    return None, None
+
+
+def _sample(collection: str, command: Dict[str, Any], entry: Dict[str, Any], millis_field: str) -> Optional[Dict]:
+    query, sort = _command_query(command)
+    if query is None:
+        return None
+    return {
+        "collection": collection,
+        "shape": query_shape(query),
+        "sort": dict(sort) if sort else None,
+        "plan_summary": entry.get("planSummary"),
+        "millis": entry.get(millis_field) or 0,
+        "docs_examined": entry.get("docsExamined") or 0,
+        "returned": entry.get("nreturned") or 0
+    }
+
+
+async def enable_profiler(db, slow_ms: int = SLOW_QUERY_MS):
+    """
+    Profile operations slower than `slow_ms`; the same threshold drives the slow-query log
+    """
+    return await db.command("profile", 1, slowms=slow_ms)
+
+
+async def sample_profiler(db, limit: int = PROFILE_SAMPLE_SIZE) -> List[Dict]:
+    """
+    Most recent read and update operations recorded by the database profiler
+    """
+    entries = await db["system.profile"].find(
+        {"op": {"$in": ["query", "update", "remove", "command"]}}
+    ).sort("ts", -1).limit(limit).to_list(length=None)
+    samples = []
+    for entry in entries:
+        collection = _split_namespace(entry.get("ns", ""))
+        if collection.startswith("system."):
+            continue
+        sample = _sample(collection, entry.get("command") or {}, entry, "millis")
+        if sample:
+            samples.append(sample)
+    return samples
+
+
+async def sample_slow_log(db) -> List[Dict]:
+    """
+    Slow queries from the server's in-memory log (structured log lines, MongoDB 4.4+)
+    """
+    result = await db.client.admin.command("getLog", "global")
+    samples = []
+    for line in result.get("log", []):
+        try:
+            entry = json.loads(line)
+        except (TypeError, ValueError):
+            continue
+        if entry.get("msg") != "Slow query":
+            continue
+        attributes = entry.get("attr") or {}
+        collection = _split_namespace(attributes.get("ns", ""))
+        if not collection or collection.startswith("system.") or collection.startswith("$cmd"):
+            continue
+        sample = _sample(collection, attributes.get("command") or {}, attributes, "durationMillis")
+        if sample:
+            samples.append(sample)
+    return samples
+
+
+def sample_query_plans() -> List[Dict]:
+    """
+    Collection scans recorded by the repositories in debug mode
+    """
+    return [
+        {
+            "collection": plan["collection"],
+            "shape": plan["shape"],
+            "sort": None,
+            "plan_summary": "COLLSCAN",
+            "millis": plan.get("execution_ms") or 0,
+            "docs_examined": plan.get("docs_examined") or 0,
+            "returned": plan.get("returned") or 0
+        }
+        for plan in get_query_plans(collection_scans_only=True)
+    ]
+
+
+def _field_keys(shape: Dict[str, Any]) -> Tuple[List[str], List[str]]:
+    """
+    Equality and range fields of a query shape, descending into $and
+    """
+    equality: List[str] = []
+    ranges: List[str] = []
+    for field, value in shape.items():
+        if field == "$and":
+            for clause in value:
+                clause_equality, clause_ranges = _field_keys(clause)
+                equality.extend(clause_equality)
+                ranges.extend(clause_ranges)
+        elif field.startswith("$") or field == "_id":
+            continue
+        elif isinstance(value, dict) and value and all(key.startswith("$") for key in value):
+            (equality if set(value) <= EQUALITY_OPERATORS else ranges).append(field)
+        else:
+            equality.append(field)
+    return equality, ranges
+
+
+def suggest_indexes(shape: Dict[str, Any], sort: Optional[Dict[str, Any]] = None) -> List[List[Tuple[str, int]]]:
+    """
+    Index keys serving a query shape: equality fields, then sort, then range fields.
+    Each $or branch is planned on its own, so it gets its own suggestion.
+    """
+    branches = shape.get("$or") or [{}]
+    common = {field: value for field, value in shape.items() if field != "$or"}
+    suggestions = []
+    for branch in branches:
+        equality, ranges = _field_keys({**common, **branch})
+        keys: List[Tuple[str, int]] = [(field, ASCENDING) for field in dict.fromkeys(equality)]
+        for field, direction in (sort or {}).items():
+            if field not in dict(keys):
+                keys.append((field, int(direction) if isinstance(direction, (int, float)) else ASCENDING))
+        for field in dict.fromkeys(ranges):
+            if field not in dict(keys):
+                keys.append((field, ASCENDING))
+        if keys and keys not in suggestions:
+            suggestions.append(keys)
+    return suggestions
+
+
+def declared_index(keys: List[Tuple[str, int]], indexes: Iterable[IndexSpec]) -> Optional[str]:
+    """
+    Name of a declared index whose leading fields serve the suggested keys' leading field
+    """
+    for index in indexes:
+        if index.fields[0] == keys[0][0]:
+            return index.name
+    return None
+
+
+def analyze(samples: Iterable[Dict], spec: Dict[str, List[IndexSpec]] = INDEX_SPEC) -> List[Dict]:
+    """
+    Group samples by collection and query shape and report the shapes that scanned
+    the collection or examined far more documents than they returned, slowest first
+    """
+    groups: Dict[Tuple[str, str], Dict] = {}
+    for sample in samples:
+        key = (sample["collection"], json.dumps(sample["shape"], sort_keys=True, default=str))
+        group = groups.setdefault(key, {
+            "collection": sample["collection"],
+            "shape": sample["shape"],
+            "sort": sample["sort"],
+            "count": 0,
+            "total_millis": 0,
+            "max_millis": 0,
+            "docs_examined": 0,
+            "returned": 0,
+            "plan_summaries": set()
+        })
+        group["count"] += 1
+        group["total_millis"] += sample["millis"]
+        group["max_millis"] = max(group["max_millis"], sample["millis"])
+        group["docs_examined"] += sample["docs_examined"]
+        group["returned"] += sample["returned"]
+        if sample["plan_summary"]:
+            group["plan_summaries"].add(sample["plan_summary"])
+
+    findings = []
+    for group in groups.values():
+        collection_scan = any(summary.startswith("COLLSCAN") for summary in group["plan_summaries"])
+        over_scanned = group["docs_examined"] > max(group["returned"], 1) * SCAN_RATIO
+        if not (collection_scan or over_scanned):
+            continue
+        suggestions = suggest_indexes(group["shape"], group["sort"])
+        declared = spec.get(group["collection"], [])
+        findings.append({
+            **group,
+            "plan_summaries": sorted(group["plan_summaries"]),
+            "collection_scan": collection_scan,
+            "suggested_indexes": [
+                {"keys": keys, "declared_index": declared_index(keys, declared)}
+                for keys in suggestions
+            ]
+        })
+    findings.sort(key=lambda finding: finding["total_millis"], reverse=True)
+    return findings
+
+
+async def advise(db, limit: int = PROFILE_SAMPLE_SIZE) -> List[Dict]:
+    """
+    Unindexed query shapes seen by the profiler, the slow-query log and the
+    repositories' recorded plans. A source that is disabled or not permitted
+    is skipped.
+    """
+    samples = sample_query_plans()
+    for source in (lambda: sample_profiler(db, limit), lambda: sample_slow_log(db)):
+        try:
+            samples.extend(await source())
+        except Exception as e:
+            print(f"Index advisor could not read a query sample source: {e}")
+    return analyze(samples)
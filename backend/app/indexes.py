@@ -0,0 +1,197 @@
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
+from pymongo import ASCENDING, DESCENDING
+
+IndexKeys = List[Tuple[str, int]]
+
+
+class IndexSpec:
+    """
+    One declared index: its ordered key fields and the options that distinguish it.
+    The default name is the one the server generates, so indexes created before the
+    spec existed are recognized as already applied.
+    """
+
+    def __init__(self, keys: Union[str, Sequence[Tuple[str, int]]], unique: bool = False,
+                 sparse: bool = False, name: Optional[str] = None,
+                 expire_after_seconds: Optional[int] = None):
+        self.keys: IndexKeys = [(keys, ASCENDING)] if isinstance(keys, str) else [tuple(key) for key in keys]
+        self.unique = unique
+        self.sparse = sparse
+        self.expire_after_seconds = expire_after_seconds
+        self.name = name or "_".join(f"{field}_{direction}" for field, direction in self.keys)
+
+    @property
+    def fields(self) -> List[str]:
+        return [field for field, _ in self.keys]
+
+    def same_options(self, info: Dict[str, Any]) -> bool:
+        return (
+            bool(info.get("unique")) == self.unique
+            and bool(info.get("sparse")) == self.sparse
+            and info.get("expireAfterSeconds") == self.expire_after_seconds
+        )
+
+    def create_options(self) -> Dict[str, Any]:
+        options: Dict[str, Any] = {"name": self.name}
+        if self.unique:
+            options["unique"] = True
+        if self.sparse:
+            options["sparse"] = True
+        if self.expire_after_seconds is not None:
+            options["expireAfterSeconds"] = self.expire_after_seconds
+        return options
+
+    def __repr__(self) -> str:
+        return f"IndexSpec({self.name})"
+
+
+# Every index the application's queries rely on, per collection. Indexes found on a
+# collection but not declared here are reported as unmanaged.
+INDEX_SPEC: Dict[str, List[IndexSpec]] = {
+    "users": [
+        IndexSpec("username", unique=True),
+        IndexSpec("email", unique=True),
+        IndexSpec("created_at"),
+        IndexSpec("last_login"),
+        # OAuth sign-in looks users up by provider id
+        IndexSpec("github_id", sparse=True),
+        IndexSpec("google_id", sparse=True),
+    ],
+    "projects": [
+        IndexSpec("owner_id"),
+        # Second branch of every owner/team membership $or
+        IndexSpec("team_members"),
+        IndexSpec("status"),
+        IndexSpec("created_at"),
+        IndexSpec("updated_at"),
+        IndexSpec([("name", ASCENDING), ("status", ASCENDING)]),
+    ],
+    "tasks": [
+        IndexSpec("assignee_id"),
+        IndexSpec("status"),
+        IndexSpec("due_date"),
+        IndexSpec("project_id"),
+        IndexSpec("priority"),
+        IndexSpec([("status", ASCENDING), ("due_date", ASCENDING)]),
+        IndexSpec([("assignee_id", ASCENDING), ("status", ASCENDING)]),
+        # Team workload aggregation: project, assignee, then status
+        IndexSpec([("project_id", ASCENDING), ("assignee_id", ASCENDING), ("status", ASCENDING)]),
+        # Reverse dependency lookups
+        IndexSpec("dependencies.task_id"),
+    ],
+    "resources": [
+        IndexSpec("project_id"),
+        IndexSpec("type"),
+        IndexSpec("status"),
+        IndexSpec([("project_id", ASCENDING), ("type", ASCENDING)]),
+    ],
+    "resource_allocations": [
+        IndexSpec([("resource_id", ASCENDING), ("start_date", ASCENDING), ("end_date", ASCENDING)]),
+        IndexSpec([("resource_id", ASCENDING), ("task_id", ASCENDING)]),
+    ],
+    "resource_utilization": [
+        # Heatmap reads a project's buckets over a month range
+        IndexSpec([("project_id", ASCENDING), ("month", ASCENDING)]),
+        IndexSpec([("resource_id", ASCENDING), ("month", ASCENDING)]),
+    ],
+    "rules": [
+        IndexSpec("project_id"),
+        IndexSpec("type"),
+        IndexSpec("active"),
+        IndexSpec([("project_id", ASCENDING), ("active", ASCENDING)]),
+        # evaluate_rules and the scheduled rule scan
+        IndexSpec([("active", ASCENDING), ("type", ASCENDING)]),
+    ],
+    "notifications": [
+        IndexSpec([("recipient", ASCENDING), ("created_at", DESCENDING)]),
+    ],
+    "notification_logs": [
+        IndexSpec("sent_at"),
+    ],
+    "files": [
+        IndexSpec([("project_id", ASCENDING), ("uploaded_at", DESCENDING)]),
+    ],
+    "jobs": [
+        # Claims: due queued jobs, highest priority first, then oldest
+        IndexSpec([("status", ASCENDING), ("priority", DESCENDING), ("run_at", ASCENDING)]),
+        # When the next queued job is due, for idle workers' sleep
+        IndexSpec([("status", ASCENDING), ("run_at", ASCENDING)]),
+        # Expired lease recovery
+        IndexSpec([("status", ASCENDING), ("lease_until", ASCENDING)]),
+        # Dedup keys of uniquely enqueued jobs
+        IndexSpec("key", unique=True, sparse=True),
+        # Finished jobs are removed once their retention ends
+        IndexSpec("expires_at", expire_after_seconds=0),
+    ],
+}
+
+
+def _live_keys(info: Dict[str, Any]) -> Tuple[Tuple[str, Any], ...]:
+    return tuple(
+        (field, int(direction) if isinstance(direction, (int, float)) else direction)
+        for field, direction in info.get("key", [])
+    )
+
+
+async def plan_indexes(db, spec: Dict[str, List[IndexSpec]] = INDEX_SPEC) -> Dict[str, Dict[str, List]]:
+    """
+    Diff the declared indexes against the live ones, per collection: declared indexes
+    that are `missing`, declared keys whose live index differs in options (`changed`,
+    as (live name, spec) pairs) and live indexes the spec does not declare (`unmanaged`)
+    """
+    plan = {}
+    for collection_name, indexes in spec.items():
+        live = await getattr(db, collection_name).index_information()
+        live_by_keys = {
+            _live_keys(info): (name, info) for name, info in live.items() if name != "_id_"
+        }
+        missing: List[IndexSpec] = []
+        changed: List[Tuple[str, IndexSpec]] = []
+        for index in indexes:
+            found = live_by_keys.pop(tuple(index.keys), None)
+            if found is None:
+                missing.append(index)
+            elif not index.same_options(found[1]):
+                changed.append((found[0], index))
+        plan[collection_name] = {
+            "missing": missing,
+            "changed": changed,
+            "unmanaged": [name for name, _ in live_by_keys.values()]
+        }
+    return plan
+
+
+async def sync_indexes(db, spec: Dict[str, List[IndexSpec]] = INDEX_SPEC, rebuild_changed: bool = False,
+                       drop_unmanaged: bool = False) -> Dict[str, Dict[str, List[str]]]:
+    """
+    Apply the index spec. Missing indexes are always created; indexes whose options
+    changed are rebuilt and undeclared ones dropped only when asked, since both
+    touch existing indexes. Running it again with nothing to do issues no writes.
+    """
+    report = {}
+    for collection_name, plan in (await plan_indexes(db, spec)).items():
+        collection = getattr(db, collection_name)
+        result = {"created": [], "rebuilt": [], "dropped": [], "changed": [], "unmanaged": []}
+
+        for index in plan["missing"]:
+            await collection.create_index(index.keys, **index.create_options())
+            result["created"].append(index.name)
+
+        for live_name, index in plan["changed"]:
+            if not rebuild_changed:
+                result["changed"].append(live_name)
+                continue
+            # Index options cannot be altered in place
+            await collection.drop_index(live_name)
+            await collection.create_index(index.keys, **index.create_options())
+            result["rebuilt"].append(index.name)
+
+        for live_name in plan["unmanaged"]:
+            if drop_unmanaged:
+                await collection.drop_index(live_name)
+                result["dropped"].append(live_name)
+            else:
+                result["unmanaged"].append(live_name)
+
+        report[collection_name] = result
+    return report
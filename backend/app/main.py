@@ -1,4 +1,5 @@
-from fastapi import FastAPI
+import asyncio
+from fastapi import Depends, FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from slowapi import Limiter, _rate_limit_exceeded_handler
 from slowapi.util import get_remote_address
@@ -6,8 +7,16 @@ from slowapi.errors import RateLimitExceeded
 from slowapi.middleware import SlowAPIMiddleware
 from .routers import auth, projects, tasks, resources, github_integration, rules
 from .routers import ws_router
-from .database import connect_to_mongo, close_mongo_connection
+from .routers.auth import get_current_user_with_role
+from .database import connect_to_mongo, close_mongo_connection, health_check
 from .services.cache_service import cache_service
+from .services.websocket_manager import manager
+from .services.background_jobs import background_job_processor, job_queue
+from .services.job_handlers import register_job_handlers
+from .services.data_retention_service import data_retention_service
+from .services.rule_scheduler import rule_scheduler
+from .services.user_service import user_service
+from .services.task_service import task_service
 
 # Rate limiting
 limiter = Limiter(key_func=get_remote_address)
@@ -31,16 +40,33 @@ app.add_middleware(
 # Database events
 @app.on_event("startup")
 async def startup_event():
+    register_job_handlers()
     try:
         await connect_to_mongo()
         from .database import create_indexes
         await create_indexes()
+        # Reservations only see allocations stored in resource_allocations
+        from .database_migration import migrate_resource_allocations
+        migrated = await migrate_resource_allocations()
+        if migrated:
+            print(f"Migrated allocations of {migrated} resources")
         await cache_service.initialize()
+        await manager.initialize()
+        asyncio.create_task(background_job_processor.process_jobs())
+        await user_service.schedule_overdue_refresh()
+        await task_service.schedule_counter_maintenance()
+        await data_retention_service.schedule_maintenance()
+        await job_queue.start()
+        rule_scheduler.start()
     except Exception as e:
         print(f"Database connection failed: {e}. Running without database for demo.")
 
 @app.on_event("shutdown")
 async def shutdown_event():
+    background_job_processor.stop()
+    await rule_scheduler.stop()
+    await job_queue.stop()
+    await manager.shutdown()
     await close_mongo_connection()
 
 # Include routers
@@ -55,3 +81,11 @@ app.include_router(ws_router, prefix="/ws", tags=["WebSocket"])
 @app.get("/")
 async def root():
     return {"message": "Welcome to GravityPM API"}
+
+@app.get("/health/database", dependencies=[Depends(get_current_user_with_role("admin"))])
+async def database_health():
+    return await health_check() or {"status": "unavailable"}
+
+@app.get("/health/jobs")
+async def jobs_health():
+    return {**await job_queue.stats(), "rule_scheduler": rule_scheduler.stats()}
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, field_validator, Field, ConfigDict
-from typing import List, Optional
+from typing import Dict, List, Optional
 from datetime import datetime, timezone
 from enum import Enum
 
@@ -22,9 +22,22 @@ class TimelineMilestone(BaseModel):
 class ProjectTimeline(BaseModel):
     milestones: List[TimelineMilestone] = []
     critical_path: List[str] = []  # IDs of critical path milestones
+    critical_tasks: List[str] = []  # IDs of critical path tasks, in order
     estimated_duration_days: Optional[int] = None
     actual_duration_days: Optional[int] = None
     progress_percentage: float = 0.0
+    schedule_computed_at: Optional[datetime] = None
+
+class ProjectTaskCounters(BaseModel):
+    total: int = 0
+    by_status: Dict[str, int] = {}
+    by_priority: Dict[str, int] = {}  # keyed by priority level
+    overdue: int = 0
+    estimated_hours: float = 0.0
+    actual_hours: float = 0.0
+    total_weight: int = 0  # sum of task priorities
+    completed_weight: int = 0
+    rebuilt_at: Optional[datetime] = None
 
 class Project(BaseModel):
     id: Optional[str] = None
@@ -40,6 +53,7 @@ class Project(BaseModel):
     budget_alert_threshold: float = Field(default=0.8, ge=0, le=1)  # Alert when spent > threshold * budget
     timeline: ProjectTimeline = ProjectTimeline()  # Project timeline with milestones
     team_members: List[str] = []  # List of user IDs
+    task_counters: Optional[ProjectTaskCounters] = None  # Denormalized, maintained by task writes
     created_at: datetime = datetime.now(timezone.utc)
     updated_at: datetime = datetime.now(timezone.utc)
 
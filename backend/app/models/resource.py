@@ -39,7 +39,7 @@ class Resource(BaseModel):
     availability: bool = True
     skill_level: Optional[int] = Field(None, ge=1, le=5)  # For human resources
     location: Optional[str] = None
-    allocations: List[ResourceAllocation] = []
+    allocations: List[ResourceAllocation] = []  # Legacy; allocations live in the resource_allocations collection
     utilization_history: List[ResourceUtilization] = []
     created_at: datetime = datetime.now(timezone.utc)
     updated_at: datetime = datetime.now(timezone.utc)
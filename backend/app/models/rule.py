@@ -1,7 +1,8 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, field_validator, model_validator
 from typing import Optional, Dict, Any, List
 from datetime import datetime, timezone
 from enum import Enum
+from ..cron import validate_cron
 
 class RuleType(str, Enum):
     GITHUB_EVENT = "github_event"
@@ -34,6 +35,17 @@ class RuleCreate(BaseModel):
     project_id: Optional[str] = None
     schedule: Optional[str] = None
 
+    @field_validator('schedule')
+    @classmethod
+    def schedule_is_cron(cls, v):
+        return validate_cron(v)
+
+    @model_validator(mode='after')
+    def scheduled_rule_has_schedule(self):
+        if self.type == RuleType.SCHEDULED and not self.schedule:
+            raise ValueError('Scheduled rules need a cron schedule')
+        return self
+
 class RuleUpdate(BaseModel):
     name: Optional[str] = None
     description: Optional[str] = None
@@ -41,3 +53,8 @@ class RuleUpdate(BaseModel):
     actions: Optional[List[Dict[str, Any]]] = None
     active: Optional[bool] = None
     schedule: Optional[str] = None
+
+    @field_validator('schedule')
+    @classmethod
+    def schedule_is_cron(cls, v):
+        return validate_cron(v)
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, ConfigDict, Field
-from typing import Optional, List
+from typing import Optional, List, Dict
 from datetime import datetime, timezone
 from enum import Enum
 
@@ -29,6 +29,7 @@ class Task(BaseModel):
     status: TaskStatus = TaskStatus.TODO
     due_date: Optional[datetime] = None
     dependencies: List[TaskDependency] = []
+    milestone_id: Optional[str] = None  # Timeline milestone this task delivers
     progress: TaskProgress = TaskProgress()
     priority: int = Field(default=1, ge=1, le=5)  # 1=low, 5=critical
     tags: List[str] = []
@@ -45,6 +46,7 @@ class TaskCreate(BaseModel):
     assignee_id: Optional[str] = None
     due_date: Optional[datetime] = None
     dependencies: Optional[List[TaskDependency]] = None
+    milestone_id: Optional[str] = None
     estimated_hours: Optional[float] = None
     priority: Optional[int] = Field(default=1, ge=1, le=5)
     tags: Optional[List[str]] = None
@@ -57,7 +59,30 @@ class TaskUpdate(BaseModel):
     status: Optional[TaskStatus] = None
     due_date: Optional[datetime] = None
     dependencies: Optional[List[TaskDependency]] = None
+    milestone_id: Optional[str] = None
     progress_percentage: Optional[float] = Field(None, ge=0, le=100)
     actual_hours: Optional[float] = None
     priority: Optional[int] = Field(None, ge=1, le=5)
     tags: Optional[List[str]] = None
+
+# Upper bound on the number of items accepted by one bulk request
+BULK_TASK_LIMIT = 5000
+
+class TaskBulkCreate(BaseModel):
+    tasks: List[TaskCreate] = Field(..., min_length=1, max_length=BULK_TASK_LIMIT)
+
+class TaskBulkUpdateItem(BaseModel):
+    task_id: str
+    update: TaskUpdate
+
+class TaskBulkUpdate(BaseModel):
+    items: List[TaskBulkUpdateItem] = Field(..., min_length=1, max_length=BULK_TASK_LIMIT)
+
+class TaskBulkDelete(BaseModel):
+    task_ids: List[str] = Field(..., min_length=1, max_length=BULK_TASK_LIMIT)
+
+class TaskBatchAssignment(BaseModel):
+    task_ids: List[str] = Field(..., min_length=1)
+    project_id: str
+    weight_by_hours: bool = False
+    skill_levels: Optional[Dict[str, int]] = None  # user_id -> skill level (1-5)
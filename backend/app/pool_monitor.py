@@ -0,0 +1,213 @@
+from typing import Any, Dict
+from collections import deque
+import math
+import os
+import threading
+import time
+from pymongo import monitoring
+
+# Checkout waits above this mean requests are queueing for a connection
+POOL_WAIT_TARGET_MS = float(os.getenv("MONGO_POOL_WAIT_TARGET_MS", "10"))
+# Connections the server can give this deployment, shared by every worker process
+MONGO_CONNECTION_BUDGET = int(os.getenv("MONGO_CONNECTION_BUDGET", "500"))
+# Worker processes per host (the uvicorn/gunicorn convention)
+WEB_CONCURRENCY = int(os.getenv("WEB_CONCURRENCY", "1"))
+# Recent checkout waits kept for percentiles
+WAIT_SAMPLES = 1000
+
+
+def _percentile(values, fraction: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(int(len(ordered) * fraction), len(ordered) - 1)]
+
+
+class _ServerPool:
+    def __init__(self):
+        self.open = 0
+        self.in_use = 0
+        self.waiting = 0
+        self.peak_in_use = 0
+        self.peak_demand = 0
+        self.checkouts = 0
+        self.failed_checkouts: Dict[str, int] = {}
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.waits: deque = deque(maxlen=WAIT_SAMPLES)
+        self.cleared = 0
+
+
+class PoolMonitor(monitoring.ConnectionPoolListener):
+    """
+    Connection pool metrics through pymongo's public CMAP events: open and checked-out
+    connections, checkout waits and failures, and how close each server's pool is to
+    its size limit.
+
+    Events are published on the thread running the operation (Motor's executor threads),
+    so a checkout's wait is measured from the start time that thread recorded.
+    """
+
+    def __init__(self, max_pool_size: int):
+        self.max_pool_size = max_pool_size
+        self._pools: Dict[str, _ServerPool] = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    @staticmethod
+    def _key(address) -> str:
+        return f"{address[0]}:{address[1]}" if isinstance(address, tuple) else str(address)
+
+    def _pool(self, address) -> _ServerPool:
+        key = self._key(address)
+        pool = self._pools.get(key)
+        if pool is None:
+            pool = self._pools[key] = _ServerPool()
+        return pool
+
+    def _wait(self) -> float:
+        starts = getattr(self._local, "starts", None)
+        return time.monotonic() - starts.pop() if starts else 0.0
+
+    def pool_created(self, event):
+        with self._lock:
+            self._pool(event.address)
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        with self._lock:
+            self._pool(event.address).cleared += 1
+
+    def pool_closed(self, event):
+        with self._lock:
+            self._pools.pop(self._key(event.address), None)
+
+    def connection_created(self, event):
+        with self._lock:
+            self._pool(event.address).open += 1
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        with self._lock:
+            pool = self._pool(event.address)
+            pool.open = max(pool.open - 1, 0)
+
+    def connection_check_out_started(self, event):
+        if not hasattr(self._local, "starts"):
+            self._local.starts = []
+        self._local.starts.append(time.monotonic())
+        with self._lock:
+            pool = self._pool(event.address)
+            pool.waiting += 1
+            pool.peak_demand = max(pool.peak_demand, pool.in_use + pool.waiting)
+
+    def connection_check_out_failed(self, event):
+        wait = self._wait()
+        with self._lock:
+            pool = self._pool(event.address)
+            pool.waiting = max(pool.waiting - 1, 0)
+            pool.failed_checkouts[event.reason] = pool.failed_checkouts.get(event.reason, 0) + 1
+            pool.waits.append(wait)
+
+    def connection_checked_out(self, event):
+        wait = self._wait()
+        with self._lock:
+            pool = self._pool(event.address)
+            pool.waiting = max(pool.waiting - 1, 0)
+            pool.in_use += 1
+            pool.peak_in_use = max(pool.peak_in_use, pool.in_use)
+            pool.checkouts += 1
+            pool.wait_total += wait
+            pool.wait_max = max(pool.wait_max, wait)
+            pool.waits.append(wait)
+
+    def connection_checked_in(self, event):
+        with self._lock:
+            pool = self._pool(event.address)
+            pool.in_use = max(pool.in_use - 1, 0)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Per-server pool metrics plus totals; waits are in milliseconds and
+        saturation is the share of the pool checked out at its busiest
+        """
+        with self._lock:
+            servers = {
+                address: {
+                    "open_connections": pool.open,
+                    "in_use": pool.in_use,
+                    "waiting": pool.waiting,
+                    "peak_in_use": pool.peak_in_use,
+                    "peak_demand": pool.peak_demand,
+                    "checkouts": pool.checkouts,
+                    "failed_checkouts": dict(pool.failed_checkouts),
+                    "wait_ms_avg": round(pool.wait_total / pool.checkouts * 1000, 3) if pool.checkouts else 0.0,
+                    "wait_ms_p95": round(_percentile(pool.waits, 0.95) * 1000, 3),
+                    "wait_ms_max": round(pool.wait_max * 1000, 3),
+                    "saturation": round(pool.peak_in_use / self.max_pool_size, 3) if self.max_pool_size else 0.0,
+                    "cleared": pool.cleared
+                }
+                for address, pool in self._pools.items()
+            }
+        in_use = sum(server["in_use"] for server in servers.values())
+        open_connections = sum(server["open_connections"] for server in servers.values())
+        return {
+            "pool_size": self.max_pool_size,
+            "active_connections": in_use,
+            "available_connections": max(open_connections - in_use, 0),
+            "servers": servers
+        }
+
+    def recommend_pool_size(self, workers: int = WEB_CONCURRENCY,
+                            budget: int = MONGO_CONNECTION_BUDGET) -> Dict[str, Any]:
+        """
+        Pool size per worker derived from observed checkout waits: grow to the peak
+        number of operations that wanted a connection at once (with a quarter headroom)
+        while waits exceed the target, shrink towards the observed peak while the pool
+        sits mostly idle. Capped so every worker's pool fits the server connection budget.
+        """
+        servers = self.stats()["servers"]
+        ceiling = max(budget // max(workers, 1), 1)
+        wait_p95 = max((server["wait_ms_p95"] for server in servers.values()), default=0.0)
+        peak_demand = max((server["peak_demand"] for server in servers.values()), default=0)
+        peak_in_use = max((server["peak_in_use"] for server in servers.values()), default=0)
+
+        if not any(server["checkouts"] for server in servers.values()):
+            reason = "no checkouts observed yet"
+            recommended = self.max_pool_size
+        elif wait_p95 > POOL_WAIT_TARGET_MS:
+            reason = f"p95 checkout wait {wait_p95}ms exceeds {POOL_WAIT_TARGET_MS}ms"
+            recommended = max(math.ceil(peak_demand * 1.25), self.max_pool_size + 1)
+        elif peak_in_use * 2 <= self.max_pool_size:
+            reason = f"peak of {peak_in_use} connections in use leaves most of the pool idle"
+            recommended = max(math.ceil(peak_in_use * 1.25), 1)
+        else:
+            reason = "checkout waits are within target"
+            recommended = self.max_pool_size
+
+        if recommended > ceiling:
+            recommended = ceiling
+            reason += "; capped by the connection budget"
+        return {
+            "current_pool_size": self.max_pool_size,
+            "recommended_pool_size": recommended,
+            "workers": workers,
+            "total_connections": recommended * workers,
+            "connection_budget": budget,
+            "reason": reason
+        }
+
+    def reset(self):
+        with self._lock:
+            for pool in self._pools.values():
+                pool.peak_in_use = pool.in_use
+                pool.peak_demand = pool.in_use + pool.waiting
+                pool.checkouts = 0
+                pool.failed_checkouts = {}
+                pool.wait_total = 0.0
+                pool.wait_max = 0.0
+                pool.waits.clear()
@@ -0,0 +1,281 @@
+from typing import Any, Callable, Dict, Iterable, List, Optional
+from collections import deque
+from datetime import datetime
+import os
+from bson import ObjectId
+from pymongo import ReturnDocument
+from .database import get_database, route_database
+from .services.exceptions import DatabaseUnavailableError
+
+# Debug mode: explain every repository read and record its winning plan. Each read
+# costs an extra round trip, so this is meant for development and load tests only
+EXPLAIN_QUERIES = os.getenv("MONGO_EXPLAIN_QUERIES", "false").lower() == "true"
+QUERY_PLAN_HISTORY = int(os.getenv("MONGO_QUERY_PLAN_HISTORY", "500"))
+# Existence checks only need the id back
+ID_PROJECTION = {"_id": 1}
+# Profile reads never need the password hash
+USER_PROFILE_PROJECTION = {"hashed_password": 0}
+
+_query_plans: deque = deque(maxlen=QUERY_PLAN_HISTORY)
+
+
+def encode_id(value: Any) -> Any:
+    """
+    Query value matching a document id whether it was stored as an ObjectId
+    (the insert default) or as its string form; both are point lookups on `_id`
+    """
+    if isinstance(value, str) and ObjectId.is_valid(value):
+        return {"$in": [ObjectId(value), value]}
+    return value
+
+
+def encode_ids(values: Iterable[Any]) -> Dict[str, List[Any]]:
+    """
+    `$in` clause matching any of the ids in either stored form
+    """
+    encoded = []
+    for value in values:
+        encoded.append(value)
+        if isinstance(value, str) and ObjectId.is_valid(value):
+            encoded.append(ObjectId(value))
+    return {"$in": encoded}
+
+
+def decode_document(document: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """
+    Expose the document id as the string `id` the API models carry; `_id` keeps its stored type
+    """
+    if document is not None and "_id" in document and document.get("id") is None:
+        document["id"] = str(document["_id"])
+    return document
+
+
+def query_shape(query: Any) -> Any:
+    """
+    The query with every value replaced by 1, so queries that differ only in
+    their values group together
+    """
+    if isinstance(query, dict):
+        return {key: query_shape(value) for key, value in query.items()}
+    if isinstance(query, (list, tuple)) and query and all(isinstance(item, dict) for item in query):
+        return [query_shape(item) for item in query]
+    return 1
+
+
+def summarize_plan(explain: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Stages, indexes and examined counts of an explain result's winning plan
+    """
+    planner = explain.get("queryPlanner") or {}
+    stages: List[str] = []
+    indexes: List[str] = []
+    pending = [planner.get("winningPlan") or {}]
+    while pending:
+        node = pending.pop()
+        # Servers running the slot-based engine nest the classic plan under queryPlan
+        node = node.get("queryPlan", node)
+        if node.get("stage"):
+            stages.append(node["stage"])
+        if node.get("indexName"):
+            indexes.append(node["indexName"])
+        if node.get("inputStage"):
+            pending.append(node["inputStage"])
+        pending.extend(node.get("inputStages") or [])
+
+    stats = explain.get("executionStats") or {}
+    return {
+        "stages": stages,
+        "indexes": indexes,
+        "collection_scan": "COLLSCAN" in stages,
+        "keys_examined": stats.get("totalKeysExamined"),
+        "docs_examined": stats.get("totalDocsExamined"),
+        "returned": stats.get("nReturned"),
+        "execution_ms": stats.get("executionTimeMillis")
+    }
+
+
+def get_query_plans(collection_scans_only: bool = False) -> List[Dict[str, Any]]:
+    """
+    Query plans recorded in debug mode, most recent first
+    """
+    plans = reversed(_query_plans)
+    if collection_scans_only:
+        return [plan for plan in plans if plan.get("collection_scan")]
+    return list(plans)
+
+
+def clear_query_plans():
+    _query_plans.clear()
+
+
+async def insert_document(collection, document: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Insert a document and return it as stored, without reading it back
+    """
+    result = await collection.insert_one(document)
+    document["_id"] = result.inserted_id
+    return document
+
+
+async def update_document(collection, query: Dict[str, Any], update: Dict[str, Any],
+                          projection: Optional[Dict[str, Any]] = None) -> Optional[Dict[str, Any]]:
+    """
+    Apply an update and return the updated document in the same round trip;
+    None when nothing matched
+    """
+    return await collection.find_one_and_update(
+        query, update, projection=projection, return_document=ReturnDocument.AFTER
+    )
+
+
+class Repository:
+    """
+    Data access for one collection.
+
+    Ids are encoded so by-id lookups hit the `_id` index whichever type the id
+    was stored with, reads take a projection (falling back to the repository
+    default) and an optional index hint, and in debug mode every read's winning
+    plan is recorded by query shape. The database is resolved on each access,
+    from `database` when given (services pass their own handle) and otherwise
+    from the connection opened at startup, following the current read route.
+    """
+
+    def __init__(self, name: str, database: Optional[Callable[[], Any]] = None,
+                 projection: Optional[Dict[str, Any]] = None):
+        self.name = name
+        self._database = database
+        self.projection = projection
+
+    @property
+    def collection(self):
+        db = self._database() if self._database else None
+        db = get_database() if db is None else route_database(db)
+        if db is None:
+            raise DatabaseUnavailableError()
+        return getattr(db, self.name)
+
+    async def find_by_id(self, document_id: Any, projection: Optional[Dict[str, Any]] = None,
+                         extra: Optional[Dict[str, Any]] = None) -> Optional[Dict[str, Any]]:
+        query = {"_id": encode_id(document_id), **(extra or {})}
+        return await self.find_one(query, projection)
+
+    async def find_one(self, query: Dict[str, Any], projection: Optional[Dict[str, Any]] = None,
+                       hint: Any = None) -> Optional[Dict[str, Any]]:
+        projection = projection or self.projection
+        args = (query, projection) if projection else (query,)
+        kwargs = {"hint": hint} if hint else {}
+        document = await self.collection.find_one(*args, **kwargs)
+        await self._record_plan(query, hint)
+        return decode_document(document)
+
+    async def find(self, query: Dict[str, Any], projection: Optional[Dict[str, Any]] = None,
+                   sort: Optional[List] = None, skip: int = 0, limit: int = 0,
+                   hint: Any = None) -> List[Dict[str, Any]]:
+        projection = projection or self.projection
+        args = (query, projection) if projection else (query,)
+        kwargs: Dict[str, Any] = {}
+        if sort:
+            kwargs["sort"] = sort
+        if skip:
+            kwargs["skip"] = skip
+        if limit:
+            kwargs["limit"] = limit
+        if hint:
+            kwargs["hint"] = hint
+        documents = await self.collection.find(*args, **kwargs).to_list(length=None)
+        await self._record_plan(query, hint)
+        return [decode_document(document) for document in documents]
+
+    async def insert(self, document: Dict[str, Any]) -> Dict[str, Any]:
+        return decode_document(await insert_document(self.collection, document))
+
+    async def update(self, query: Dict[str, Any], update: Dict[str, Any],
+                     projection: Optional[Dict[str, Any]] = None,
+                     return_document: ReturnDocument = ReturnDocument.AFTER) -> Optional[Dict[str, Any]]:
+        """
+        Apply an update and return the document after it, or before it when the
+        caller needs the exact transition
+        """
+        return decode_document(await self.collection.find_one_and_update(
+            query, update, projection=projection or self.projection, return_document=return_document
+        ))
+
+    async def update_by_id(self, document_id: Any, update: Dict[str, Any],
+                           projection: Optional[Dict[str, Any]] = None,
+                           return_document: ReturnDocument = ReturnDocument.AFTER) -> Optional[Dict[str, Any]]:
+        return await self.update({"_id": encode_id(document_id)}, update, projection, return_document)
+
+    async def delete_by_id(self, document_id: Any) -> bool:
+        result = await self.collection.delete_one({"_id": encode_id(document_id)})
+        return bool(result.deleted_count)
+
+    async def take_by_id(self, document_id: Any) -> Optional[Dict[str, Any]]:
+        """
+        Delete a document and return it as it was
+        """
+        return decode_document(await self.collection.find_one_and_delete({"_id": encode_id(document_id)}))
+
+    async def delete_many(self, query: Dict[str, Any]) -> int:
+        result = await self.collection.delete_many(query)
+        return result.deleted_count
+
+    async def explain(self, query: Dict[str, Any], hint: Any = None) -> Dict[str, Any]:
+        """
+        Winning plan summary for a query against this collection
+        """
+        cursor = self.collection.find(query)
+        if hint:
+            cursor = cursor.hint(hint)
+        return summarize_plan(await cursor.explain())
+
+    async def _record_plan(self, query: Dict[str, Any], hint: Any):
+        if not EXPLAIN_QUERIES:
+            return
+        try:
+            plan = await self.explain(query, hint)
+        except Exception as e:
+            plan = {"error": str(e)}
+        plan.update({"collection": self.name, "shape": query_shape(query), "recorded_at": datetime.utcnow()})
+        _query_plans.append(plan)
+        if plan.get("collection_scan"):
+            print(f"Collection scan on {self.name} for query shape {plan['shape']}")
+
+
+class ProjectRepository(Repository):
+    """
+    Projects, with the owner/team membership check every project-scoped endpoint runs
+    """
+
+    @staticmethod
+    def access_filter(username: str) -> Dict[str, Any]:
+        return {"$or": [{"owner_id": username}, {"team_members": username}]}
+
+    async def find_accessible(self, project_id: Any, username: str,
+                              projection: Optional[Dict[str, Any]] = ID_PROJECTION) -> Optional[Dict[str, Any]]:
+        """
+        The project when `username` owns it or is on its team; only its id unless a projection is given
+        """
+        return await self.find_by_id(project_id, projection, self.access_filter(username))
+
+    async def find_owned(self, project_id: Any, username: str,
+                         projection: Optional[Dict[str, Any]] = ID_PROJECTION) -> Optional[Dict[str, Any]]:
+        return await self.find_by_id(project_id, projection, {"owner_id": username})
+
+    async def find_accessible_projects(self, username: str) -> List[Dict[str, Any]]:
+        return await self.find(self.access_filter(username))
+
+    async def accessible_ids(self, username: str) -> List[str]:
+        """
+        Ids of the projects `username` can access, in the string form other collections reference them by
+        """
+        projects = await self.find(self.access_filter(username), ID_PROJECTION)
+        return [project["id"] for project in projects]
+
+
+projects = ProjectRepository("projects")
+tasks = Repository("tasks")
+# Utilization history is served from resource_utilization, not the resource document
+resources = Repository("resources", projection={"utilization_history": 0})
+rules = Repository("rules")
+users = Repository("users", projection=USER_PROFILE_PROJECTION)
+resource_allocations = Repository("resource_allocations")
@@ -1,4 +1,4 @@
-from .auth import router as auth
+from .auth import router as auth, get_current_user_with_role
 from .projects import router as projects
 from .tasks import router as tasks
 from .resources import router as resources
@@ -6,18 +6,75 @@ from .github_integration import router as github_integration
 from .rules import router as rules
 
 # WebSocket router for real-time updates
-from fastapi import APIRouter, WebSocket, WebSocketDisconnect
-from ..services.websocket_manager import manager
+import asyncio
+import json
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, WebSocket, WebSocketDisconnect, status
+from ..services.websocket_manager import (
+    manager, encode_event, IDLE_TIMEOUT_SECONDS, INBOUND_VIOLATION_LIMIT
+)
 
 ws_router = APIRouter()
 
 @ws_router.websocket("/updates")
-async def websocket_endpoint(websocket: WebSocket):
-    await manager.connect(websocket)
+async def websocket_endpoint(websocket: WebSocket, token: Optional[str] = None):
+    """
+    Topic subscriptions over one socket. Clients authenticate with `?token=<access token>`
+    and send {"action": "subscribe" | "unsubscribe", "topic": "project:<id>"}; they are
+    subscribed to their own `user:<username>` topic on connect. A reconnecting client adds
+    "last_id" (the last `seq` it received on the topic) to a subscribe to catch up.
+    Server pings are answered with {"action": "pong"}; a connection silent for longer
+    than the idle timeout, or far over the inbound rate limit, is closed.
+    """
+    from .auth import get_current_user
+
+    try:
+        user = await get_current_user(token) if token else None
+    except HTTPException:
+        user = None
+    if user is None:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+
+    connection = await manager.connect(websocket, user.username)
     try:
         while True:
-            data = await websocket.receive_text()
-            # Echo received message for demo; in real app, broadcast updates
-            await manager.broadcast(f"Message: {data}")
+            try:
+                raw = await asyncio.wait_for(websocket.receive_text(), timeout=IDLE_TIMEOUT_SECONDS)
+            except asyncio.TimeoutError:
+                manager.idle_timeouts += 1
+                await manager.close(websocket, status.WS_1001_GOING_AWAY)
+                break
+            if not connection.allow_inbound():
+                if connection.rate_limited > INBOUND_VIOLATION_LIMIT:
+                    await manager.close(websocket, status.WS_1008_POLICY_VIOLATION)
+                    break
+                continue
+            try:
+                message = json.loads(raw)
+                action, topic = message.get("action"), message.get("topic")
+            except (ValueError, AttributeError):
+                connection.offer(encode_event("error", {"detail": "Messages must be JSON objects"}))
+                continue
+
+            if action == "pong":
+                continue
+            if action == "subscribe" and isinstance(topic, str):
+                last_id = message.get("last_id")
+                if await manager.subscribe(connection, topic, last_id if isinstance(last_id, int) else None):
+                    connection.offer(encode_event("subscribed", {"topic": topic}))
+                else:
+                    connection.offer(encode_event("subscription_denied", {"topic": topic}))
+            elif action == "unsubscribe" and isinstance(topic, str):
+                manager.unsubscribe(connection, topic)
+                connection.offer(encode_event("unsubscribed", {"topic": topic}))
+            else:
+                connection.offer(encode_event("error", {"detail": f"Unknown action: {action}"}))
     except WebSocketDisconnect:
+        pass
+    finally:
         manager.disconnect(websocket)
+
+@ws_router.get("/metrics", dependencies=[Depends(get_current_user_with_role("admin"))])
+async def websocket_metrics():
+    return manager.metrics()
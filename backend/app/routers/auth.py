@@ -10,7 +10,8 @@ import jwt
 from jwt import ExpiredSignatureError, InvalidTokenError
 from passlib.context import CryptContext
 from ..database import get_database
-from ..models.user import User, UserInDB, UserCreate, Token, TokenData
+from ..repository import insert_document, encode_id, USER_PROFILE_PROJECTION
+from ..models.user import User, UserCreate, Token, TokenData
 from ..services.auth_service import (
     authenticate_user,
     create_access_token,
@@ -69,7 +70,7 @@ def get_current_user_with_role(required_role: str):
     Dependency to get current user and check role
     """
     async def dependency(current_user: User = Depends(get_current_active_user)):
-        if not check_user_role(UserInDB(**current_user.dict()), required_role):
+        if not check_user_role(current_user, required_role):
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
                 detail=f"Insufficient permissions. Required role: {required_role}"
@@ -93,8 +94,7 @@ async def register(request: Request, user: UserCreate):
     user_dict["updated_at"] = datetime.utcnow()
     del user_dict["password"]
 
-    result = await db.users.insert_one(user_dict)
-    created_user = await db.users.find_one({"_id": result.inserted_id})
+    created_user = await insert_document(db.users, user_dict)
     user_data = {k: v for k, v in created_user.items() if k != 'hashed_password'}
     return User(**user_data)
 
@@ -212,7 +212,7 @@ async def get_users(
     Get all users (admin only)
     """
     db = get_database()
-    users = await db.users.find().skip(skip).limit(limit).to_list(length=None)
+    users = await db.users.find({}, USER_PROFILE_PROJECTION).skip(skip).limit(limit).to_list(length=None)
     return [User(**user) for user in users]
 
 @router.put("/users/{user_id}/role")
@@ -229,7 +229,7 @@ async def update_user_role(
 
     db = get_database()
     result = await db.users.update_one(
-        {"_id": user_id},
+        {"_id": encode_id(user_id)},
         {"$set": {"role": role, "updated_at": datetime.utcnow()}}
     )
 
@@ -35,19 +35,26 @@ async def github_webhook(request: Request):
 
 from fastapi import Form
 
-@router.post("/sync")
+@router.post("/sync", status_code=202)
 async def sync_repository(
     repo_full_name: str = Form(...),
     project_id: str = Form(...)
 ):
     try:
-        from ..services.github_service import sync_repository_data
-        result = await sync_repository_data(repo_full_name, project_id)
-        return result
+        from ..services.github_service import queue_repository_sync
+        return await queue_repository_sync(repo_full_name, project_id)
     except Exception as e:
         print(f"Error syncing repository: {str(e)}")
         raise HTTPException(status_code=500, detail="Internal server error syncing repository")
 
+@router.get("/sync/{job_id}")
+async def get_sync_status(job_id: str):
+    from ..services.github_service import get_repository_sync
+    sync = await get_repository_sync(job_id)
+    if not sync:
+        raise HTTPException(status_code=404, detail="Sync job not found")
+    return sync
+
 @router.get("/repos", response_model=List[Dict[str, Any]])
 async def get_user_repos(current_user: User = Depends(get_current_user)):
     if not current_user.github_id:
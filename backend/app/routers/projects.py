@@ -1,8 +1,10 @@
 from typing import List
 from datetime import datetime
 from fastapi import APIRouter, Depends, HTTPException
-from ..database import get_database
-from ..models.project import Project, ProjectCreate, ProjectUpdate
+from pymongo import ReturnDocument
+from .. import repository
+from ..database import report_reads
+from ..models.project import Project, ProjectCreate, ProjectUpdate, ProjectTaskCounters
 from ..models.user import User
 from ..routers.auth import get_current_user
 
@@ -10,54 +12,67 @@ router = APIRouter()
 
 @router.post("/", response_model=Project)
 async def create_project(project: ProjectCreate, current_user: User = Depends(get_current_user)):
-    db = get_database()
-    if db is None:
-        raise HTTPException(status_code=500, detail="Database connection not available")
+    from ..services.user_service import user_service
+
     project_dict = project.dict()
     project_dict["owner_id"] = current_user.username
     project_dict["team_members"] = [current_user.username]
-    result = await db.projects.insert_one(project_dict)
-    created_project = await db.projects.find_one({"_id": result.inserted_id})
+    project_dict["task_counters"] = ProjectTaskCounters(rebuilt_at=datetime.utcnow()).dict()
+    created_project = await repository.projects.insert(project_dict)
+    await user_service.record_project_change(None, created_project)
     return Project(**created_project)
 
 @router.get("/", response_model=List[Project])
 async def get_projects(current_user: User = Depends(get_current_user)):
-    db = get_database()
-    projects = await db.projects.find({"$or": [{"owner_id": current_user.username}, {"team_members": current_user.username}]}).to_list(length=None)
+    projects = await repository.projects.find_accessible_projects(current_user.username)
     return [Project(**project) for project in projects]
 
 @router.get("/{project_id}", response_model=Project)
 async def get_project(project_id: str, current_user: User = Depends(get_current_user)):
-    db = get_database()
-    project = await db.projects.find_one({"_id": project_id, "$or": [{"owner_id": current_user.username}, {"team_members": current_user.username}]})
+    project = await repository.projects.find_accessible(project_id, current_user.username, projection=None)
     if not project:
         raise HTTPException(status_code=404, detail="Project not found")
     return Project(**project)
 
 @router.put("/{project_id}", response_model=Project)
 async def update_project(project_id: str, project_update: ProjectUpdate, current_user: User = Depends(get_current_user)):
-    db = get_database()
     # Check if user owns the project
-    project = await db.projects.find_one({"_id": project_id, "owner_id": current_user.username})
+    project = await repository.projects.find_owned(project_id, current_user.username)
     if not project:
         raise HTTPException(status_code=404, detail="Project not found or not authorized")
     
+    from ..services.user_service import user_service
+
     update_data = {k: v for k, v in project_update.dict().items() if v is not None}
     update_data["updated_at"] = datetime.utcnow()
     
-    await db.projects.update_one({"_id": project_id}, {"$set": update_data})
-    updated_project = await db.projects.find_one({"_id": project_id})
+    if "team_members" in update_data:
+        # Membership changes feed the materialized user statistics
+        previous = await repository.projects.update_by_id(
+            project_id, {"$set": update_data}, return_document=ReturnDocument.BEFORE
+        )
+        if previous is None:
+            raise HTTPException(status_code=404, detail="Project not found or not authorized")
+        updated_project = {**previous, **update_data}
+        await user_service.record_project_change(previous, updated_project)
+    else:
+        updated_project = await repository.projects.update_by_id(project_id, {"$set": update_data})
+        if updated_project is None:
+            raise HTTPException(status_code=404, detail="Project not found or not authorized")
     return Project(**updated_project)
 
 @router.delete("/{project_id}")
 async def delete_project(project_id: str, current_user: User = Depends(get_current_user)):
-    db = get_database()
     # Check if user owns the project
-    project = await db.projects.find_one({"_id": project_id, "owner_id": current_user.username})
+    project = await repository.projects.find_owned(project_id, current_user.username)
     if not project:
         raise HTTPException(status_code=404, detail="Project not found or not authorized")
 
-    await db.projects.delete_one({"_id": project_id})
+    from ..services.user_service import user_service
+
+    deleted_project = await repository.projects.take_by_id(project_id)
+    if deleted_project:
+        await user_service.record_project_change(deleted_project, None)
     return {"message": "Project deleted successfully"}
 
 @router.post("/{project_id}/budget/spend")
@@ -65,8 +80,7 @@ async def update_spent_amount(project_id: str, amount: float, current_user: User
     from ..services.project_service import project_service
 
     # Check if user has access to the project
-    db = get_database()
-    project = await db.projects.find_one({"_id": project_id, "$or": [{"owner_id": current_user.username}, {"team_members": current_user.username}]})
+    project = await repository.projects.find_accessible(project_id, current_user.username)
     if not project:
         raise HTTPException(status_code=404, detail="Project not found or not authorized")
 
@@ -76,28 +90,37 @@ async def update_spent_amount(project_id: str, amount: float, current_user: User
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
 
-@router.get("/{project_id}/budget/report")
+@router.get("/{project_id}/budget/report", dependencies=[Depends(report_reads)])
 async def get_budget_report(project_id: str, current_user: User = Depends(get_current_user)):
     from ..services.project_service import project_service
 
     # Check if user has access to the project
-    db = get_database()
-    project = await db.projects.find_one({"_id": project_id, "$or": [{"owner_id": current_user.username}, {"team_members": current_user.username}]})
+    project = await repository.projects.find_accessible(project_id, current_user.username)
     if not project:
         raise HTTPException(status_code=404, detail="Project not found or not authorized")
 
     report = await project_service.get_budget_report(project_id)
     return report
 
-@router.get("/{project_id}/budget/alert")
+@router.get("/{project_id}/budget/alert", dependencies=[Depends(report_reads)])
 async def check_budget_alert(project_id: str, current_user: User = Depends(get_current_user)):
     from ..services.project_service import project_service
 
     # Check if user has access to the project
-    db = get_database()
-    project = await db.projects.find_one({"_id": project_id, "$or": [{"owner_id": current_user.username}, {"team_members": current_user.username}]})
+    project = await repository.projects.find_accessible(project_id, current_user.username)
     if not project:
         raise HTTPException(status_code=404, detail="Project not found or not authorized")
 
     alert = await project_service.check_budget_alert(project_id)
     return alert
+
+@router.get("/{project_id}/schedule", dependencies=[Depends(report_reads)])
+async def get_project_schedule(project_id: str, current_user: User = Depends(get_current_user)):
+    from ..services.project_service import project_service
+
+    # Check if user has access to the project
+    project = await repository.projects.find_accessible(project_id, current_user.username)
+    if not project:
+        raise HTTPException(status_code=404, detail="Project not found or not authorized")
+
+    return await project_service.get_schedule_report(project_id)
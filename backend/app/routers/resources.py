@@ -1,7 +1,8 @@
-from typing import List
+from typing import List, Optional
 from datetime import datetime
 from fastapi import APIRouter, Depends, HTTPException
-from ..database import get_database
+from .. import repository
+from ..database import report_reads
 from ..models.resource import Resource, ResourceCreate, ResourceUpdate
 from ..models.user import User
 from ..routers.auth import get_current_user
@@ -10,47 +11,78 @@ router = APIRouter()
 
 @router.post("/", response_model=Resource)
 async def create_resource(resource: ResourceCreate, current_user: User = Depends(get_current_user)):
-    db = get_database()
-    if db is None:
-        raise HTTPException(status_code=500, detail="Database connection not available")
     # Check if project exists and user has access
-    project = await db.projects.find_one({"_id": resource.project_id, "$or": [{"owner_id": current_user.username}, {"team_members": current_user.username}]})
+    project = await repository.projects.find_accessible(resource.project_id, current_user.username)
     if not project:
         raise HTTPException(status_code=404, detail="Project not found or not authorized")
 
     resource_dict = resource.dict()
-    result = await db.resources.insert_one(resource_dict)
-    created_resource = await db.resources.find_one({"_id": result.inserted_id})
+    created_resource = await repository.resources.insert(resource_dict)
     return Resource(**created_resource)
 
 @router.get("/", response_model=List[Resource])
 async def get_resources(project_id: str = None, current_user: User = Depends(get_current_user)):
-    db = get_database()
     query = {}
     if project_id:
         # Check project access
-        project = await db.projects.find_one({"_id": project_id, "$or": [{"owner_id": current_user.username}, {"team_members": current_user.username}]})
+        project = await repository.projects.find_accessible(project_id, current_user.username)
         if not project:
             raise HTTPException(status_code=404, detail="Project not found or not authorized")
         query["project_id"] = project_id
     else:
         # Get resources from user's projects
-        user_projects = await db.projects.find({"$or": [{"owner_id": current_user.username}, {"team_members": current_user.username}]}).to_list(length=None)
-        project_ids = [p["_id"] for p in user_projects]
+        project_ids = await repository.projects.accessible_ids(current_user.username)
         query["project_id"] = {"$in": project_ids}
     
-    resources = await db.resources.find(query).to_list(length=None)
+    resources = await repository.resources.find(query)
     return [Resource(**resource) for resource in resources]
 
+@router.get("/available")
+async def find_available_resources(project_id: str, resource_type: str, required_quantity: float,
+                                   start_date: datetime, end_date: Optional[datetime] = None,
+                                   current_user: User = Depends(get_current_user)):
+    from ..services.resource_service import resource_service
+
+    # Check project access
+    project = await repository.projects.find_accessible(project_id, current_user.username)
+    if not project:
+        raise HTTPException(status_code=404, detail="Project not found or not authorized")
+
+    return await resource_service.search_availability(
+        project_id, resource_type, required_quantity, [(start_date, end_date)]
+    )
+
+@router.get("/utilization/heatmap", dependencies=[Depends(report_reads)])
+async def get_utilization_heatmap(project_id: str, start_date: Optional[datetime] = None, days: int = 90,
+                                  current_user: User = Depends(get_current_user)):
+    from ..services.resource_service import resource_service
+
+    # Check project access
+    project = await repository.projects.find_accessible(project_id, current_user.username)
+    if not project:
+        raise HTTPException(status_code=404, detail="Project not found or not authorized")
+
+    return await resource_service.get_utilization_heatmap(project_id, start_date, days)
+
+@router.get("/leveling", dependencies=[Depends(report_reads)])
+async def get_leveling_plan(project_id: str, current_user: User = Depends(get_current_user)):
+    from ..services.resource_service import resource_service
+
+    # Check project access
+    project = await repository.projects.find_accessible(project_id, current_user.username)
+    if not project:
+        raise HTTPException(status_code=404, detail="Project not found or not authorized")
+
+    return await resource_service.optimize_resource_allocation(project_id)
+
 @router.get("/{resource_id}", response_model=Resource)
 async def get_resource(resource_id: str, current_user: User = Depends(get_current_user)):
-    db = get_database()
-    resource = await db.resources.find_one({"_id": resource_id})
+    resource = await repository.resources.find_by_id(resource_id)
     if not resource:
         raise HTTPException(status_code=404, detail="Resource not found")
     
     # Check project access
-    project = await db.projects.find_one({"_id": resource["project_id"], "$or": [{"owner_id": current_user.username}, {"team_members": current_user.username}]})
+    project = await repository.projects.find_accessible(resource["project_id"], current_user.username)
     if not project:
         raise HTTPException(status_code=404, detail="Not authorized")
     
@@ -58,34 +90,42 @@ async def get_resource(resource_id: str, current_user: User = Depends(get_curren
 
 @router.put("/{resource_id}", response_model=Resource)
 async def update_resource(resource_id: str, resource_update: ResourceUpdate, current_user: User = Depends(get_current_user)):
-    db = get_database()
-    resource = await db.resources.find_one({"_id": resource_id})
+    resource = await repository.resources.find_by_id(resource_id)
     if not resource:
         raise HTTPException(status_code=404, detail="Resource not found")
     
     # Check project access
-    project = await db.projects.find_one({"_id": resource["project_id"], "$or": [{"owner_id": current_user.username}, {"team_members": current_user.username}]})
+    project = await repository.projects.find_accessible(resource["project_id"], current_user.username)
     if not project:
         raise HTTPException(status_code=404, detail="Not authorized")
     
+    from ..services.resource_service import resource_service
+
     update_data = {k: v for k, v in resource_update.dict().items() if v is not None}
     update_data["updated_at"] = datetime.utcnow()
     
-    await db.resources.update_one({"_id": resource_id}, {"$set": update_data})
-    updated_resource = await db.resources.find_one({"_id": resource_id})
+    updated_resource = await repository.resources.update_by_id(resource_id, {"$set": update_data})
+    if updated_resource is None:
+        raise HTTPException(status_code=404, detail="Resource not found")
+    if updated_resource.get("quantity") != resource.get("quantity"):
+        # The utilization buckets are ratios against the capacity
+        await resource_service.materialize_utilization(resource_id)
     return Resource(**updated_resource)
 
 @router.delete("/{resource_id}")
 async def delete_resource(resource_id: str, current_user: User = Depends(get_current_user)):
-    db = get_database()
-    resource = await db.resources.find_one({"_id": resource_id})
+    resource = await repository.resources.find_by_id(resource_id)
     if not resource:
         raise HTTPException(status_code=404, detail="Resource not found")
     
     # Check project access
-    project = await db.projects.find_one({"_id": resource["project_id"], "$or": [{"owner_id": current_user.username}, {"team_members": current_user.username}]})
+    project = await repository.projects.find_accessible(resource["project_id"], current_user.username)
     if not project:
         raise HTTPException(status_code=404, detail="Not authorized")
     
-    await db.resources.delete_one({"_id": resource_id})
+    from ..services.resource_service import resource_service
+
+    await repository.resources.delete_by_id(resource_id)
+    await repository.resource_allocations.delete_many({"resource_id": resource["id"]})
+    await resource_service.delete_utilization(resource["id"])
     return {"message": "Resource deleted successfully"}
@@ -1,8 +1,9 @@
 from typing import List
-from datetime import datetime
 from fastapi import APIRouter, Depends, HTTPException
-from ..database import get_database
-from ..models.task import Task, TaskCreate, TaskUpdate
+from .. import repository
+from ..models.task import (
+    Task, TaskCreate, TaskUpdate, TaskBatchAssignment, TaskBulkCreate, TaskBulkUpdate, TaskBulkDelete
+)
 from ..models.user import User
 from ..routers.auth import get_current_user
 
@@ -10,47 +11,80 @@ router = APIRouter()
 
 @router.post("/", response_model=Task)
 async def create_task(task: TaskCreate, current_user: User = Depends(get_current_user)):
-    db = get_database()
-    if db is None:
-        raise HTTPException(status_code=500, detail="Database connection not available")
     # Check if project exists and user has access
-    project = await db.projects.find_one({"_id": task.project_id, "$or": [{"owner_id": current_user.username}, {"team_members": current_user.username}]})
+    project = await repository.projects.find_accessible(task.project_id, current_user.username)
     if not project:
         raise HTTPException(status_code=404, detail="Project not found or not authorized")
 
-    task_dict = task.dict()
-    result = await db.tasks.insert_one(task_dict)
-    created_task = await db.tasks.find_one({"_id": result.inserted_id})
-    return Task(**created_task)
+    from ..services.task_service import task_service
+
+    return await task_service.create_task(task, current_user)
 
 @router.get("/", response_model=List[Task])
 async def get_tasks(project_id: str = None, current_user: User = Depends(get_current_user)):
-    db = get_database()
     query = {}
     if project_id:
         # Check project access
-        project = await db.projects.find_one({"_id": project_id, "$or": [{"owner_id": current_user.username}, {"team_members": current_user.username}]})
+        project = await repository.projects.find_accessible(project_id, current_user.username)
         if not project:
             raise HTTPException(status_code=404, detail="Project not found or not authorized")
         query["project_id"] = project_id
     else:
         # Get tasks from user's projects
-        user_projects = await db.projects.find({"$or": [{"owner_id": current_user.username}, {"team_members": current_user.username}]}).to_list(length=None)
-        project_ids = [p["_id"] for p in user_projects]
+        project_ids = await repository.projects.accessible_ids(current_user.username)
         query["project_id"] = {"$in": project_ids}
     
-    tasks = await db.tasks.find(query).to_list(length=None)
+    tasks = await repository.tasks.find(query)
     return [Task(**task) for task in tasks]
 
+@router.post("/assign/batch")
+async def assign_tasks_batch(assignment: TaskBatchAssignment, current_user: User = Depends(get_current_user)):
+    from ..services.task_service import task_service
+
+    # Check project access
+    project = await repository.projects.find_accessible(assignment.project_id, current_user.username)
+    if not project:
+        raise HTTPException(status_code=404, detail="Project not found or not authorized")
+
+    assignments = await task_service.assign_tasks_batch(
+        assignment.task_ids,
+        assignment.project_id,
+        weight_by_hours=assignment.weight_by_hours,
+        skill_levels=assignment.skill_levels
+    )
+    return {"assigned": len(assignments), "assignments": assignments}
+
+def _bulk_response(results: List[dict]) -> dict:
+    failed = sum(1 for result in results if result["status"] == "error")
+    return {"succeeded": len(results) - failed, "failed": failed, "results": results}
+
+@router.post("/bulk")
+async def bulk_create_tasks(payload: TaskBulkCreate, current_user: User = Depends(get_current_user)):
+    from ..services.task_service import task_service
+
+    return _bulk_response(await task_service.bulk_create_tasks(payload.tasks, current_user))
+
+@router.put("/bulk")
+async def bulk_update_tasks(payload: TaskBulkUpdate, current_user: User = Depends(get_current_user)):
+    from ..services.task_service import task_service
+
+    items = [(item.task_id, item.update) for item in payload.items]
+    return _bulk_response(await task_service.bulk_update_tasks(items, current_user))
+
+@router.delete("/bulk")
+async def bulk_delete_tasks(payload: TaskBulkDelete, current_user: User = Depends(get_current_user)):
+    from ..services.task_service import task_service
+
+    return _bulk_response(await task_service.bulk_delete_tasks(payload.task_ids, current_user))
+
 @router.get("/{task_id}", response_model=Task)
 async def get_task(task_id: str, current_user: User = Depends(get_current_user)):
-    db = get_database()
-    task = await db.tasks.find_one({"_id": task_id})
+    task = await repository.tasks.find_by_id(task_id)
     if not task:
         raise HTTPException(status_code=404, detail="Task not found")
     
     # Check project access
-    project = await db.projects.find_one({"_id": task["project_id"], "$or": [{"owner_id": current_user.username}, {"team_members": current_user.username}]})
+    project = await repository.projects.find_accessible(task["project_id"], current_user.username)
     if not project:
         raise HTTPException(status_code=404, detail="Not authorized")
     
@@ -58,34 +92,39 @@ async def get_task(task_id: str, current_user: User = Depends(get_current_user))
 
 @router.put("/{task_id}", response_model=Task)
 async def update_task(task_id: str, task_update: TaskUpdate, current_user: User = Depends(get_current_user)):
-    db = get_database()
-    task = await db.tasks.find_one({"_id": task_id})
+    task = await repository.tasks.find_by_id(task_id)
     if not task:
         raise HTTPException(status_code=404, detail="Task not found")
     
     # Check project access
-    project = await db.projects.find_one({"_id": task["project_id"], "$or": [{"owner_id": current_user.username}, {"team_members": current_user.username}]})
+    project = await repository.projects.find_accessible(task["project_id"], current_user.username)
     if not project:
         raise HTTPException(status_code=404, detail="Not authorized")
     
-    update_data = {k: v for k, v in task_update.dict().items() if v is not None}
-    update_data["updated_at"] = datetime.utcnow()
-    
-    await db.tasks.update_one({"_id": task_id}, {"$set": update_data})
-    updated_task = await db.tasks.find_one({"_id": task_id})
-    return Task(**updated_task)
+    from ..services.task_service import task_service
+
+    if task_update.dependencies is not None:
+        if not await task_service.validate_dependencies(task_id, task_update.dependencies, project_id=task["project_id"]):
+            raise HTTPException(status_code=400, detail="Invalid or circular task dependencies")
+
+    # The service keeps the counters, the cached dependency graph and the schedule in step
+    updated_task = await task_service.update_task(task_id, task_update, current_user)
+    if updated_task is None:
+        raise HTTPException(status_code=404, detail="Task not found")
+    return updated_task
 
 @router.delete("/{task_id}")
 async def delete_task(task_id: str, current_user: User = Depends(get_current_user)):
-    db = get_database()
-    task = await db.tasks.find_one({"_id": task_id})
+    task = await repository.tasks.find_by_id(task_id)
     if not task:
         raise HTTPException(status_code=404, detail="Task not found")
     
     # Check project access
-    project = await db.projects.find_one({"_id": task["project_id"], "$or": [{"owner_id": current_user.username}, {"team_members": current_user.username}]})
+    project = await repository.projects.find_accessible(task["project_id"], current_user.username)
     if not project:
         raise HTTPException(status_code=404, detail="Not authorized")
     
-    await db.tasks.delete_one({"_id": task_id})
+    from ..services.task_service import task_service
+
+    await task_service.delete_task(task_id, current_user)
     return {"message": "Task deleted successfully"}
@@ -0,0 +1,89 @@
+from typing import Any, Dict, Iterable, List, Optional
+from datetime import datetime
+from bisect import bisect_left, bisect_right
+
+# Open-ended allocations extend to the end of time
+OPEN_END = datetime.max
+
+
+def _field(allocation: Any, name: str):
+    return allocation.get(name) if isinstance(allocation, dict) else getattr(allocation, name)
+
+
+class AllocationIndex:
+    """
+    Interval index over a resource's allocation windows.
+
+    Allocations are swept into a step function of concurrently allocated
+    quantity over half-open windows [start_date, end_date), and a segment tree
+    over the steps answers "peak allocated quantity within a window" in
+    O(log n) after an O(n log n) build.
+    """
+
+    def __init__(self, allocations: Iterable[Any] = ()):
+        self.allocations = list(allocations)
+        deltas: Dict[datetime, float] = {}
+        for allocation in self.allocations:
+            start = _field(allocation, "start_date")
+            end = _field(allocation, "end_date") or OPEN_END
+            if end <= start:
+                continue
+            quantity = _field(allocation, "allocated_quantity") or 0.0
+            deltas[start] = deltas.get(start, 0.0) + quantity
+            deltas[end] = deltas.get(end, 0.0) - quantity
+
+        # times[i] starts a step where `levels[i]` is allocated until times[i + 1]
+        self.times: List[datetime] = sorted(deltas)
+        self.levels: List[float] = []
+        level = 0.0
+        for time in self.times:
+            level += deltas[time]
+            self.levels.append(level)
+
+        self._size = len(self.levels)
+        self._tree = [0.0] * (2 * self._size)
+        self._tree[self._size:] = self.levels
+        for node in range(self._size - 1, 0, -1):
+            self._tree[node] = max(self._tree[2 * node], self._tree[2 * node + 1])
+
+    def __len__(self) -> int:
+        return len(self.allocations)
+
+    def peak(self, start: datetime, end: Optional[datetime] = None) -> float:
+        """
+        Peak concurrently allocated quantity anywhere in [start, end)
+        """
+        end = end or OPEN_END
+        if not self._size or end <= start:
+            return 0.0
+        # Steps overlapping the window: the one containing `start` up to the last one starting before `end`
+        first = max(bisect_right(self.times, start) - 1, 0)
+        last = bisect_left(self.times, end) - 1
+        if last < first:
+            return 0.0
+        return max(self._range_max(first, last + 1), 0.0)
+
+    def overlapping(self, start: datetime, end: Optional[datetime] = None) -> List[Any]:
+        """
+        Allocations whose window intersects [start, end)
+        """
+        end = end or OPEN_END
+        return [
+            allocation for allocation in self.allocations
+            if _field(allocation, "start_date") < end and (_field(allocation, "end_date") or OPEN_END) > start
+        ]
+
+    def _range_max(self, lo: int, hi: int) -> float:
+        result = float("-inf")
+        lo += self._size
+        hi += self._size
+        while lo < hi:
+            if lo & 1:
+                result = max(result, self._tree[lo])
+                lo += 1
+            if hi & 1:
+                hi -= 1
+                result = max(result, self._tree[hi])
+            lo //= 2
+            hi //= 2
+        return result
@@ -7,7 +7,8 @@ import jwt
 from jwt import ExpiredSignatureError, InvalidTokenError
 from passlib.context import CryptContext
 from ..database import get_database
-from ..models.user import UserInDB
+from ..repository import insert_document, update_document
+from ..models.user import User, UserInDB
 
 # Security settings
 SECRET_KEY = "your-secret-key-here"  # In production, use environment variable
@@ -133,31 +134,28 @@ async def authenticate_or_create_github_user(github_user_data: Dict[str, Any], a
     """
     db = get_database()
 
-    # Try to find existing user by GitHub ID
-    existing_user = await db.users.find_one({"github_id": github_user_data["id"]})
-
+    # Update the access token of the user with this GitHub ID; the write returns the updated user
+    existing_user = await update_document(
+        db.users,
+        {"github_id": github_user_data["id"]},
+        {"$set": {"github_access_token": access_token, "updated_at": datetime.now(timezone.utc)}}
+    )
     if existing_user:
-        # Update access token
-        await db.users.update_one(
-            {"_id": existing_user["_id"]},
-            {"$set": {"github_access_token": access_token, "updated_at": datetime.now(timezone.utc)}}
-        )
         return UserInDB(**existing_user)
 
-    # Try to find by email
-    existing_user = await db.users.find_one({"email": github_user_data.get("email")})
-
-    if existing_user:
-        # Link GitHub account
-        await db.users.update_one(
-            {"_id": existing_user["_id"]},
+    # Link the GitHub account to the user with the same email
+    if github_user_data.get("email"):
+        existing_user = await update_document(
+            db.users,
+            {"email": github_user_data["email"]},
             {"$set": {
                 "github_id": github_user_data["id"],
                 "github_access_token": access_token,
                 "updated_at": datetime.now(timezone.utc)
             }}
         )
-        return UserInDB(**existing_user)
+        if existing_user:
+            return UserInDB(**existing_user)
 
     # Create new user
     username = github_user_data["login"]
@@ -180,8 +178,7 @@ async def authenticate_or_create_github_user(github_user_data: Dict[str, Any], a
         "updated_at": datetime.now(timezone.utc)
     }
 
-    result = await db.users.insert_one(user_dict)
-    created_user = await db.users.find_one({"_id": result.inserted_id})
+    created_user = await insert_document(db.users, user_dict)
     return UserInDB(**created_user)
 
 # Google OAuth functions
@@ -250,31 +247,28 @@ async def authenticate_or_create_google_user(google_user_data: Dict[str, Any], a
     """
     db = get_database()
 
-    # Try to find existing user by Google ID
-    existing_user = await db.users.find_one({"google_id": google_user_data["id"]})
-
+    # Update the access token of the user with this Google ID; the write returns the updated user
+    existing_user = await update_document(
+        db.users,
+        {"google_id": google_user_data["id"]},
+        {"$set": {"google_access_token": access_token, "updated_at": datetime.now(timezone.utc)}}
+    )
     if existing_user:
-        # Update access token
-        await db.users.update_one(
-            {"_id": existing_user["_id"]},
-            {"$set": {"google_access_token": access_token, "updated_at": datetime.now(timezone.utc)}}
-        )
         return UserInDB(**existing_user)
 
-    # Try to find by email
-    existing_user = await db.users.find_one({"email": google_user_data.get("email")})
-
-    if existing_user:
-        # Link Google account
-        await db.users.update_one(
-            {"_id": existing_user["_id"]},
+    # Link the Google account to the user with the same email
+    if google_user_data.get("email"):
+        existing_user = await update_document(
+            db.users,
+            {"email": google_user_data["email"]},
             {"$set": {
                 "google_id": google_user_data["id"],
                 "google_access_token": access_token,
                 "updated_at": datetime.now(timezone.utc)
             }}
         )
-        return UserInDB(**existing_user)
+        if existing_user:
+            return UserInDB(**existing_user)
 
     # Create new user
     username = google_user_data.get("email", "").split("@")[0]
@@ -297,12 +291,11 @@ async def authenticate_or_create_google_user(google_user_data: Dict[str, Any], a
         "updated_at": datetime.now(timezone.utc)
     }
 
-    result = await db.users.insert_one(user_dict)
-    created_user = await db.users.find_one({"_id": result.inserted_id})
+    created_user = await insert_document(db.users, user_dict)
     return UserInDB(**created_user)
 
 # Role-based access control functions
-def check_user_role(user: UserInDB, required_role: str) -> bool:
+def check_user_role(user: User, required_role: str) -> bool:
     """
     Check if user has required role
     """
@@ -1,8 +1,44 @@
 import asyncio
-from typing import Callable, Any, Dict
+from typing import Callable, Any, Awaitable, Dict, List, Optional
 from datetime import datetime, timedelta
 import heapq
+import os
 import uuid
+from pymongo import ASCENDING, DESCENDING, ReturnDocument
+from pymongo.errors import DuplicateKeyError
+import redis.asyncio as redis
+from ..database import LiveDatabase
+from ..repository import Repository, decode_document, encode_id
+from .event_broker import REDIS_URL
+
+# Concurrent job workers per process
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "4"))
+# A claimed job returns to the queue when its worker stops renewing the lease for this long
+JOB_LEASE_SECONDS = int(os.getenv("JOB_LEASE_SECONDS", "60"))
+# Idle workers sleep until the next job is due or a wakeup arrives; without the notify
+# channel they cannot hear about other processes' jobs, so they also poll at this interval
+JOB_POLL_INTERVAL_SECONDS = float(os.getenv("JOB_POLL_INTERVAL_SECONDS", "1"))
+# Longest idle sleep with the notify channel up, a safety net for lost notifications
+JOB_MAX_IDLE_SECONDS = float(os.getenv("JOB_MAX_IDLE_SECONDS", "300"))
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "5"))
+# Retry delays double from the base up to the cap
+JOB_RETRY_BASE_SECONDS = float(os.getenv("JOB_RETRY_BASE_SECONDS", "5"))
+JOB_RETRY_MAX_SECONDS = float(os.getenv("JOB_RETRY_MAX_SECONDS", "3600"))
+# Completed jobs (and their dedup keys) are kept this long
+JOB_RETENTION_SECONDS = int(os.getenv("JOB_RETENTION_SECONDS", str(7 * 86400)))
+
+QUEUED = "queued"
+RUNNING = "running"
+COMPLETED = "completed"
+# Dead-lettered: out of attempts, kept until retried or removed by hand
+DEAD = "dead"
+
+# Redis pub/sub channel announcing newly queued jobs to every process
+JOB_NOTIFY_CHANNEL = "gravitypm:jobs"
+# Recurring job slots are aligned to this, so every process computes the same run times
+PERIODIC_EPOCH = datetime(1970, 1, 1)
+
+JobHandler = Callable[..., Awaitable[Any]]
 
 class Job:
     def __init__(self, func: Callable, args: tuple = (), kwargs: dict = {}, run_at: datetime = None):
@@ -23,9 +59,12 @@ class BackgroundJobProcessor:
     def __init__(self):
         self.job_queue = []
         self.running = False
+        self._wakeup = asyncio.Event()
 
     def add_job(self, job: Job):
         heapq.heappush(self.job_queue, job)
+        # The new job may be due before the one the loop is waiting for
+        self._wakeup.set()
 
     async def run_job(self, job: Job):
         job.status = "running"
@@ -42,14 +81,345 @@ class BackgroundJobProcessor:
     async def process_jobs(self):
         self.running = True
         while self.running:
+            self._wakeup.clear()
             now = datetime.utcnow()
             if self.job_queue and self.job_queue[0].run_at <= now:
                 job = heapq.heappop(self.job_queue)
                 await self.run_job(job)
-            else:
-                await asyncio.sleep(1)
+                continue
+            # Sleep until the head job is due, or indefinitely with nothing queued
+            timeout = (self.job_queue[0].run_at - now).total_seconds() if self.job_queue else None
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
 
     def stop(self):
         self.running = False
+        self._wakeup.set()
 
 background_job_processor = BackgroundJobProcessor()
+
+
+class JobQueue:
+    """
+    Durable job queue in the `jobs` collection, shared by every worker process.
+
+    Jobs name a handler registered with `register` and carry keyword arguments, so
+    they survive restarts. Workers claim the highest priority due job with one atomic
+    find_one_and_update that takes a lease; the lease is renewed while the handler
+    runs and a job whose lease lapses (its worker died) is queued again. Failures are
+    retried with exponential backoff and dead-lettered once out of attempts.
+
+    Idle workers sleep until the earliest queued job is due. Enqueuing wakes this
+    process's workers directly and every other process through a Redis notify channel.
+    """
+
+    db = LiveDatabase()
+
+    def __init__(self):
+        self.jobs = Repository("jobs", lambda: self.db)
+        self.handlers: Dict[str, JobHandler] = {}
+        self.worker_id = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self.running = False
+        self.workers = 0
+        self._tasks: List[asyncio.Task] = []
+        self._wakeup = asyncio.Event()
+        self._notify_client = None
+        self._notify_pubsub = None
+
+    def register(self, name: str, handler: JobHandler):
+        self.handlers[name] = handler
+        return handler
+
+    async def enqueue(self, name: str, payload: Optional[Dict[str, Any]] = None, run_at: Optional[datetime] = None,
+                      priority: int = 0, max_attempts: int = JOB_MAX_ATTEMPTS,
+                      key: Optional[str] = None) -> Optional[str]:
+        """
+        Queue a job and return its id. A job with a `key` is queued at most once per
+        key (until its retention ends); None means one was already queued.
+        """
+        now = datetime.utcnow()
+        document = {
+            "name": name,
+            "payload": payload or {},
+            "status": QUEUED,
+            "priority": priority,
+            "run_at": run_at or now,
+            "attempts": 0,
+            "max_attempts": max_attempts,
+            "created_at": now
+        }
+        if key is None:
+            job_id = (await self.jobs.insert(document))["id"]
+        else:
+            document["key"] = key
+            try:
+                result = await self.jobs.collection.update_one({"key": key}, {"$setOnInsert": document}, upsert=True)
+            except DuplicateKeyError:
+                # Another process queued the same key concurrently
+                return None
+            if result.upserted_id is None:
+                return None
+            job_id = str(result.upserted_id)
+        await self.notify()
+        return job_id
+
+    async def enqueue_periodic(self, name: str, interval_seconds: int, priority: int = 0,
+                               after: Optional[datetime] = None) -> Optional[str]:
+        """
+        Queue the next run of a recurring job at the start of the next `interval_seconds`
+        slot after `after` (now by default). Runs are keyed by name and slot, so every
+        worker process can call this and each slot still runs once. The handler receives
+        `interval_seconds` to queue its own next run.
+        """
+        elapsed = int(((after or datetime.utcnow()) - PERIODIC_EPOCH).total_seconds())
+        run_at = PERIODIC_EPOCH + timedelta(seconds=(elapsed // interval_seconds + 1) * interval_seconds)
+        return await self.enqueue(
+            name, {"interval_seconds": interval_seconds}, run_at=run_at, priority=priority,
+            key=f"{name}:{run_at.isoformat()}"
+        )
+
+    async def notify(self):
+        """
+        Wake idle workers here and in every other process to look for due jobs
+        """
+        self._wakeup.set()
+        if self._notify_client is None:
+            return
+        try:
+            await self._notify_client.publish(JOB_NOTIFY_CHANNEL, self.worker_id)
+        except Exception as e:
+            # Other processes still find the job within their idle timeout
+            print(f"Job notification failed: {e}")
+
+    async def claim(self) -> Optional[Dict[str, Any]]:
+        """
+        Atomically take the next due job, highest priority first, under a fresh lease
+        """
+        now = datetime.utcnow()
+        document = await self.jobs.collection.find_one_and_update(
+            {"status": QUEUED, "run_at": {"$lte": now}},
+            {
+                "$set": {
+                    "status": RUNNING,
+                    "worker": self.worker_id,
+                    "lease": uuid.uuid4().hex,
+                    "lease_until": now + timedelta(seconds=JOB_LEASE_SECONDS),
+                    "started_at": now
+                },
+                "$inc": {"attempts": 1}
+            },
+            sort=[("priority", DESCENDING), ("run_at", ASCENDING)],
+            return_document=ReturnDocument.AFTER
+        )
+        return decode_document(document)
+
+    def _leased(self, job: Dict[str, Any]) -> Dict[str, Any]:
+        # Only the holder of the current lease may renew or finish the job
+        return {"_id": encode_id(job["id"]), "status": RUNNING, "lease": job["lease"]}
+
+    async def renew_lease(self, job: Dict[str, Any]) -> bool:
+        result = await self.jobs.collection.update_one(
+            self._leased(job),
+            {"$set": {"lease_until": datetime.utcnow() + timedelta(seconds=JOB_LEASE_SECONDS)}}
+        )
+        return bool(result.modified_count)
+
+    async def complete(self, job: Dict[str, Any], result: Any = None):
+        now = datetime.utcnow()
+        await self.jobs.collection.update_one(self._leased(job), {
+            "$set": {
+                "status": COMPLETED,
+                "result": result,
+                "finished_at": now,
+                "expires_at": now + timedelta(seconds=JOB_RETENTION_SECONDS)
+            },
+            "$unset": {"lease": "", "lease_until": ""}
+        })
+
+    async def fail(self, job: Dict[str, Any], error: str):
+        """
+        Queue a failed job again after its backoff, or dead-letter it once out of attempts
+        """
+        now = datetime.utcnow()
+        if job["attempts"] >= job["max_attempts"]:
+            update = {"status": DEAD, "error": error, "finished_at": now}
+        else:
+            update = {"status": QUEUED, "error": error, "run_at": now + timedelta(seconds=self.backoff(job["attempts"]))}
+        await self.jobs.collection.update_one(
+            self._leased(job), {"$set": update, "$unset": {"lease": "", "lease_until": ""}}
+        )
+
+    @staticmethod
+    def backoff(attempts: int) -> float:
+        return min(JOB_RETRY_BASE_SECONDS * 2 ** (attempts - 1), JOB_RETRY_MAX_SECONDS)
+
+    async def recover_expired_leases(self) -> int:
+        """
+        Return jobs whose worker stopped renewing their lease to the queue, dead-lettering
+        those that have used up their attempts
+        """
+        now = datetime.utcnow()
+        expired = {"status": RUNNING, "lease_until": {"$lt": now}}
+        unset = {"lease": "", "lease_until": ""}
+        dead = await self.jobs.collection.update_many(
+            {**expired, "$expr": {"$gte": ["$attempts", "$max_attempts"]}},
+            {"$set": {"status": DEAD, "error": "Lease expired", "finished_at": now}, "$unset": unset}
+        )
+        requeued = await self.jobs.collection.update_many(
+            expired, {"$set": {"status": QUEUED, "error": "Lease expired", "run_at": now}, "$unset": unset}
+        )
+        if requeued.modified_count:
+            await self.notify()
+        return dead.modified_count + requeued.modified_count
+
+    async def retry(self, job_id: str) -> bool:
+        """
+        Queue a dead-lettered job again with a fresh set of attempts
+        """
+        job = await self.jobs.update(
+            {"_id": encode_id(job_id), "status": DEAD},
+            {"$set": {"status": QUEUED, "run_at": datetime.utcnow(), "attempts": 0}, "$unset": {"finished_at": ""}}
+        )
+        if job is None:
+            return False
+        await self.notify()
+        return True
+
+    async def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        return await self.jobs.find_by_id(job_id)
+
+    async def dead_letters(self, limit: int = 50) -> List[Dict[str, Any]]:
+        return await self.jobs.find({"status": DEAD}, sort=[("finished_at", DESCENDING)], limit=limit)
+
+    async def stats(self) -> Dict[str, Any]:
+        counts = await self.jobs.collection.aggregate([
+            {"$group": {"_id": "$status", "count": {"$sum": 1}}}
+        ]).to_list(length=None)
+        return {
+            "worker": self.worker_id,
+            "workers": self.workers,
+            "jobs": {row["_id"]: row["count"] for row in counts}
+        }
+
+    async def execute(self, job: Dict[str, Any]):
+        handler = self.handlers.get(job["name"])
+        if handler is None:
+            # Another process (e.g. a newer deploy) may know the handler
+            await self.fail(job, f"No handler registered for {job['name']}")
+            return
+        renewal = asyncio.create_task(self._renew_while_running(job))
+        try:
+            result = await handler(**job.get("payload", {}))
+        except Exception as e:
+            await self.fail(job, str(e))
+        else:
+            await self.complete(job, result)
+        finally:
+            renewal.cancel()
+
+    async def _renew_while_running(self, job: Dict[str, Any]):
+        while True:
+            await asyncio.sleep(JOB_LEASE_SECONDS / 3)
+            if not await self.renew_lease(job):
+                return
+
+    async def idle_timeout(self) -> float:
+        """
+        Seconds until the earliest queued job is due, capped by how long a sleeping
+        worker may go without checking (short when it would miss other processes' jobs)
+        """
+        cap = JOB_MAX_IDLE_SECONDS if self._notify_client is not None else JOB_POLL_INTERVAL_SECONDS
+        head = await self.jobs.collection.find_one(
+            {"status": QUEUED}, {"run_at": 1}, sort=[("run_at", ASCENDING)]
+        )
+        if head is None:
+            return cap
+        return min(max((head["run_at"] - datetime.utcnow()).total_seconds(), 0.0), cap)
+
+    async def _work(self):
+        while self.running:
+            # Cleared before claiming so a wakeup during the claim is not lost
+            self._wakeup.clear()
+            try:
+                job = await self.claim()
+                if job is None:
+                    timeout = await self.idle_timeout()
+            except Exception as e:
+                print(f"Job claim failed: {e}")
+                job, timeout = None, JOB_POLL_INTERVAL_SECONDS
+            if job is not None:
+                try:
+                    await self.execute(job)
+                except Exception as e:
+                    # The job's lease lapses and recovery queues it again
+                    print(f"Job {job['id']} ({job['name']}) could not be finished: {e}")
+                    await asyncio.sleep(JOB_POLL_INTERVAL_SECONDS)
+                continue
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _listen(self):
+        while True:
+            try:
+                async for item in self._notify_pubsub.listen():
+                    if item.get("type") == "message":
+                        self._wakeup.set()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # The pub/sub connection resubscribes when it reconnects
+                print(f"Job notifications interrupted: {e}")
+                await asyncio.sleep(1)
+
+    async def _recover(self):
+        while self.running:
+            try:
+                await self.recover_expired_leases()
+            except Exception as e:
+                print(f"Job lease recovery failed: {e}")
+            await asyncio.sleep(JOB_LEASE_SECONDS / 2)
+
+    async def connect_notifications(self, url: str = REDIS_URL) -> bool:
+        client = redis.from_url(url, decode_responses=True)
+        try:
+            await client.ping()
+            pubsub = client.pubsub(ignore_subscribe_messages=True)
+            await pubsub.subscribe(JOB_NOTIFY_CHANNEL)
+        except Exception as e:
+            print(f"Redis not available, job workers poll every {JOB_POLL_INTERVAL_SECONDS}s: {e}")
+            await client.close()
+            return False
+        self._notify_client = client
+        self._notify_pubsub = pubsub
+        self._tasks.append(asyncio.create_task(self._listen()))
+        return True
+
+    async def start(self, workers: int = JOB_WORKERS):
+        self.running = True
+        self.workers = workers
+        await self.connect_notifications()
+        self._tasks.extend(asyncio.create_task(self._work()) for _ in range(workers))
+        self._tasks.append(asyncio.create_task(self._recover()))
+
+    async def stop(self):
+        """
+        Stop claiming jobs; jobs still running are abandoned to lease recovery
+        """
+        self.running = False
+        self.workers = 0
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        if self._notify_pubsub is not None:
+            await self._notify_pubsub.close()
+        if self._notify_client is not None:
+            await self._notify_client.close()
+        self._notify_client = self._notify_pubsub = None
+
+
+job_queue = JobQueue()
@@ -1,14 +1,17 @@
-import asyncio
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional
-from motor.motor_asyncio import AsyncIOMotorDatabase
-from ..database import get_database
+from ..database import LiveDatabase
 from .notification_service import notification_service
+from .background_jobs import job_queue
+
+# Maintenance is bulk work, so it yields to everything else on the job queue
+MAINTENANCE_JOB_PRIORITY = -10
 
 
 class DataRetentionService:
+    db = LiveDatabase()
+
     def __init__(self):
-        self.db: Optional[AsyncIOMotorDatabase] = None
         self.retention_policies = {
             'user_sessions': 30,  # days
             'audit_logs': 90,     # days
@@ -18,18 +21,11 @@ class DataRetentionService:
             'error_logs': 60,     # days
         }
 
-    async def initialize(self):
-        """Initialize the service with database connection"""
-        self.db = get_database()
-
     async def cleanup_expired_data(self) -> Dict[str, int]:
         """
         Clean up expired data based on retention policies
         Returns a dictionary with cleanup statistics
         """
-        if not self.db:
-            await self.initialize()
-
         cleanup_stats = {}
 
         for collection, days in self.retention_policies.items():
@@ -75,9 +71,6 @@ class DataRetentionService:
         Archive old data that exceeds retention policies
         Returns archive statistics
         """
-        if not self.db:
-            await self.initialize()
-
         archive_stats = {}
 
         # Archive completed projects older than 2 years
@@ -114,9 +107,6 @@ class DataRetentionService:
         """
         Get current retention status and upcoming cleanup dates
         """
-        if not self.db:
-            await self.initialize()
-
         status = {}
 
         for collection, days in self.retention_policies.items():
@@ -184,20 +174,25 @@ class DataRetentionService:
         return result
 
 
-# Global instance
-data_retention_service = DataRetentionService()
-
-
-async def scheduled_data_cleanup():
-    """
-    Scheduled task to run data cleanup periodically
-    Call this from a scheduler (e.g., APScheduler)
-    """
-    while True:
+    async def schedule_maintenance(self, day: Optional[datetime] = None) -> Optional[str]:
+        """
+        Queue the maintenance run for a day (today by default). Runs are keyed by date,
+        so every worker process can call this and the day still runs once.
+        """
+        day = (day or datetime.utcnow()).replace(hour=0, minute=0, second=0, microsecond=0)
+        return await job_queue.enqueue(
+            "retention.run_maintenance",
+            run_at=max(day, datetime.utcnow()),
+            priority=MAINTENANCE_JOB_PRIORITY,
+            key=f"retention:{day.date().isoformat()}"
+        )
+
+    async def _maintenance_job(self) -> Dict:
         try:
-            await data_retention_service.run_maintenance()
-        except Exception as e:
-            print(f"Scheduled cleanup failed: {str(e)}")
+            return await self.run_maintenance()
+        finally:
+            await self.schedule_maintenance(datetime.utcnow() + timedelta(days=1))
+
 
-        # Run daily
-        await asyncio.sleep(86400)  # 24 hours
+# Global instance
+data_retention_service = DataRetentionService()
@@ -0,0 +1,239 @@
+from typing import Dict, Iterable, List, Optional, Set
+
+
+class DependencyCycleError(ValueError):
+    """Raised when a dependency edge would close a cycle"""
+
+
+class DependencyGraph:
+    """
+    In-memory task dependency graph for a single project.
+
+    Tasks are mapped to dense integer indices and edges are held as adjacency
+    arrays (prerequisite -> dependents and dependent -> prerequisites).
+    A topological order is maintained incrementally with the Pearce-Kelly
+    algorithm, so adding an edge only reorders the affected region and cycle
+    checks only explore nodes between the two endpoints in the current order.
+    """
+
+    def __init__(self):
+        self.ids: List[str] = []
+        self.index: Dict[str, int] = {}
+        self.successors: List[List[int]] = []  # prerequisite -> dependents
+        self.predecessors: List[List[int]] = []  # dependent -> prerequisites
+        self.done: List[bool] = []
+        self.position: List[int] = []  # node -> position in topological order
+        self.order: List[int] = []  # position -> node
+
+    @classmethod
+    def from_tasks(cls, tasks: Iterable[Dict]) -> "DependencyGraph":
+        """
+        Build a graph from task documents carrying `_id`, `status` and `dependencies`.
+        Nodes are keyed by the string form of `_id`, which is how dependencies reference tasks
+        """
+        graph = cls()
+        tasks = list(tasks)
+        for task in tasks:
+            graph._add_node(str(task["_id"]), task.get("status") == "done")
+
+        for task in tasks:
+            node = graph.index[str(task["_id"])]
+            for dep in task.get("dependencies") or []:
+                prerequisite = graph.index.get(dep.get("task_id"))
+                if prerequisite is not None and prerequisite not in graph.predecessors[node]:
+                    graph.successors[prerequisite].append(node)
+                    graph.predecessors[node].append(prerequisite)
+
+        graph._rebuild_order()
+        return graph
+
+    def __contains__(self, task_id: str) -> bool:
+        return task_id in self.index
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def copy(self) -> "DependencyGraph":
+        """
+        An independent copy, for validating a batch of edits without touching this graph
+        """
+        graph = DependencyGraph()
+        graph.ids = list(self.ids)
+        graph.index = dict(self.index)
+        graph.successors = [list(nodes) for nodes in self.successors]
+        graph.predecessors = [list(nodes) for nodes in self.predecessors]
+        graph.done = list(self.done)
+        graph.position = list(self.position)
+        graph.order = list(self.order)
+        return graph
+
+    def add_task(self, task_id: str, done: bool = False):
+        if task_id not in self.index:
+            node = self._add_node(task_id, done)
+            self.position[node] = len(self.order)
+            self.order.append(node)
+
+    def set_done(self, task_id: str, done: bool):
+        node = self.index.get(task_id)
+        if node is not None:
+            self.done[node] = done
+
+    def prerequisites(self, task_id: str) -> List[str]:
+        return [self.ids[node] for node in self.predecessors[self.index[task_id]]]
+
+    def dependents(self, task_id: str) -> List[str]:
+        return [self.ids[node] for node in self.successors[self.index[task_id]]]
+
+    def can_start(self, task_id: str) -> bool:
+        """
+        A task can start once every prerequisite is done; O(in-degree)
+        """
+        node = self.index.get(task_id)
+        if node is None:
+            return True
+        return all(self.done[prerequisite] for prerequisite in self.predecessors[node])
+
+    def would_create_cycle(self, prerequisite_id: str, dependent_id: str) -> bool:
+        """
+        Check whether making `dependent_id` depend on `prerequisite_id` closes a cycle
+        """
+        if prerequisite_id == dependent_id:
+            return True
+        source = self.index.get(prerequisite_id)
+        target = self.index.get(dependent_id)
+        if source is None or target is None:
+            return False
+        if self.position[source] < self.position[target]:
+            return False
+        return self._forward_region(target, self.position[source], source) is None
+
+    def add_dependency(self, prerequisite_id: str, dependent_id: str):
+        """
+        Add an edge prerequisite -> dependent, reordering only the affected region
+        """
+        if prerequisite_id == dependent_id:
+            raise DependencyCycleError(f"Task {dependent_id} cannot depend on itself")
+        source = self.index[prerequisite_id]
+        target = self.index[dependent_id]
+        if source in self.predecessors[target]:
+            return
+
+        lower, upper = self.position[target], self.position[source]
+        if lower < upper:
+            forward = self._forward_region(target, upper, source)
+            if forward is None:
+                raise DependencyCycleError(
+                    f"Dependency {prerequisite_id} -> {dependent_id} would create a cycle"
+                )
+            backward = self._backward_region(source, lower)
+            self._reorder(backward, forward)
+
+        self.successors[source].append(target)
+        self.predecessors[target].append(source)
+
+    def remove_dependency(self, prerequisite_id: str, dependent_id: str):
+        # Removing an edge never invalidates a topological order
+        source = self.index.get(prerequisite_id)
+        target = self.index.get(dependent_id)
+        if source is None or target is None or source not in self.predecessors[target]:
+            return
+        self.successors[source].remove(target)
+        self.predecessors[target].remove(source)
+
+    def set_dependencies(self, task_id: str, prerequisite_ids: Iterable[str]):
+        """
+        Replace the prerequisites of a task; validated before anything is changed
+        """
+        prerequisite_ids = list(dict.fromkeys(prerequisite_ids))
+        for dep_id in prerequisite_ids:
+            if dep_id not in self.index:
+                raise KeyError(dep_id)
+            if self.would_create_cycle(dep_id, task_id):
+                raise DependencyCycleError(f"Dependency {dep_id} -> {task_id} would create a cycle")
+
+        for dep_id in self.prerequisites(task_id):
+            if dep_id not in prerequisite_ids:
+                self.remove_dependency(dep_id, task_id)
+        for dep_id in prerequisite_ids:
+            self.add_dependency(dep_id, task_id)
+
+    def topological_order(self) -> List[str]:
+        return [self.ids[node] for node in self.order]
+
+    def _add_node(self, task_id: str, done: bool) -> int:
+        node = len(self.ids)
+        self.ids.append(task_id)
+        self.index[task_id] = node
+        self.successors.append([])
+        self.predecessors.append([])
+        self.done.append(done)
+        self.position.append(-1)
+        return node
+
+    def _rebuild_order(self):
+        """
+        Kahn's algorithm over the whole graph; nodes left on legacy cycles go last
+        """
+        in_degree = [len(prerequisites) for prerequisites in self.predecessors]
+        order = [node for node, degree in enumerate(in_degree) if degree == 0]
+        head = 0
+        while head < len(order):
+            node = order[head]
+            head += 1
+            for dependent in self.successors[node]:
+                in_degree[dependent] -= 1
+                if in_degree[dependent] == 0:
+                    order.append(dependent)
+
+        if len(order) < len(self.ids):
+            placed = set(order)
+            order.extend(node for node in range(len(self.ids)) if node not in placed)
+
+        self.order = order
+        for position, node in enumerate(order):
+            self.position[node] = position
+
+    def _forward_region(self, start: int, upper: int, blocked: int) -> Optional[List[int]]:
+        """
+        Nodes reachable from `start` positioned before `upper`; None if `blocked` is reached
+        """
+        visited: Set[int] = {start}
+        stack = [start]
+        region = []
+        while stack:
+            node = stack.pop()
+            region.append(node)
+            for dependent in self.successors[node]:
+                if dependent == blocked:
+                    return None
+                if dependent not in visited and self.position[dependent] < upper:
+                    visited.add(dependent)
+                    stack.append(dependent)
+        return region
+
+    def _backward_region(self, start: int, lower: int) -> List[int]:
+        """
+        Nodes that reach `start` positioned after `lower`
+        """
+        visited: Set[int] = {start}
+        stack = [start]
+        region = []
+        while stack:
+            node = stack.pop()
+            region.append(node)
+            for prerequisite in self.predecessors[node]:
+                if prerequisite not in visited and self.position[prerequisite] > lower:
+                    visited.add(prerequisite)
+                    stack.append(prerequisite)
+        return region
+
+    def _reorder(self, backward: List[int], forward: List[int]):
+        # Ancestors of the prerequisite move ahead of the dependent's descendants,
+        # reusing only the positions the affected nodes already occupied
+        backward.sort(key=self.position.__getitem__)
+        forward.sort(key=self.position.__getitem__)
+        nodes = backward + forward
+        positions = sorted(self.position[node] for node in nodes)
+        for node, position in zip(nodes, positions):
+            self.position[node] = position
+            self.order[position] = node
@@ -0,0 +1,188 @@
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional, Tuple
+from collections import deque
+import asyncio
+import json
+import os
+import time
+import redis.asyncio as redis
+
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+# Pub/sub channel per topic, and the counter numbering a topic's events
+CHANNEL_PREFIX = "gravitypm:events:"
+SEQUENCE_PREFIX = "gravitypm:event-seq:"
+# Recent events of a topic, for clients resuming after a reconnect
+LOG_PREFIX = "gravitypm:event-log:"
+# Events kept per topic, and how long a topic's log outlives its last event
+REPLAY_BUFFER_SIZE = int(os.getenv("WS_REPLAY_BUFFER_SIZE", "200"))
+REPLAY_TTL_SECONDS = int(os.getenv("WS_REPLAY_TTL_SECONDS", "3600"))
+
+# Receives (topic, sequence number, encoded message) for every event published by any worker
+EventHandler = Callable[[str, int, str], Awaitable[None]]
+
+
+def encode_event(event_type: str, data: Any, topic: Optional[str] = None, seq: Optional[int] = None) -> str:
+    message: Dict[str, Any] = {"event": event_type, "data": data}
+    if topic:
+        message["topic"] = topic
+    if seq is not None:
+        message["seq"] = seq
+    # Documents carry datetimes and ObjectIds
+    return json.dumps(message, default=str)
+
+
+class EventBroker:
+    """
+    Distributes WebSocket events between workers. Every event gets the next sequence
+    number of its topic and is encoded once by the publishing worker; each worker's
+    handler then relays the encoded message to its own subscribers.
+
+    The last events of every topic are also logged by the broker, so a client resuming
+    on any worker, or after a restart, can be sent what it missed.
+    """
+
+    def __init__(self):
+        self.handler: Optional[EventHandler] = None
+
+    async def start(self, handler: EventHandler):
+        self.handler = handler
+
+    async def stop(self):
+        pass
+
+    async def publish(self, topic: str, event_type: str, data: Any) -> int:
+        seq = await self.next_sequence(topic)
+        message = encode_event(event_type, data, topic, seq)
+        await self.record(topic, seq, message)
+        await self.send(topic, seq, message)
+        return seq
+
+    async def next_sequence(self, topic: str) -> int:
+        raise NotImplementedError
+
+    async def record(self, topic: str, seq: int, message: str):
+        raise NotImplementedError
+
+    async def events_since(self, topic: str, last_id: int) -> Tuple[int, List[Tuple[int, str]]]:
+        """
+        The topic's latest sequence number and its logged events after `last_id`, in order
+        """
+        raise NotImplementedError
+
+    async def send(self, topic: str, seq: int, message: str):
+        raise NotImplementedError
+
+
+class InMemoryBroker(EventBroker):
+    """
+    Broker for a single process (and tests): events go straight to the local handler
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.sequences: Dict[str, int] = {}
+        self.logs: Dict[str, Deque[Tuple[int, str]]] = {}
+        self._recorded_at: Dict[str, float] = {}
+        self._swept_at = time.monotonic()
+
+    async def next_sequence(self, topic: str) -> int:
+        self.sequences[topic] = self.sequences.get(topic, 0) + 1
+        return self.sequences[topic]
+
+    async def record(self, topic: str, seq: int, message: str):
+        now = time.monotonic()
+        log = self.logs.get(topic)
+        if log is None:
+            log = self.logs[topic] = deque(maxlen=REPLAY_BUFFER_SIZE)
+        log.append((seq, message))
+        self._recorded_at[topic] = now
+        if now - self._swept_at >= REPLAY_TTL_SECONDS:
+            self._swept_at = now
+            self.drop_idle_logs(now)
+
+    async def events_since(self, topic: str, last_id: int) -> Tuple[int, List[Tuple[int, str]]]:
+        events = [(seq, message) for seq, message in self.logs.get(topic, ()) if seq > last_id]
+        return self.sequences.get(topic, 0), events
+
+    def drop_idle_logs(self, now: float):
+        """
+        Forget the logs of topics without an event for a replay TTL
+        """
+        for topic, recorded_at in list(self._recorded_at.items()):
+            if now - recorded_at >= REPLAY_TTL_SECONDS:
+                del self._recorded_at[topic]
+                self.logs.pop(topic, None)
+
+    async def send(self, topic: str, seq: int, message: str):
+        if self.handler:
+            await self.handler(topic, seq, message)
+
+
+class RedisBroker(EventBroker):
+    """
+    Broker over Redis pub/sub. Sequence numbers come from a per-topic INCR so they are
+    shared by all workers; every worker pattern-subscribes to all topic channels and
+    relays what it receives, including its own events. A topic's recent events are kept
+    in a sorted set scored by sequence number, capped in size and expiring once the
+    topic goes quiet, so concurrent publishers may log out of order.
+    """
+
+    def __init__(self, url: str = REDIS_URL):
+        super().__init__()
+        self.client = redis.from_url(url, decode_responses=True)
+        self._pubsub = None
+        self._listener: Optional[asyncio.Task] = None
+
+    async def start(self, handler: EventHandler):
+        await super().start(handler)
+        await self.client.ping()
+        self._pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+        await self._pubsub.psubscribe(f"{CHANNEL_PREFIX}*")
+        self._listener = asyncio.create_task(self._listen())
+
+    async def stop(self):
+        if self._listener:
+            self._listener.cancel()
+        if self._pubsub is not None:
+            await self._pubsub.close()
+        await self.client.close()
+
+    async def next_sequence(self, topic: str) -> int:
+        return await self.client.incr(f"{SEQUENCE_PREFIX}{topic}")
+
+    async def record(self, topic: str, seq: int, message: str):
+        key = f"{LOG_PREFIX}{topic}"
+        async with self.client.pipeline(transaction=True) as pipe:
+            pipe.zadd(key, {f"{seq} {message}": seq})
+            pipe.zremrangebyrank(key, 0, -REPLAY_BUFFER_SIZE - 1)
+            pipe.expire(key, REPLAY_TTL_SECONDS)
+            await pipe.execute()
+
+    async def events_since(self, topic: str, last_id: int) -> Tuple[int, List[Tuple[int, str]]]:
+        async with self.client.pipeline(transaction=True) as pipe:
+            pipe.get(f"{SEQUENCE_PREFIX}{topic}")
+            pipe.zrangebyscore(f"{LOG_PREFIX}{topic}", f"({last_id}", "+inf")
+            latest, entries = await pipe.execute()
+        events = []
+        for entry in entries:
+            seq, message = entry.split(" ", 1)
+            events.append((int(seq), message))
+        return int(latest or 0), events
+
+    async def send(self, topic: str, seq: int, message: str):
+        await self.client.publish(f"{CHANNEL_PREFIX}{topic}", f"{seq} {message}")
+
+    async def _listen(self):
+        while True:
+            try:
+                async for item in self._pubsub.listen():
+                    if item.get("type") != "pmessage":
+                        continue
+                    topic = item["channel"][len(CHANNEL_PREFIX):]
+                    seq, message = item["data"].split(" ", 1)
+                    await self.handler(topic, int(seq), message)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # The pub/sub connection resubscribes when it reconnects
+                print(f"Event relay interrupted: {e}")
+                await asyncio.sleep(1)
@@ -71,6 +71,17 @@ class ConflictError(GravityPMException):
             extra_data={"resource_type": resource_type} if resource_type else {}
         )
 
+class ReservationContentionError(GravityPMException):
+    """Exception raised when concurrent reservations keep a resource's ledger from being claimed"""
+
+    def __init__(self, resource_id: str):
+        super().__init__(
+            status_code=409,
+            detail=f"Resource {resource_id} is being reserved concurrently, try again",
+            error_code="RESERVATION_CONTENTION",
+            extra_data={"resource_id": resource_id}
+        )
+
 class BusinessLogicError(GravityPMException):
     """Exception raised for business logic violations"""
 
@@ -93,6 +104,16 @@ class ExternalServiceError(GravityPMException):
             extra_data={"service": service_name}
         )
 
+class DatabaseUnavailableError(GravityPMException):
+    """Exception raised when no database connection is available"""
+
+    def __init__(self, detail: str = "Database connection not available"):
+        super().__init__(
+            status_code=503,
+            detail=detail,
+            error_code="DATABASE_UNAVAILABLE"
+        )
+
 # Convenience functions for common exceptions
 def raise_validation_error(detail: str, field: Optional[str] = None) -> None:
     """Raise a validation error"""
@@ -4,11 +4,14 @@ import uuid
 from datetime import datetime
 from pathlib import Path
 from fastapi import UploadFile, HTTPException
-from ..database import get_database
+from ..database import LiveDatabase
+from ..repository import Repository, encode_id
 
 class FileService:
+    db = LiveDatabase()
+
     def __init__(self):
-        self.db = get_database()
+        self.files = Repository("files", lambda: self.db)
         self.upload_dir = Path(os.getenv("UPLOAD_DIR", "uploads"))
         self.upload_dir.mkdir(exist_ok=True)
         self.max_file_size = int(os.getenv("MAX_FILE_SIZE", "10485760"))  # 10MB default
@@ -67,7 +70,7 @@ class FileService:
         """
         Get file metadata by ID
         """
-        file_doc = await self.db.files.find_one({"_id": file_id})
+        file_doc = await self.files.find_by_id(file_id)
         if not file_doc:
             raise HTTPException(status_code=404, detail="File not found")
 
@@ -86,7 +89,7 @@ class FileService:
         """
         Get file path for download and increment download count
         """
-        file_doc = await self.db.files.find_one({"_id": file_id})
+        file_doc = await self.files.find_by_id(file_id)
         if not file_doc:
             raise HTTPException(status_code=404, detail="File not found")
 
@@ -96,7 +99,7 @@ class FileService:
 
         # Increment download count
         await self.db.files.update_one(
-            {"_id": file_id},
+            {"_id": encode_id(file_id)},
             {"$inc": {"download_count": 1}}
         )
 
@@ -110,7 +113,7 @@ class FileService:
         """
         Delete a file and its metadata
         """
-        file_doc = await self.db.files.find_one({"_id": file_id})
+        file_doc = await self.files.find_by_id(file_id)
         if not file_doc:
             raise HTTPException(status_code=404, detail="File not found")
 
@@ -126,7 +129,7 @@ class FileService:
 
         # Delete metadata
         await self.db.files.update_one(
-            {"_id": file_id},
+            {"_id": encode_id(file_id)},
             {"$set": {
                 "deleted": True,
                 "deleted_by": deleted_by,
@@ -140,9 +143,9 @@ class FileService:
         """
         List all files for a project
         """
-        files = await self.db.files.find(
-            {"project_id": project_id, "deleted": {"$ne": True}}
-        ).sort("uploaded_at", -1).to_list(length=None)
+        files = await self.files.find(
+            {"project_id": project_id, "deleted": {"$ne": True}}, sort=[("uploaded_at", -1)]
+        )
 
         return [{
             "file_id": str(file["_id"]),
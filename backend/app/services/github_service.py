@@ -1,11 +1,12 @@
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional
 import hmac
 import hashlib
 import os
 from datetime import datetime
 from fastapi import HTTPException
-from ..services.rule_engine import rule_engine
+from ..services.background_jobs import job_queue
 from ..database import get_database
+from ..repository import encode_id
 
 # GitHub webhook secret - should be set via environment variable
 GITHUB_WEBHOOK_SECRET = os.getenv("GITHUB_WEBHOOK_SECRET", "")
@@ -29,7 +30,8 @@ def verify_github_signature(payload: bytes, signature: str) -> bool:
 
 async def process_github_webhook(event_type: str, payload: Dict[str, Any], signature: str = None) -> Dict[str, Any]:
     """
-    Process GitHub webhook events and trigger rule evaluation
+    Verify a GitHub webhook and queue rule evaluation for it; the rules' actions
+    run on the job queue rather than in the webhook request
     """
     # Verify signature if provided
     if signature and not verify_github_signature(str(payload).encode(), signature):
@@ -40,13 +42,13 @@ async def process_github_webhook(event_type: str, payload: Dict[str, Any], signa
     # Extract relevant event data
     event_data = extract_event_data(event_type, payload)
 
-    # Evaluate rules for this event
-    triggered_actions = await rule_engine.evaluate_rules("github_event", event_data)
+    job_id = await job_queue.enqueue("rules.evaluate", {"event_type": "github_event", "event_data": event_data})
 
     return {
         "event_type": event_type,
         "processed": True,
-        "triggered_actions": triggered_actions,
+        "queued": True,
+        "job_id": job_id,
         "event_data": event_data
     }
 
@@ -160,6 +162,27 @@ async def get_github_commits(repo_full_name: str, branch: str = "main", since: s
         }
     ]
 
+async def queue_repository_sync(repo_full_name: str, project_id: str) -> Dict[str, Any]:
+    """
+    Queue a repository synchronization; its progress is read back with get_repository_sync
+    """
+    job_id = await job_queue.enqueue(
+        "github.sync_repository", {"repo_full_name": repo_full_name, "project_id": project_id}
+    )
+    return {"queued": True, "job_id": job_id, "repo": repo_full_name, "project_id": project_id}
+
+async def get_repository_sync(job_id: str) -> Optional[Dict[str, Any]]:
+    job = await job_queue.get(job_id)
+    if not job or job["name"] != "github.sync_repository":
+        return None
+    return {
+        "job_id": job["id"],
+        "status": job["status"],
+        "attempts": job["attempts"],
+        "result": job.get("result"),
+        "error": job.get("error")
+    }
+
 async def sync_repository_data(repo_full_name: str, project_id: str) -> Dict[str, Any]:
     """
     Synchronize repository data from GitHub to local database
@@ -177,7 +200,7 @@ async def sync_repository_data(repo_full_name: str, project_id: str) -> Dict[str
 
     # Update project with latest repo data
     await db.projects.update_one(
-        {"_id": project_id},
+        {"_id": encode_id(project_id)},
         {"$set": {
             "github_repo_data": repo_data,
             "last_sync": datetime.utcnow(),
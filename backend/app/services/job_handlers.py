@@ -0,0 +1,28 @@
+from .background_jobs import JobQueue, job_queue
+
+
+def register_job_handlers(queue: JobQueue = job_queue):
+    """
+    Register the handler of every job the application queues. Called at startup before
+    the workers start, so a job never depends on which modules happen to be imported.
+    """
+    from .rule_engine import rule_engine
+    from .rule_scheduler import rule_scheduler
+    from .github_service import sync_repository_data
+    from .notification_service import notification_service
+    from .data_retention_service import data_retention_service
+    from .task_service import task_service
+    from .user_service import user_service
+
+    handlers = {
+        "rules.evaluate": rule_engine.evaluate_rules,
+        "rules.scheduled_fire": rule_scheduler._fire,
+        "github.sync_repository": sync_repository_data,
+        "notifications.send_email": notification_service._send_email_job,
+        "retention.run_maintenance": data_retention_service._maintenance_job,
+        "tasks.refresh_overdue_counters": task_service._refresh_overdue_job,
+        "tasks.rebuild_counters": task_service._rebuild_counters_job,
+        "users.refresh_overdue_counts": user_service._refresh_overdue_job,
+    }
+    for name, handler in handlers.items():
+        queue.register(name, handler)
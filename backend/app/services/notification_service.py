@@ -1,19 +1,28 @@
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional
+import asyncio
 import smtplib
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 import os
 from datetime import datetime
-from ..database import get_database
+from ..database import LiveDatabase
+from ..repository import Repository, encode_id
+from .background_jobs import job_queue
+
+# Emails go ahead of bulk work on the job queue
+EMAIL_JOB_PRIORITY = 10
 
 class NotificationService:
+    db = LiveDatabase()
+
     def __init__(self):
-        self.db = get_database()
+        self.notifications = Repository("notifications", lambda: self.db)
         self.smtp_server = os.getenv("SMTP_SERVER", "smtp.gmail.com")
         self.smtp_port = int(os.getenv("SMTP_PORT", "587"))
         self.smtp_username = os.getenv("SMTP_USERNAME", "")
         self.smtp_password = os.getenv("SMTP_PASSWORD", "")
         self.from_email = os.getenv("FROM_EMAIL", "noreply@gravitypm.com")
+        self.admin_email = os.getenv("ADMIN_EMAIL", "")
 
     async def send_email(self, to_email: str, subject: str, body: str, template_name: str = None) -> Dict[str, Any]:
         """
@@ -32,12 +41,8 @@ class NotificationService:
 
             msg.attach(MIMEText(body, 'html'))
 
-            server = smtplib.SMTP(self.smtp_server, self.smtp_port)
-            server.starttls()
-            server.login(self.smtp_username, self.smtp_password)
-            text = msg.as_string()
-            server.sendmail(self.from_email, to_email, text)
-            server.quit()
+            # smtplib blocks, so the exchange runs off the event loop
+            await asyncio.to_thread(self._deliver, to_email, msg.as_string())
 
             await self._log_notification(to_email, subject, body, "email", template_name, True)
             return {"message": "Email sent successfully", "sent": True}
@@ -46,6 +51,40 @@ class NotificationService:
             await self._log_notification(to_email, subject, body, "email", template_name, False, str(e))
             return {"error": f"Failed to send email: {str(e)}", "sent": False}
 
+    def _deliver(self, to_email: str, text: str):
+        server = smtplib.SMTP(self.smtp_server, self.smtp_port)
+        server.starttls()
+        server.login(self.smtp_username, self.smtp_password)
+        server.sendmail(self.from_email, to_email, text)
+        server.quit()
+
+    async def queue_email(self, to_email: str, subject: str, body: str,
+                          template_name: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Send an email from the job queue instead of the caller's request
+        """
+        job_id = await job_queue.enqueue("notifications.send_email", {
+            "to_email": to_email, "subject": subject, "body": body, "template_name": template_name
+        }, priority=EMAIL_JOB_PRIORITY)
+        return {"message": "Email queued", "queued": True, "job_id": job_id}
+
+    async def _send_email_job(self, to_email: str, subject: str, body: str,
+                              template_name: Optional[str] = None) -> Dict[str, Any]:
+        result = await self.send_email(to_email, subject, body, template_name)
+        if "error" in result:
+            # Raising hands the email back to the queue for a retry
+            raise RuntimeError(result["error"])
+        return result
+
+    async def send_admin_notification(self, subject: str, message: str) -> Dict[str, Any]:
+        """
+        Email the administrator address, if one is configured
+        """
+        if not self.admin_email:
+            await self._log_notification("admin", subject, message, "email")
+            return {"message": "Admin notification logged (ADMIN_EMAIL not configured)", "sent": False}
+        return await self.queue_email(self.admin_email, subject, message)
+
     async def send_notification(self, recipient: str, notification_type: str, data: Dict[str, Any]) -> Dict[str, Any]:
         """
         Send a notification based on type and data
@@ -54,7 +93,7 @@ class NotificationService:
             template = self._get_email_template(data.get("template", "default"))
             subject = template["subject"].format(**data)
             body = template["body"].format(**data)
-            return await self.send_email(recipient, subject, body, data.get("template"))
+            return await self.queue_email(recipient, subject, body, data.get("template"))
         elif notification_type == "in_app":
             return await self._send_in_app_notification(recipient, data)
         else:
@@ -167,9 +206,9 @@ class NotificationService:
         """
         Get notifications for a user
         """
-        notifications = await self.db.notifications.find(
-            {"recipient": user_id}
-        ).sort("created_at", -1).limit(limit).to_list(length=None)
+        notifications = await self.notifications.find(
+            {"recipient": user_id}, sort=[("created_at", -1)], limit=limit
+        )
 
         return notifications
 
@@ -178,7 +217,7 @@ class NotificationService:
         Mark a notification as read
         """
         result = await self.db.notifications.update_one(
-            {"_id": notification_id, "recipient": user_id},
+            {"_id": encode_id(notification_id), "recipient": user_id},
             {"$set": {"read": True, "read_at": datetime.utcnow()}}
         )
         return result.modified_count > 0
@@ -1,14 +1,27 @@
-from typing import Optional, List
-from datetime import datetime
-from ..database import get_database
-from ..models.project import Project, ProjectCreate, ProjectUpdate, ProjectTimeline, TimelineMilestone
-from .websocket_manager import manager
+from typing import Optional, List, Dict, Tuple
+from datetime import datetime, timedelta
+import math
+from pymongo import ReturnDocument
+from ..database import LiveDatabase
+from ..repository import ProjectRepository, encode_id
+from ..models.project import Project, ProjectCreate, ProjectUpdate, ProjectTimeline, TimelineMilestone, ProjectTaskCounters
+from .websocket_manager import manager, project_topic, user_topic
 from .cache_service import cached, invalidate_cache
-import json
+from .user_service import user_service
+from .schedule_engine import CriticalPathSchedule, MILESTONE_PREFIX, task_duration_days
+
+# Cached schedules are rebuilt after this long to pick up writes from other workers
+SCHEDULE_TTL = timedelta(seconds=60)
+SCHEDULE_TASK_PROJECTION = {
+    "status": 1, "dependencies.task_id": 1, "milestone_id": 1, "progress.estimated_hours": 1
+}
 
 class ProjectService:
+    db = LiveDatabase()
+
     def __init__(self):
-        self.db = get_database()
+        self.projects = ProjectRepository("projects", lambda: self.db)
+        self._schedules: Dict[str, Tuple[CriticalPathSchedule, datetime]] = {}
 
     async def create_project(self, project_create: ProjectCreate, owner) -> Project:
         project_dict = project_create.dict()
@@ -17,31 +30,42 @@ class ProjectService:
         project_dict["status"] = "planning"
         project_dict["spent_amount"] = 0.0
         project_dict["timeline"] = ProjectTimeline().dict()
+        project_dict["task_counters"] = ProjectTaskCounters(rebuilt_at=datetime.utcnow()).dict()
         project_dict["owner_id"] = owner.username
         project_dict["team_members"] = [owner.username]
-        result = await self.db.projects.insert_one(project_dict)
-        created_project = await self.db.projects.find_one({"_id": result.inserted_id})
-        # Broadcast project creation event via WebSocket
-        message = json.dumps({"event": "project_created", "data": project_dict})
-        await manager.broadcast(message)
+        created_project = await self.projects.insert(project_dict)
+        await user_service.record_project_change(None, project_dict)
+        # Nobody is subscribed to a new project yet, so tell its team directly
+        for member in project_dict["team_members"]:
+            await manager.publish(user_topic(member), "project_created", created_project)
         return Project(**created_project)
 
     @invalidate_cache("project:*")
     async def update_project(self, project_id: str, project_update: ProjectUpdate, user) -> Optional[Project]:
         update_data = project_update.dict(exclude_unset=True)
         update_data["updated_at"] = datetime.utcnow()
-        result = await self.db.projects.update_one({"_id": project_id}, {"$set": update_data})
-        if result.modified_count == 0:
-            return None
-        updated_project = await self.db.projects.find_one({"_id": project_id})
-        # Broadcast project update event via WebSocket
-        message = json.dumps({"event": "project_updated", "data": update_data})
-        await manager.broadcast(message)
+        if "team_members" in update_data:
+            # Membership changes feed the materialized user statistics
+            previous = await self.projects.update_by_id(
+                project_id, {"$set": update_data}, return_document=ReturnDocument.BEFORE
+            )
+            if previous is None:
+                return None
+            updated_project = {**previous, **update_data}
+            await user_service.record_project_change(previous, updated_project)
+        else:
+            updated_project = await self.projects.update_by_id(project_id, {"$set": update_data})
+            if updated_project is None:
+                return None
+        # Notify the project's WebSocket subscribers
+        await manager.publish(
+            project_topic(project_id), "project_updated", {"id": project_id, **update_data}, entity_id=project_id
+        )
         return Project(**updated_project)
 
     @cached(ttl_seconds=300, key_prefix="project")
     async def get_project(self, project_id: str, user=None) -> Optional[Project]:
-        project = await self.db.projects.find_one({"_id": project_id})
+        project = await self.projects.find_by_id(project_id)
         if project:
             return Project(**project)
         return None
@@ -55,7 +79,7 @@ class ProjectService:
         progress = (completed / total) * 100 if total > 0 else 0.0
         # Update progress in DB
         await self.db.projects.update_one(
-            {"_id": project_id},
+            {"_id": encode_id(project_id)},
             {"$set": {"timeline.progress_percentage": progress, "updated_at": datetime.utcnow()}}
         )
         return progress
@@ -67,26 +91,96 @@ class ProjectService:
         timeline = project.timeline or ProjectTimeline()
         timeline.milestones.append(milestone)
         await self.db.projects.update_one(
-            {"_id": project_id},
+            {"_id": encode_id(project_id)},
             {"$set": {"timeline": timeline.dict(), "updated_at": datetime.utcnow()}}
         )
+        self.invalidate_schedule(project_id)
         return timeline
 
-    async def update_spent_amount(self, project_id: str, amount: float) -> Optional[Project]:
-        """Update the spent amount for a project."""
-        if amount < 0:
-            raise ValueError("Amount must be non-negative")
-        project = await self.get_project(project_id)
+    async def get_schedule(self, project_id: str) -> Optional[CriticalPathSchedule]:
+        """
+        Get the project's critical path schedule, computing it on a cache miss
+        """
+        cached = self._schedules.get(project_id)
+        if cached and cached[1] > datetime.utcnow() - SCHEDULE_TTL:
+            return cached[0]
+        return await self.compute_schedule(project_id)
+
+    async def compute_schedule(self, project_id: str) -> Optional[CriticalPathSchedule]:
+        """
+        Run the critical path method over the project's tasks and milestones and persist
+        the summary to the timeline
+        """
+        project = await self.projects.find_by_id(project_id, {"timeline.milestones": 1})
         if not project:
             return None
-        new_spent = project.spent_amount + amount
-        if new_spent < 0:
-            raise ValueError("Spent amount cannot be negative")
+        tasks = await self.db.tasks.find({"project_id": project_id}, SCHEDULE_TASK_PROJECTION).to_list(length=None)
+        milestones = (project.get("timeline") or {}).get("milestones") or []
+
+        schedule = CriticalPathSchedule.from_project(tasks, milestones)
+        self._schedules[project_id] = (schedule, datetime.utcnow())
+        await self._persist_schedule(project_id, schedule)
+        return schedule
+
+    async def update_task_schedule(self, project_id: str, task: Dict):
+        """
+        Incrementally reschedule after a task's duration or status changed
+        """
+        cached = self._schedules.get(project_id)
+        task_id = str(task["_id"])
+        if not cached or task_id not in cached[0].graph:
+            return
+        schedule = cached[0]
+        schedule.update_duration(task_id, task_duration_days(task))
+        await self._persist_schedule(project_id, schedule)
+
+    def invalidate_schedule(self, project_id: str):
+        self._schedules.pop(project_id, None)
+
+    async def get_schedule_report(self, project_id: str) -> Optional[Dict]:
+        """
+        Earliest/latest start, slack and criticality of every task and milestone
+        """
+        schedule = await self.get_schedule(project_id)
+        if schedule is None:
+            return None
+        return {
+            "project_id": project_id,
+            "estimated_duration_days": schedule.project_duration,
+            "critical_path": schedule.critical_path(),
+            "nodes": [schedule.node_schedule(node_id) for node_id in schedule.graph.topological_order()]
+        }
+
+    async def _persist_schedule(self, project_id: str, schedule: CriticalPathSchedule):
+        path = schedule.critical_path()
         await self.db.projects.update_one(
-            {"_id": project_id},
-            {"$set": {"spent_amount": new_spent, "updated_at": datetime.utcnow()}}
+            {"_id": encode_id(project_id)},
+            {"$set": {
+                "timeline.critical_path": [
+                    node_id[len(MILESTONE_PREFIX):] for node_id in path if str(node_id).startswith(MILESTONE_PREFIX)
+                ],
+                "timeline.critical_tasks": [
+                    node_id for node_id in path if not str(node_id).startswith(MILESTONE_PREFIX)
+                ],
+                "timeline.estimated_duration_days": math.ceil(schedule.project_duration),
+                "timeline.schedule_computed_at": datetime.utcnow()
+            }}
         )
-        return await self.get_project(project_id)
+
+    @invalidate_cache("project:*")
+    async def update_spent_amount(self, project_id: str, amount: float) -> Optional[Project]:
+        """Add to the spent amount of a project and return the project as written."""
+        if amount < 0:
+            raise ValueError("Amount must be non-negative")
+        # $inc cannot lose a concurrent spend, and the write returns the new total
+        updated_project = await self.projects.update_by_id(
+            project_id,
+            {"$inc": {"spent_amount": amount}, "$set": {"updated_at": datetime.utcnow()}},
+            return_document=ReturnDocument.AFTER
+        )
+        if updated_project is None:
+            return None
+        return Project(**updated_project)
 
     async def check_budget_alert(self, project_id: str) -> dict:
         """Check if project budget is nearing or exceeding the alert threshold."""
@@ -130,18 +224,15 @@ class ProjectService:
         project = await self.get_project(project_id, user)
         if not project:
             return False
-        result = await self.db.projects.delete_one({"_id": project_id})
-        return result.deleted_count > 0
+        deleted = await self.projects.delete_by_id(project_id)
+        if deleted:
+            await user_service.record_project_change(project.dict(), None)
+        return deleted
 
     @cached(ttl_seconds=300, key_prefix="user_projects")
     async def get_user_projects(self, username: str) -> List[Project]:
         """Get all projects for a specific user with caching"""
-        cursor = self.db.projects.find({"$or": [{"owner_id": username}, {"team_members": username}]})
-        projects = []
-        async for project_doc in cursor:
-            projects.append(Project(**project_doc))
-        return projects
-
-    # Additional methods for timeline management, critical path calculation, budget alerts etc. can be added here
+        projects = await self.projects.find_accessible_projects(username)
+        return [Project(**project_doc) for project_doc in projects]
 
 project_service = ProjectService()
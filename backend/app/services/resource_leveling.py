@@ -0,0 +1,219 @@
+from typing import Dict, Iterable, List, Optional, Tuple
+from datetime import datetime, timedelta
+import heapq
+import math
+import time
+from .schedule_engine import CriticalPathSchedule, MILESTONE_PREFIX, EPSILON
+from .utilization_engine import DAY, daily_allocated, start_of_day
+
+# Leveling stops evaluating placements once this much wall time is spent;
+# remaining tasks keep the earliest start their predecessors allow
+DEFAULT_LEVELING_TIME_BUDGET_SECONDS = 2.0
+
+
+class ResourceLeveler:
+    """
+    Resource leveling by priority-based list scheduling over a critical path schedule.
+
+    Each task may be delayed by whole days, never beyond its total float, so the
+    project end date does not move. Tasks are placed in dependency order, most
+    constrained first (least slack, then highest priority), at the delay within
+    their window that minimizes over-allocation and then peak utilization of the
+    resources they use. Usage is tracked as one daily profile per resource.
+    """
+
+    def __init__(self, schedule: CriticalPathSchedule, capacities: Dict[str, float],
+                 allocations: Iterable[Dict], priorities: Optional[Dict[str, int]] = None,
+                 time_budget: float = DEFAULT_LEVELING_TIME_BUDGET_SECONDS):
+        self.schedule = schedule
+        self.capacities = {resource_id: quantity for resource_id, quantity in capacities.items() if quantity}
+        self.allocations = list(allocations)
+        self.priorities = priorities or {}
+        self.time_budget = time_budget
+
+    def level(self) -> Dict:
+        started = time.perf_counter()
+        graph = self.schedule.graph
+        if not self.allocations:
+            return self._plan(None, [], {}, True, started)
+
+        anchor = start_of_day(min(allocation["start_date"] for allocation in self.allocations))
+        resource_ids = list(self.capacities)
+        resource_index = {resource_id: index for index, resource_id in enumerate(resource_ids)}
+        max_delay = [self._max_delay(node) for node in range(len(graph))]
+
+        # Split allocations into movable task demand and fixed background load
+        demands: Dict[int, List[Tuple[int, int, List[float], Dict]]] = {}
+        fixed: List[Tuple[int, int, Dict]] = []
+        # Allocations on resources without a capacity move with their task but are not leveled
+        unconstrained: Dict[int, List[Dict]] = {}
+        horizon = 1
+        for allocation in self.allocations:
+            resource = resource_index.get(allocation["resource_id"])
+            node = graph.index.get(allocation["task_id"])
+            if resource is None:
+                if node is not None and allocation.get("end_date") is not None:
+                    unconstrained.setdefault(node, []).append(allocation)
+                continue
+            day = start_of_day(allocation["start_date"])
+            base = (day - anchor).days
+            if allocation.get("end_date") is None or node is None:
+                fixed.append((resource, base, allocation))
+                if allocation.get("end_date") is not None:
+                    horizon = max(horizon, base + math.ceil((allocation["end_date"] - day) / DAY))
+                continue
+            length = max(math.ceil((allocation["end_date"] - day) / DAY), 1)
+            profile = daily_allocated([allocation], day, length)
+            demands.setdefault(node, []).append((resource, base, profile, allocation))
+            horizon = max(horizon, base + length + max_delay[node])
+
+        background = [[0.0] * horizon for _ in resource_ids]
+        # Load carried past the horizon by open-ended allocations, used when a profile has to grow
+        self._tail = [0.0] * len(resource_ids)
+        for resource, base, allocation in fixed:
+            if allocation.get("end_date") is None:
+                self._tail[resource] += allocation.get("allocated_quantity") or 0.0
+            days = horizon - base
+            if days > 0:
+                profile = daily_allocated([allocation], anchor + timedelta(days=base), days)
+                usage = background[resource]
+                for offset, quantity in enumerate(profile):
+                    usage[base + offset] += quantity
+
+        baseline = [list(usage) for usage in background]
+        for node_demands in demands.values():
+            for resource, base, profile, _ in node_demands:
+                self._add(baseline[resource], base, profile)
+
+        usage = background
+        capacity = [self.capacities[resource_id] for resource_id in resource_ids]
+        delays = self._schedule_nodes(demands, usage, capacity, max_delay, started)
+
+        moves = self._moves(delays, demands, unconstrained, resource_ids)
+        report = {
+            resource_ids[index]: {
+                "capacity": capacity[index],
+                "peak_before": round(max(baseline[index]), 4),
+                "peak_after": round(max(usage[index]), 4),
+                "overload_before": round(self._overload(baseline[index], capacity[index]), 4),
+                "overload_after": round(self._overload(usage[index], capacity[index]), 4)
+            }
+            for index in range(len(resource_ids))
+        }
+        complete = time.perf_counter() - started <= self.time_budget
+        return self._plan(anchor, moves, report, complete, started)
+
+    def _schedule_nodes(self, demands: Dict, usage: List[List[float]], capacity: List[float],
+                        max_delay: List[int], started: float) -> List[int]:
+        schedule = self.schedule
+        graph = schedule.graph
+        size = len(graph)
+        delays = [0] * size
+        remaining = [len(predecessors) for predecessors in graph.predecessors]
+        eligible = [self._priority_key(node) for node in range(size) if not remaining[node]]
+        heapq.heapify(eligible)
+        deadline = started + self.time_budget
+
+        while eligible:
+            node = heapq.heappop(eligible)[-1]
+            lower = 0
+            for predecessor in graph.predecessors[node]:
+                gap = schedule.earliest_start[node] - schedule.earliest_finish[predecessor]
+                lower = max(lower, math.ceil(delays[predecessor] - gap - EPSILON))
+            upper = max(lower, max_delay[node])
+
+            node_demands = demands.get(node)
+            for resource, base, profile, _ in node_demands or ():
+                # Whole-day delays forced by fractional gaps can run past the planned horizon
+                shortfall = base + upper + len(profile) - len(usage[resource])
+                if shortfall > 0:
+                    usage[resource].extend([self._tail[resource]] * shortfall)
+            if node_demands and upper > lower and time.perf_counter() < deadline:
+                delay = min(
+                    range(lower, upper + 1),
+                    key=lambda candidate: self._placement_cost(node_demands, usage, capacity, candidate)
+                )
+            else:
+                delay = lower
+            delays[node] = delay
+            for resource, base, profile, _ in node_demands or ():
+                self._add(usage[resource], base + delay, profile)
+
+            for successor in graph.successors[node]:
+                remaining[successor] -= 1
+                if not remaining[successor]:
+                    heapq.heappush(eligible, self._priority_key(successor))
+        return delays
+
+    def _priority_key(self, node: int) -> Tuple:
+        schedule = self.schedule
+        slack = schedule.latest_start[node] - schedule.earliest_start[node]
+        priority = self.priorities.get(self.schedule.graph.ids[node], 0)
+        return (round(slack, 6), -priority, schedule.earliest_start[node], node)
+
+    def _max_delay(self, node: int) -> int:
+        schedule = self.schedule
+        return max(math.floor(schedule.latest_start[node] - schedule.earliest_start[node] + EPSILON), 0)
+
+    @staticmethod
+    def _placement_cost(node_demands: List, usage: List[List[float]], capacity: List[float],
+                        delay: int) -> Tuple[float, float, int]:
+        """
+        (over-allocated quantity-days, peak utilization ratio, delay) of placing a task at `delay`
+        """
+        overload = 0.0
+        peak = 0.0
+        for resource, base, profile, _ in node_demands:
+            resource_usage = usage[resource]
+            limit = capacity[resource]
+            start = base + delay
+            for offset, quantity in enumerate(profile):
+                load = resource_usage[start + offset] + quantity
+                if load > limit:
+                    overload += load - limit
+                if load > peak * limit:
+                    peak = load / limit
+        return (round(overload, 6), round(peak, 6), delay)
+
+    @staticmethod
+    def _add(usage: List[float], start: int, profile: List[float]):
+        for offset, quantity in enumerate(profile):
+            usage[start + offset] += quantity
+
+    @staticmethod
+    def _overload(usage: List[float], capacity: float) -> float:
+        return sum(load - capacity for load in usage if load > capacity)
+
+    def _moves(self, delays: List[int], demands: Dict, unconstrained: Dict,
+               resource_ids: List[str]) -> List[Dict]:
+        graph = self.schedule.graph
+        moves = []
+        for node in graph.order:
+            task_id = graph.ids[node]
+            if not delays[node] or str(task_id).startswith(MILESTONE_PREFIX):
+                continue
+            shift = timedelta(days=delays[node])
+            allocations = [allocation for _, _, _, allocation in demands.get(node, [])]
+            moves.append({
+                "task_id": task_id,
+                "shift_days": delays[node],
+                "allocations": [
+                    {
+                        "resource_id": allocation["resource_id"],
+                        "start_date": allocation["start_date"] + shift,
+                        "end_date": allocation["end_date"] + shift
+                    }
+                    for allocation in allocations + unconstrained.get(node, [])
+                ]
+            })
+        return moves
+
+    def _plan(self, anchor: Optional[datetime], moves: List[Dict], report: Dict,
+              complete: bool, started: float) -> Dict:
+        return {
+            "anchor": anchor,
+            "moves": moves,
+            "resources": report,
+            "complete": complete,
+            "elapsed_seconds": round(time.perf_counter() - started, 4)
+        }
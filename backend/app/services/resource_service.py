@@ -1,121 +1,211 @@
-from typing import Optional, List, Dict
+from typing import Optional, List, Dict, Tuple
 from datetime import datetime, timedelta
-from ..database import get_database
+from bson import ObjectId
+from pymongo import ReplaceOne
+import asyncio
+from ..database import LiveDatabase, route_database
+from ..repository import Repository, encode_id, encode_ids
 from ..models.resource import (
     Resource, ResourceCreate, ResourceUpdate,
     ResourceAllocation, ResourceConflict, ResourceUtilization
 )
+from .allocation_index import AllocationIndex
+from .exceptions import ReservationContentionError
+from .project_service import project_service
+from .resource_leveling import ResourceLeveler, DEFAULT_LEVELING_TIME_BUDGET_SECONDS
+from .utilization_engine import (
+    average_allocated, monthly_buckets, slice_buckets, daily_allocated, utilization_percentages,
+    start_of_day, start_of_month, next_month, UTILIZATION_HORIZON_DAYS, UTILIZATION_LOOKBACK_DAYS
+)
+
+# A reservation retries this many times when concurrent reservations keep winning the ledger
+MAX_RESERVATION_ATTEMPTS = 5
+RESERVATION_RETRY_DELAY_SECONDS = 0.05
+# A claim on a resource's ledger lapses after this long, should its holder die before releasing it
+RESERVATION_CLAIM_SECONDS = 30
+ALLOCATION_PROJECTION = {
+    "_id": 0, "resource_id": 1, "task_id": 1, "allocated_quantity": 1, "start_date": 1, "end_date": 1
+}
+# Window queries can otherwise be planned on the (resource_id, task_id) index
+ALLOCATION_WINDOW_INDEX = [("resource_id", 1), ("start_date", 1), ("end_date", 1)]
 
 class ResourceService:
+    db = LiveDatabase()
+
     def __init__(self):
-        self.db = get_database()
+        self.resources = Repository("resources", lambda: self.db)
+        self.tasks = Repository("tasks", lambda: self.db)
+        self.allocations = Repository("resource_allocations", lambda: self.db)
 
     async def allocate_resource(self, resource_id: str, allocation: ResourceAllocation) -> Optional[ResourceAllocation]:
         """
-        Allocate a resource to a task with conflict checking
+        Atomically reserve capacity on a resource for a task; None when the resource is
+        missing or lacks capacity.
+
+        After the capacity check the resource's allocation_version ledger is claimed by a
+        compare-and-set, which fails if another reservation committed or holds the claim
+        since the ledger was read; the check is then repeated against the fresh state. Only
+        the claim holder inserts its allocation, so readers never see a tentative one.
+        Raises ReservationContentionError when the ledger cannot be claimed.
         """
-        # Check for conflicts
-        conflicts = await self.check_allocation_conflicts(resource_id, allocation)
-        if conflicts:
-            return None  # Cannot allocate due to conflicts
+        for _ in range(MAX_RESERVATION_ATTEMPTS):
+            resource = await self.resources.find_by_id(
+                resource_id, {"project_id": 1, "quantity": 1, "allocation_version": 1, "allocation_claim": 1}
+            )
+            if not resource:
+                return None
+            claim = resource.get("allocation_claim")
+            if claim and claim["expires_at"] > datetime.utcnow():
+                # Another reservation is inserting its allocation
+                await asyncio.sleep(RESERVATION_RETRY_DELAY_SECONDS)
+                continue
 
-        # Add allocation to resource
-        result = await self.db.resources.update_one(
-            {"_id": resource_id},
-            {
-                "$push": {"allocations": allocation.dict()},
-                "$set": {"updated_at": datetime.utcnow()}
-            }
-        )
+            existing = await self._load_allocations([resource_id], allocation.start_date, allocation.end_date)
+            if self._find_conflicts(resource, existing.get(resource_id, []), allocation):
+                return None  # Cannot allocate due to conflicts
+
+            now = datetime.utcnow()
+            token = str(ObjectId())
+            claimed = await self.db.resources.update_one(
+                {
+                    **self._ledger_filter(resource),
+                    "$or": [{"allocation_claim": None}, {"allocation_claim.expires_at": {"$lte": now}}]
+                },
+                {
+                    "$inc": {"allocation_version": 1},
+                    "$set": {
+                        "allocation_claim": {
+                            "token": token, "expires_at": now + timedelta(seconds=RESERVATION_CLAIM_SECONDS)
+                        },
+                        "updated_at": now
+                    }
+                }
+            )
+            if not claimed.modified_count:
+                continue
 
-        if result.modified_count == 0:
-            return None
+            try:
+                await self.db.resource_allocations.insert_one({
+                    "resource_id": resource_id,
+                    "project_id": resource.get("project_id"),
+                    **allocation.dict(),
+                    "created_at": now
+                })
+            finally:
+                await self.db.resources.update_one(
+                    {"_id": resource["_id"], "allocation_claim.token": token},
+                    {"$unset": {"allocation_claim": ""}}
+                )
+            await self.materialize_utilization(resource_id)
+            return allocation
+
+        raise ReservationContentionError(resource_id)
 
-        return allocation
+    def _ledger_filter(self, resource: Dict) -> Dict:
+        version = resource.get("allocation_version")
+        if version is None:
+            return {"_id": resource["_id"], "allocation_version": {"$exists": False}}
+        return {"_id": resource["_id"], "allocation_version": version}
+
+    async def _load_allocations(self, resource_ids: List[str], start_date: Optional[datetime] = None,
+                                end_date: Optional[datetime] = None) -> Dict[str, List[Dict]]:
+        """
+        Allocations of the given resources overlapping [start_date, end_date), grouped by resource.
+        Allocations reference resources by the string form of their id.
+        """
+        query: Dict = {"resource_id": {"$in": [str(resource_id) for resource_id in resource_ids]}}
+        if end_date is not None:
+            query["start_date"] = {"$lt": end_date}
+        if start_date is not None:
+            query["$or"] = [{"end_date": None}, {"end_date": {"$gt": start_date}}]
+
+        windowed = start_date is not None or end_date is not None
+        allocations = await self.allocations.find(
+            query, ALLOCATION_PROJECTION, hint=ALLOCATION_WINDOW_INDEX if windowed else None
+        )
+        grouped: Dict[str, List[Dict]] = {}
+        for allocation in allocations:
+            grouped.setdefault(allocation["resource_id"], []).append(allocation)
+        return grouped
 
     async def check_allocation_conflicts(self, resource_id: str, new_allocation: ResourceAllocation) -> List[ResourceConflict]:
         """
         Check for conflicts with existing allocations
         """
-        resource = await self.db.resources.find_one({"_id": resource_id})
+        resource = await self.resources.find_by_id(resource_id, {"quantity": 1})
         if not resource:
             return []
 
-        conflicts = []
-        existing_allocations = resource.get("allocations", [])
-        available_quantity = resource.get("quantity", 0)
+        existing = await self._load_allocations([resource_id], new_allocation.start_date, new_allocation.end_date)
+        return self._find_conflicts(resource, existing.get(resource_id, []), new_allocation)
 
-        for alloc in existing_allocations:
-            alloc_obj = ResourceAllocation(**alloc)
-
-            # Check time overlap
-            if (new_allocation.start_date <= alloc_obj.end_date or alloc_obj.end_date is None) and \
-               (new_allocation.end_date is None or new_allocation.end_date >= alloc_obj.start_date):
+    def _find_conflicts(self, resource: Dict, allocations: List[Dict],
+                        new_allocation: ResourceAllocation) -> List[ResourceConflict]:
+        """
+        Compare the peak concurrent quantity over the new allocation's window with capacity
+        """
+        index = AllocationIndex(allocations)
+        available_quantity = resource.get("quantity") or 0
 
-                # Check quantity overlap
-                total_allocated = new_allocation.allocated_quantity + alloc_obj.allocated_quantity
-                if total_allocated > available_quantity:
-                    conflicts.append(ResourceConflict(
-                        conflicting_allocation_id=str(alloc_obj.task_id),
-                        conflict_type="over_allocation",
-                        severity="high",
-                        description=f"Allocation exceeds available quantity ({total_allocated} > {available_quantity})"
-                    ))
+        peak = index.peak(new_allocation.start_date, new_allocation.end_date)
+        total_allocated = peak + new_allocation.allocated_quantity
+        if total_allocated <= available_quantity:
+            return []
 
-        return conflicts
+        # Exceeding capacity with no overlapping allocations is reported against no allocation
+        description = f"Allocation exceeds available quantity ({total_allocated} > {available_quantity})"
+        overlapping = index.overlapping(new_allocation.start_date, new_allocation.end_date)
+        return [
+            ResourceConflict(
+                conflicting_allocation_id=allocation_id,
+                conflict_type="over_allocation",
+                severity="high",
+                description=description
+            )
+            for allocation_id in [str(alloc["task_id"]) for alloc in overlapping] or [""]
+        ]
 
-    async def optimize_resource_allocation(self, project_id: str) -> Dict[str, List[str]]:
+    async def optimize_resource_allocation(self, project_id: str,
+                                           time_budget: float = DEFAULT_LEVELING_TIME_BUDGET_SECONDS) -> Optional[Dict]:
         """
-        Optimize resource allocation for a project
+        Level the project's resource usage by shifting task allocations within their slack.
+        Returns a reallocation plan; nothing is written.
         """
-        # Get all resources and tasks for the project
-        resources = await self.db.resources.find({"project_id": project_id}).to_list(length=None)
-        tasks = await self.db.tasks.find({"project_id": project_id}).to_list(length=None)
-
-        optimization_suggestions = {}
-
-        # Simple optimization: suggest reallocating over-allocated resources
-        for resource in resources:
-            resource_obj = Resource(**resource)
-            total_allocated = sum(alloc.allocated_quantity for alloc in resource_obj.allocations)
-            available = resource_obj.quantity or 0
+        schedule = await project_service.get_schedule(project_id)
+        if schedule is None:
+            return None
 
-            if total_allocated > available:
-                optimization_suggestions[resource_obj.id] = [
-                    f"Over-allocated by {total_allocated - available}",
-                    "Consider reducing allocation quantities or extending resource capacity"
-                ]
+        resources = await self.resources.find({"project_id": project_id}, {"quantity": 1})
+        allocations = await self._load_allocations([resource["id"] for resource in resources])
+        tasks = await self.tasks.find({"project_id": project_id}, {"priority": 1})
 
-        return optimization_suggestions
+        leveler = ResourceLeveler(
+            schedule,
+            {resource["id"]: resource.get("quantity") for resource in resources},
+            [allocation for resource_allocations in allocations.values() for allocation in resource_allocations],
+            {task["id"]: task.get("priority") or 0 for task in tasks},
+            time_budget
+        )
+        return {"project_id": project_id, **leveler.level()}
 
     async def calculate_utilization(self, resource_id: str, start_date: datetime, end_date: datetime) -> ResourceUtilization:
         """
-        Calculate resource utilization for a given period
+        Calculate duration-weighted resource utilization for a given period
         """
-        resource = await self.db.resources.find_one({"_id": resource_id})
+        resource = await self.resources.find_by_id(resource_id, {"quantity": 1})
         if not resource:
             return None
 
-        resource_obj = Resource(**resource)
-        available_quantity = resource_obj.quantity or 0
-
-        # Calculate average allocated quantity during the period
-        total_allocated = 0
-        allocation_count = 0
-
-        for alloc in resource_obj.allocations:
-            alloc_obj = ResourceAllocation(**alloc)
+        allocations = await self._load_allocations([resource_id], start_date, end_date)
+        return self._utilization_for_period(resource, allocations.get(resource_id, []), start_date, end_date)
 
-            # Check if allocation overlaps with the period
-            if (alloc_obj.start_date <= end_date) and \
-               (alloc_obj.end_date is None or alloc_obj.end_date >= start_date):
-                total_allocated += alloc_obj.allocated_quantity
-                allocation_count += 1
-
-        avg_allocated = total_allocated / max(allocation_count, 1)
+    def _utilization_for_period(self, resource: Dict, allocations: List[Dict],
+                                start_date: datetime, end_date: datetime) -> ResourceUtilization:
+        available_quantity = resource.get("quantity") or 0
+        avg_allocated = average_allocated(allocations, start_date, end_date)
         utilization_percentage = (avg_allocated / available_quantity * 100) if available_quantity > 0 else 0
 
-        utilization = ResourceUtilization(
+        return ResourceUtilization(
             period_start=start_date,
             period_end=end_date,
             utilization_percentage=round(utilization_percentage, 2),
@@ -123,17 +213,6 @@ class ResourceService:
             available_quantity=available_quantity
         )
 
-        # Store in history
-        await self.db.resources.update_one(
-            {"_id": resource_id},
-            {
-                "$push": {"utilization_history": utilization.dict()},
-                "$set": {"updated_at": datetime.utcnow()}
-            }
-        )
-
-        return utilization
-
     async def get_resource_utilization_report(self, project_id: str, days: int = 30) -> Dict[str, List[ResourceUtilization]]:
         """
         Generate utilization report for all resources in a project
@@ -141,68 +220,152 @@ class ResourceService:
         end_date = datetime.utcnow()
         start_date = end_date - timedelta(days=days)
 
-        resources = await self.db.resources.find({"project_id": project_id}).to_list(length=None)
-        report = {}
+        resources = await self.resources.find({"project_id": project_id}, {"name": 1, "quantity": 1})
+        allocations = await self._load_allocations([resource["id"] for resource in resources], start_date, end_date)
 
-        for resource in resources:
-            resource_obj = Resource(**resource)
-            utilization = await self.calculate_utilization(resource_obj.id, start_date, end_date)
-            if utilization:
-                report[resource_obj.name] = [utilization]
+        return {
+            resource["name"]: [
+                self._utilization_for_period(resource, allocations.get(resource["id"], []), start_date, end_date)
+            ]
+            for resource in resources
+        }
+
+    async def materialize_utilization(self, resource_id: str, start_date: Optional[datetime] = None,
+                                      end_date: Optional[datetime] = None) -> int:
+        """
+        Recompute a resource's monthly utilization buckets in the resource_utilization collection
+        """
+        today = start_of_day(datetime.utcnow())
+        start_date = start_date or today - timedelta(days=UTILIZATION_LOOKBACK_DAYS)
+        end_date = end_date or today + timedelta(days=UTILIZATION_HORIZON_DAYS)
+
+        resource = await self.resources.find_by_id(resource_id, {"project_id": 1, "quantity": 1})
+        if not resource:
+            return 0
+
+        # Buckets cover whole months, so load every allocation overlapping the first and last one
+        bucket_end = start_of_month(end_date)
+        if bucket_end < end_date:
+            bucket_end = next_month(bucket_end)
+        allocations = await self._load_allocations([resource_id], start_of_month(start_date), bucket_end)
+        buckets = monthly_buckets(resource, allocations.get(str(resource_id), []), start_date, end_date)
+        if buckets:
+            await self.db.resource_utilization.bulk_write(
+                [ReplaceOne({"_id": bucket["_id"]}, bucket, upsert=True) for bucket in buckets],
+                ordered=False
+            )
+        return len(buckets)
+
+    async def delete_utilization(self, resource_id: str) -> int:
+        """
+        Remove a deleted resource's utilization buckets
+        """
+        result = await self.db.resource_utilization.delete_many({"resource_id": str(resource_id)})
+        return result.deleted_count
 
-        return report
+    async def get_utilization_heatmap(self, project_id: str, start_date: Optional[datetime] = None,
+                                      days: int = 90) -> Dict:
+        """
+        Daily utilization matrix (resources x days) served from the materialized buckets.
+        Resources without buckets for the range are computed in memory and not persisted.
+        """
+        start_date = start_of_day(start_date or datetime.utcnow())
+        end_date = start_date + timedelta(days=days)
+
+        resources = await self.resources.find({"project_id": project_id}, {"name": 1})
+        buckets = await route_database(self.db).resource_utilization.find(
+            {"project_id": project_id, "month": {"$gte": start_of_month(start_date), "$lt": end_date}},
+            {"resource_id": 1, "month": 1, "utilization": 1}
+        ).to_list(length=None)
+
+        buckets_by_resource: Dict[str, List[Dict]] = {}
+        for bucket in buckets:
+            buckets_by_resource.setdefault(bucket["resource_id"], []).append(bucket)
+
+        rows = {
+            resource["id"]: slice_buckets(buckets_by_resource.get(resource["id"], []), start_date, days)
+            for resource in resources
+        }
+
+        missing = [resource_id for resource_id, row in rows.items() if None in row]
+        if missing:
+            fallback = await self.resources.find({"_id": encode_ids(missing)}, {"quantity": 1})
+            allocations = await self._load_allocations(missing, start_date, end_date)
+            for resource in fallback:
+                allocated = daily_allocated(allocations.get(resource["id"], []), start_date, days)
+                rows[resource["id"]] = utilization_percentages(allocated, resource.get("quantity"))
+
+        return {
+            "start_date": start_date,
+            "days": days,
+            "resources": [{"id": resource["id"], "name": resource["name"]} for resource in resources],
+            "matrix": [rows[resource["id"]] for resource in resources]
+        }
 
     async def deallocate_resource(self, resource_id: str, task_id: str) -> bool:
         """
         Remove allocation of a resource from a task
         """
-        result = await self.db.resources.update_one(
-            {"_id": resource_id},
-            {
-                "$pull": {"allocations": {"task_id": task_id}},
-                "$set": {"updated_at": datetime.utcnow()}
-            }
-        )
+        # Releasing capacity cannot over-allocate, so it does not need to take the ledger
+        result = await self.db.resource_allocations.delete_many({"resource_id": resource_id, "task_id": task_id})
 
-        return result.modified_count > 0
+        if result.deleted_count > 0:
+            await self.db.resources.update_one({"_id": encode_id(resource_id)}, {"$set": {"updated_at": datetime.utcnow()}})
+            await self.materialize_utilization(resource_id)
+        return result.deleted_count > 0
 
     async def find_available_resources(self, project_id: str, resource_type: str,
                                     required_quantity: float, start_date: datetime,
                                     end_date: Optional[datetime] = None) -> List[Resource]:
         """
-        Find available resources of a specific type that can fulfill requirements
+        Find available resources of a specific type that can fulfill requirements,
+        ranked by remaining capacity
         """
-        # Find resources of the specified type
-        resources = await self.db.resources.find({
-            "project_id": project_id,
-            "type": resource_type,
-            "availability": True
-        }).to_list(length=None)
-
-        available_resources = []
-
-        for resource in resources:
-            resource_obj = Resource(**resource)
-
-            # Check if resource has enough quantity
-            if resource_obj.quantity and resource_obj.quantity < required_quantity:
-                continue
+        matches = await self.search_availability(
+            project_id, resource_type, required_quantity, [(start_date, end_date)]
+        )
+        return [match["resource"] for match in matches]
 
-            # Check for conflicts with existing allocations
-            conflicts = await self.check_allocation_conflicts(
-                resource_obj.id,
-                ResourceAllocation(
-                    task_id="",  # Placeholder
-                    allocated_quantity=required_quantity,
-                    start_date=start_date,
-                    end_date=end_date,
-                    allocated_by=""  # Placeholder
-                )
-            )
+    async def search_availability(self, project_id: str, resource_type: str, required_quantity: float,
+                                  windows: List[Tuple[datetime, Optional[datetime]]]) -> List[Dict]:
+        """
+        Batch availability search: candidates and their allocations within the requested windows
+        are loaded with one query each, each candidate's allocations are indexed once and every
+        requested window is evaluated against that index.
+        Returns matches ordered by the capacity left after the allocation.
+        """
+        resources = await self.resources.find(
+            {
+                "project_id": project_id,
+                "type": resource_type,
+                "availability": True,
+                "quantity": {"$gte": required_quantity}
+            },
+            {"utilization_history": 0, "allocations": 0}
+        )
+        if not resources:
+            return []
 
-            if not conflicts:
-                available_resources.append(resource_obj)
+        ends = [end for _, end in windows]
+        allocations = await self._load_allocations(
+            [resource["id"] for resource in resources],
+            min(start for start, _ in windows),
+            None if None in ends else max(ends)
+        )
 
-        return available_resources
+        matches = []
+        for resource in resources:
+            index = AllocationIndex(allocations.get(resource["id"], []))
+            peak = max(index.peak(start, end) for start, end in windows)
+            remaining_capacity = (resource.get("quantity") or 0) - peak - required_quantity
+            if remaining_capacity >= 0:
+                matches.append({
+                    "resource": Resource(**resource),
+                    "peak_allocated": peak,
+                    "remaining_capacity": remaining_capacity
+                })
+
+        matches.sort(key=lambda match: match["remaining_capacity"], reverse=True)
+        return matches
 
 resource_service = ResourceService()
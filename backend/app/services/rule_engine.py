@@ -2,20 +2,25 @@ from typing import Dict, Any, List
 from datetime import datetime
 import re
 import time
-from ..database import get_database
+from pymongo import ReturnDocument
+from ..database import LiveDatabase
+from ..repository import Repository, encode_id
 from ..models.rule import Rule
 from ..models.task import Task, TaskStatus
 from ..models.project import Project
 
 class RuleEngine:
+    db = LiveDatabase()
+
     def __init__(self):
-        self.db = get_database()
+        self.rules = Repository("rules", lambda: self.db)
+        self.tasks = Repository("tasks", lambda: self.db)
 
     async def evaluate_rules(self, event_type: str, event_data: Dict[str, Any]) -> List[Dict[str, Any]]:
         """
         Evaluate all active rules against the given event
         """
-        rules = await self.db.rules.find({"active": True, "type": event_type}).to_list(length=None)
+        rules = await self.rules.find({"active": True, "type": event_type})
         triggered_actions = []
 
         for rule in rules:
@@ -34,7 +39,7 @@ class RuleEngine:
         """
         Update rule execution metrics for performance monitoring
         """
-        rule = await self.db.rules.find_one({"_id": rule_id})
+        rule = await self.rules.find_by_id(rule_id)
         if not rule:
             return
         execution_count = rule.get("execution_count", 0) + 1
@@ -45,7 +50,7 @@ class RuleEngine:
         new_avg_time = ((avg_time * (execution_count - 1)) + execution_time) / execution_count
 
         await self.db.rules.update_one(
-            {"_id": rule_id},
+            {"_id": encode_id(rule_id)},
             {"$set": {
                 "last_executed": datetime.utcnow(),
                 "execution_count": execution_count,
@@ -59,7 +64,7 @@ class RuleEngine:
         """
         Manually trigger a rule by ID with given event data
         """
-        rule = await self.db.rules.find_one({"_id": rule_id, "active": True})
+        rule = await self.rules.find_by_id(rule_id, extra={"active": True})
         if not rule:
             return [{"error": "Rule not found or inactive"}]
 
@@ -78,14 +83,14 @@ class RuleEngine:
         """
         Retrieve all active scheduled rules
         """
-        rules = await self.db.rules.find({"active": True, "type": "scheduled"}).to_list(length=None)
+        rules = await self.rules.find({"active": True, "type": "scheduled"})
         return rules
 
     async def execute_scheduled_rule(self, rule_id: str) -> List[Dict[str, Any]]:
         """
         Execute a scheduled rule by ID
         """
-        rule = await self.db.rules.find_one({"_id": rule_id, "active": True, "type": "scheduled"})
+        rule = await self.rules.find_by_id(rule_id, extra={"active": True, "type": "scheduled"})
         if not rule:
             return [{"error": "Scheduled rule not found or inactive"}]
 
@@ -200,8 +205,11 @@ class RuleEngine:
         task_data["title"] = self._replace_placeholders(task_data["title"], event_data)
         task_data["description"] = self._replace_placeholders(task_data["description"], event_data)
 
-        result = await self.db.tasks.insert_one(task_data)
-        return {"task_id": str(result.inserted_id), "message": "Task created successfully"}
+        from .task_service import task_service
+
+        created_task = await self.tasks.insert(task_data)
+        await task_service.record_task_change(None, created_task)
+        return {"task_id": created_task["id"], "message": "Task created successfully"}
 
     async def _update_task_status(self, action_data: Dict[str, Any], event_data: Dict[str, Any]) -> Dict[str, Any]:
         """
@@ -217,15 +225,19 @@ class RuleEngine:
         if task_id.startswith("pattern:"):
             pattern = task_id.replace("pattern:", "")
             # Find task that matches the pattern in title or description
-            task = await self.db.tasks.find_one({"title": {"$regex": pattern}})
+            task = await self.tasks.find_one({"title": {"$regex": pattern}})
             if not task:
                 return {"error": "No task found matching pattern"}
-            task_id = task["_id"]
+            task_id = task["id"]
 
-        await self.db.tasks.update_one(
-            {"_id": task_id},
-            {"$set": {"status": new_status, "updated_at": datetime.utcnow()}}
-        )
+        from .task_service import task_service
+
+        # The previous state is returned atomically so the counters see exactly this transition
+        update_data = {"status": new_status, "updated_at": datetime.utcnow()}
+        previous = await self.tasks.update_by_id(task_id, {"$set": update_data}, return_document=ReturnDocument.BEFORE)
+        if previous is None:
+            return {"error": "Task not found"}
+        await task_service.record_task_change(previous, {**previous, **update_data})
 
         return {"task_id": task_id, "new_status": new_status, "message": "Task status updated"}
 
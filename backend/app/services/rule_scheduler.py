@@ -0,0 +1,207 @@
+from typing import Any, Dict, List, Optional, Tuple
+from datetime import datetime, timedelta
+import asyncio
+import heapq
+import os
+from ..cron import CronExpression
+from ..database import LiveDatabase
+from ..repository import Repository
+from .background_jobs import job_queue
+from .rule_engine import rule_engine
+
+# A fire found this late (after downtime or a stalled loop) still runs, once; older
+# fires are skipped as misfires
+RULE_MISFIRE_GRACE_SECONDS = int(os.getenv("RULE_MISFIRE_GRACE_SECONDS", "300"))
+# Full reload of the scheduled rules, which picks up rules changed through other processes
+RULE_SCHEDULE_RELOAD_SECONDS = int(os.getenv("RULE_SCHEDULE_RELOAD_SECONDS", "300"))
+# Pause after the rules or the job queue could not be reached
+RULE_SCHEDULER_RETRY_SECONDS = 5
+
+
+class RuleScheduler:
+    """
+    Fires SCHEDULED rules on their cron schedules by queueing an execution job per fire.
+
+    Next fire times sit in a min-heap and the loop sleeps until the earliest one, so
+    idle rules cost nothing between fires. Every worker process runs a scheduler; each
+    fire is queued under a job key made of the rule id and fire time, so only one
+    process's job is queued. Rule changes refresh this process's heap immediately,
+    other processes pick them up on their next reload, and the job re-checks the rule's
+    schedule before executing, so a stale fire from a changed rule is skipped.
+    """
+
+    db = LiveDatabase()
+
+    def __init__(self):
+        self.rules = Repository("rules", lambda: self.db)
+        # (fire time, rule id) entries; superseded ones are skipped when popped
+        self._heap: List[Tuple[datetime, str]] = []
+        self._schedules: Dict[str, Tuple[CronExpression, datetime]] = {}
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self.running = False
+        self.fired = 0
+        self.duplicates = 0
+        self.misfires = 0
+
+    def schedule(self, rule: Dict[str, Any], now: Optional[datetime] = None):
+        """
+        Track an active scheduled rule's next fire, or stop tracking any other rule.
+        Fires due within the misfire grace period are still ahead, so they run late.
+        """
+        rule_id = str(rule.get("id") or rule["_id"])
+        if not rule.get("active", True) or rule.get("type") != "scheduled" or not rule.get("schedule"):
+            self.unschedule(rule_id)
+            return
+        try:
+            cron = CronExpression(rule["schedule"])
+        except ValueError as e:
+            print(f"Rule {rule_id} has an invalid schedule: {e}")
+            self.unschedule(rule_id)
+            return
+
+        current = self._schedules.get(rule_id)
+        if current and current[0].expression == cron.expression:
+            return
+        now = now or datetime.utcnow()
+        earliest = now - timedelta(seconds=RULE_MISFIRE_GRACE_SECONDS)
+        last_executed = rule.get("last_executed")
+        if isinstance(last_executed, datetime):
+            missed = cron.next_after(last_executed)
+            if missed is not None and missed < earliest:
+                self.misfires += 1
+            earliest = max(earliest, last_executed)
+        self._push(rule_id, cron, cron.next_after(earliest))
+
+    def unschedule(self, rule_id: str):
+        if self._schedules.pop(rule_id, None) is not None:
+            self._wakeup.set()
+
+    def _push(self, rule_id: str, cron: CronExpression, fire_at: Optional[datetime]):
+        if fire_at is None:
+            self._schedules.pop(rule_id, None)
+            return
+        self._schedules[rule_id] = (cron, fire_at)
+        heapq.heappush(self._heap, (fire_at, rule_id))
+        # The loop may be sleeping towards a later fire
+        self._wakeup.set()
+
+    async def load(self):
+        """
+        Rebuild the schedule from every active scheduled rule
+        """
+        rules = await rule_engine.get_scheduled_rules()
+        now = datetime.utcnow()
+        seen = set()
+        for rule in rules:
+            seen.add(str(rule["id"]))
+            self.schedule(rule, now)
+        for rule_id in list(self._schedules):
+            if rule_id not in seen:
+                self.unschedule(rule_id)
+
+    def reschedule(self, rule: Dict[str, Any]):
+        """
+        Track a created or changed rule, replacing its known schedule
+        """
+        self._schedules.pop(str(rule["id"]), None)
+        self.schedule(rule)
+
+    async def refresh(self, rule_id: str):
+        """
+        Re-read one rule after it was created, changed or deleted
+        """
+        rule = await self.rules.find_by_id(rule_id)
+        if rule is None:
+            self.unschedule(str(rule_id))
+        else:
+            self.reschedule(rule)
+
+    async def dispatch_due(self, now: Optional[datetime] = None) -> int:
+        """
+        Queue every fire that is due and move those rules to their next fire.
+        Fires later than the grace period are counted as misfires and skipped;
+        several missed fires of one rule collapse into a single late run. A fire that
+        cannot be queued stays due and the error propagates.
+        """
+        now = now or datetime.utcnow()
+        queued = 0
+        while self._heap and self._heap[0][0] <= now:
+            fire_at, rule_id = heapq.heappop(self._heap)
+            tracked = self._schedules.get(rule_id)
+            if tracked is None or tracked[1] != fire_at:
+                continue
+            cron = tracked[0]
+            if (now - fire_at).total_seconds() > RULE_MISFIRE_GRACE_SECONDS:
+                self.misfires += 1
+            else:
+                try:
+                    queued += await self._enqueue(rule_id, cron, fire_at)
+                except Exception:
+                    heapq.heappush(self._heap, (fire_at, rule_id))
+                    raise
+            self._push(rule_id, cron, cron.next_after(max(fire_at, now)))
+        return queued
+
+    async def _enqueue(self, rule_id: str, cron: CronExpression, fire_at: datetime) -> bool:
+        job_id = await job_queue.enqueue(
+            "rules.scheduled_fire",
+            {"rule_id": rule_id, "schedule": cron.expression, "fire_at": fire_at},
+            run_at=fire_at,
+            key=f"rule:{rule_id}:{fire_at.isoformat()}"
+        )
+        if job_id is None:
+            # Another process queued this fire
+            self.duplicates += 1
+            return False
+        self.fired += 1
+        return True
+
+    async def _fire(self, rule_id: str, schedule: str, fire_at: datetime) -> Dict[str, Any]:
+        rule = await self.rules.find_by_id(rule_id, {"schedule": 1})
+        if rule is None or rule.get("schedule") != schedule:
+            return {"skipped": True, "reason": "Rule deleted or rescheduled", "fire_at": fire_at}
+        return {"fire_at": fire_at, "actions": await rule_engine.execute_scheduled_rule(rule_id)}
+
+    async def _run(self):
+        reload_at = datetime.utcnow()
+        while self.running:
+            self._wakeup.clear()
+            now = datetime.utcnow()
+            try:
+                if now >= reload_at:
+                    await self.load()
+                    reload_at = now + timedelta(seconds=RULE_SCHEDULE_RELOAD_SECONDS)
+                await self.dispatch_due()
+                wake_at = min(self._heap[0][0], reload_at) if self._heap else reload_at
+            except Exception as e:
+                print(f"Rule scheduler error: {e}")
+                wake_at = now + timedelta(seconds=RULE_SCHEDULER_RETRY_SECONDS)
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), max((wake_at - datetime.utcnow()).total_seconds(), 0))
+            except asyncio.TimeoutError:
+                pass
+
+    def start(self):
+        self.running = True
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        self.running = False
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    def stats(self) -> Dict[str, Any]:
+        upcoming = min((fire_at for _, fire_at in self._schedules.values()), default=None)
+        return {
+            "scheduled_rules": len(self._schedules),
+            "next_fire_at": upcoming,
+            "fired": self.fired,
+            "duplicates": self.duplicates,
+            "misfires": self.misfires
+        }
+
+
+rule_scheduler = RuleScheduler()
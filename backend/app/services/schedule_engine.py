@@ -0,0 +1,202 @@
+from typing import Dict, Iterable, List
+import heapq
+from .dependency_graph import DependencyGraph
+
+HOURS_PER_DAY = 8.0
+# Tasks without an estimate are scheduled as one working day
+DEFAULT_TASK_DURATION_DAYS = 1.0
+MILESTONE_PREFIX = "milestone:"
+EPSILON = 1e-9
+
+
+def task_duration_days(task: Dict) -> float:
+    """
+    Remaining duration of a task in working days; completed tasks take no further time
+    """
+    if task.get("status") == "done":
+        return 0.0
+    estimated_hours = (task.get("progress") or {}).get("estimated_hours")
+    if estimated_hours is None:
+        return DEFAULT_TASK_DURATION_DAYS
+    return max(estimated_hours, 0.0) / HOURS_PER_DAY
+
+
+def milestone_node_id(milestone_id: str) -> str:
+    return f"{MILESTONE_PREFIX}{milestone_id}"
+
+
+class CriticalPathSchedule:
+    """
+    Critical path method over a project's dependency DAG.
+
+    Forward and backward passes run in the graph's topological order in O(V+E).
+    A duration change for a single node only re-propagates through the nodes
+    whose dates actually move, unless the project end moves, in which case the
+    backward pass is redone.
+    """
+
+    def __init__(self, graph: DependencyGraph, durations: Dict[str, float]):
+        self.graph = graph
+        size = len(graph)
+        self.duration = [durations.get(task_id, 0.0) for task_id in graph.ids]
+        self.earliest_start = [0.0] * size
+        self.earliest_finish = [0.0] * size
+        self.latest_start = [0.0] * size
+        self.latest_finish = [0.0] * size
+        self.project_duration = 0.0
+        self.compute()
+
+    @classmethod
+    def from_project(cls, tasks: Iterable[Dict], milestones: Iterable[Dict]) -> "CriticalPathSchedule":
+        """
+        Build the combined task and milestone schedule.
+        Milestones become zero-duration nodes that depend on their tasks and on
+        the milestones listed in their `dependencies`.
+        """
+        tasks = list(tasks)
+        milestone_tasks: Dict[str, List[Dict]] = {}
+        for task in tasks:
+            if task.get("milestone_id"):
+                milestone_tasks.setdefault(task["milestone_id"], []).append({"task_id": str(task["_id"])})
+
+        nodes = [
+            {"_id": task["_id"], "status": task.get("status"), "dependencies": task.get("dependencies") or []}
+            for task in tasks
+        ]
+        for milestone in milestones:
+            if not milestone.get("id"):
+                continue
+            nodes.append({
+                "_id": milestone_node_id(milestone["id"]),
+                "status": "done" if milestone.get("completed") else "todo",
+                "dependencies": milestone_tasks.get(milestone["id"], []) + [
+                    {"task_id": milestone_node_id(dep_id)} for dep_id in milestone.get("dependencies") or []
+                ]
+            })
+
+        durations = {str(task["_id"]): task_duration_days(task) for task in tasks}
+        return cls(DependencyGraph.from_tasks(nodes), durations)
+
+    def compute(self):
+        self._forward_pass()
+        self._backward_pass()
+
+    def update_duration(self, node_id: str, duration: float):
+        """
+        Change one node's duration and re-propagate only the affected dates
+        """
+        node = self.graph.index[node_id]
+        if abs(self.duration[node] - duration) < EPSILON:
+            return
+        self.duration[node] = duration
+
+        self._propagate_forward(node)
+        project_duration = max(self.earliest_finish, default=0.0)
+        if abs(project_duration - self.project_duration) > EPSILON:
+            self.project_duration = project_duration
+            self._backward_pass()
+        else:
+            self._propagate_backward(node)
+
+    def slack(self, node_id: str) -> float:
+        node = self.graph.index[node_id]
+        return self.latest_start[node] - self.earliest_start[node]
+
+    def is_critical(self, node_id: str) -> bool:
+        return self.slack(node_id) < EPSILON
+
+    def critical_path(self) -> List[str]:
+        """
+        A zero-slack chain running from a project start node to the project end
+        """
+        graph = self.graph
+        node = None
+        for candidate in graph.order:
+            if not graph.predecessors[candidate] and self._zero_slack(candidate) and self.duration[candidate] > 0:
+                node = candidate
+                break
+        if node is None:
+            node = next((c for c in graph.order if not graph.predecessors[c] and self._zero_slack(c)), None)
+        if node is None:
+            return []
+
+        path = [graph.ids[node]]
+        while True:
+            next_node = next((
+                successor for successor in graph.successors[node]
+                if self._zero_slack(successor)
+                and abs(self.earliest_start[successor] - self.earliest_finish[node]) < EPSILON
+            ), None)
+            if next_node is None:
+                return path
+            node = next_node
+            path.append(graph.ids[node])
+
+    def node_schedule(self, node_id: str) -> Dict:
+        node = self.graph.index[node_id]
+        return {
+            "id": node_id,
+            "duration_days": round(self.duration[node], 4),
+            "earliest_start": round(self.earliest_start[node], 4),
+            "earliest_finish": round(self.earliest_finish[node], 4),
+            "latest_start": round(self.latest_start[node], 4),
+            "latest_finish": round(self.latest_finish[node], 4),
+            "slack": round(self.latest_start[node] - self.earliest_start[node], 4),
+            "critical": self._zero_slack(node)
+        }
+
+    def _zero_slack(self, node: int) -> bool:
+        return self.latest_start[node] - self.earliest_start[node] < EPSILON
+
+    def _forward_pass(self):
+        predecessors = self.graph.predecessors
+        for node in self.graph.order:
+            start = max((self.earliest_finish[p] for p in predecessors[node]), default=0.0)
+            self.earliest_start[node] = start
+            self.earliest_finish[node] = start + self.duration[node]
+        self.project_duration = max(self.earliest_finish, default=0.0)
+
+    def _backward_pass(self):
+        successors = self.graph.successors
+        for node in reversed(self.graph.order):
+            finish = min((self.latest_start[s] for s in successors[node]), default=self.project_duration)
+            self.latest_finish[node] = finish
+            self.latest_start[node] = finish - self.duration[node]
+
+    def _propagate_forward(self, origin: int):
+        position = self.graph.position
+        successors = self.graph.successors
+        predecessors = self.graph.predecessors
+        heap = [(position[origin], origin)]
+        queued = {origin}
+        while heap:
+            _, node = heapq.heappop(heap)
+            start = max((self.earliest_finish[p] for p in predecessors[node]), default=0.0)
+            finish = start + self.duration[node]
+            self.earliest_start[node] = start
+            if abs(finish - self.earliest_finish[node]) < EPSILON:
+                continue
+            self.earliest_finish[node] = finish
+            for successor in successors[node]:
+                if successor not in queued:
+                    queued.add(successor)
+                    heapq.heappush(heap, (position[successor], successor))
+
+    def _propagate_backward(self, origin: int):
+        position = self.graph.position
+        successors = self.graph.successors
+        predecessors = self.graph.predecessors
+        heap = [(-position[origin], origin)]
+        queued = {origin}
+        while heap:
+            _, node = heapq.heappop(heap)
+            finish = min((self.latest_start[s] for s in successors[node]), default=self.project_duration)
+            start = finish - self.duration[node]
+            self.latest_finish[node] = finish
+            if abs(start - self.latest_start[node]) < EPSILON:
+                continue
+            self.latest_start[node] = start
+            for predecessor in predecessors[node]:
+                if predecessor not in queued:
+                    queued.add(predecessor)
+                    heapq.heappush(heap, (-position[predecessor], predecessor))
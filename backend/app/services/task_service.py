@@ -1,15 +1,93 @@
-from typing import Optional, List, Dict
-from datetime import datetime
-from ..database import get_database
+from typing import Optional, List, Dict, Tuple
+from datetime import datetime, timedelta
+from bson import ObjectId
+from pymongo import ReturnDocument, InsertOne, UpdateOne, DeleteOne
+from pymongo.errors import BulkWriteError
+import heapq
+from ..database import LiveDatabase
+from ..repository import Repository, ProjectRepository, ID_PROJECTION, encode_id, encode_ids
 from ..models.task import Task, TaskCreate, TaskUpdate, TaskDependency, TaskProgress, TaskStatus
-from .websocket_manager import manager
-import json
+from .websocket_manager import manager, project_topic
+from ..models.project import ProjectTaskCounters
+from .user_service import user_service, OVERDUE_REFRESH_INTERVAL_SECONDS
+from .background_jobs import job_queue
+from .project_service import project_service
+from .dependency_graph import DependencyGraph, DependencyCycleError
+
+# Task fields that feed the denormalized project task counters and user statistics
+COUNTED_TASK_FIELDS = ("project_id", "assignee_id", "status", "priority", "due_date", "progress")
+# Interval between full rebuilds of every project's task counters, bounding drift
+TASK_COUNTERS_REPAIR_INTERVAL_SECONDS = 3600
+# The full repair is a collection scan, so it yields to interactive jobs
+COUNTERS_REPAIR_JOB_PRIORITY = -10
+# Cached dependency graphs are reloaded after this long to pick up writes from other workers
+DEPENDENCY_GRAPH_TTL = timedelta(seconds=60)
 
 class TaskService:
+    db = LiveDatabase()
+
     def __init__(self):
-        self.db = get_database()
+        self.tasks = Repository("tasks", lambda: self.db)
+        self.projects = ProjectRepository("projects", lambda: self.db)
+        self._dependency_graphs: Dict[str, Tuple[DependencyGraph, datetime]] = {}
 
     async def create_task(self, task_create: TaskCreate, user) -> Task:
+        task_dict = self._new_task_document(task_create)
+        created_task = await self.tasks.insert(task_dict)
+        await self.record_task_change(None, created_task)
+        self._sync_dependency_graph(
+            task_dict["project_id"], created_task["id"],
+            dependencies=task_dict.get("dependencies") or [], status=task_dict["status"]
+        )
+        project_service.invalidate_schedule(task_dict["project_id"])
+        # Notify the project's WebSocket subscribers
+        await manager.publish(project_topic(task_dict["project_id"]), "task_created", created_task)
+        return Task(**created_task)
+
+    async def update_task(self, task_id: str, task_update: TaskUpdate, user) -> Optional[Task]:
+        update_data = self._update_document(task_update)
+
+        if any(field in update_data for field in COUNTED_TASK_FIELDS):
+            # Fetch the previous state atomically so the counters can be adjusted
+            previous = await self.tasks.update_by_id(
+                task_id, {"$set": update_data}, return_document=ReturnDocument.BEFORE
+            )
+            if previous is None:
+                return None
+            updated_task = {**previous, **update_data}
+            await self.record_task_change(previous, updated_task)
+            self._sync_dependency_graph(previous["project_id"], task_id, status=update_data.get("status"))
+        else:
+            updated_task = await self.tasks.update_by_id(task_id, {"$set": update_data})
+            if updated_task is None:
+                return None
+        if "dependencies" in update_data:
+            self._sync_dependency_graph(updated_task["project_id"], task_id, dependencies=update_data["dependencies"])
+        if "dependencies" in update_data or "milestone_id" in update_data:
+            project_service.invalidate_schedule(updated_task["project_id"])
+        elif "status" in update_data:
+            await project_service.update_task_schedule(updated_task["project_id"], updated_task)
+        # Notify the project's WebSocket subscribers
+        await manager.publish(
+            project_topic(updated_task["project_id"]), "task_updated", {"id": task_id, **update_data},
+            entity_id=task_id
+        )
+        return Task(**updated_task)
+
+    async def delete_task(self, task_id: str, user) -> bool:
+        deleted_task = await self.tasks.take_by_id(task_id)
+        if deleted_task is None:
+            return False
+        await self.record_task_change(deleted_task, None)
+        # Edges to and from the task go with it, so reload the graph and schedule
+        self.invalidate_dependency_graph(deleted_task["project_id"])
+        project_service.invalidate_schedule(deleted_task["project_id"])
+        # Not coalesced, so held updates to the task go out before its deletion
+        await manager.publish(project_topic(deleted_task["project_id"]), "task_deleted", {"id": task_id})
+        return True
+
+    @staticmethod
+    def _new_task_document(task_create: TaskCreate) -> Dict:
         task_dict = task_create.dict()
         task_dict["created_at"] = datetime.utcnow()
         task_dict["updated_at"] = datetime.utcnow()
@@ -17,14 +95,10 @@ class TaskService:
         task_dict["progress"] = TaskProgress(
             estimated_hours=task_create.estimated_hours
         ).dict()
-        result = await self.db.tasks.insert_one(task_dict)
-        created_task = await self.db.tasks.find_one({"_id": result.inserted_id})
-        # Broadcast task creation event via WebSocket
-        message = json.dumps({"event": "task_created", "data": task_dict})
-        await manager.broadcast(message)
-        return Task(**created_task)
+        return task_dict
 
-    async def update_task(self, task_id: str, task_update: TaskUpdate, user) -> Optional[Task]:
+    @staticmethod
+    def _update_document(task_update: TaskUpdate) -> Dict:
         update_data = task_update.dict(exclude_unset=True)
         update_data["updated_at"] = datetime.utcnow()
 
@@ -37,126 +111,550 @@ class TaskService:
             if task_update.actual_hours is not None:
                 progress_update["actual_hours"] = task_update.actual_hours
             update_data["progress"] = progress_update
+        return update_data
 
-        result = await self.db.tasks.update_one({"_id": task_id}, {"$set": update_data})
-        if result.modified_count == 0:
-            return None
-        updated_task = await self.db.tasks.find_one({"_id": task_id})
-        # Broadcast task update event via WebSocket
-        message = json.dumps({"event": "task_updated", "data": update_data})
-        await manager.broadcast(message)
-        return Task(**updated_task)
+    async def bulk_create_tasks(self, task_creates: List[TaskCreate], user) -> List[Dict]:
+        """
+        Create many tasks with one authorization query and one unordered bulk write.
+        Returns one result per input item, in order.
+        """
+        authorized = await self._authorized_project_ids({task.project_id for task in task_creates}, user)
+        results: List[Dict] = [None] * len(task_creates)
+        documents = []
+        for index, task_create in enumerate(task_creates):
+            if task_create.project_id not in authorized:
+                results[index] = self._bulk_error(index, None, "Project not found or not authorized")
+                continue
+            task_dict = self._new_task_document(task_create)
+            task_dict["_id"] = ObjectId()
+            documents.append((index, task_dict))
+
+        errors = await self._bulk_write_tasks([InsertOne(task_dict) for _, task_dict in documents])
+        created = []
+        for position, (index, task_dict) in enumerate(documents):
+            if position in errors:
+                results[index] = self._bulk_error(index, str(task_dict["_id"]), errors[position])
+            else:
+                results[index] = {"index": index, "task_id": str(task_dict["_id"]), "status": "created"}
+                created.append(task_dict)
+
+        await self.record_task_changes([(None, task_dict) for task_dict in created])
+        await self._finish_bulk("tasks_bulk_created", created)
+        return results
+
+    async def bulk_update_tasks(self, items: List[Tuple[str, TaskUpdate]], user) -> List[Dict]:
+        """
+        Apply many (task_id, update) pairs with one lookup, one authorization query and one
+        unordered bulk write. Returns one result per input item, in order.
+        """
+        existing = await self._load_authorized_tasks([task_id for task_id, _ in items], user)
+        results: List[Dict] = [None] * len(items)
+        updates = []
+        # Accepted dependency edits are applied to a per-project copy of the graph, so
+        # later items are validated against the batch so far and cannot close a cycle
+        working_graphs: Dict[str, DependencyGraph] = {}
+        for index, (task_id, task_update) in enumerate(items):
+            # A repeated id is only updated once, so counters and stats count it once
+            previous = existing.pop(task_id, None)
+            if previous is None:
+                results[index] = self._bulk_error(index, task_id, "Task not found or not authorized")
+                continue
+            if task_update.dependencies is not None:
+                project_id = previous["project_id"]
+                if project_id not in working_graphs:
+                    working_graphs[project_id] = (await self.get_dependency_graph(project_id)).copy()
+                try:
+                    working_graphs[project_id].set_dependencies(
+                        str(previous["_id"]), [dep.task_id for dep in task_update.dependencies]
+                    )
+                except (KeyError, DependencyCycleError):
+                    results[index] = self._bulk_error(index, task_id, "Invalid or circular task dependencies")
+                    continue
+            updates.append((index, previous, self._update_document(task_update)))
+
+        errors = await self._bulk_write_tasks([
+            UpdateOne({"_id": previous["_id"]}, {"$set": update_data}) for _, previous, update_data in updates
+        ])
+        changes = []
+        for position, (index, previous, update_data) in enumerate(updates):
+            if position in errors:
+                results[index] = self._bulk_error(index, str(previous["_id"]), errors[position])
+            else:
+                results[index] = {"index": index, "task_id": str(previous["_id"]), "status": "updated"}
+                changes.append((previous, {**previous, **update_data}))
+
+        await self.record_task_changes(changes)
+        await self._finish_bulk("tasks_bulk_updated", [current for _, current in changes])
+        return results
+
+    async def bulk_delete_tasks(self, task_ids: List[str], user) -> List[Dict]:
+        """
+        Delete many tasks with one lookup, one authorization query and one unordered bulk write
+        """
+        existing = await self._load_authorized_tasks(task_ids, user)
+        results: List[Dict] = [None] * len(task_ids)
+        deletions = []
+        for index, task_id in enumerate(task_ids):
+            previous = existing.pop(task_id, None)
+            if previous is None:
+                results[index] = self._bulk_error(index, task_id, "Task not found or not authorized")
+                continue
+            deletions.append((index, previous))
+
+        errors = await self._bulk_write_tasks([DeleteOne({"_id": previous["_id"]}) for _, previous in deletions])
+        deleted = []
+        for position, (index, previous) in enumerate(deletions):
+            if position in errors:
+                results[index] = self._bulk_error(index, str(previous["_id"]), errors[position])
+            else:
+                results[index] = {"index": index, "task_id": str(previous["_id"]), "status": "deleted"}
+                deleted.append(previous)
+
+        await self.record_task_changes([(previous, None) for previous in deleted])
+        await self._finish_bulk("tasks_bulk_deleted", deleted)
+        return results
+
+    async def _authorized_project_ids(self, project_ids: set, user) -> set:
+        # One query authorizes every distinct project in the batch
+        projects = await self.projects.find(
+            {"_id": encode_ids(project_ids), **self.projects.access_filter(user.username)},
+            ID_PROJECTION
+        )
+        return {project["id"] for project in projects}
+
+    async def _load_authorized_tasks(self, task_ids: List[str], user) -> Dict[str, Dict]:
+        tasks = await self.tasks.find({"_id": encode_ids(set(task_ids))})
+        authorized = await self._authorized_project_ids({task["project_id"] for task in tasks}, user)
+        return {task["id"]: task for task in tasks if task["project_id"] in authorized}
+
+    async def _bulk_write_tasks(self, operations: List) -> Dict[int, str]:
+        """
+        Run an unordered bulk write; returns write errors keyed by operation position
+        """
+        if not operations:
+            return {}
+        try:
+            await self.db.tasks.bulk_write(operations, ordered=False)
+        except BulkWriteError as e:
+            return {error["index"]: error.get("errmsg", "Write failed") for error in e.details.get("writeErrors", [])}
+        return {}
+
+    async def _finish_bulk(self, event: str, tasks: List[Dict]):
+        """
+        Invalidate the affected projects' graphs and schedules and emit one aggregated event per project
+        """
+        if not tasks:
+            return
+        tasks_by_project: Dict[str, List[Dict]] = {}
+        for task in tasks:
+            tasks_by_project.setdefault(task["project_id"], []).append(task)
+        for project_id in sorted(tasks_by_project):
+            self.invalidate_dependency_graph(project_id)
+            project_service.invalidate_schedule(project_id)
+            project_tasks = tasks_by_project[project_id]
+            await manager.publish(project_topic(project_id), event, {
+                "count": len(project_tasks),
+                "project_id": project_id,
+                "task_ids": [str(task["_id"]) for task in project_tasks]
+            })
+
+    @staticmethod
+    def _bulk_error(index: int, task_id: Optional[str], error: str) -> Dict:
+        return {"index": index, "task_id": task_id, "status": "error", "error": error}
 
     async def get_task(self, task_id: str) -> Optional[Task]:
-        task = await self.db.tasks.find_one({"_id": task_id})
+        task = await self.tasks.find_by_id(task_id)
         if task:
             return Task(**task)
         return None
 
-    async def validate_dependencies(self, task_id: str, dependencies: List[TaskDependency]) -> bool:
+    async def get_dependency_graph(self, project_id: str) -> DependencyGraph:
+        """
+        Get the project's dependency graph, loading it with a single query on a cache miss
+        """
+        cached = self._dependency_graphs.get(project_id)
+        if cached and cached[1] > datetime.utcnow() - DEPENDENCY_GRAPH_TTL:
+            return cached[0]
+
+        tasks = await self.tasks.find({"project_id": project_id}, {"status": 1, "dependencies.task_id": 1})
+        graph = DependencyGraph.from_tasks(tasks)
+        self._dependency_graphs[project_id] = (graph, datetime.utcnow())
+        return graph
+
+    def invalidate_dependency_graph(self, project_id: str):
+        self._dependency_graphs.pop(project_id, None)
+
+    def _sync_dependency_graph(self, project_id: str, task_id: str, dependencies: Optional[List] = None,
+                               status: Optional[str] = None):
+        """
+        Apply a task write to the cached graph, dropping it if the write cannot be applied
+        """
+        cached = self._dependency_graphs.get(project_id)
+        if not cached:
+            return
+        graph = cached[0]
+        try:
+            graph.add_task(task_id)
+            if status is not None:
+                graph.set_done(task_id, status == TaskStatus.DONE)
+            if dependencies is not None:
+                graph.set_dependencies(task_id, [
+                    dep["task_id"] if isinstance(dep, dict) else dep.task_id for dep in dependencies
+                ])
+        except (KeyError, DependencyCycleError):
+            self.invalidate_dependency_graph(project_id)
+
+    async def _get_task_project_id(self, task_id: str) -> Optional[str]:
+        task = await self.tasks.find_by_id(task_id, {"project_id": 1})
+        return task["project_id"] if task else None
+
+    async def validate_dependencies(self, task_id: str, dependencies: List[TaskDependency],
+                                    project_id: Optional[str] = None) -> bool:
         """
         Validate that all dependencies exist and don't create circular dependencies
         """
+        project_id = project_id or await self._get_task_project_id(task_id)
+        if not project_id:
+            return False
+
+        graph = await self.get_dependency_graph(project_id)
         for dep in dependencies:
             # Check if dependency task exists
-            dep_task = await self.db.tasks.find_one({"_id": dep.task_id})
-            if not dep_task:
+            if dep.task_id not in graph:
                 return False
 
             # Check for circular dependency
-            if await self._has_circular_dependency(task_id, dep.task_id):
+            if graph.would_create_cycle(dep.task_id, task_id):
                 return False
 
         return True
 
-    async def _has_circular_dependency(self, task_id: str, dep_task_id: str) -> bool:
-        """
-        Check if adding this dependency would create a circular reference
-        """
-        # Get all tasks that depend on the current task
-        dependent_tasks = await self.db.tasks.find({"dependencies.task_id": task_id}).to_list(length=None)
-
-        for task in dependent_tasks:
-            if task["_id"] == dep_task_id:
-                return True
-            # Recursively check
-            if await self._has_circular_dependency(task["_id"], dep_task_id):
-                return True
-
-        return False
-
     async def can_start_task(self, task_id: str) -> bool:
         """
         Check if a task can be started based on its dependencies
         """
-        task = await self.get_task(task_id)
-        if not task or not task.dependencies:
+        project_id = await self._get_task_project_id(task_id)
+        if not project_id:
             return True
 
-        for dep in task.dependencies:
-            dep_task = await self.get_task(dep.task_id)
-            if not dep_task or dep_task.status != TaskStatus.DONE:
-                return False
-
-        return True
+        graph = await self.get_dependency_graph(project_id)
+        return graph.can_start(task_id)
 
     async def assign_task_smart(self, task_id: str, project_id: str) -> Optional[str]:
         """
         Smart task assignment based on workload balancing
         """
         # Get all team members for the project
-        project = await self.db.projects.find_one({"_id": project_id})
+        project = await self.projects.find_by_id(project_id, {"team_members": 1})
         if not project:
             return None
 
         team_members = project.get("team_members", [])
-
-        # Calculate current workload for each team member
-        workloads = {}
-        for member_id in team_members:
-            # Count active tasks assigned to this member
-            active_tasks = await self.db.tasks.count_documents({
-                "assignee_id": member_id,
-                "status": {"$in": ["todo", "in_progress"]},
-                "project_id": project_id
-            })
-            workloads[member_id] = active_tasks
+        if not team_members:
+            return None
 
         # Find member with least workload
-        if workloads:
-            assignee_id = min(workloads, key=workloads.get)
-            await self.db.tasks.update_one(
-                {"_id": task_id},
-                {"$set": {"assignee_id": assignee_id, "updated_at": datetime.utcnow()}}
+        workloads = await self.get_team_workloads(project_id, team_members)
+        assignee_id = min(team_members, key=lambda member_id: workloads[member_id]["active_tasks"])
+        previous = await self.tasks.update_by_id(
+            task_id,
+            {"$set": {"assignee_id": assignee_id, "updated_at": datetime.utcnow()}},
+            projection={field: 1 for field in COUNTED_TASK_FIELDS},
+            return_document=ReturnDocument.BEFORE
+        )
+        if previous is None:
+            return None
+        await user_service.record_task_change(previous, {**previous, "assignee_id": assignee_id})
+        return assignee_id
+
+    async def get_team_workloads(self, project_id: str, team_members: List[str]) -> Dict[str, Dict]:
+        """
+        Active task count and estimated hours per team member, computed with a single $group
+        """
+        pipeline = [
+            {"$match": {
+                "project_id": project_id,
+                "assignee_id": {"$in": team_members},
+                "status": {"$in": [TaskStatus.TODO.value, TaskStatus.IN_PROGRESS.value]}
+            }},
+            {"$group": {
+                "_id": "$assignee_id",
+                "active_tasks": {"$sum": 1},
+                "estimated_hours": {"$sum": {"$ifNull": ["$progress.estimated_hours", 0]}}
+            }}
+        ]
+        rows = await self.db.tasks.aggregate(pipeline).to_list(length=None)
+
+        workloads = {member_id: {"active_tasks": 0, "estimated_hours": 0.0} for member_id in team_members}
+        for row in rows:
+            workloads[row["_id"]] = {"active_tasks": row["active_tasks"], "estimated_hours": row["estimated_hours"]}
+        return workloads
+
+    async def assign_tasks_batch(
+        self,
+        task_ids: List[str],
+        project_id: str,
+        weight_by_hours: bool = False,
+        skill_levels: Optional[Dict[str, int]] = None
+    ) -> Dict[str, str]:
+        """
+        Assign a batch of unassigned tasks across the project team.
+        Members are kept in a min-heap keyed by live workload; with weight_by_hours the
+        load is measured in estimated hours instead of task count, and skill_levels
+        (member -> 1..5) scale how much load a member can absorb.
+        Returns a mapping of task_id -> assignee_id.
+        """
+        project = await self.projects.find_by_id(project_id, {"team_members": 1})
+        if not project or not project.get("team_members"):
+            return {}
+        team_members = project["team_members"]
+
+        tasks = await self.tasks.find(
+            {"_id": encode_ids(task_ids), "project_id": project_id, "assignee_id": None},
+            {field: 1 for field in COUNTED_TASK_FIELDS}
+        )
+        if not tasks:
+            return {}
+
+        skill_levels = skill_levels or {}
+        workloads = await self.get_team_workloads(project_id, team_members)
+
+        def task_cost(task: Dict) -> float:
+            if weight_by_hours:
+                return (task.get("progress") or {}).get("estimated_hours") or 1.0
+            return 1.0
+
+        def effective_load(member_id: str, load: float) -> float:
+            return load / skill_levels.get(member_id, 1)
+
+        heap = []
+        for index, member_id in enumerate(team_members):
+            workload = workloads[member_id]
+            load = workload["estimated_hours"] if weight_by_hours else workload["active_tasks"]
+            heap.append((effective_load(member_id, load), index, member_id, load))
+        heapq.heapify(heap)
+
+        # Place the most important and largest tasks first so they land on the least-loaded members
+        tasks.sort(key=lambda task: (task.get("priority") or 1, task_cost(task)), reverse=True)
+
+        assignments = {}
+        now = datetime.utcnow()
+        for task in tasks:
+            _, index, member_id, load = heapq.heappop(heap)
+            assignments[task["id"]] = member_id
+            load += task_cost(task)
+            heapq.heappush(heap, (effective_load(member_id, load), index, member_id, load))
+
+        await self.db.tasks.bulk_write([
+            UpdateOne(
+                {"_id": task["_id"], "assignee_id": None},
+                {"$set": {"assignee_id": assignments[task["id"]], "updated_at": now}}
             )
-            return assignee_id
+            for task in tasks
+        ], ordered=False)
+        await user_service.record_task_changes([
+            (None, {**task, "assignee_id": assignments[task["id"]]}) for task in tasks
+        ])
 
-        return None
+        return assignments
 
     async def get_project_progress(self, project_id: str) -> Dict:
         """
-        Calculate overall project progress
+        Calculate overall project progress from the project's task counters,
+        falling back to an aggregation when the counters have not been built yet
         """
-        tasks = await self.db.tasks.find({"project_id": project_id}).to_list(length=None)
+        project = await self.projects.find_by_id(project_id, {"task_counters": 1})
+        counters = (project or {}).get("task_counters")
+        if counters is None:
+            counters = await self.rebuild_task_counters(project_id)
+        return self._format_progress(counters)
 
-        if not tasks:
-            return {"total_tasks": 0, "completed_tasks": 0, "progress_percentage": 0.0}
+    async def rebuild_task_counters(self, project_id: Optional[str] = None) -> Dict:
+        """
+        Recompute the denormalized task counters with a two-stage $group aggregation,
+        for a single project or, without `project_id`, for every project.
+        Returns the counters of `project_id`, or the number of projects repaired.
+        """
+        now = datetime.utcnow()
+        done = {"$eq": ["$status", TaskStatus.DONE.value]}
+        pipeline = [
+            {"$group": {
+                "_id": {"project_id": "$project_id", "status": "$status", "priority": "$priority"},
+                "count": {"$sum": 1},
+                "overdue": {"$sum": {"$cond": [
+                    {"$and": [{"$eq": [{"$type": "$due_date"}, "date"]}, {"$lt": ["$due_date", now]}, {"$not": [done]}]},
+                    1, 0
+                ]}},
+                "estimated_hours": {"$sum": {"$ifNull": ["$progress.estimated_hours", 0]}},
+                "actual_hours": {"$sum": {"$ifNull": ["$progress.actual_hours", 0]}}
+            }},
+            {"$group": {
+                "_id": "$_id.project_id",
+                "rows": {"$push": {
+                    "status": "$_id.status", "priority": "$_id.priority", "count": "$count", "overdue": "$overdue",
+                    "estimated_hours": "$estimated_hours", "actual_hours": "$actual_hours"
+                }}
+            }}
+        ]
+        if project_id is not None:
+            pipeline.insert(0, {"$match": {"project_id": project_id}})
+        results = await self.db.tasks.aggregate(pipeline).to_list(length=None)
 
-        total_tasks = len(tasks)
-        completed_tasks = sum(1 for task in tasks if task["status"] == TaskStatus.DONE)
+        counters_by_project = {row["_id"]: self._fold_task_counters(row["rows"], now) for row in results}
+        if project_id is not None:
+            counters_by_project.setdefault(project_id, self._fold_task_counters([], now))
 
-        # Calculate weighted progress based on task priorities
-        total_weight = sum(task.get("priority", 1) for task in tasks)
-        completed_weight = sum(
-            task.get("priority", 1) for task in tasks
-            if task["status"] == TaskStatus.DONE
+        operations = [
+            UpdateOne({"_id": encode_id(counted_project_id)}, {"$set": {"task_counters": counters}})
+            for counted_project_id, counters in counters_by_project.items()
+        ]
+        if operations:
+            await self.db.projects.bulk_write(operations, ordered=False)
+        if project_id is not None:
+            return counters_by_project[project_id]
+
+        await self.db.projects.update_many(
+            {"_id": {"$nin": encode_ids(counters_by_project)["$in"]}},
+            {"$set": {"task_counters": self._fold_task_counters([], now)}}
+        )
+        return len(counters_by_project)
+
+    async def refresh_overdue_task_counters(self) -> int:
+        """
+        Recount overdue tasks per project; overdue status changes with time, not writes
+        """
+        now = datetime.utcnow()
+        pipeline = [
+            {"$match": {"due_date": {"$lt": now}, "status": {"$ne": TaskStatus.DONE.value}}},
+            {"$group": {"_id": "$project_id", "count": {"$sum": 1}}}
+        ]
+        overdue = await self.db.tasks.aggregate(pipeline).to_list(length=None)
+
+        operations = [
+            UpdateOne(
+                {"_id": encode_id(row["_id"]), "task_counters": {"$exists": True}},
+                {"$set": {"task_counters.overdue": row["count"]}}
+            )
+            for row in overdue
+        ]
+        if operations:
+            await self.db.projects.bulk_write(operations, ordered=False)
+        await self.db.projects.update_many(
+            {"_id": {"$nin": encode_ids(row["_id"] for row in overdue)["$in"]}, "task_counters.overdue": {"$gt": 0}},
+            {"$set": {"task_counters.overdue": 0}}
         )
+        return len(overdue)
+
+    async def schedule_counter_maintenance(self, overdue_interval_seconds: int = OVERDUE_REFRESH_INTERVAL_SECONDS,
+                                           repair_interval_seconds: int = TASK_COUNTERS_REPAIR_INTERVAL_SECONDS):
+        """
+        Queue the recurring overdue recount and full counter repair on the durable job queue,
+        so only one worker process runs each cycle
+        """
+        await job_queue.enqueue_periodic("tasks.refresh_overdue_counters", overdue_interval_seconds)
+        await job_queue.enqueue_periodic(
+            "tasks.rebuild_counters", repair_interval_seconds, priority=COUNTERS_REPAIR_JOB_PRIORITY
+        )
+
+    async def _refresh_overdue_job(self, interval_seconds: int) -> int:
+        try:
+            return await self.refresh_overdue_task_counters()
+        finally:
+            await job_queue.enqueue_periodic("tasks.refresh_overdue_counters", interval_seconds)
+
+    async def _rebuild_counters_job(self, interval_seconds: int) -> int:
+        try:
+            return await self.rebuild_task_counters()
+        finally:
+            await job_queue.enqueue_periodic(
+                "tasks.rebuild_counters", interval_seconds, priority=COUNTERS_REPAIR_JOB_PRIORITY
+            )
+
+    async def record_task_change(self, before: Optional[Dict], after: Optional[Dict]):
+        """
+        Apply a task write to the project task counters and the assignees' user stats.
+        `before` is None for a created task and `after` is None for a deleted one.
+        """
+        await self.record_task_changes([(before, after)])
+
+    async def record_task_changes(self, changes: List[Tuple[Optional[Dict], Optional[Dict]]]):
+        """
+        Apply a batch of task writes to the project task counters and user stats
+        """
+        await self._apply_counter_deltas(changes)
+        await user_service.record_task_changes(changes)
+
+    async def _apply_counter_deltas(self, changes: List[Tuple[Optional[Dict], Optional[Dict]]]):
+        """
+        Atomically adjust the task counters of the affected projects with one $inc per project
+        """
+        now = datetime.utcnow()
+        increments: Dict[str, Dict[str, float]] = {}
+        for before, after in changes:
+            for task, sign in ((before, -1), (after, 1)):
+                if task is None or not task.get("project_id"):
+                    continue
+                inc = increments.setdefault(task["project_id"], {})
+                for field, value in self._task_counter_values(task, now).items():
+                    key = f"task_counters.{field}"
+                    inc[key] = inc.get(key, 0) + sign * value
+
+        # Only adjust counters that already exist; missing ones are rebuilt lazily on read
+        operations = []
+        for project_id, inc in increments.items():
+            inc = {key: value for key, value in inc.items() if value}
+            if inc:
+                operations.append(UpdateOne(
+                    {"_id": encode_id(project_id), "task_counters": {"$exists": True}}, {"$inc": inc}
+                ))
+        if operations:
+            await self.db.projects.bulk_write(operations, ordered=False)
+
+    @staticmethod
+    def _task_counter_values(task: Dict, now: datetime) -> Dict[str, float]:
+        status = getattr(task.get("status"), "value", task.get("status")) or TaskStatus.TODO.value
+        priority = task.get("priority") or 1
+        progress = task.get("progress") or {}
+        due_date = task.get("due_date")
+        done = status == TaskStatus.DONE.value
+        return {
+            "total": 1,
+            f"by_status.{status}": 1,
+            f"by_priority.{priority}": 1,
+            "total_weight": priority,
+            "completed_weight": priority if done else 0,
+            "overdue": 1 if due_date and due_date < now and not done else 0,
+            "estimated_hours": progress.get("estimated_hours") or 0,
+            "actual_hours": progress.get("actual_hours") or 0
+        }
+
+    @staticmethod
+    def _fold_task_counters(rows: List[Dict], now: datetime) -> Dict:
+        counters = ProjectTaskCounters(rebuilt_at=now).dict()
+        for row in rows:
+            status = row.get("status") or TaskStatus.TODO.value
+            priority = row.get("priority") or 1
+            count = row["count"]
+            counters["total"] += count
+            counters["by_status"][status] = counters["by_status"].get(status, 0) + count
+            counters["by_priority"][str(priority)] = counters["by_priority"].get(str(priority), 0) + count
+            counters["total_weight"] += count * priority
+            if status == TaskStatus.DONE.value:
+                counters["completed_weight"] += count * priority
+            counters["overdue"] += row.get("overdue", 0)
+            counters["estimated_hours"] += row.get("estimated_hours", 0)
+            counters["actual_hours"] += row.get("actual_hours", 0)
+        return counters
 
+    @staticmethod
+    def _format_progress(counters: Dict) -> Dict:
+        total_weight = counters.get("total_weight", 0)
+        completed_weight = counters.get("completed_weight", 0)
         progress_percentage = (completed_weight / total_weight * 100) if total_weight > 0 else 0.0
 
         return {
-            "total_tasks": total_tasks,
-            "completed_tasks": completed_tasks,
+            "total_tasks": counters.get("total", 0),
+            "completed_tasks": (counters.get("by_status") or {}).get(TaskStatus.DONE.value, 0),
             "progress_percentage": round(progress_percentage, 2)
         }
 
@@ -1,8 +1,10 @@
-from typing import List, Optional, Dict, Any
-from datetime import datetime
+from typing import List, Optional, Dict, Any, Tuple
+from datetime import datetime, timedelta
 from passlib.context import CryptContext
 from fastapi import HTTPException
-from ..database import get_database
+from pymongo import UpdateOne
+from ..database import LiveDatabase, route_database, read_route, REPORT_READS
+from ..repository import Repository, USER_PROFILE_PROJECTION
 from ..models.user import User, UserCreate, UserUpdate, UserInDB
 from ..services.auth_service import get_password_hash
 from .exceptions import (
@@ -10,10 +12,20 @@ from .exceptions import (
     BusinessLogicError, raise_validation_error, raise_authorization_error,
     raise_not_found_error, raise_conflict_error, raise_business_logic_error
 )
+from .background_jobs import job_queue
+
+# Materialized user_stats documents older than this are rebuilt on read to bound counter drift
+USER_STATS_MAX_AGE = timedelta(hours=1)
+# Interval between scheduled overdue recounts (overdue status changes with time, not writes)
+OVERDUE_REFRESH_INTERVAL_SECONDS = 300
+
+USER_STATS_FIELDS = ("owned_projects", "member_projects", "total_tasks", "completed_tasks", "overdue_tasks")
 
 class UserService:
+    db = LiveDatabase()
+
     def __init__(self):
-        self.db = get_database()
+        self.users = Repository("users", lambda: self.db, projection=USER_PROFILE_PROJECTION)
         self.pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
     async def create_user(self, user_data: UserCreate) -> User:
@@ -24,12 +36,12 @@ class UserService:
         await self._validate_user_data(user_data)
 
         # Check if user already exists
-        existing_user = await self.db.users.find_one({
+        existing_user = await self.users.find_one({
             "$or": [
                 {"username": user_data.username},
                 {"email": user_data.email}
             ]
-        })
+        }, {"_id": 1})
         if existing_user:
             raise_conflict_error("Username or email already exists", "user")
 
@@ -45,8 +57,7 @@ class UserService:
         user_dict["updated_at"] = datetime.utcnow()
         del user_dict["password"]  # Remove plain password
 
-        result = await self.db.users.insert_one(user_dict)
-        created_user = await self.db.users.find_one({"_id": result.inserted_id})
+        created_user = await self.users.insert(user_dict)
 
         return User(**created_user)
 
@@ -54,7 +65,7 @@ class UserService:
         """
         Get a user by username with access control
         """
-        user = await self.db.users.find_one({"username": username})
+        user = await self.users.find_one({"username": username})
         if not user:
             raise_not_found_error("User", username)
 
@@ -68,7 +79,7 @@ class UserService:
         """
         Get a user by email (used for password reset, etc.)
         """
-        user = await self.db.users.find_one({"email": email})
+        user = await self.users.find_one({"email": email})
         if user:
             return User(**user)
         return None
@@ -91,10 +102,7 @@ class UserService:
         update_dict = {k: v for k, v in update_data.dict().items() if v is not None}
         update_dict["updated_at"] = datetime.utcnow()
 
-        await self.db.users.update_one({"username": username}, {"$set": update_dict})
-
-        # Get updated user
-        updated_user = await self.db.users.find_one({"username": username})
+        updated_user = await self.users.update({"username": username}, {"$set": update_dict})
         return User(**updated_user)
 
     async def change_password(self, username: str, old_password: str, new_password: str, current_user: User) -> bool:
@@ -106,7 +114,7 @@ class UserService:
             raise_authorization_error("Not authorized to change this password")
 
         # Get user with password
-        user = await self.db.users.find_one({"username": username})
+        user = await self.users.find_one({"username": username}, {"hashed_password": 1})
         if not user:
             raise_not_found_error("User", username)
 
@@ -144,7 +152,7 @@ class UserService:
         if username == current_user.username:
             raise_business_logic_error("Cannot disable your own account", "self_disable")
 
-        await self.db.users.update_one(
+        updated_user = await self.users.update(
             {"username": username},
             {
                 "$set": {
@@ -153,8 +161,6 @@ class UserService:
                 }
             }
         )
-
-        updated_user = await self.db.users.find_one({"username": username})
         return User(**updated_user)
 
     async def enable_user(self, username: str, current_user: User) -> User:
@@ -164,7 +170,7 @@ class UserService:
         if current_user.role != "admin":
             raise HTTPException(status_code=403, detail="Admin access required")
 
-        await self.db.users.update_one(
+        updated_user = await self.users.update(
             {"username": username},
             {
                 "$set": {
@@ -173,8 +179,6 @@ class UserService:
                 }
             }
         )
-
-        updated_user = await self.db.users.find_one({"username": username})
         return User(**updated_user)
 
     async def get_users(self, current_user: User, skip: int = 0, limit: int = 100) -> List[User]:
@@ -184,40 +188,174 @@ class UserService:
         if current_user.role != "admin":
             raise HTTPException(status_code=403, detail="Admin access required")
 
-        users = await self.db.users.find({}).skip(skip).limit(limit).to_list(length=None)
+        users = await self.users.find({}, skip=skip, limit=limit)
         return [User(**user) for user in users]
 
     async def get_user_stats(self, username: str, current_user: User) -> Dict[str, Any]:
         """
-        Get user statistics
+        Get user statistics from the materialized user_stats collection
         """
         user = await self.get_user(username, current_user)
 
-        # Count user's projects
-        owned_projects = await self.db.projects.count_documents({"owner_id": username})
-        member_projects = await self.db.projects.count_documents({"team_members": username})
+        # Stats tolerate replication lag, so both the read and a rebuild's aggregation may use a secondary
+        with read_route(REPORT_READS):
+            stats = await route_database(self.db).user_stats.find_one({"_id": username})
+            if stats is None or stats.get("rebuilt_at", datetime.min) < datetime.utcnow() - USER_STATS_MAX_AGE:
+                stats = await self.rebuild_user_stats(username)
+
+        return self._format_user_stats(username, stats)
+
+    async def rebuild_user_stats(self, username: str) -> Dict[str, int]:
+        """
+        Recompute a user's statistics with a single $facet aggregation and materialize them
+        """
+        stats = await self._aggregate_user_stats(username)
+        now = datetime.utcnow()
+        await self.db.user_stats.update_one(
+            {"_id": username},
+            {"$set": {**stats, "rebuilt_at": now, "overdue_refreshed_at": now, "updated_at": now}},
+            upsert=True
+        )
+        return stats
+
+    async def _aggregate_user_stats(self, username: str) -> Dict[str, int]:
+        """
+        Count projects and tasks for a user in one round trip: the user's projects are
+        unioned with the user's tasks and a $facet computes every counter
+        """
+        now = datetime.utcnow()
+        pipeline = [
+            {"$match": {"$or": [{"owner_id": username}, {"team_members": username}]}},
+            {"$project": {"kind": {"$literal": "project"}, "owner_id": 1, "team_members": 1}},
+            {"$unionWith": {
+                "coll": "tasks",
+                "pipeline": [
+                    {"$match": {"assignee_id": username}},
+                    {"$project": {"kind": {"$literal": "task"}, "status": 1, "due_date": 1}}
+                ]
+            }},
+            {"$facet": {
+                "owned_projects": [{"$match": {"kind": "project", "owner_id": username}}, {"$count": "count"}],
+                "member_projects": [{"$match": {"kind": "project", "team_members": username}}, {"$count": "count"}],
+                "total_tasks": [{"$match": {"kind": "task"}}, {"$count": "count"}],
+                "completed_tasks": [{"$match": {"kind": "task", "status": "done"}}, {"$count": "count"}],
+                "overdue_tasks": [
+                    {"$match": {"kind": "task", "due_date": {"$lt": now}, "status": {"$ne": "done"}}},
+                    {"$count": "count"}
+                ]
+            }}
+        ]
+        results = await route_database(self.db).projects.aggregate(pipeline).to_list(length=1)
+        facets = results[0] if results else {}
+        return {
+            field: facets[field][0]["count"] if facets.get(field) else 0
+            for field in USER_STATS_FIELDS
+        }
 
-        # Count user's tasks
-        total_tasks = await self.db.tasks.count_documents({"assignee_id": username})
-        completed_tasks = await self.db.tasks.count_documents({
-            "assignee_id": username,
-            "status": "done"
-        })
+    async def record_task_change(self, before: Optional[Dict[str, Any]], after: Optional[Dict[str, Any]]):
+        """
+        Incrementally update materialized stats for a task write.
+        `before` is None for a created task and `after` is None for a deleted one.
+        """
+        await self.record_task_changes([(before, after)])
 
-        # Count overdue tasks
-        overdue_tasks = await self.db.tasks.count_documents({
-            "assignee_id": username,
-            "due_date": {"$lt": datetime.utcnow()},
-            "status": {"$ne": "done"}
-        })
+    async def record_task_changes(self, changes: List[Tuple[Optional[Dict[str, Any]], Optional[Dict[str, Any]]]]):
+        """
+        Incrementally update materialized stats for a batch of task writes in one bulk write
+        """
+        increments: Dict[str, Dict[str, int]] = {}
+        now = datetime.utcnow()
+        for before, after in changes:
+            for task, sign in ((before, -1), (after, 1)):
+                if not task or not task.get("assignee_id"):
+                    continue
+                inc = increments.setdefault(task["assignee_id"], {})
+                done = task.get("status") == "done"
+                due_date = task.get("due_date")
+                inc["total_tasks"] = inc.get("total_tasks", 0) + sign
+                if done:
+                    inc["completed_tasks"] = inc.get("completed_tasks", 0) + sign
+                if due_date and due_date < now and not done:
+                    inc["overdue_tasks"] = inc.get("overdue_tasks", 0) + sign
+
+        await self._apply_stats_increments(increments)
+
+    async def record_project_change(self, before: Optional[Dict[str, Any]], after: Optional[Dict[str, Any]]):
+        """
+        Incrementally update materialized stats for a project write (ownership or membership changes)
+        """
+        increments: Dict[str, Dict[str, int]] = {}
+        for project, sign in ((before, -1), (after, 1)):
+            if not project:
+                continue
+            if project.get("owner_id"):
+                inc = increments.setdefault(project["owner_id"], {})
+                inc["owned_projects"] = inc.get("owned_projects", 0) + sign
+            for member in set(project.get("team_members") or []):
+                inc = increments.setdefault(member, {})
+                inc["member_projects"] = inc.get("member_projects", 0) + sign
+
+        await self._apply_stats_increments(increments)
+
+    async def _apply_stats_increments(self, increments: Dict[str, Dict[str, int]]):
+        # Missing documents are not upserted; they are built from scratch on first read
+        operations = []
+        for username, inc in increments.items():
+            inc = {field: value for field, value in inc.items() if value}
+            if inc:
+                operations.append(UpdateOne(
+                    {"_id": username},
+                    {"$inc": inc, "$set": {"updated_at": datetime.utcnow()}}
+                ))
+        if operations:
+            await self.db.user_stats.bulk_write(operations, ordered=False)
+
+    async def refresh_overdue_counts(self) -> int:
+        """
+        Recount overdue tasks for every materialized user with a single $group aggregation
+        """
+        now = datetime.utcnow()
+        pipeline = [
+            {"$match": {"due_date": {"$lt": now}, "status": {"$ne": "done"}, "assignee_id": {"$ne": None}}},
+            {"$group": {"_id": "$assignee_id", "count": {"$sum": 1}}}
+        ]
+        overdue = await self.db.tasks.aggregate(pipeline).to_list(length=None)
+
+        operations = [
+            UpdateOne(
+                {"_id": row["_id"]},
+                {"$set": {"overdue_tasks": row["count"], "overdue_refreshed_at": now}}
+            )
+            for row in overdue
+        ]
+        if operations:
+            await self.db.user_stats.bulk_write(operations, ordered=False)
+        await self.db.user_stats.update_many(
+            {"_id": {"$nin": [row["_id"] for row in overdue]}},
+            {"$set": {"overdue_tasks": 0, "overdue_refreshed_at": now}}
+        )
+        return len(overdue)
 
+    async def schedule_overdue_refresh(self, interval_seconds: int = OVERDUE_REFRESH_INTERVAL_SECONDS):
+        """
+        Queue the recurring overdue recount on the durable job queue, so only one worker
+        process runs each cycle
+        """
+        await job_queue.enqueue_periodic("users.refresh_overdue_counts", interval_seconds)
+
+    async def _refresh_overdue_job(self, interval_seconds: int) -> int:
+        try:
+            return await self.refresh_overdue_counts()
+        finally:
+            await job_queue.enqueue_periodic("users.refresh_overdue_counts", interval_seconds)
+
+    @staticmethod
+    def _format_user_stats(username: str, stats: Dict[str, Any]) -> Dict[str, Any]:
+        total_tasks = stats.get("total_tasks", 0)
+        completed_tasks = stats.get("completed_tasks", 0)
         return {
             "username": username,
-            "owned_projects": owned_projects,
-            "member_projects": member_projects,
-            "total_tasks": total_tasks,
-            "completed_tasks": completed_tasks,
-            "overdue_tasks": overdue_tasks,
+            **{field: stats.get(field, 0) for field in USER_STATS_FIELDS},
             "completion_rate": round((completed_tasks / total_tasks * 100) if total_tasks > 0 else 0, 2)
         }
 
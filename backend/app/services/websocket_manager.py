@@ -1,30 +1,376 @@
-from fastapi import WebSocket, WebSocketDisconnect
-from typing import List
-import json
+from fastapi import WebSocket
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+import asyncio
+import os
+import time
+from .event_broker import EventBroker, InMemoryBroker, RedisBroker, encode_event
+
+# Messages buffered per connection before the overflow policy applies
+OUTBOUND_QUEUE_SIZE = int(os.getenv("WS_OUTBOUND_QUEUE_SIZE", "256"))
+# What a full queue does with a new message: "evict" closes the connection so the client
+# reconnects and resumes from its last id, "drop_oldest"/"drop_newest" discard a message
+QUEUE_OVERFLOW_POLICY = os.getenv("WS_QUEUE_OVERFLOW_POLICY", "evict")
+# A ping is sent after this long without outbound traffic; clients answer with a pong
+HEARTBEAT_INTERVAL_SECONDS = float(os.getenv("WS_HEARTBEAT_INTERVAL_SECONDS", "20"))
+# Connections that send nothing (not even pongs) for this long are closed
+IDLE_TIMEOUT_SECONDS = float(os.getenv("WS_IDLE_TIMEOUT_SECONDS", "60"))
+# Inbound message rate per connection (token bucket) and how many excess messages
+# are discarded before the connection is closed
+INBOUND_RATE_PER_SECOND = float(os.getenv("WS_INBOUND_RATE_PER_SECOND", "5"))
+INBOUND_BURST = int(os.getenv("WS_INBOUND_BURST", "20"))
+INBOUND_VIOLATION_LIMIT = int(os.getenv("WS_INBOUND_VIOLATION_LIMIT", "50"))
+# Close code telling an evicted client to reconnect later
+EVICTED_CLOSE_CODE = 1013
+# Successive updates to one entity within this window are merged into a single delta event
+COALESCE_WINDOW_MS = int(os.getenv("WS_COALESCE_WINDOW_MS", "25"))
+
+
+def project_topic(project_id: Any) -> str:
+    return f"project:{project_id}"
+
+
+def user_topic(username: str) -> str:
+    return f"user:{username}"
+
+
+class Connection:
+    """
+    One client socket. Outbound messages go through a bounded queue drained by the
+    connection's own sender task, so a slow client only ever delays itself; the sender
+    pings the client whenever the queue stays empty for a heartbeat interval.
+    """
+
+    def __init__(self, websocket: WebSocket, username: Optional[str] = None,
+                 queue_size: int = OUTBOUND_QUEUE_SIZE, overflow_policy: str = QUEUE_OVERFLOW_POLICY,
+                 on_overflow: Optional[Callable[["Connection"], None]] = None):
+        self.websocket = websocket
+        self.username = username
+        self.topics: Set[str] = set()
+        # Live events held per topic while the events it missed are being read
+        self.held: Dict[str, List[Tuple[int, str]]] = {}
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.overflow_policy = overflow_policy
+        self.on_overflow = on_overflow
+        self.dropped = 0
+        self.evicted = False
+        self.rate_limited = 0
+        self._tokens = float(INBOUND_BURST)
+        self._refilled_at = time.monotonic()
+        self._sender: Optional[asyncio.Task] = None
+
+    def start(self, on_failure):
+        self._sender = asyncio.create_task(self._send_loop(on_failure))
+
+    def stop(self):
+        if self._sender and not self._sender.done():
+            self._sender.cancel()
+
+    def offer(self, message: str) -> bool:
+        """
+        Queue a message without waiting; False when it was not queued
+        """
+        if self.evicted:
+            return False
+        try:
+            self.queue.put_nowait(message)
+            return True
+        except asyncio.QueueFull:
+            self.dropped += 1
+        if self.overflow_policy == "drop_oldest":
+            self.queue.get_nowait()
+            self.queue.put_nowait(message)
+            return True
+        if self.overflow_policy == "evict":
+            self.evicted = True
+            if self.on_overflow:
+                self.on_overflow(self)
+        return False
+
+    def allow_inbound(self) -> bool:
+        """
+        Take a token for an inbound message; False when the client is over its rate
+        """
+        now = time.monotonic()
+        self._tokens = min(self._tokens + (now - self._refilled_at) * INBOUND_RATE_PER_SECOND, INBOUND_BURST)
+        self._refilled_at = now
+        if self._tokens >= 1:
+            self._tokens -= 1
+            return True
+        self.rate_limited += 1
+        return False
+
+    async def _send_loop(self, on_failure):
+        try:
+            while True:
+                try:
+                    message = await asyncio.wait_for(self.queue.get(), timeout=HEARTBEAT_INTERVAL_SECONDS)
+                except asyncio.TimeoutError:
+                    message = encode_event("ping", {})
+                await self.websocket.send_text(message)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"Error sending to connection: {e}")
+            on_failure(self.websocket)
+
 
 class ConnectionManager:
+    """
+    Pub/sub hub for WebSocket clients.
+
+    Clients subscribe to topics (`project:<id>`, `user:<username>`) and only receive
+    events published to those. Events go through the broker, which numbers them per
+    topic and hands them to every worker's `relay`; there each event, encoded once,
+    is queued on every local subscriber's connection without awaiting its socket.
+
+    Updates published with an `entity_id` are held for a short window per topic and
+    successive deltas to the same entity merged, so a burst of writes to one task
+    reaches clients as one event carrying every changed field.
+
+    The broker logs the last events of every topic. A client resubscribing with the
+    last id it saw receives what it missed, or a `resync_required` event when the log
+    no longer reaches back that far.
+    """
+
     def __init__(self):
-        self.active_connections: List[WebSocket] = []
+        self.active_connections: Dict[WebSocket, Connection] = {}
+        self.topics: Dict[str, Set[Connection]] = {}
+        self.broker: EventBroker = InMemoryBroker()
+        self.broker.handler = self.relay
+        # Highest sequence number relayed per subscribed topic, for gap detection
+        self.last_seq: Dict[str, int] = {}
+        self.gaps = 0
+        self.coalesce_window = COALESCE_WINDOW_MS / 1000
+        # topic -> (event type, entity id) -> merged delta, in first-seen order
+        self._pending: Dict[str, Dict[Tuple[str, str], Dict[str, Any]]] = {}
+        self._flushes: Dict[str, asyncio.Task] = {}
+        self.coalesced = 0
+        # Counters of connections no longer active, for metrics
+        self.dropped = 0
+        self.evictions = 0
+        self.idle_timeouts = 0
+        self.rate_limited = 0
 
-    async def connect(self, websocket: WebSocket):
+    async def initialize(self):
+        """
+        Distribute events through Redis when it is available so clients connected to
+        any worker receive them; otherwise events stay within this worker
+        """
+        broker = RedisBroker()
+        try:
+            await broker.start(self.relay)
+        except Exception as e:
+            print(f"Redis not available, WebSocket events stay in this worker: {e}")
+            await broker.stop()
+            return
+        self.broker = broker
+        print("WebSocket events distributed through Redis")
+
+    async def shutdown(self):
+        for topic in list(self._pending):
+            await self.flush(topic)
+        await self.broker.stop()
+
+    async def connect(self, websocket: WebSocket, username: Optional[str] = None) -> Connection:
         await websocket.accept()
-        self.active_connections.append(websocket)
+        connection = Connection(websocket, username, on_overflow=self.evict)
+        self.active_connections[websocket] = connection
+        connection.start(self.disconnect)
+        if username:
+            # Everyone receives the events addressed to them
+            self._add(connection, user_topic(username))
+        return connection
 
     def disconnect(self, websocket: WebSocket):
-        self.active_connections.remove(websocket)
+        connection = self.active_connections.pop(websocket, None)
+        if connection is None:
+            return
+        for topic in list(connection.topics):
+            self._remove(connection, topic)
+        connection.stop()
+        self.dropped += connection.dropped
+        self.rate_limited += connection.rate_limited
+
+    def evict(self, connection: Connection):
+        """
+        Drop a connection whose queue overflowed; the client reconnects and resumes from its last id
+        """
+        self.evictions += 1
+        self.disconnect(connection.websocket)
+        asyncio.create_task(self.close(connection.websocket, EVICTED_CLOSE_CODE))
+
+    async def close(self, websocket: WebSocket, code: int):
+        self.disconnect(websocket)
+        try:
+            await websocket.close(code=code)
+        except Exception:
+            # Already closed by the peer
+            pass
+
+    def metrics(self) -> Dict[str, Any]:
+        connections = list(self.active_connections.values())
+        depths = [connection.queue.qsize() for connection in connections]
+        return {
+            "connections": len(connections),
+            "topics": len(self.topics),
+            "subscriptions": sum(len(subscribers) for subscribers in self.topics.values()),
+            "queue_depth_total": sum(depths),
+            "queue_depth_max": max(depths, default=0),
+            "queue_capacity": OUTBOUND_QUEUE_SIZE,
+            "overflow_policy": QUEUE_OVERFLOW_POLICY,
+            "dropped_messages": self.dropped + sum(connection.dropped for connection in connections),
+            "evictions": self.evictions,
+            "idle_timeouts": self.idle_timeouts,
+            "rate_limited_messages": self.rate_limited + sum(connection.rate_limited for connection in connections),
+            "sequence_gaps": self.gaps,
+            "coalesced_updates": self.coalesced,
+            "broker": type(self.broker).__name__
+        }
+
+    async def authorize(self, username: Optional[str], topic: str) -> bool:
+        """
+        Whether `username` may receive a topic's events: their own user topic, or a
+        project they own or are a team member of
+        """
+        if not username:
+            return False
+        kind, _, key = topic.partition(":")
+        if kind == "user":
+            return key == username
+        if kind == "project" and key:
+            from .. import repository
+            return await repository.projects.find_accessible(key, username) is not None
+        return False
+
+    async def subscribe(self, connection: Connection, topic: str, last_id: Optional[int] = None) -> bool:
+        """
+        Subscribe a connection to a topic; with `last_id`, first send the events after it
+        """
+        if topic not in connection.topics and not await self.authorize(connection.username, topic):
+            return False
+        self._add(connection, topic)
+        if last_id is not None:
+            await self.replay(connection, topic, last_id)
+        return True
+
+    async def replay(self, connection: Connection, topic: str, last_id: int) -> int:
+        """
+        Queue the logged events after `last_id`; returns how many, or -1 when the client
+        has to refetch because events it missed are no longer logged. Events relayed to
+        the connection meanwhile are held and queued after the replayed ones.
+        """
+        held = connection.held.setdefault(topic, [])
+        try:
+            latest, missed = await self.broker.events_since(topic, last_id)
+        except Exception as e:
+            print(f"Error reading the event log of {topic}: {e}")
+            latest, missed = self.last_seq.get(topic, last_id), None
+        finally:
+            connection.held.pop(topic, None)
+        replayed = last_id
+        if missed is not None and last_id == latest:
+            count = 0
+        # A client ahead of the log saw a sequence that was reset since
+        elif not missed or last_id > latest or missed[0][0] > last_id + 1:
+            connection.offer(encode_event("resync_required", {"topic": topic, "last_id": latest}, topic))
+            count = -1
+        else:
+            for seq, message in missed:
+                connection.offer(message)
+            replayed = missed[-1][0]
+            count = len(missed)
+        for seq, message in held:
+            if seq > replayed:
+                connection.offer(message)
+        return count
+
+    def unsubscribe(self, connection: Connection, topic: str):
+        self._remove(connection, topic)
+
+    async def publish(self, topic: str, event_type: str, data: Any, entity_id: Any = None) -> int:
+        """
+        Send an event to a topic's subscribers on every worker; returns its sequence number,
+        or 0 when it was held for coalescing or the broker failed. Real-time delivery is
+        best effort and never fails the write.
+        """
+        if entity_id is not None and self.coalesce_window > 0:
+            pending = self._pending.setdefault(topic, {})
+            key = (event_type, str(entity_id))
+            if key in pending:
+                pending[key].update(data)
+                self.coalesced += 1
+            else:
+                pending[key] = dict(data)
+            if topic not in self._flushes:
+                self._flushes[topic] = asyncio.create_task(self._flush_later(topic))
+            return 0
+        # Held updates go out first so the topic's events stay in order
+        await self.flush(topic)
+        return await self._publish(topic, event_type, data)
+
+    async def flush(self, topic: str):
+        """
+        Publish the updates held for a topic
+        """
+        flush = self._flushes.pop(topic, None)
+        if flush is not None and flush is not asyncio.current_task():
+            flush.cancel()
+        for (event_type, _), data in self._pending.pop(topic, {}).items():
+            await self._publish(topic, event_type, data)
+
+    async def _flush_later(self, topic: str):
+        await asyncio.sleep(self.coalesce_window)
+        await self.flush(topic)
+
+    async def _publish(self, topic: str, event_type: str, data: Any) -> int:
+        try:
+            return await self.broker.publish(topic, event_type, data)
+        except Exception as e:
+            print(f"Error publishing {event_type} to {topic}: {e}")
+            return 0
+
+    async def relay(self, topic: str, seq: int, message: str):
+        if topic not in self.topics:
+            return
+        last = self.last_seq.get(topic)
+        if last is not None and seq > last + 1:
+            # Events published while this worker was not listening, or lost in transit
+            self.gaps += 1
+            print(f"Missed events {last + 1}-{seq - 1} on {topic}")
+        if last is None or seq > last:
+            self.last_seq[topic] = seq
+        self._deliver(topic, seq, message)
 
     async def broadcast(self, message: str):
-        for connection in self.active_connections:
-            try:
-                await connection.send_text(message)
-            except Exception as e:
-                print(f"Error broadcasting to connection: {e}")
-                # Remove broken connections
-                self.active_connections.remove(connection)
+        # Iterate over a snapshot: failed senders disconnect while we loop
+        for connection in list(self.active_connections.values()):
+            connection.offer(message)
 
     async def broadcast_event(self, event_type: str, data: dict):
-        message = json.dumps({"event": event_type, "data": data})
-        await self.broadcast(message)
+        await self.broadcast(encode_event(event_type, data))
+
+    def _deliver(self, topic: str, seq: int, message: str) -> int:
+        delivered = 0
+        for connection in list(self.topics.get(topic, ())):
+            held = connection.held.get(topic)
+            if held is not None:
+                held.append((seq, message))
+            else:
+                delivered += connection.offer(message)
+        return delivered
+
+    def _add(self, connection: Connection, topic: str):
+        self.topics.setdefault(topic, set()).add(connection)
+        connection.topics.add(topic)
+
+    def _remove(self, connection: Connection, topic: str):
+        subscribers = self.topics.get(topic)
+        if subscribers is not None:
+            subscribers.discard(connection)
+            if not subscribers:
+                del self.topics[topic]
+                self.last_seq.pop(topic, None)
+        connection.topics.discard(topic)
 
 # Singleton instance
 manager = ConnectionManager()
@@ -0,0 +1,67 @@
+import pytest
+import random
+from datetime import datetime, timedelta
+from app.services.allocation_index import AllocationIndex
+from app.models.resource import ResourceAllocation
+
+BASE = datetime(2024, 1, 1)
+
+
+def allocation(start_day, end_day, quantity, task_id="task"):
+    return {
+        "task_id": task_id,
+        "allocated_quantity": quantity,
+        "start_date": BASE + timedelta(days=start_day),
+        "end_date": BASE + timedelta(days=end_day) if end_day is not None else None,
+        "allocated_by": "user123"
+    }
+
+
+def day(n):
+    return BASE + timedelta(days=n)
+
+
+class TestAllocationIndex:
+    def test_empty_index(self):
+        index = AllocationIndex([])
+        assert index.peak(day(0), day(10)) == 0.0
+
+    def test_peak_sums_three_overlapping_allocations(self):
+        index = AllocationIndex([allocation(0, 10, 2), allocation(3, 8, 3), allocation(5, 6, 4)])
+        assert index.peak(day(0), day(30)) == 9.0
+        assert index.peak(day(0), day(3)) == 2.0
+        assert index.peak(day(8), day(30)) == 2.0
+
+    def test_windows_are_half_open(self):
+        index = AllocationIndex([allocation(0, 5, 4)])
+        assert index.peak(day(5), day(10)) == 0.0
+        assert index.peak(day(-5), day(0)) == 0.0
+        assert index.peak(day(4), day(10)) == 4.0
+
+    def test_open_ended_allocations(self):
+        index = AllocationIndex([allocation(10, None, 1), allocation(0, 20, 2)])
+        assert index.peak(day(100)) == 1.0
+        assert index.peak(day(15)) == 3.0
+
+    def test_accepts_allocation_models(self):
+        index = AllocationIndex([ResourceAllocation(**allocation(0, 5, 2))])
+        assert index.peak(day(1), day(2)) == 2.0
+
+    def test_overlapping(self):
+        index = AllocationIndex([allocation(0, 5, 1, "a"), allocation(5, 9, 1, "b"), allocation(8, None, 1, "c")])
+        assert [a["task_id"] for a in index.overlapping(day(4), day(6))] == ["a", "b"]
+        assert [a["task_id"] for a in index.overlapping(day(20))] == ["c"]
+
+    def test_matches_brute_force(self):
+        rng = random.Random(11)
+        allocations = [allocation(s, s + rng.randint(1, 20), rng.randint(1, 5)) for s in
+                       (rng.randint(0, 100) for _ in range(300))]
+        index = AllocationIndex(allocations)
+        for _ in range(200):
+            start = rng.randint(-5, 120)
+            end = start + rng.randint(1, 30)
+            expected = max(
+                sum(a["allocated_quantity"] for a in allocations if a["start_date"] <= day(t) < a["end_date"])
+                for t in range(start, end)
+            )
+            assert index.peak(day(start), day(end)) == expected
@@ -14,6 +14,8 @@ from app.services.auth_service import (
     get_password_hash,
     authenticate_user,
     create_access_token,
+    authenticate_or_create_github_user,
+    authenticate_or_create_google_user,
     SECRET_KEY,
     ALGORITHM
 )
@@ -240,3 +242,47 @@ class TestCreateAccessToken:
         # Should fail with wrong algorithm
         with pytest.raises(JWTError):
             jwt.decode(token, SECRET_KEY, algorithms=["HS512"])
+
+class TestOAuthUsers:
+    """Test signing in existing users through OAuth"""
+
+    @pytest.fixture
+    def mock_db(self):
+        """Mock database"""
+        return AsyncMock()
+
+    @pytest.mark.asyncio
+    @patch('app.services.auth_service.get_database')
+    async def test_github_user_gets_the_updated_document(self, mock_get_database, mock_db):
+        """The returned user carries the access token just written"""
+        mock_get_database.return_value = mock_db
+        mock_db.users.find_one_and_update.return_value = {
+            "username": "testuser", "email": "test@example.com", "hashed_password": "hash",
+            "github_id": "42", "github_access_token": "new-token"
+        }
+
+        result = await authenticate_or_create_github_user({"id": "42", "login": "testuser"}, "new-token")
+
+        assert result.github_access_token == "new-token"
+        query, update = mock_db.users.find_one_and_update.call_args[0]
+        assert query == {"github_id": "42"}
+        assert update["$set"]["github_access_token"] == "new-token"
+        mock_db.users.update_one.assert_not_called()
+
+    @pytest.mark.asyncio
+    @patch('app.services.auth_service.get_database')
+    async def test_google_account_is_linked_by_email(self, mock_get_database, mock_db):
+        """A user found by email is returned with the linked Google account"""
+        mock_get_database.return_value = mock_db
+        written_at = datetime(2026, 1, 1, tzinfo=timezone.utc)
+        mock_db.users.find_one_and_update.side_effect = [None, {
+            "username": "testuser", "email": "test@example.com", "hashed_password": "hash",
+            "google_id": "7", "updated_at": written_at
+        }]
+
+        result = await authenticate_or_create_google_user({"id": "7", "email": "test@example.com"}, "token")
+
+        assert result.updated_at == written_at
+        query, update = mock_db.users.find_one_and_update.call_args[0]
+        assert query == {"email": "test@example.com"}
+        assert update["$set"]["google_id"] == "7"
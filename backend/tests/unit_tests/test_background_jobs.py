@@ -1,7 +1,17 @@
+import asyncio
 import pytest
-from unittest.mock import AsyncMock, MagicMock
+from unittest.mock import AsyncMock, MagicMock, patch
 from datetime import datetime, timedelta
-from app.services.background_jobs import Job, BackgroundJobProcessor
+from bson import ObjectId
+from pymongo.errors import DuplicateKeyError
+from pathlib import Path
+import re
+from app.repository import encode_id
+from app.services.job_handlers import register_job_handlers
+from app.services.background_jobs import (
+    Job, BackgroundJobProcessor, JobQueue, JOB_NOTIFY_CHANNEL, JOB_POLL_INTERVAL_SECONDS,
+    JOB_RETRY_BASE_SECONDS, QUEUED, RUNNING, COMPLETED, DEAD
+)
 
 pytestmark = pytest.mark.asyncio
 
@@ -69,23 +79,277 @@ class TestBackgroundJobProcessor:
 
         def job_func():
             executed.append(True)
+            processor.stop()
 
         job = Job(func=job_func, run_at=datetime.utcnow() - timedelta(seconds=1))
         processor.add_job(job)
 
-        # Mock asyncio.sleep to avoid hanging
-        import unittest.mock
-        with unittest.mock.patch('asyncio.sleep', side_effect=Exception("Stop loop")):
-            processor.running = True
-            with pytest.raises(Exception, match="Stop loop"):
-                await processor.process_jobs()
+        await asyncio.wait_for(processor.process_jobs(), 1)
 
         # Check that job was processed
         assert len(executed) == 1
         assert job.status == "completed"
 
+    async def test_add_job_wakes_idle_loop(self):
+        processor = BackgroundJobProcessor()
+        loop_task = asyncio.create_task(processor.process_jobs())
+        await asyncio.sleep(0.01)
+
+        job = Job(func=lambda: "done")
+        processor.add_job(job)
+        await asyncio.sleep(0.01)
+
+        assert job.status == "completed"
+        processor.stop()
+        await asyncio.wait_for(loop_task, 1)
+
+    async def test_loop_sleeps_until_head_job_is_due(self):
+        processor = BackgroundJobProcessor()
+        job = Job(func=lambda: "done", run_at=datetime.utcnow() + timedelta(seconds=0.05))
+        processor.add_job(job)
+        loop_task = asyncio.create_task(processor.process_jobs())
+
+        await asyncio.sleep(0.02)
+        assert job.status == "pending"
+        await asyncio.sleep(0.06)
+        assert job.status == "completed"
+        processor.stop()
+        await asyncio.wait_for(loop_task, 1)
+
     def test_stop(self):
         processor = BackgroundJobProcessor()
         processor.running = True
         processor.stop()
         assert processor.running is False
+
+
+def make_queue():
+    queue = JobQueue()
+    queue.db = MagicMock()
+    jobs = queue.db.jobs
+    jobs.insert_one = AsyncMock(return_value=MagicMock(inserted_id=ObjectId()))
+    jobs.update_one = AsyncMock(return_value=MagicMock(modified_count=1, upserted_id=None))
+    jobs.update_many = AsyncMock(return_value=MagicMock(modified_count=0))
+    jobs.find_one_and_update = AsyncMock(return_value=None)
+    jobs.find_one = AsyncMock(return_value=None)
+    return queue
+
+
+def claimed(attempts=1, max_attempts=3, name="sync"):
+    return {
+        "id": str(ObjectId()), "name": name, "payload": {"project_id": "p1"}, "status": RUNNING,
+        "attempts": attempts, "max_attempts": max_attempts, "lease": "lease-1"
+    }
+
+
+class TestJobQueue:
+    async def test_enqueue_stores_a_due_queued_job(self):
+        queue = make_queue()
+        job_id = await queue.enqueue("sync", {"project_id": "p1"}, priority=5)
+
+        document = queue.db.jobs.insert_one.await_args.args[0]
+        assert job_id == str(document["_id"])
+        assert document["status"] == QUEUED
+        assert document["priority"] == 5
+        assert document["attempts"] == 0
+        assert document["run_at"] <= datetime.utcnow()
+
+    async def test_keyed_enqueue_is_deduplicated(self):
+        queue = make_queue()
+        inserted = ObjectId()
+        queue.db.jobs.update_one.return_value = MagicMock(upserted_id=inserted)
+        assert await queue.enqueue("retention", key="retention:2026-01-01") == str(inserted)
+        query, update = queue.db.jobs.update_one.await_args.args
+        assert query == {"key": "retention:2026-01-01"}
+        assert update["$setOnInsert"]["key"] == "retention:2026-01-01"
+
+        queue.db.jobs.update_one.return_value = MagicMock(upserted_id=None)
+        assert await queue.enqueue("retention", key="retention:2026-01-01") is None
+        queue.db.jobs.update_one.side_effect = DuplicateKeyError("duplicate")
+        assert await queue.enqueue("retention", key="retention:2026-01-01") is None
+
+    async def test_periodic_enqueue_is_keyed_by_interval_slot(self):
+        queue = make_queue()
+        queue.db.jobs.update_one.return_value = MagicMock(upserted_id=ObjectId())
+
+        # Two processes starting within the same slot queue the same run
+        for after in (datetime(2026, 1, 1, 10, 2, 30), datetime(2026, 1, 1, 10, 4, 59)):
+            await queue.enqueue_periodic("tasks.refresh_overdue_counters", 300, after=after)
+            query, update = queue.db.jobs.update_one.await_args.args
+            assert query == {"key": "tasks.refresh_overdue_counters:2026-01-01T10:05:00"}
+            assert update["$setOnInsert"]["run_at"] == datetime(2026, 1, 1, 10, 5)
+            assert update["$setOnInsert"]["payload"] == {"interval_seconds": 300}
+
+        # A run at the slot boundary queues the next slot
+        await queue.enqueue_periodic("tasks.refresh_overdue_counters", 300, after=datetime(2026, 1, 1, 10, 5))
+        query, _ = queue.db.jobs.update_one.await_args.args
+        assert query == {"key": "tasks.refresh_overdue_counters:2026-01-01T10:10:00"}
+
+    async def test_claim_takes_highest_priority_due_job_under_a_lease(self):
+        queue = make_queue()
+        queue.db.jobs.find_one_and_update.return_value = {"_id": ObjectId(), "name": "sync", "status": RUNNING}
+
+        job = await queue.claim()
+
+        query, update = queue.db.jobs.find_one_and_update.await_args.args
+        kwargs = queue.db.jobs.find_one_and_update.await_args.kwargs
+        assert query["status"] == QUEUED
+        assert "$lte" in query["run_at"]
+        assert kwargs["sort"] == [("priority", -1), ("run_at", 1)]
+        assert update["$inc"] == {"attempts": 1}
+        assert update["$set"]["worker"] == queue.worker_id
+        assert update["$set"]["lease_until"] > datetime.utcnow()
+        assert job["id"]
+
+    async def test_successful_job_completes_under_its_lease(self):
+        queue = make_queue()
+        queue.handlers["sync"] = AsyncMock(return_value={"synced": True})
+        job = claimed()
+
+        await queue.execute(job)
+
+        queue.handlers["sync"].assert_awaited_once_with(project_id="p1")
+        query, update = queue.db.jobs.update_one.await_args.args
+        assert query == {"_id": encode_id(job["id"]), "status": RUNNING, "lease": "lease-1"}
+        assert update["$set"]["status"] == COMPLETED
+        assert update["$set"]["result"] == {"synced": True}
+        assert update["$set"]["expires_at"] > datetime.utcnow()
+
+    async def test_failed_job_is_retried_with_exponential_backoff(self):
+        queue = make_queue()
+        queue.handlers["sync"] = AsyncMock(side_effect=RuntimeError("GitHub unavailable"))
+
+        await queue.execute(claimed(attempts=2))
+
+        update = queue.db.jobs.update_one.await_args.args[1]["$set"]
+        assert update["status"] == QUEUED
+        assert update["error"] == "GitHub unavailable"
+        delay = (update["run_at"] - datetime.utcnow()).total_seconds()
+        assert JOB_RETRY_BASE_SECONDS * 2 - 1 < delay <= JOB_RETRY_BASE_SECONDS * 2
+
+    async def test_job_out_of_attempts_is_dead_lettered(self):
+        queue = make_queue()
+        queue.handlers["sync"] = AsyncMock(side_effect=RuntimeError("GitHub unavailable"))
+
+        await queue.execute(claimed(attempts=3, max_attempts=3))
+
+        assert queue.db.jobs.update_one.await_args.args[1]["$set"]["status"] == DEAD
+
+    async def test_unknown_handler_fails_the_job(self):
+        queue = make_queue()
+        await queue.execute(claimed(name="unknown"))
+
+        update = queue.db.jobs.update_one.await_args.args[1]["$set"]
+        assert update["status"] == QUEUED
+        assert "No handler registered" in update["error"]
+
+    async def test_expired_leases_are_requeued_or_dead_lettered(self):
+        queue = make_queue()
+        queue.db.jobs.update_many.side_effect = [MagicMock(modified_count=1), MagicMock(modified_count=2)]
+
+        assert await queue.recover_expired_leases() == 3
+
+        (dead_query, dead_update), (requeue_query, requeue_update) = [
+            call.args for call in queue.db.jobs.update_many.await_args_list
+        ]
+        assert dead_query["status"] == RUNNING and "$lt" in dead_query["lease_until"]
+        assert "$expr" in dead_query
+        assert dead_update["$set"]["status"] == DEAD
+        assert requeue_update["$set"]["status"] == QUEUED
+
+
+class TestJobWakeups:
+    async def test_enqueue_wakes_local_and_remote_workers(self):
+        queue = make_queue()
+        queue._notify_client = MagicMock()
+        queue._notify_client.publish = AsyncMock()
+
+        await queue.enqueue("sync")
+
+        assert queue._wakeup.is_set()
+        queue._notify_client.publish.assert_awaited_once_with(JOB_NOTIFY_CHANNEL, queue.worker_id)
+
+    async def test_idle_timeout_runs_to_the_next_due_job(self):
+        queue = make_queue()
+        queue._notify_client = MagicMock()
+        queue.db.jobs.find_one.return_value = {"run_at": datetime.utcnow() + timedelta(seconds=30)}
+        assert 29 < await queue.idle_timeout() <= 30
+
+        queue.db.jobs.find_one.return_value = {"run_at": datetime.utcnow() - timedelta(seconds=5)}
+        assert await queue.idle_timeout() == 0
+
+        # Without the notify channel other processes' jobs are only found by polling
+        queue._notify_client = None
+        queue.db.jobs.find_one.return_value = {"run_at": datetime.utcnow() + timedelta(seconds=30)}
+        assert await queue.idle_timeout() == JOB_POLL_INTERVAL_SECONDS
+
+    async def test_idle_worker_claims_as_soon_as_it_is_woken(self):
+        queue = make_queue()
+        queue._notify_client = MagicMock()
+        queue.db.jobs.find_one.return_value = None
+        job = claimed()
+        claims = [None, job]
+        queue.claim = AsyncMock(side_effect=lambda: claims.pop(0) if claims else None)
+        queue.execute = AsyncMock()
+        queue.running = True
+        worker = asyncio.create_task(queue._work())
+
+        await asyncio.sleep(0.01)
+        queue.execute.assert_not_awaited()
+        queue._wakeup.set()
+        await asyncio.sleep(0.01)
+
+        queue.execute.assert_awaited_once_with(job)
+        worker.cancel()
+        await asyncio.gather(worker, return_exceptions=True)
+
+    async def test_worker_survives_a_job_it_cannot_finish(self):
+        queue = make_queue()
+        queue.handlers["sync"] = AsyncMock(return_value={"synced": True})
+        first, second = claimed(), claimed()
+        claims = [first, second]
+        queue.claim = AsyncMock(side_effect=lambda: claims.pop(0) if claims else None)
+        queue.complete = AsyncMock(side_effect=[ConnectionError("database unavailable"), None])
+        queue.running = True
+
+        with patch("app.services.background_jobs.JOB_POLL_INTERVAL_SECONDS", 0.001):
+            worker = asyncio.create_task(queue._work())
+            await asyncio.sleep(0.02)
+        worker.cancel()
+        await asyncio.gather(worker, return_exceptions=True)
+
+        assert [call.args[0] for call in queue.complete.await_args_list] == [first, second]
+
+
+class TestJobHandlers:
+    def test_every_queued_job_name_has_a_handler(self):
+        app_dir = Path(__file__).resolve().parents[2] / "app"
+        queued = {
+            name
+            for path in app_dir.rglob("*.py")
+            for name in re.findall(r'enqueue(?:_periodic)?\(\s*"([\w.]+)"', path.read_text())
+        }
+        queue = JobQueue()
+        register_job_handlers(queue)
+
+        assert queued
+        assert queued <= set(queue.handlers)
+
+
+    async def test_job_handler_services_use_the_live_database(self):
+        import app.main  # noqa: F401 - creates the service singletons before any connection
+        from app import database
+        from app.services.background_jobs import job_queue
+        from app.services.data_retention_service import data_retention_service
+        from app.services.notification_service import notification_service
+        from app.services.rule_engine import rule_engine
+        from app.services.rule_scheduler import rule_scheduler
+        live_db = MagicMock()
+        live_db.user_sessions.delete_many = AsyncMock(return_value=MagicMock(deleted_count=2))
+
+        with patch.object(database, "database", live_db):
+            for service in (job_queue, data_retention_service, notification_service, rule_engine, rule_scheduler):
+                assert service.db is live_db
+            stats = await data_retention_service.cleanup_expired_data()
+
+        assert stats["user_sessions"] == 2
@@ -0,0 +1,41 @@
+import pytest
+from datetime import datetime
+from app.cron import CronExpression
+
+
+class TestCronExpression:
+    def test_every_minute_fires_on_the_next_minute(self):
+        assert CronExpression("* * * * *").next_after(datetime(2026, 3, 1, 10, 15, 30)) == datetime(2026, 3, 1, 10, 16)
+
+    def test_fire_is_strictly_after_the_given_time(self):
+        cron = CronExpression("0 9 * * *")
+        assert cron.next_after(datetime(2026, 3, 1, 8, 59)) == datetime(2026, 3, 1, 9, 0)
+        assert cron.next_after(datetime(2026, 3, 1, 9, 0)) == datetime(2026, 3, 2, 9, 0)
+
+    def test_lists_ranges_steps_and_names(self):
+        cron = CronExpression("*/15 9-17 * jan-mar mon,wed,fri")
+        # 2026-03-07 is a Saturday
+        assert cron.next_after(datetime(2026, 3, 6, 17, 50)) == datetime(2026, 3, 9, 9, 0)
+        assert cron.next_after(datetime(2026, 3, 9, 9, 0)) == datetime(2026, 3, 9, 9, 15)
+        assert cron.next_after(datetime(2026, 3, 31, 18, 0)) == datetime(2027, 1, 1, 9, 0)
+
+    def test_restricted_day_fields_match_either(self):
+        # The 13th or any Friday
+        cron = CronExpression("0 0 13 * 5")
+        assert cron.next_after(datetime(2026, 2, 1)) == datetime(2026, 2, 6)
+        assert cron.next_after(datetime(2026, 2, 6)) == datetime(2026, 2, 13)
+
+    def test_sunday_is_zero_or_seven_and_macros(self):
+        # 2026-03-01 is a Sunday
+        assert CronExpression("0 0 * * 7").next_after(datetime(2026, 2, 27)) == datetime(2026, 3, 1)
+        assert CronExpression("@weekly").next_after(datetime(2026, 2, 27)) == datetime(2026, 3, 1)
+        assert CronExpression("@monthly").next_after(datetime(2026, 2, 27)) == datetime(2026, 3, 1)
+
+    def test_leap_day_and_impossible_dates(self):
+        assert CronExpression("0 0 29 2 *").next_after(datetime(2026, 3, 1)) == datetime(2028, 2, 29)
+        assert CronExpression("0 0 30 2 *").next_after(datetime(2026, 3, 1)) is None
+
+    @pytest.mark.parametrize("expression", ["* * * *", "60 * * * *", "* 24 * * *", "*/0 * * * *", "5-1 * * * *", "* * * foo *"])
+    def test_invalid_expressions(self, expression):
+        with pytest.raises(ValueError):
+            CronExpression(expression)
@@ -7,6 +7,7 @@ pytestmark = pytest.mark.asyncio
 class TestDatabase:
     @patch('app.database.AsyncIOMotorClient')
     async def test_connect_to_mongo_success(self, mock_client_class):
+        from app.database import pool_monitor
         mock_client = MagicMock()
         mock_client.admin.command = AsyncMock()
         mock_client_class.return_value = mock_client
@@ -22,7 +23,8 @@ class TestDatabase:
             heartbeatFrequencyMS=10000,
             serverSelectionTimeoutMS=5000,
             retryWrites=True,
-            retryReads=True
+            retryReads=True,
+            event_listeners=[pool_monitor]
         )
         mock_client.admin.command.assert_called_once_with('ping')
 
@@ -61,12 +63,23 @@ class TestDatabase:
         mock_tasks = AsyncMock()
         mock_resources = AsyncMock()
         mock_rules = AsyncMock()
+        mock_resource_allocations = AsyncMock()
+        mock_db.resource_utilization = AsyncMock()
+        mock_db.notifications = AsyncMock()
+        mock_db.notification_logs = AsyncMock()
+        mock_db.files = AsyncMock()
+        mock_db.jobs = AsyncMock()
 
         mock_db.users = mock_users
         mock_db.projects = mock_projects
         mock_db.tasks = mock_tasks
         mock_db.resources = mock_resources
         mock_db.rules = mock_rules
+        mock_db.resource_allocations = mock_resource_allocations
+        for collection in (mock_users, mock_projects, mock_tasks, mock_resources, mock_rules,
+                           mock_resource_allocations, mock_db.resource_utilization, mock_db.notifications,
+                           mock_db.notification_logs, mock_db.files, mock_db.jobs):
+            collection.index_information.return_value = {"_id_": {"key": [("_id", 1)]}}
 
         await create_indexes()
 
@@ -75,6 +88,10 @@ class TestDatabase:
         mock_tasks.create_index.assert_called()
         mock_resources.create_index.assert_called()
         mock_rules.create_index.assert_called()
+        mock_resource_allocations.create_index.assert_called()
+        mock_db.notifications.create_index.assert_called()
+        mock_db.files.create_index.assert_called()
+        mock_db.jobs.create_index.assert_any_call([("expires_at", 1)], name="expires_at_1", expireAfterSeconds=0)
 
     @patch('app.database.get_database')
     async def test_create_indexes_no_db(self, mock_get_db):
@@ -82,3 +99,37 @@ class TestDatabase:
 
         with pytest.raises(Exception, match="Database connection is not established"):
             await create_indexes()
+
+    def test_report_route_reads_through_report_database(self):
+        from app.database import read_route, route_database, REPORT_READS
+        with patch('app.database.database', 'primary'), patch('app.database.report_database', 'secondary'):
+            assert get_database() == 'primary'
+            with read_route(REPORT_READS):
+                assert get_database() == 'secondary'
+                # A service's primary handle is swapped, any other handle is kept
+                assert route_database('primary') == 'secondary'
+                assert route_database('other') == 'other'
+            assert get_database() == 'primary'
+
+    async def test_replication_lag_per_secondary(self):
+        from datetime import datetime
+        from app.database import replication_lag
+        mock_client = MagicMock()
+        mock_client.admin.command = AsyncMock(return_value={"members": [
+            {"name": "a:27017", "stateStr": "PRIMARY", "optimeDate": datetime(2024, 1, 1, 0, 0, 30)},
+            {"name": "b:27017", "stateStr": "SECONDARY", "optimeDate": datetime(2024, 1, 1, 0, 0, 18)},
+            {"name": "c:27017", "stateStr": "ARBITER"},
+        ]})
+
+        with patch('app.database.client', mock_client):
+            lag = await replication_lag()
+
+        assert lag == {"b:27017": 12.0}
+        mock_client.admin.command.assert_called_once_with("replSetGetStatus")
+
+    @patch('app.database.client', MagicMock())
+    async def test_get_connection_stats_uses_pool_monitor(self):
+        from app.database import get_connection_stats
+        stats = await get_connection_stats()
+        assert stats["pool_size"] == 10
+        assert stats["sizing"]["recommended_pool_size"] >= 1
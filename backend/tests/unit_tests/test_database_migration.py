@@ -7,11 +7,13 @@ pytestmark = pytest.mark.asyncio
 class TestDatabaseMigration:
     @patch('app.database_migration.connect_to_mongo', new_callable=AsyncMock)
     @patch('app.database_migration.create_indexes', new_callable=AsyncMock)
+    @patch('app.database_migration.migrate_resource_allocations', new_callable=AsyncMock)
     @patch('app.database_migration.close_mongo_connection', new_callable=AsyncMock)
-    async def test_main_success(self, mock_close, mock_create, mock_connect):
+    async def test_main_success(self, mock_close, mock_migrate, mock_create, mock_connect):
         await main()
         mock_connect.assert_called_once()
         mock_create.assert_called_once()
+        mock_migrate.assert_called_once()
         mock_close.assert_called_once()
 
     @patch('app.database_migration.connect_to_mongo', new_callable=AsyncMock)
@@ -23,3 +25,30 @@ class TestDatabaseMigration:
         mock_connect.assert_called_once()
         mock_create.assert_called_once()
         mock_close.assert_called_once()
+
+    async def test_migrate_resource_allocations_upserts_so_reruns_do_not_duplicate(self):
+        from datetime import datetime
+        from unittest.mock import MagicMock
+        from app.database_migration import migrate_resource_allocations
+        allocation = {"task_id": "t1", "allocated_quantity": 2, "start_date": datetime(2024, 1, 1), "end_date": None}
+        resource = {"_id": "r1", "project_id": "p1", "allocations": [allocation]}
+
+        async def resources(*args, **kwargs):
+            yield resource
+
+        db = MagicMock()
+        db.resources.find = MagicMock(side_effect=lambda *args, **kwargs: resources())
+        db.resources.update_one = AsyncMock()
+        db.resource_allocations.bulk_write = AsyncMock()
+        with patch('app.database_migration.get_database', return_value=db):
+            # A run interrupted before the embedded allocations were removed is repeated
+            assert await migrate_resource_allocations() == 1
+            assert await migrate_resource_allocations() == 1
+
+        first, second = [call.args[0] for call in db.resource_allocations.bulk_write.call_args_list]
+        assert [operation._filter for operation in first] == [operation._filter for operation in second]
+        [operation] = first
+        assert operation._upsert is True
+        assert operation._filter == {"resource_id": "r1", "task_id": "t1", "start_date": datetime(2024, 1, 1), "end_date": None}
+        assert "$setOnInsert" in operation._doc
+        assert db.resources.update_one.call_args[0][1]["$unset"] == {"allocations": ""}
@@ -0,0 +1,110 @@
+import pytest
+import random
+from bson import ObjectId
+from app.services.dependency_graph import DependencyGraph, DependencyCycleError
+
+
+def make_tasks(edges, done=()):
+    """Build task documents from (prerequisite, dependent) pairs"""
+    task_ids = sorted({task_id for edge in edges for task_id in edge})
+    return [
+        {
+            "_id": task_id,
+            "status": "done" if task_id in done else "todo",
+            "dependencies": [{"task_id": prerequisite} for prerequisite, dependent in edges if dependent == task_id]
+        }
+        for task_id in task_ids
+    ]
+
+
+def assert_topological(graph):
+    position = {task_id: i for i, task_id in enumerate(graph.topological_order())}
+    for task_id in graph.ids:
+        for dependent in graph.dependents(task_id):
+            assert position[task_id] < position[dependent]
+
+
+class TestDependencyGraph:
+    def test_from_tasks_builds_adjacency(self):
+        graph = DependencyGraph.from_tasks(make_tasks([("a", "b"), ("a", "c"), ("b", "d"), ("c", "d")]))
+        assert len(graph) == 4
+        assert sorted(graph.prerequisites("d")) == ["b", "c"]
+        assert sorted(graph.dependents("a")) == ["b", "c"]
+        assert_topological(graph)
+
+    def test_from_tasks_keys_object_ids_by_string(self):
+        first, second = ObjectId(), ObjectId()
+        graph = DependencyGraph.from_tasks([
+            {"_id": first, "status": "todo", "dependencies": []},
+            {"_id": second, "status": "todo", "dependencies": [{"task_id": str(first)}]}
+        ])
+        assert graph.prerequisites(str(second)) == [str(first)]
+
+    def test_would_create_cycle(self):
+        graph = DependencyGraph.from_tasks(make_tasks([("a", "b"), ("b", "c")]))
+        assert graph.would_create_cycle("c", "a") is True
+        assert graph.would_create_cycle("a", "c") is False
+        assert graph.would_create_cycle("a", "a") is True
+
+    def test_would_create_cycle_unknown_task(self):
+        graph = DependencyGraph.from_tasks(make_tasks([("a", "b")]))
+        assert graph.would_create_cycle("a", "new") is False
+
+    def test_add_dependency_reorders(self):
+        graph = DependencyGraph()
+        for task_id in ["a", "b", "c", "d"]:
+            graph.add_task(task_id)
+        graph.add_dependency("d", "a")
+        graph.add_dependency("c", "d")
+        graph.add_dependency("b", "c")
+        assert graph.topological_order() == ["b", "c", "d", "a"]
+
+    def test_add_dependency_rejects_cycle(self):
+        graph = DependencyGraph.from_tasks(make_tasks([("a", "b"), ("b", "c")]))
+        with pytest.raises(DependencyCycleError):
+            graph.add_dependency("c", "a")
+        # The graph is unchanged after a rejected edge
+        assert graph.prerequisites("a") == []
+        assert_topological(graph)
+
+    def test_set_dependencies_replaces_prerequisites(self):
+        graph = DependencyGraph.from_tasks(make_tasks([("a", "c"), ("b", "d")]))
+        graph.set_dependencies("c", ["b", "d"])
+        assert sorted(graph.prerequisites("c")) == ["b", "d"]
+        assert graph.dependents("a") == []
+        assert_topological(graph)
+
+    def test_set_dependencies_unknown_task(self):
+        graph = DependencyGraph.from_tasks(make_tasks([("a", "b")]))
+        with pytest.raises(KeyError):
+            graph.set_dependencies("b", ["missing"])
+
+    def test_can_start(self):
+        graph = DependencyGraph.from_tasks(make_tasks([("a", "c"), ("b", "c")], done={"a"}))
+        assert graph.can_start("a") is True
+        assert graph.can_start("c") is False
+        graph.set_done("b", True)
+        assert graph.can_start("c") is True
+
+    def test_diamond_chain_is_not_exponential(self):
+        # 200 stacked diamonds would take 2^200 paths with a naive recursive search
+        edges = []
+        for i in range(200):
+            edges += [(f"n{i}", f"l{i}"), (f"n{i}", f"r{i}"), (f"l{i}", f"n{i + 1}"), (f"r{i}", f"n{i + 1}")]
+        graph = DependencyGraph.from_tasks(make_tasks(edges))
+        assert graph.would_create_cycle("n200", "n0") is True
+        assert graph.would_create_cycle("n0", "n200") is False
+
+    def test_random_insertions_keep_order_consistent(self):
+        rng = random.Random(7)
+        graph = DependencyGraph()
+        for i in range(60):
+            graph.add_task(f"t{i}")
+        for _ in range(400):
+            prerequisite, dependent = rng.sample(graph.ids, 2)
+            if graph.would_create_cycle(prerequisite, dependent):
+                with pytest.raises(DependencyCycleError):
+                    graph.add_dependency(prerequisite, dependent)
+            else:
+                graph.add_dependency(prerequisite, dependent)
+            assert_topological(graph)
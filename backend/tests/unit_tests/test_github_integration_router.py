@@ -148,18 +148,9 @@ class TestGitHubIntegrationRouter:
             assert response.status_code == 500
 
     def test_sync_repository_success(self, client):
-        """Test successful repository synchronization"""
-        mock_result = {
-            "status": "synced",
-            "repository": "test/repo",
-            "project_id": "project123",
-            "commits_synced": 5,
-            "issues_synced": 2
-        }
-
-        # Patch the correct service function
-        with patch('app.services.github_service.sync_repository_data', new_callable=AsyncMock) as mock_sync:
-            mock_sync.return_value = mock_result
+        """Test repository synchronization is queued"""
+        with patch('app.services.github_service.job_queue.enqueue', new_callable=AsyncMock) as mock_enqueue:
+            mock_enqueue.return_value = "job123"
 
             # Send form data instead of JSON
             response = client.post(
@@ -167,17 +158,18 @@ class TestGitHubIntegrationRouter:
                 data={"repo_full_name": "test/repo", "project_id": "project123"}
             )
 
-            assert response.status_code == 200
+            assert response.status_code == 202
             data = response.json()
-            assert data["status"] == "synced"
-            assert data["repository"] == "test/repo"
-            mock_sync.assert_called_once_with("test/repo", "project123")
+            assert data["queued"] == True
+            assert data["job_id"] == "job123"
+            mock_enqueue.assert_awaited_once_with(
+                "github.sync_repository", {"repo_full_name": "test/repo", "project_id": "project123"}
+            )
 
     def test_sync_repository_error(self, client):
         """Test repository synchronization error"""
-        # Patch the correct service function
-        with patch('app.services.github_service.sync_repository_data', new_callable=AsyncMock) as mock_sync:
-            mock_sync.side_effect = Exception("Sync failed")
+        with patch('app.services.github_service.job_queue.enqueue', new_callable=AsyncMock) as mock_enqueue:
+            mock_enqueue.side_effect = Exception("Queue unavailable")
 
             # Send form data instead of JSON
             response = client.post(
@@ -187,6 +179,25 @@ class TestGitHubIntegrationRouter:
 
             assert response.status_code == 500
 
+    def test_get_sync_status(self, client):
+        """Test reading back a queued synchronization"""
+        job = {
+            "id": "job123",
+            "name": "github.sync_repository",
+            "status": "completed",
+            "attempts": 1,
+            "result": {"synced": True, "repo": "test/repo"}
+        }
+
+        with patch('app.services.github_service.job_queue.get', new_callable=AsyncMock) as mock_get:
+            mock_get.return_value = job
+            response = client.get("/github/sync/job123")
+            assert response.status_code == 200
+            assert response.json()["result"]["synced"] == True
+
+            mock_get.return_value = None
+            assert client.get("/github/sync/missing").status_code == 404
+
     def test_get_user_repos_success(self, client, mock_db, mock_user):
         """Test getting user repositories successfully"""
         mock_repos = [
@@ -299,17 +310,8 @@ class TestGitHubIntegrationRouter:
 
     def test_sync_repository_unauthenticated(self, client):
         """Test sync repository without authentication - should work without auth"""
-        mock_result = {
-            "status": "synced",
-            "repository": "test/repo",
-            "project_id": "project123",
-            "commits_synced": 5,
-            "issues_synced": 2
-        }
-
-        # Patch the correct service function
-        with patch('app.services.github_service.sync_repository_data', new_callable=AsyncMock) as mock_sync:
-            mock_sync.return_value = mock_result
+        with patch('app.services.github_service.job_queue.enqueue', new_callable=AsyncMock) as mock_enqueue:
+            mock_enqueue.return_value = "job123"
 
             # Send form data instead of JSON
             response = client.post(
@@ -317,10 +319,8 @@ class TestGitHubIntegrationRouter:
                 data={"repo_full_name": "test/repo", "project_id": "project123"}
             )
 
-            assert response.status_code == 200
-            data = response.json()
-            assert data["status"] == "synced"
-            mock_sync.assert_called_once_with("test/repo", "project123")
+            assert response.status_code == 202
+            assert response.json()["job_id"] == "job123"
 
     def test_get_user_repos_unauthenticated(self, unauthenticated_client):
         """Test getting repositories without authentication"""
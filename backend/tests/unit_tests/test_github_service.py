@@ -61,16 +61,18 @@ class TestGitHubService:
             "head_commit": {"message": "Test commit", "author": {"name": "Test Author"}}
         }
 
-        with patch('app.services.github_service.rule_engine') as mock_rule_engine:
-            mock_rule_engine.evaluate_rules = AsyncMock(return_value=[{"action": "test"}])
+        with patch('app.services.github_service.job_queue.enqueue', new_callable=AsyncMock) as mock_enqueue:
+            mock_enqueue.return_value = "job123"
 
             result = await process_github_webhook(event_type, payload)
 
             assert result["event_type"] == "push"
             assert result["processed"] == True
-            assert "triggered_actions" in result
+            assert result["job_id"] == "job123"
             assert "event_data" in result
-            mock_rule_engine.evaluate_rules.assert_called_once()
+            mock_enqueue.assert_awaited_once_with(
+                "rules.evaluate", {"event_type": "github_event", "event_data": result["event_data"]}
+            )
 
     @pytest.mark.asyncio
     async def test_process_github_webhook_invalid_signature(self):
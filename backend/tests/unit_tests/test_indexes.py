@@ -0,0 +1,135 @@
+import json
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+from app.indexes import IndexSpec, plan_indexes, sync_indexes
+from app.index_advisor import analyze, suggest_indexes, sample_slow_log
+
+
+def collection_with(indexes):
+    collection = MagicMock()
+    collection.index_information = AsyncMock(return_value={
+        "_id_": {"key": [("_id", 1)]}, **indexes
+    })
+    collection.create_index = AsyncMock()
+    collection.drop_index = AsyncMock()
+    return collection
+
+
+SPEC = {
+    "tasks": [
+        IndexSpec("project_id"),
+        IndexSpec([("status", 1), ("due_date", 1)]),
+        IndexSpec("code", unique=True),
+    ]
+}
+
+
+@pytest.mark.asyncio
+class TestIndexSync:
+    async def test_plan_classifies_missing_changed_and_unmanaged(self):
+        db = MagicMock()
+        db.tasks = collection_with({
+            "project_id_1": {"key": [("project_id", 1)]},
+            "code_1": {"key": [("code", 1.0)]},
+            "legacy_1": {"key": [("legacy", 1)]},
+        })
+
+        plan = (await plan_indexes(db, SPEC))["tasks"]
+
+        assert [index.name for index in plan["missing"]] == ["status_1_due_date_1"]
+        assert [(name, index.name) for name, index in plan["changed"]] == [("code_1", "code_1")]
+        assert plan["unmanaged"] == ["legacy_1"]
+
+    async def test_sync_creates_only_missing_by_default(self):
+        db = MagicMock()
+        db.tasks = collection_with({
+            "code_1": {"key": [("code", 1)]},
+            "legacy_1": {"key": [("legacy", 1)]},
+        })
+
+        report = (await sync_indexes(db, SPEC))["tasks"]
+
+        assert report["created"] == ["project_id_1", "status_1_due_date_1"]
+        assert report["changed"] == ["code_1"]
+        assert report["unmanaged"] == ["legacy_1"]
+        db.tasks.create_index.assert_any_await([("status", 1), ("due_date", 1)], name="status_1_due_date_1")
+        db.tasks.drop_index.assert_not_awaited()
+
+    async def test_sync_rebuilds_and_prunes_when_asked(self):
+        db = MagicMock()
+        db.tasks = collection_with({
+            "project_id_1": {"key": [("project_id", 1)]},
+            "status_1_due_date_1": {"key": [("status", 1), ("due_date", 1)]},
+            "code_1": {"key": [("code", 1)]},
+            "legacy_1": {"key": [("legacy", 1)]},
+        })
+
+        report = (await sync_indexes(db, SPEC, rebuild_changed=True, drop_unmanaged=True))["tasks"]
+
+        assert report["rebuilt"] == ["code_1"]
+        assert report["dropped"] == ["legacy_1"]
+        db.tasks.create_index.assert_awaited_once_with([("code", 1)], name="code_1", unique=True)
+
+    async def test_sync_is_idempotent_when_live_matches_spec(self):
+        db = MagicMock()
+        db.tasks = collection_with({
+            "project_id_1": {"key": [("project_id", 1)]},
+            "status_1_due_date_1": {"key": [("status", 1), ("due_date", 1)]},
+            "code_1": {"key": [("code", 1)], "unique": True},
+        })
+
+        report = (await sync_indexes(db, SPEC, rebuild_changed=True))["tasks"]
+
+        assert not any(report.values())
+        db.tasks.create_index.assert_not_awaited()
+        db.tasks.drop_index.assert_not_awaited()
+
+
+class TestIndexAdvisor:
+    def test_suggestion_orders_equality_sort_range(self):
+        shape = {"project_id": 1, "due_date": {"$lt": 1}, "status": {"$in": 1}}
+        assert suggest_indexes(shape, {"priority": -1}) == [
+            [("project_id", 1), ("status", 1), ("priority", -1), ("due_date", 1)]
+        ]
+
+    def test_suggestion_per_or_branch(self):
+        shape = {"$or": [{"owner_id": 1}, {"team_members": 1}]}
+        assert suggest_indexes(shape) == [[("owner_id", 1)], [("team_members", 1)]]
+
+    def test_analyze_reports_scans_and_marks_declared_indexes(self):
+        spec = {"notifications": [IndexSpec([("recipient", 1), ("created_at", -1)])]}
+        samples = [
+            {"collection": "notifications", "shape": {"recipient": 1}, "sort": {"created_at": -1},
+             "plan_summary": "COLLSCAN", "millis": 120, "docs_examined": 5000, "returned": 20},
+            {"collection": "notifications", "shape": {"recipient": 1}, "sort": {"created_at": -1},
+             "plan_summary": "COLLSCAN", "millis": 80, "docs_examined": 5000, "returned": 20},
+            {"collection": "tasks", "shape": {"project_id": 1}, "sort": None,
+             "plan_summary": "IXSCAN { project_id: 1 }", "millis": 150, "docs_examined": 10, "returned": 10},
+        ]
+
+        findings = analyze(samples, spec)
+
+        assert len(findings) == 1
+        assert findings[0]["count"] == 2
+        assert findings[0]["total_millis"] == 200
+        assert findings[0]["suggested_indexes"] == [
+            {"keys": [("recipient", 1), ("created_at", -1)], "declared_index": "recipient_1_created_at_-1"}
+        ]
+
+    @pytest.mark.asyncio
+    async def test_slow_log_samples_slow_queries_only(self):
+        slow = {"msg": "Slow query", "attr": {
+            "ns": "gravitypm.files", "command": {"find": "files", "filter": {"project_id": "p1"}},
+            "planSummary": "COLLSCAN", "durationMillis": 300, "docsExamined": 900, "nreturned": 3
+        }}
+        db = MagicMock()
+        db.client.admin.command = AsyncMock(return_value={"log": [
+            json.dumps(slow), json.dumps({"msg": "Connection accepted"}), "not json"
+        ]})
+
+        samples = await sample_slow_log(db)
+
+        assert samples == [{
+            "collection": "files", "shape": {"project_id": 1}, "sort": None,
+            "plan_summary": "COLLSCAN", "millis": 300, "docs_examined": 900, "returned": 3
+        }]
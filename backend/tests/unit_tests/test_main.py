@@ -39,3 +39,23 @@ class TestMainApp:
         # Actually, better to check if the app has the routers
         assert "/auth" in [route.path for route in app.routes if hasattr(route, 'path')]
         # This is approximate; in practice, check specific endpoints
+
+class TestDatabaseHealth:
+    def test_requires_authentication(self, client):
+        assert client.get("/health/database").status_code == 401
+
+    def test_is_admin_only(self, client):
+        from app.routers.auth import get_current_user
+        from app.models.user import User
+        app.dependency_overrides[get_current_user] = lambda: User(username="bob", email="bob@example.com")
+        try:
+            assert client.get("/health/database").status_code == 403
+            app.dependency_overrides[get_current_user] = lambda: User(
+                username="admin", email="admin@example.com", role="admin"
+            )
+            with patch('app.main.health_check', new=AsyncMock(return_value={"status": "healthy"})):
+                response = client.get("/health/database")
+        finally:
+            app.dependency_overrides.clear()
+        assert response.status_code == 200
+        assert response.json() == {"status": "healthy"}
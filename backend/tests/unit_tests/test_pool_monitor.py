@@ -0,0 +1,80 @@
+from types import SimpleNamespace
+from unittest.mock import patch
+from app.pool_monitor import PoolMonitor
+
+ADDRESS = ("db", 27017)
+
+
+def event(**fields):
+    return SimpleNamespace(address=ADDRESS, **fields)
+
+
+def checkout(monitor, started, finished):
+    with patch("app.pool_monitor.time.monotonic", return_value=started):
+        monitor.connection_check_out_started(event())
+    with patch("app.pool_monitor.time.monotonic", return_value=finished):
+        monitor.connection_checked_out(event(connection_id=1))
+
+
+class TestPoolMonitor:
+    def test_tracks_checkouts_waits_and_saturation(self):
+        monitor = PoolMonitor(max_pool_size=4)
+        monitor.connection_created(event(connection_id=1))
+        monitor.connection_created(event(connection_id=2))
+        checkout(monitor, 0.0, 0.002)
+        checkout(monitor, 1.0, 1.050)
+        monitor.connection_checked_in(event(connection_id=1))
+
+        stats = monitor.stats()
+        server = stats["servers"]["db:27017"]
+        assert server["checkouts"] == 2
+        assert server["in_use"] == 1
+        assert server["peak_in_use"] == 2
+        assert server["saturation"] == 0.5
+        assert server["wait_ms_max"] == 50.0
+        assert server["wait_ms_avg"] == 26.0
+        assert stats["active_connections"] == 1
+        assert stats["available_connections"] == 1
+
+    def test_failed_checkouts_are_counted_by_reason(self):
+        monitor = PoolMonitor(max_pool_size=2)
+        monitor.connection_check_out_started(event())
+        monitor.connection_check_out_failed(event(reason="timeout"))
+
+        server = monitor.stats()["servers"]["db:27017"]
+        assert server["failed_checkouts"] == {"timeout": 1}
+        assert server["waiting"] == 0
+
+    def test_recommends_growth_when_waits_exceed_target(self):
+        monitor = PoolMonitor(max_pool_size=2)
+        # Three operations want a connection at once on a pool of two
+        with patch("app.pool_monitor.time.monotonic", return_value=0.0):
+            for _ in range(3):
+                monitor.connection_check_out_started(event())
+        with patch("app.pool_monitor.time.monotonic", side_effect=[0.1, 0.2, 0.3]):
+            for _ in range(3):
+                monitor.connection_checked_out(event(connection_id=1))
+
+        sizing = monitor.recommend_pool_size(workers=8, budget=400)
+        assert sizing["recommended_pool_size"] == 4
+        assert sizing["total_connections"] == 32
+
+    def test_recommendation_capped_by_connection_budget(self):
+        monitor = PoolMonitor(max_pool_size=10)
+        for _ in range(40):
+            monitor.connection_check_out_started(event())
+        with patch("app.pool_monitor.time.monotonic", return_value=1e6):
+            for _ in range(40):
+                monitor.connection_checked_out(event(connection_id=1))
+
+        sizing = monitor.recommend_pool_size(workers=8, budget=160)
+        assert sizing["recommended_pool_size"] == 20
+        assert "connection budget" in sizing["reason"]
+
+    def test_recommends_shrinking_an_idle_pool(self):
+        monitor = PoolMonitor(max_pool_size=10)
+        checkout(monitor, 0.0, 0.0)
+        monitor.connection_checked_in(event(connection_id=1))
+
+        sizing = monitor.recommend_pool_size(workers=1)
+        assert sizing["recommended_pool_size"] == 2
@@ -13,7 +13,7 @@ from app.services.exceptions import NotFoundError
 @pytest.mark.asyncio
 class TestProjectService:
     @pytest.fixture
-    async def project_service(self):
+    def project_service(self):
         service = ProjectService()
         service.db = AsyncMock()
         return service
@@ -123,3 +123,77 @@ class TestProjectService:
 
         result = await project_service.delete_project("project123", user)
         assert result == True
+
+    async def test_compute_schedule_persists_timeline(self, project_service):
+        project_service.db.projects.find_one = AsyncMock(return_value={
+            "_id": "project123",
+            "timeline": {"milestones": [{"id": "m1", "dependencies": []}]}
+        })
+        project_service.db.tasks.find = MagicMock()
+        project_service.db.tasks.find.return_value.to_list = AsyncMock(return_value=[
+            {"_id": "a", "status": "todo", "progress": {"estimated_hours": 16}, "dependencies": []},
+            {"_id": "b", "status": "todo", "progress": {"estimated_hours": 8},
+             "dependencies": [{"task_id": "a"}], "milestone_id": "m1"}
+        ])
+        project_service.db.projects.update_one = AsyncMock()
+
+        schedule = await project_service.compute_schedule("project123")
+        assert schedule.project_duration == 3.0
+
+        update = project_service.db.projects.update_one.call_args[0][1]["$set"]
+        assert update["timeline.critical_tasks"] == ["a", "b"]
+        assert update["timeline.critical_path"] == ["m1"]
+        assert update["timeline.estimated_duration_days"] == 3
+
+    async def test_service_created_before_connect_uses_live_database(self):
+        from unittest.mock import patch
+        import app.main  # noqa: F401 - creates the service singletons before any connection
+        from app import database
+        from app.services.project_service import project_service
+        live_db = MagicMock()
+        live_db.projects.find_one = AsyncMock(return_value={"_id": "project123", "timeline": {}})
+        live_db.tasks.find.return_value.to_list = AsyncMock(return_value=[])
+        live_db.projects.update_one = AsyncMock()
+
+        with patch.object(database, "database", live_db):
+            assert project_service.db is live_db
+            await project_service.compute_schedule("project123")
+        project_service.invalidate_schedule("project123")
+
+        live_db.projects.update_one.assert_awaited_once()
+
+    async def test_update_task_schedule_is_incremental(self, project_service):
+        project_service.db.projects.find_one = AsyncMock(return_value={"_id": "project123", "timeline": {}})
+        project_service.db.tasks.find = MagicMock()
+        project_service.db.tasks.find.return_value.to_list = AsyncMock(return_value=[
+            {"_id": "a", "status": "todo", "progress": {"estimated_hours": 16}, "dependencies": []},
+            {"_id": "b", "status": "todo", "progress": {"estimated_hours": 8}, "dependencies": [{"task_id": "a"}]}
+        ])
+        project_service.db.projects.update_one = AsyncMock()
+        await project_service.compute_schedule("project123")
+
+        await project_service.update_task_schedule("project123", {"_id": "a", "status": "done"})
+
+        schedule = await project_service.get_schedule("project123")
+        assert schedule.project_duration == 1.0
+        project_service.db.tasks.find.assert_called_once()
+
+    async def test_update_spent_amount_returns_written_project(self, project_service):
+        from unittest.mock import patch
+        project_service.db.projects.find_one_and_update = AsyncMock(return_value={
+            "_id": "project123", "name": "Test Project", "owner_id": "user123", "spent_amount": 150.0
+        })
+        project_service.db.projects.find_one = AsyncMock()
+
+        with patch("app.services.cache_service.cache_service.clear_pattern", new=AsyncMock()) as clear_pattern:
+            project = await project_service.update_spent_amount("project123", 50.0)
+
+        assert project.spent_amount == 150.0
+        _, update = project_service.db.projects.find_one_and_update.call_args[0][:2]
+        assert update["$inc"] == {"spent_amount": 50.0}
+        # No read-back through the cached get_project
+        project_service.db.projects.find_one.assert_not_called()
+        clear_pattern.assert_awaited_once_with("project:*")
+
+        with pytest.raises(ValueError):
+            await project_service.update_spent_amount("project123", -1.0)
@@ -29,7 +29,7 @@ class TestProjectsRouter:
     @pytest.fixture
     def client(self, mock_db, mock_project_service):
         """Create a test client with mocked database and services"""
-        with patch('app.routers.projects.get_database', return_value=mock_db):
+        with patch('app.repository.get_database', return_value=mock_db):
             with patch('app.routers.projects.project_service', mock_project_service):
                 with patch('app.services.project_service.project_service', mock_project_service):
                     client = TestClient(app)
@@ -439,3 +439,59 @@ class TestProjectsRouter:
         assert response.status_code == 401
         data = response.json()
         assert "Not authenticated" in data["detail"]
+
+
+class TestProjectsRouterUserStats:
+    """Project writes through the API keep the materialized user statistics in step"""
+
+    @pytest.fixture
+    def mock_db(self):
+        return AsyncMock()
+
+    @pytest.fixture
+    def client(self, mock_db):
+        from fastapi import FastAPI
+        from app.routers.projects import router as projects_router, get_current_user
+        from app.services.user_service import user_service
+        test_app = FastAPI()
+        test_app.include_router(projects_router, prefix="/projects")
+        test_app.dependency_overrides[get_current_user] = lambda: User(
+            username="testuser", email="test@example.com"
+        )
+        with patch('app.repository.get_database', return_value=mock_db), \
+                patch.object(user_service, "db", mock_db):
+            yield TestClient(test_app)
+
+    @staticmethod
+    def stats_increments(mock_db):
+        operations = mock_db.user_stats.bulk_write.call_args[0][0]
+        return {operation._filter["_id"]: operation._doc["$inc"] for operation in operations}
+
+    def test_create_project_bumps_creator_stats(self, client, mock_db):
+        mock_db.projects.insert_one = AsyncMock(return_value=MagicMock(inserted_id="project123"))
+
+        response = client.post("/projects/", json={"name": "Test Project"})
+
+        assert response.status_code == 200
+        assert self.stats_increments(mock_db) == {"testuser": {"owned_projects": 1, "member_projects": 1}}
+
+    def test_team_change_moves_member_stats(self, client, mock_db):
+        previous = {"_id": "project123", "name": "Test Project", "owner_id": "testuser",
+                    "team_members": ["testuser", "alice"]}
+        mock_db.projects.find_one = AsyncMock(return_value={"_id": "project123"})
+        mock_db.projects.find_one_and_update = AsyncMock(return_value=previous)
+
+        response = client.put("/projects/project123", json={"team_members": ["testuser", "bob"]})
+
+        assert response.status_code == 200
+        assert self.stats_increments(mock_db) == {"alice": {"member_projects": -1}, "bob": {"member_projects": 1}}
+
+    def test_delete_project_drops_stats(self, client, mock_db):
+        project = {"_id": "project123", "owner_id": "testuser", "team_members": ["testuser"]}
+        mock_db.projects.find_one = AsyncMock(return_value={"_id": "project123"})
+        mock_db.projects.find_one_and_delete = AsyncMock(return_value=project)
+
+        response = client.delete("/projects/project123")
+
+        assert response.status_code == 200
+        assert self.stats_increments(mock_db) == {"testuser": {"owned_projects": -1, "member_projects": -1}}
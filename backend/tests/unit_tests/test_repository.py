@@ -0,0 +1,136 @@
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+from bson import ObjectId
+from pymongo import ReturnDocument
+from app import repository as repository_module
+from app.repository import (
+    Repository, ProjectRepository, insert_document, update_document,
+    encode_id, encode_ids, decode_document, query_shape, summarize_plan
+)
+from app.services.exceptions import DatabaseUnavailableError
+
+
+@pytest.mark.asyncio
+class TestRepository:
+    async def test_insert_document_returns_stored_document(self):
+        collection = MagicMock()
+        collection.insert_one = AsyncMock(return_value=MagicMock(inserted_id="doc1"))
+        collection.find_one = AsyncMock()
+
+        document = await insert_document(collection, {"name": "a"})
+        assert document == {"_id": "doc1", "name": "a"}
+        collection.find_one.assert_not_called()
+
+    async def test_update_document_returns_document_after_update(self):
+        collection = MagicMock()
+        collection.find_one_and_update = AsyncMock(return_value={"_id": "doc1", "name": "b"})
+
+        document = await update_document(collection, {"_id": "doc1"}, {"$set": {"name": "b"}}, {"name": 1})
+        assert document == {"_id": "doc1", "name": "b"}
+        assert collection.find_one_and_update.call_args.kwargs == {
+            "projection": {"name": 1}, "return_document": ReturnDocument.AFTER
+        }
+
+
+class TestIdCodec:
+    def test_encode_id_matches_both_stored_forms(self):
+        value = "65a1f0c2e4b0a1b2c3d4e5f6"
+        assert encode_id(value) == {"$in": [ObjectId(value), value]}
+        assert encode_id("project123") == "project123"
+        assert encode_id(ObjectId(value)) == ObjectId(value)
+
+    def test_encode_ids(self):
+        value = "65a1f0c2e4b0a1b2c3d4e5f6"
+        assert encode_ids(["p1", value]) == {"$in": ["p1", value, ObjectId(value)]}
+
+    def test_decode_document_exposes_string_id(self):
+        object_id = ObjectId()
+        document = decode_document({"_id": object_id, "name": "a"})
+        assert document["id"] == str(object_id)
+        assert document["_id"] == object_id
+        assert decode_document(None) is None
+
+    def test_query_shape_replaces_values(self):
+        shape = query_shape({"_id": {"$in": [1, 2]}, "$or": [{"owner_id": "a"}, {"team_members": "a"}]})
+        assert shape == {"_id": {"$in": 1}, "$or": [{"owner_id": 1}, {"team_members": 1}]}
+
+    def test_summarize_plan(self):
+        plan = summarize_plan({
+            "queryPlanner": {"winningPlan": {
+                "stage": "FETCH",
+                "inputStage": {"stage": "OR", "inputStages": [
+                    {"stage": "IXSCAN", "indexName": "owner_id_1"},
+                    {"stage": "COLLSCAN"}
+                ]}
+            }},
+            "executionStats": {"totalKeysExamined": 3, "totalDocsExamined": 40, "nReturned": 2}
+        })
+        assert plan["stages"][:2] == ["FETCH", "OR"]
+        assert plan["indexes"] == ["owner_id_1"]
+        assert plan["collection_scan"] is True
+        assert plan["docs_examined"] == 40
+
+
+@pytest.mark.asyncio
+class TestRepositoryClass:
+    def make_db(self):
+        db = MagicMock()
+        db.projects.find_one = AsyncMock(return_value={"_id": "p1"})
+        return db
+
+    async def test_find_by_id_encodes_id_and_applies_default_projection(self):
+        value = "65a1f0c2e4b0a1b2c3d4e5f6"
+        db = MagicMock()
+        db.resources.find_one = AsyncMock(return_value={"_id": ObjectId(value), "name": "r"})
+        repository = Repository("resources", lambda: db, projection={"utilization_history": 0})
+
+        resource = await repository.find_by_id(value)
+        assert resource["id"] == value
+        query, projection = db.resources.find_one.call_args[0]
+        assert query == {"_id": {"$in": [ObjectId(value), value]}}
+        assert projection == {"utilization_history": 0}
+
+    async def test_collection_falls_back_to_connection_and_raises_without_one(self):
+        db = self.make_db()
+        repository = Repository("projects", lambda: None)
+        with patch("app.repository.get_database", return_value=db):
+            assert (await repository.find_by_id("p1"))["id"] == "p1"
+        with patch("app.repository.get_database", return_value=None):
+            with pytest.raises(DatabaseUnavailableError):
+                await repository.find_by_id("p1")
+
+    async def test_find_accessible_checks_membership_and_projects_id(self):
+        db = self.make_db()
+        repository = ProjectRepository("projects", lambda: db)
+
+        assert await repository.find_accessible("p1", "alice")
+        query, projection = db.projects.find_one.call_args[0]
+        assert query == {"_id": "p1", "$or": [{"owner_id": "alice"}, {"team_members": "alice"}]}
+        assert projection == {"_id": 1}
+
+    async def test_accessible_ids_are_strings(self):
+        object_id = ObjectId()
+        db = MagicMock()
+        db.projects.find.return_value.to_list = AsyncMock(return_value=[{"_id": object_id}, {"_id": "p2"}])
+        repository = ProjectRepository("projects", lambda: db)
+
+        assert await repository.accessible_ids("alice") == [str(object_id), "p2"]
+
+    async def test_find_passes_hint_and_records_plan_in_debug_mode(self):
+        db = MagicMock()
+        db.tasks.find.return_value.to_list = AsyncMock(return_value=[])
+        db.tasks.find.return_value.explain = AsyncMock(return_value={
+            "queryPlanner": {"winningPlan": {"stage": "COLLSCAN"}}
+        })
+        repository = repository_module.Repository("tasks", lambda: db)
+        repository_module.clear_query_plans()
+
+        with patch.object(repository_module, "EXPLAIN_QUERIES", True):
+            await repository.find({"project_id": "p1"})
+        with patch.object(repository_module, "EXPLAIN_QUERIES", False):
+            await repository.find({"project_id": "p1"}, hint=[("project_id", 1)])
+
+        assert db.tasks.find.call_args_list[-1].kwargs == {"hint": [("project_id", 1)]}
+        [plan] = repository_module.get_query_plans(collection_scans_only=True)
+        assert plan["collection"] == "tasks"
+        assert plan["shape"] == {"project_id": 1}
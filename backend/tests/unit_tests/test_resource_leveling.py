@@ -0,0 +1,108 @@
+import random
+import time
+from datetime import datetime, timedelta
+from app.services.resource_leveling import ResourceLeveler
+from app.services.schedule_engine import CriticalPathSchedule
+
+START = datetime(2024, 1, 1)
+
+
+def task(task_id, days, depends_on=()):
+    return {
+        "_id": task_id,
+        "status": "todo",
+        "progress": {"estimated_hours": days * 8},
+        "dependencies": [{"task_id": dep} for dep in depends_on]
+    }
+
+
+def allocation(task_id, resource_id, day, days, quantity=1):
+    return {
+        "task_id": task_id,
+        "resource_id": resource_id,
+        "allocated_quantity": quantity,
+        "start_date": START + timedelta(days=day),
+        "end_date": START + timedelta(days=day + days)
+    }
+
+
+class TestResourceLeveler:
+    def setup_method(self):
+        # a (3d) -> c (2d) is critical; b (1d) -> d (1d) has three days of slack
+        self.schedule = CriticalPathSchedule.from_project(
+            [task("a", 3), task("c", 2, ["a"]), task("b", 1), task("d", 1, ["b"])], []
+        )
+
+    def test_shifts_task_within_slack_to_remove_overload(self):
+        plan = ResourceLeveler(self.schedule, {"r1": 1}, [
+            allocation("a", "r1", 0, 3),
+            allocation("b", "r1", 0, 1)
+        ]).level()
+
+        moves = {move["task_id"]: move for move in plan["moves"]}
+        assert moves["b"]["shift_days"] == 3
+        assert moves["b"]["allocations"] == [{
+            "resource_id": "r1", "start_date": START + timedelta(days=3), "end_date": START + timedelta(days=4)
+        }]
+        assert "a" not in moves
+        assert plan["resources"]["r1"]["peak_before"] == 2
+        assert plan["resources"]["r1"]["overload_after"] == 0
+        assert plan["complete"]
+
+    def test_successors_follow_shifted_predecessors(self):
+        plan = ResourceLeveler(self.schedule, {"r1": 1}, [
+            allocation("a", "r1", 0, 3),
+            allocation("b", "r1", 0, 1)
+        ]).level()
+
+        moves = {move["task_id"]: move for move in plan["moves"]}
+        assert moves["d"]["shift_days"] == 3
+        assert moves["d"]["allocations"] == []
+
+    def test_never_delays_beyond_slack(self):
+        # Both critical-length branches: nothing can move, so the overload is reported
+        schedule = CriticalPathSchedule.from_project([task("a", 2), task("b", 2)], [])
+        plan = ResourceLeveler(schedule, {"r1": 1}, [
+            allocation("a", "r1", 0, 2),
+            allocation("b", "r1", 0, 2)
+        ]).level()
+
+        assert plan["moves"] == []
+        assert plan["resources"]["r1"]["overload_after"] == 2
+
+    def test_open_ended_and_foreign_allocations_are_fixed_load(self):
+        plan = ResourceLeveler(self.schedule, {"r1": 2}, [
+            {"task_id": "other", "resource_id": "r1", "allocated_quantity": 1,
+             "start_date": START, "end_date": None},
+            allocation("a", "r1", 0, 3),
+            allocation("b", "r1", 0, 1)
+        ]).level()
+
+        assert plan["resources"]["r1"]["peak_before"] == 3
+        assert plan["resources"]["r1"]["peak_after"] == 2
+
+    def test_empty_allocations(self):
+        plan = ResourceLeveler(self.schedule, {"r1": 1}, []).level()
+        assert plan["moves"] == [] and plan["resources"] == {}
+
+    def test_levels_two_thousand_tasks_over_two_hundred_resources(self):
+        rng = random.Random(7)
+        tasks, allocations = [], []
+        for index in range(2000):
+            task_id = f"t{index}"
+            depends_on = [f"t{rng.randrange(index)}"] if index and rng.random() < 0.6 else []
+            duration = rng.randint(1, 5)
+            tasks.append(task(task_id, duration, depends_on))
+            allocations.append(allocation(task_id, f"r{rng.randrange(200)}", rng.randrange(60), duration))
+        schedule = CriticalPathSchedule.from_project(tasks, [])
+        capacities = {f"r{index}": 1 for index in range(200)}
+
+        began = time.perf_counter()
+        plan = ResourceLeveler(schedule, capacities, allocations, time_budget=30).level()
+        elapsed = time.perf_counter() - began
+
+        assert plan["complete"]
+        assert elapsed < 5
+        before = sum(report["overload_before"] for report in plan["resources"].values())
+        after = sum(report["overload_after"] for report in plan["resources"].values())
+        assert after < before
@@ -10,10 +10,15 @@ from app.services.resource_service import ResourceService
 from app.models.resource import Resource
 from app.services.exceptions import NotFoundError
 
+def mock_allocations(service, allocations):
+    service.db.resource_allocations.find = MagicMock()
+    service.db.resource_allocations.find.return_value.to_list = AsyncMock(return_value=allocations)
+
+
 @pytest.mark.asyncio
 class TestResourceService:
     @pytest.fixture
-    async def resource_service(self):
+    def resource_service(self):
         service = ResourceService()
         service.db = AsyncMock()
         return service
@@ -158,3 +163,280 @@ class TestResourceService:
 
         result = await resource_service.delete_resource("resource123", user)
         assert result == True
+
+    async def test_check_allocation_conflicts_detects_triple_overlap(self, resource_service):
+        from datetime import datetime
+        from app.models.resource import ResourceAllocation
+        resource_service.db.resources.find_one = AsyncMock(return_value={"_id": "resource123", "quantity": 10})
+        mock_allocations(resource_service, [
+            {"resource_id": "resource123", "task_id": "a", "allocated_quantity": 4,
+             "start_date": datetime(2024, 1, 1), "end_date": datetime(2024, 1, 31)},
+            {"resource_id": "resource123", "task_id": "b", "allocated_quantity": 4,
+             "start_date": datetime(2024, 1, 10), "end_date": datetime(2024, 1, 20)}
+        ])
+        new_allocation = ResourceAllocation(
+            task_id="c", allocated_quantity=3, allocated_by="user123",
+            start_date=datetime(2024, 1, 15), end_date=datetime(2024, 1, 16)
+        )
+
+        conflicts = await resource_service.check_allocation_conflicts("resource123", new_allocation)
+        # Each pair fits (4 + 3 <= 10) but all three together need 11
+        assert sorted(c.conflicting_allocation_id for c in conflicts) == ["a", "b"]
+
+    async def test_check_allocation_conflicts_back_to_back(self, resource_service):
+        from datetime import datetime
+        from app.models.resource import ResourceAllocation
+        resource_service.db.resources.find_one = AsyncMock(return_value={"_id": "resource123", "quantity": 1})
+        mock_allocations(resource_service, [
+            {"resource_id": "resource123", "task_id": "a", "allocated_quantity": 1,
+             "start_date": datetime(2024, 1, 1), "end_date": datetime(2024, 1, 10)}
+        ])
+        new_allocation = ResourceAllocation(
+            task_id="b", allocated_quantity=1, allocated_by="user123",
+            start_date=datetime(2024, 1, 10), end_date=datetime(2024, 1, 20)
+        )
+
+        assert await resource_service.check_allocation_conflicts("resource123", new_allocation) == []
+
+    async def test_find_available_resources_ranked_by_remaining_capacity(self, resource_service):
+        from datetime import datetime
+        window_allocation = {"task_id": "a", "allocated_quantity": 6, "start_date": datetime(2024, 1, 1),
+                             "end_date": datetime(2024, 2, 1)}
+        base = {"type": "human", "project_id": "project123", "availability": True}
+        resource_service.db.resources.find = MagicMock()
+        resource_service.db.resources.find.return_value.to_list = AsyncMock(return_value=[
+            {**base, "_id": "busy", "name": "Busy", "quantity": 8},
+            {**base, "_id": "small", "name": "Small", "quantity": 5},
+            {**base, "_id": "large", "name": "Large", "quantity": 10}
+        ])
+        mock_allocations(resource_service, [
+            {**window_allocation, "resource_id": "busy"},
+            {**window_allocation, "resource_id": "large"}
+        ])
+        resource_service.db.resources.find_one = AsyncMock()
+
+        resources = await resource_service.find_available_resources(
+            "project123", "human", 3, datetime(2024, 1, 10), datetime(2024, 1, 20)
+        )
+
+        # busy would be left with 8 - 6 - 3 < 0; small keeps 2 and large keeps 1
+        assert [r.name for r in resources] == ["Small", "Large"]
+        query, projection = resource_service.db.resources.find.call_args[0]
+        assert query["quantity"] == {"$gte": 3}
+        assert projection == {"utilization_history": 0, "allocations": 0}
+        resource_service.db.resources.find_one.assert_not_called()
+        allocation_query = resource_service.db.resource_allocations.find.call_args[0][0]
+        assert allocation_query["resource_id"] == {"$in": ["busy", "small", "large"]}
+        assert allocation_query["start_date"] == {"$lt": datetime(2024, 1, 20)}
+
+    async def test_search_availability_checks_every_window(self, resource_service):
+        from datetime import datetime
+        resource_service.db.resources.find = MagicMock()
+        resource_service.db.resources.find.return_value.to_list = AsyncMock(return_value=[
+            {"_id": "r1", "name": "R1", "type": "material", "project_id": "project123", "quantity": 5},
+            {"_id": "r2", "name": "R2", "type": "material", "project_id": "project123", "quantity": 7}
+        ])
+        mock_allocations(resource_service, [
+            {"resource_id": "r1", "task_id": "a", "allocated_quantity": 4,
+             "start_date": datetime(2024, 3, 1), "end_date": datetime(2024, 3, 5)}
+        ])
+
+        matches = await resource_service.search_availability("project123", "material", 2, [
+            (datetime(2024, 1, 1), datetime(2024, 1, 2)),
+            (datetime(2024, 3, 2), datetime(2024, 3, 3))
+        ])
+
+        assert [m["resource"].name for m in matches] == ["R2"]
+        assert matches[0]["remaining_capacity"] == 5
+
+    async def test_calculate_utilization_does_not_write(self, resource_service):
+        from datetime import datetime
+        resource_service.db.resources.find_one = AsyncMock(return_value={"_id": "resource123", "quantity": 4})
+        mock_allocations(resource_service, [
+            {"resource_id": "resource123", "task_id": "a", "allocated_quantity": 4,
+             "start_date": datetime(2024, 1, 1), "end_date": datetime(2024, 1, 3)}
+        ])
+        resource_service.db.resources.update_one = AsyncMock()
+
+        utilization = await resource_service.calculate_utilization(
+            "resource123", datetime(2024, 1, 1), datetime(2024, 1, 5)
+        )
+        assert utilization.utilization_percentage == 50.0
+        assert utilization.allocated_quantity == 2.0
+        resource_service.db.resources.update_one.assert_not_called()
+
+    async def test_utilization_heatmap_reads_buckets(self, resource_service):
+        from datetime import datetime
+        resource_service.db.resources.find = MagicMock()
+        resource_service.db.resources.find.return_value.to_list = AsyncMock(return_value=[
+            {"_id": "r1", "name": "R1"}
+        ])
+        resource_service.db.resource_utilization.find = MagicMock()
+        resource_service.db.resource_utilization.find.return_value.to_list = AsyncMock(return_value=[
+            {"resource_id": "r1", "month": datetime(2024, 1, 1), "utilization": [float(d) for d in range(31)]}
+        ])
+
+        heatmap = await resource_service.get_utilization_heatmap("project123", datetime(2024, 1, 10), 3)
+        assert heatmap["resources"] == [{"id": "r1", "name": "R1"}]
+        assert heatmap["matrix"] == [[9.0, 10.0, 11.0]]
+        # Only the name lookup touches the resources collection when buckets are complete
+        resource_service.db.resources.find.assert_called_once()
+
+    async def test_materialize_utilization_upserts_monthly_buckets(self, resource_service):
+        from datetime import datetime
+        resource_service.db.resources.find_one = AsyncMock(return_value={
+            "_id": "r1", "project_id": "project123", "quantity": 1
+        })
+        mock_allocations(resource_service, [])
+        resource_service.db.resource_utilization.bulk_write = AsyncMock()
+
+        count = await resource_service.materialize_utilization("r1", datetime(2024, 1, 1), datetime(2024, 4, 1))
+        assert count == 3
+        operations = resource_service.db.resource_utilization.bulk_write.call_args[0][0]
+        assert [op._filter["_id"] for op in operations] == ["r1:2024-01", "r1:2024-02", "r1:2024-03"]
+
+    async def test_materialize_utilization_loads_allocations_of_whole_months(self, resource_service):
+        from datetime import datetime
+        resource_service.db.resources.find_one = AsyncMock(return_value={
+            "_id": "r1", "project_id": "project123", "quantity": 2
+        })
+        # Ends before the requested start, but within the first bucket's month
+        mock_allocations(resource_service, [
+            {"resource_id": "r1", "task_id": "t1", "allocated_quantity": 1,
+             "start_date": datetime(2024, 1, 2), "end_date": datetime(2024, 1, 5)}
+        ])
+        resource_service.db.resource_utilization.bulk_write = AsyncMock()
+
+        await resource_service.materialize_utilization("r1", datetime(2024, 1, 15), datetime(2024, 2, 10))
+        query = resource_service.db.resource_allocations.find.call_args[0][0]
+        assert query["start_date"] == {"$lt": datetime(2024, 3, 1)}
+        assert query["$or"][1] == {"end_date": {"$gt": datetime(2024, 1, 1)}}
+        [january, _] = resource_service.db.resource_utilization.bulk_write.call_args[0][0]
+        assert january._doc["utilization"][1:5] == [50.0, 50.0, 50.0, 0.0]
+
+    async def test_allocate_resource_reserves_through_ledger(self, resource_service):
+        from datetime import datetime
+        from app.models.resource import ResourceAllocation
+        resource_service.db.resources.find_one = AsyncMock(return_value={
+            "_id": "r1", "project_id": "project123", "quantity": 5, "allocation_version": 3
+        })
+        mock_allocations(resource_service, [])
+        resource_service.db.resource_allocations.insert_one = AsyncMock(return_value=MagicMock(inserted_id="alloc1"))
+        resource_service.db.resources.update_one = AsyncMock(return_value=MagicMock(modified_count=1))
+        resource_service.materialize_utilization = AsyncMock()
+        allocation = ResourceAllocation(
+            task_id="t1", allocated_quantity=2, allocated_by="user123", start_date=datetime(2024, 1, 1)
+        )
+
+        assert await resource_service.allocate_resource("r1", allocation) == allocation
+        document = resource_service.db.resource_allocations.insert_one.call_args[0][0]
+        assert document["resource_id"] == "r1" and document["task_id"] == "t1"
+        # The ledger is claimed before the allocation is inserted, and released after
+        claim, release = resource_service.db.resources.update_one.call_args_list
+        ledger_filter, update = claim[0]
+        assert ledger_filter["_id"] == "r1" and ledger_filter["allocation_version"] == 3
+        assert update["$inc"] == {"allocation_version": 1}
+        token = update["$set"]["allocation_claim"]["token"]
+        assert release[0] == ({"_id": "r1", "allocation_claim.token": token}, {"$unset": {"allocation_claim": ""}})
+
+    async def test_allocate_resource_retries_when_ledger_moves(self, resource_service):
+        from datetime import datetime
+        from app.models.resource import ResourceAllocation
+        resource_service.db.resources.find_one = AsyncMock(side_effect=[
+            {"_id": "r1", "project_id": "project123", "quantity": 5},
+            {"_id": "r1", "project_id": "project123", "quantity": 5, "allocation_version": 1}
+        ])
+        resource_service.db.resource_allocations.find = MagicMock()
+        resource_service.db.resource_allocations.find.return_value.to_list = AsyncMock(side_effect=[
+            [],
+            # The concurrent reservation that won the ledger now fills the resource
+            [{"resource_id": "r1", "task_id": "other", "allocated_quantity": 4,
+              "start_date": datetime(2024, 1, 1), "end_date": None}]
+        ])
+        resource_service.db.resource_allocations.insert_one = AsyncMock()
+        resource_service.db.resources.update_one = AsyncMock(return_value=MagicMock(modified_count=0))
+        allocation = ResourceAllocation(
+            task_id="t1", allocated_quantity=2, allocated_by="user123", start_date=datetime(2024, 1, 1)
+        )
+
+        assert await resource_service.allocate_resource("r1", allocation) is None
+        ledger_filter = resource_service.db.resources.update_one.call_args[0][0]
+        assert ledger_filter["allocation_version"] == {"$exists": False}
+        # Nothing was inserted for the reservation that lost the ledger
+        resource_service.db.resource_allocations.insert_one.assert_not_called()
+
+    async def test_allocate_resource_waits_for_claimed_ledger(self, resource_service, monkeypatch):
+        from datetime import datetime, timedelta
+        from app.models.resource import ResourceAllocation
+        from app.services import resource_service as resource_service_module
+        monkeypatch.setattr(resource_service_module, "RESERVATION_RETRY_DELAY_SECONDS", 0)
+        claim = {"token": "other", "expires_at": datetime.utcnow() + timedelta(seconds=30)}
+        resource_service.db.resources.find_one = AsyncMock(side_effect=[
+            {"_id": "r1", "quantity": 5, "allocation_version": 1, "allocation_claim": claim},
+            {"_id": "r1", "quantity": 5, "allocation_version": 1}
+        ])
+        mock_allocations(resource_service, [])
+        resource_service.db.resource_allocations.insert_one = AsyncMock()
+        resource_service.db.resources.update_one = AsyncMock(return_value=MagicMock(modified_count=1))
+        resource_service.materialize_utilization = AsyncMock()
+        allocation = ResourceAllocation(
+            task_id="t1", allocated_quantity=2, allocated_by="user123", start_date=datetime(2024, 1, 1)
+        )
+
+        assert await resource_service.allocate_resource("r1", allocation) == allocation
+        assert resource_service.db.resources.find_one.await_count == 2
+        resource_service.db.resource_allocations.insert_one.assert_called_once()
+
+    async def test_allocate_resource_raises_when_ledger_stays_contended(self, resource_service):
+        from datetime import datetime
+        from app.models.resource import ResourceAllocation
+        from app.services.exceptions import ReservationContentionError
+        resource_service.db.resources.find_one = AsyncMock(return_value={"_id": "r1", "quantity": 5})
+        mock_allocations(resource_service, [])
+        resource_service.db.resource_allocations.insert_one = AsyncMock()
+        resource_service.db.resources.update_one = AsyncMock(return_value=MagicMock(modified_count=0))
+        allocation = ResourceAllocation(
+            task_id="t1", allocated_quantity=2, allocated_by="user123", start_date=datetime(2024, 1, 1)
+        )
+
+        with pytest.raises(ReservationContentionError):
+            await resource_service.allocate_resource("r1", allocation)
+        resource_service.db.resource_allocations.insert_one.assert_not_called()
+
+    async def test_deallocate_resource_deletes_allocation_documents(self, resource_service):
+        resource_service.db.resource_allocations.delete_many = AsyncMock(return_value=MagicMock(deleted_count=1))
+        resource_service.db.resources.update_one = AsyncMock()
+        resource_service.materialize_utilization = AsyncMock()
+
+        assert await resource_service.deallocate_resource("r1", "t1") is True
+        resource_service.db.resource_allocations.delete_many.assert_called_once_with(
+            {"resource_id": "r1", "task_id": "t1"}
+        )
+        resource_service.materialize_utilization.assert_called_once_with("r1")
+
+    async def test_optimize_resource_allocation_returns_leveling_plan(self, resource_service, monkeypatch):
+        from datetime import datetime
+        from app.services import resource_service as resource_service_module
+        from app.services.schedule_engine import CriticalPathSchedule
+        schedule = CriticalPathSchedule.from_project([
+            {"_id": "a", "status": "todo", "progress": {"estimated_hours": 24}, "dependencies": []},
+            {"_id": "b", "status": "todo", "progress": {"estimated_hours": 8}, "dependencies": []}
+        ], [])
+        monkeypatch.setattr(resource_service_module.project_service, "get_schedule", AsyncMock(return_value=schedule))
+        resource_service.db.resources.find = MagicMock()
+        resource_service.db.resources.find.return_value.to_list = AsyncMock(return_value=[{"_id": "r1", "quantity": 1}])
+        resource_service.db.tasks.find = MagicMock()
+        resource_service.db.tasks.find.return_value.to_list = AsyncMock(return_value=[
+            {"_id": "a", "priority": 5}, {"_id": "b", "priority": 1}
+        ])
+        mock_allocations(resource_service, [
+            {"resource_id": "r1", "task_id": "a", "allocated_quantity": 1,
+             "start_date": datetime(2024, 1, 1), "end_date": datetime(2024, 1, 2)},
+            {"resource_id": "r1", "task_id": "b", "allocated_quantity": 1,
+             "start_date": datetime(2024, 1, 1), "end_date": datetime(2024, 1, 2)}
+        ])
+
+        plan = await resource_service.optimize_resource_allocation("project123")
+        assert plan["project_id"] == "project123"
+        assert [(move["task_id"], move["shift_days"]) for move in plan["moves"]] == [("b", 1)]
+        assert plan["resources"]["r1"]["overload_after"] == 0
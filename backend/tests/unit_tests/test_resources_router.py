@@ -24,7 +24,7 @@ class TestResourcesRouter:
     @pytest.fixture
     def client(self, mock_db):
         """Create a test client with mocked database"""
-        with patch('app.routers.resources.get_database', return_value=mock_db):
+        with patch('app.repository.get_database', return_value=mock_db):
             client = TestClient(app)
             yield client
 
@@ -136,7 +136,7 @@ class TestResourcesRouter:
             {
                 "_id": "resource456",
                 "name": "Resource 2",
-                "type": "equipment",
+                "type": "material",
                 "project_id": "project456",
                 "capacity": 100.0,
                 "allocated_hours": 0.0,
@@ -448,3 +448,60 @@ class TestResourcesRouter:
         assert response.status_code == 401
         data = response.json()
         assert "Not authenticated" in data["detail"]
+
+
+class TestResourcesRouterUtilization:
+    """Resource writes keep the materialized utilization buckets in step with the capacity"""
+
+    @pytest.fixture
+    def mock_db(self):
+        return AsyncMock()
+
+    @pytest.fixture
+    def resource_service(self, mock_db):
+        from app.services.resource_service import resource_service
+        with patch.object(resource_service, "db", mock_db), \
+                patch.object(resource_service, "materialize_utilization", new=AsyncMock()):
+            yield resource_service
+
+    @pytest.fixture
+    def client(self, mock_db, resource_service):
+        from fastapi import FastAPI
+        from app.routers.resources import router as resources_router, get_current_user
+        test_app = FastAPI()
+        test_app.include_router(resources_router, prefix="/resources")
+        test_app.dependency_overrides[get_current_user] = lambda: User(
+            username="testuser", email="test@example.com"
+        )
+        mock_db.projects.find_one = AsyncMock(return_value={"_id": "project123"})
+        mock_db.resources.find_one = AsyncMock(return_value={
+            "_id": "r1", "name": "Crane", "type": "material", "project_id": "project123", "quantity": 2
+        })
+        with patch('app.repository.get_database', return_value=mock_db):
+            yield TestClient(test_app)
+
+    def test_quantity_change_rematerializes_utilization(self, client, mock_db, resource_service):
+        mock_db.resources.find_one_and_update = AsyncMock(return_value={
+            "_id": "r1", "name": "Crane", "type": "material", "project_id": "project123", "quantity": 4
+        })
+
+        response = client.put("/resources/r1", json={"quantity": 4})
+
+        assert response.status_code == 200
+        resource_service.materialize_utilization.assert_awaited_once_with("r1")
+
+    def test_other_changes_keep_utilization(self, client, mock_db, resource_service):
+        mock_db.resources.find_one_and_update = AsyncMock(return_value={
+            "_id": "r1", "name": "Tower crane", "type": "material", "project_id": "project123", "quantity": 2
+        })
+
+        response = client.put("/resources/r1", json={"name": "Tower crane"})
+
+        assert response.status_code == 200
+        resource_service.materialize_utilization.assert_not_awaited()
+
+    def test_delete_resource_removes_utilization_buckets(self, client, mock_db):
+        response = client.delete("/resources/r1")
+
+        assert response.status_code == 200
+        mock_db.resource_utilization.delete_many.assert_awaited_once_with({"resource_id": "r1"})
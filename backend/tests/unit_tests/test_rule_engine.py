@@ -18,6 +18,11 @@ class TestRuleEngine:
         engine.db = AsyncMock()
         return engine
 
+    @pytest.fixture(autouse=True)
+    def record_task_change(self):
+        with patch("app.services.task_service.task_service.record_task_change", new=AsyncMock()) as record:
+            yield record
+
     @pytest.mark.asyncio
     async def test_evaluate_rules_no_matching_rules(self, rule_engine):
         """Test evaluating rules when no rules match"""
@@ -127,13 +132,13 @@ class TestRuleEngine:
         actions = [{"type": "update_task_status", "data": {"task_id": "task123", "status": "in_progress"}}]
         event_data = {}
 
-        rule_engine.db.tasks.update_one = AsyncMock()
+        rule_engine.db.tasks.find_one_and_update = AsyncMock(return_value={"_id": "task123", "status": "todo"})
 
         result = await rule_engine._execute_actions(actions, event_data)
 
         assert len(result) == 1
         assert result[0]["action"] == "update_task_status"
-        rule_engine.db.tasks.update_one.assert_called_once()
+        rule_engine.db.tasks.find_one_and_update.assert_called_once()
 
     @pytest.mark.asyncio
     async def test_execute_actions_create_github_issue(self, rule_engine):
@@ -172,7 +177,7 @@ class TestRuleEngine:
         assert "error" in result[0]
 
     @pytest.mark.asyncio
-    async def test_create_task_from_event(self, rule_engine):
+    async def test_create_task_from_event(self, rule_engine, record_task_change):
         """Test creating task from event data"""
         action_data = {
             "title": "Task for {repository}",
@@ -197,20 +202,35 @@ class TestRuleEngine:
         call_args = rule_engine.db.tasks.insert_one.call_args[0][0]
         assert call_args["title"] == "Task for user/repo"
         assert call_args["description"] == "Commit: Fix bug"
+        # The project counters and user stats see the new task
+        record_task_change.assert_called_once_with(None, call_args)
 
     @pytest.mark.asyncio
-    async def test_update_task_status_by_id(self, rule_engine):
+    async def test_update_task_status_by_id(self, rule_engine, record_task_change):
         """Test updating task status by ID"""
         action_data = {"task_id": "task123", "status": "completed"}
         event_data = {}
 
-        rule_engine.db.tasks.update_one = AsyncMock()
+        previous = {"_id": "task123", "project_id": "proj123", "status": "todo"}
+        rule_engine.db.tasks.find_one_and_update = AsyncMock(return_value=previous)
 
         result = await rule_engine._update_task_status(action_data, event_data)
 
         assert result["task_id"] == "task123"
         assert result["new_status"] == "completed"
-        rule_engine.db.tasks.update_one.assert_called_once()
+        rule_engine.db.tasks.find_one_and_update.assert_called_once()
+        before, after = record_task_change.call_args[0]
+        assert before["status"] == "todo" and after["status"] == "completed"
+
+    @pytest.mark.asyncio
+    async def test_update_task_status_task_not_found(self, rule_engine, record_task_change):
+        """Test updating the status of a task that does not exist"""
+        rule_engine.db.tasks.find_one_and_update = AsyncMock(return_value=None)
+
+        result = await rule_engine._update_task_status({"task_id": "missing", "status": "done"}, {})
+
+        assert result == {"error": "Task not found"}
+        record_task_change.assert_not_called()
 
     @pytest.mark.asyncio
     async def test_update_task_status_by_pattern(self, rule_engine):
@@ -220,7 +240,7 @@ class TestRuleEngine:
 
         mock_task = {"_id": "task123", "title": "Fix critical bug"}
         rule_engine.db.tasks.find_one = AsyncMock(return_value=mock_task)
-        rule_engine.db.tasks.update_one = AsyncMock()
+        rule_engine.db.tasks.find_one_and_update = AsyncMock(return_value=mock_task)
 
         result = await rule_engine._update_task_status(action_data, event_data)
 
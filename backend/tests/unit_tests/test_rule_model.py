@@ -64,3 +64,12 @@ class TestRuleModel:
         )
         assert rule_update.name == "Updated Rule"
         assert rule_update.active is False
+
+    def test_rule_schedule_must_be_cron(self):
+        with pytest.raises(ValidationError):
+            RuleCreate(name="Bad", type=RuleType.SCHEDULED, conditions={}, actions=[], schedule="every day")
+        with pytest.raises(ValidationError):
+            RuleCreate(name="Unscheduled", type=RuleType.SCHEDULED, conditions={}, actions=[])
+        with pytest.raises(ValidationError):
+            RuleUpdate(schedule="0 25 * * *")
+        assert RuleUpdate(schedule="@daily").schedule == "@daily"
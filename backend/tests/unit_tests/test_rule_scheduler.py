@@ -0,0 +1,112 @@
+import asyncio
+import pytest
+from datetime import datetime, timedelta
+from unittest.mock import AsyncMock, MagicMock, patch
+from app.services.rule_scheduler import RuleScheduler, RULE_MISFIRE_GRACE_SECONDS
+
+NOW = datetime(2026, 3, 2, 9, 0, 30)
+
+
+def scheduled_rule(rule_id="r1", schedule="*/5 * * * *", **fields):
+    return {"id": rule_id, "type": "scheduled", "active": True, "schedule": schedule, **fields}
+
+
+@pytest.mark.asyncio
+class TestRuleScheduler:
+    async def test_due_fires_are_queued_once_per_rule_and_fire_time(self):
+        scheduler = RuleScheduler()
+        scheduler.schedule(scheduled_rule(), NOW)
+        # The 09:00 fire is within the misfire grace period, so it still runs
+        assert scheduler._schedules["r1"][1] == datetime(2026, 3, 2, 9, 0)
+
+        with patch("app.services.rule_scheduler.job_queue.enqueue", new=AsyncMock(return_value="job1")) as enqueue:
+            assert await scheduler.dispatch_due(NOW) == 1
+
+        name, payload = enqueue.await_args.args
+        assert name == "rules.scheduled_fire"
+        assert payload == {"rule_id": "r1", "schedule": "*/5 * * * *", "fire_at": datetime(2026, 3, 2, 9, 0)}
+        assert enqueue.await_args.kwargs["key"] == "rule:r1:2026-03-02T09:00:00"
+        assert scheduler._schedules["r1"][1] == datetime(2026, 3, 2, 9, 5)
+
+    async def test_fire_queued_by_another_process_counts_as_duplicate(self):
+        scheduler = RuleScheduler()
+        scheduler.schedule(scheduled_rule(), NOW)
+
+        with patch("app.services.rule_scheduler.job_queue.enqueue", new=AsyncMock(return_value=None)):
+            assert await scheduler.dispatch_due(NOW) == 0
+
+        assert scheduler.stats()["duplicates"] == 1
+        assert scheduler._schedules["r1"][1] == datetime(2026, 3, 2, 9, 5)
+
+    async def test_late_fires_beyond_grace_are_misfires(self):
+        scheduler = RuleScheduler()
+        scheduler.schedule(scheduled_rule(schedule="0 * * * *"), NOW)
+        late = NOW + timedelta(seconds=RULE_MISFIRE_GRACE_SECONDS + 60)
+
+        with patch("app.services.rule_scheduler.job_queue.enqueue", new=AsyncMock()) as enqueue:
+            assert await scheduler.dispatch_due(late) == 0
+
+        enqueue.assert_not_awaited()
+        assert scheduler.misfires == 1
+        assert scheduler._schedules["r1"][1] == datetime(2026, 3, 2, 10, 0)
+
+    async def test_fires_missed_while_down_are_counted_and_skipped(self):
+        scheduler = RuleScheduler()
+        scheduler.schedule(scheduled_rule(schedule="0 * * * *", last_executed=datetime(2026, 3, 2, 6, 0, 2)), NOW)
+
+        assert scheduler.misfires == 1
+        assert scheduler._schedules["r1"][1] == datetime(2026, 3, 2, 9, 0)
+
+    async def test_failed_enqueue_keeps_the_fire_due(self):
+        scheduler = RuleScheduler()
+        scheduler.schedule(scheduled_rule(), NOW)
+
+        with patch("app.services.rule_scheduler.job_queue.enqueue", new=AsyncMock(side_effect=ConnectionError("down"))):
+            with pytest.raises(ConnectionError):
+                await scheduler.dispatch_due(NOW)
+
+        with patch("app.services.rule_scheduler.job_queue.enqueue", new=AsyncMock(return_value="job1")):
+            assert await scheduler.dispatch_due(NOW) == 1
+
+    async def test_rule_changes_replace_or_drop_the_schedule(self):
+        scheduler = RuleScheduler()
+        scheduler.schedule(scheduled_rule(), NOW)
+        scheduler.schedule(scheduled_rule(rule_id="r2", schedule="0 12 * * *"), NOW)
+
+        scheduler.reschedule(scheduled_rule(schedule="30 9 * * *"))
+        assert scheduler._schedules["r1"][0].expression == "30 9 * * *"
+
+        scheduler.reschedule(scheduled_rule(rule_id="r2", active=False))
+        scheduler.unschedule("missing")
+        assert set(scheduler._schedules) == {"r1"}
+
+        with patch("app.services.rule_scheduler.rule_engine.get_scheduled_rules", new=AsyncMock(return_value=[])):
+            await scheduler.load()
+        assert scheduler.stats()["scheduled_rules"] == 0
+
+    async def test_fire_skips_rescheduled_rule(self):
+        scheduler = RuleScheduler()
+        scheduler.rules.find_by_id = AsyncMock(return_value={"id": "r1", "schedule": "0 * * * *"})
+        with patch("app.services.rule_scheduler.rule_engine.execute_scheduled_rule", new=AsyncMock(return_value=[])) as execute:
+            skipped = await scheduler._fire("r1", "*/5 * * * *", NOW)
+            fired = await scheduler._fire("r1", "0 * * * *", NOW)
+
+        assert skipped["skipped"] is True
+        assert fired == {"fire_at": NOW, "actions": []}
+        execute.assert_awaited_once_with("r1")
+
+    async def test_loop_sleeps_until_the_next_fire(self):
+        scheduler = RuleScheduler()
+        soon = datetime.utcnow().replace(microsecond=0) + timedelta(minutes=1)
+        scheduler.load = AsyncMock()
+        scheduler.dispatch_due = AsyncMock(return_value=0)
+        scheduler._heap = [(soon, "r1")]
+
+        scheduler.start()
+        await asyncio.sleep(0.02)
+        # One pass, then asleep until the fire instead of polling
+        assert scheduler.dispatch_due.await_count == 1
+        scheduler._wakeup.set()
+        await asyncio.sleep(0.01)
+        assert scheduler.dispatch_due.await_count == 2
+        await scheduler.stop()
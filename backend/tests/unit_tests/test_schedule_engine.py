@@ -0,0 +1,67 @@
+import pytest
+import random
+from app.services.schedule_engine import CriticalPathSchedule, task_duration_days, milestone_node_id
+
+
+def task(task_id, hours, deps=(), status="todo", milestone_id=None):
+    return {
+        "_id": task_id,
+        "status": status,
+        "progress": {"estimated_hours": hours},
+        "dependencies": [{"task_id": dep} for dep in deps],
+        "milestone_id": milestone_id
+    }
+
+
+class TestCriticalPathSchedule:
+    def test_task_duration_days(self):
+        assert task_duration_days(task("a", 16)) == 2.0
+        assert task_duration_days(task("a", 16, status="done")) == 0.0
+        assert task_duration_days({"_id": "a", "status": "todo"}) == 1.0
+
+    def test_forward_and_backward_pass(self):
+        # a(2d) -> b(3d) -> d(1d); a -> c(1d) -> d
+        schedule = CriticalPathSchedule.from_project([
+            task("a", 16), task("b", 24, ["a"]), task("c", 8, ["a"]), task("d", 8, ["b", "c"])
+        ], [])
+
+        assert schedule.project_duration == 6.0
+        assert schedule.node_schedule("c")["earliest_start"] == 2.0
+        assert schedule.node_schedule("c")["latest_start"] == 4.0
+        assert schedule.slack("c") == 2.0
+        assert schedule.critical_path() == ["a", "b", "d"]
+
+    def test_milestones_join_the_graph(self):
+        schedule = CriticalPathSchedule.from_project(
+            [task("a", 8, milestone_id="m1"), task("b", 40, milestone_id="m2")],
+            [{"id": "m1", "dependencies": []}, {"id": "m2", "dependencies": ["m1"]}]
+        )
+
+        assert schedule.node_schedule(milestone_node_id("m2"))["earliest_start"] == 5.0
+        assert schedule.critical_path() == ["b", milestone_node_id("m2")]
+        assert schedule.is_critical("a") is False
+
+    def test_update_duration_moves_critical_path(self):
+        schedule = CriticalPathSchedule.from_project([
+            task("a", 16), task("b", 24, ["a"]), task("c", 8, ["a"]), task("d", 8, ["b", "c"])
+        ], [])
+
+        schedule.update_duration("c", 5.0)
+        assert schedule.project_duration == 8.0
+        assert schedule.critical_path() == ["a", "c", "d"]
+        assert schedule.slack("b") == 2.0
+
+    def test_incremental_updates_match_full_recompute(self):
+        rng = random.Random(3)
+        tasks = [
+            task(f"t{i}", rng.randint(1, 40), rng.sample([f"t{j}" for j in range(i)], min(i, rng.randint(0, 3))))
+            for i in range(150)
+        ]
+        schedule = CriticalPathSchedule.from_project(tasks, [])
+
+        for _ in range(100):
+            node_id = f"t{rng.randrange(150)}"
+            schedule.update_duration(node_id, rng.uniform(0, 6))
+            incremental = [schedule.node_schedule(node_id) for node_id in schedule.graph.ids]
+            schedule.compute()
+            assert incremental == [schedule.node_schedule(node_id) for node_id in schedule.graph.ids]
@@ -3,6 +3,7 @@ import asyncio
 import sys
 import os
 from unittest.mock import AsyncMock, MagicMock
+from bson import ObjectId
 
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 
@@ -13,7 +14,7 @@ from app.services.exceptions import NotFoundError
 @pytest.mark.asyncio
 class TestTaskService:
     @pytest.fixture
-    async def task_service(self):
+    def task_service(self):
         service = TaskService()
         service.db = AsyncMock()
         return service
@@ -114,3 +115,407 @@ class TestTaskService:
 
         result = await task_service.delete_task("task123", user)
         assert result == True
+
+    async def test_get_project_progress_from_counters(self, task_service):
+        task_service.db.projects.find_one = AsyncMock(return_value={
+            "_id": "project123",
+            "task_counters": {
+                "total": 4,
+                "by_status": {"todo": 3, "done": 1},
+                "total_weight": 8,
+                "completed_weight": 2
+            }
+        })
+        task_service.db.tasks.aggregate = MagicMock()
+
+        result = await task_service.get_project_progress("project123")
+        assert result == {"total_tasks": 4, "completed_tasks": 1, "progress_percentage": 25.0}
+        task_service.db.tasks.aggregate.assert_not_called()
+
+    async def test_get_project_progress_rebuilds_missing_counters(self, task_service):
+        task_service.db.projects.find_one = AsyncMock(return_value={"_id": "project123"})
+        task_service.db.projects.bulk_write = AsyncMock()
+        task_service.db.tasks.aggregate = MagicMock()
+        task_service.db.tasks.aggregate.return_value.to_list = AsyncMock(return_value=[{
+            "_id": "project123",
+            "rows": [
+                {"status": "done", "priority": 1, "count": 2, "overdue": 0, "estimated_hours": 4, "actual_hours": 5},
+                {"status": "todo", "priority": 4, "count": 1, "overdue": 1, "estimated_hours": 8, "actual_hours": 0}
+            ]
+        }])
+
+        result = await task_service.get_project_progress("project123")
+        assert result == {"total_tasks": 3, "completed_tasks": 2, "progress_percentage": 33.33}
+        pipeline = task_service.db.tasks.aggregate.call_args[0][0]
+        assert pipeline[0] == {"$match": {"project_id": "project123"}}
+
+        operation = task_service.db.projects.bulk_write.call_args[0][0][0]
+        counters = operation._doc["$set"]["task_counters"]
+        assert counters["by_status"] == {"done": 2, "todo": 1}
+        assert counters["by_priority"] == {"1": 2, "4": 1}
+        assert counters["overdue"] == 1
+        assert counters["estimated_hours"] == 12 and counters["actual_hours"] == 5
+
+    async def test_get_project_progress_no_tasks(self, task_service):
+        task_service.db.projects.find_one = AsyncMock(return_value={"_id": "project123"})
+        task_service.db.projects.bulk_write = AsyncMock()
+        task_service.db.tasks.aggregate = MagicMock()
+        task_service.db.tasks.aggregate.return_value.to_list = AsyncMock(return_value=[])
+
+        result = await task_service.get_project_progress("project123")
+        assert result == {"total_tasks": 0, "completed_tasks": 0, "progress_percentage": 0.0}
+        task_service.db.projects.bulk_write.assert_called_once()
+
+    async def test_repair_all_task_counters_resets_projects_without_tasks(self, task_service):
+        task_service.db.projects.bulk_write = AsyncMock()
+        task_service.db.projects.update_many = AsyncMock()
+        task_service.db.tasks.aggregate = MagicMock()
+        task_service.db.tasks.aggregate.return_value.to_list = AsyncMock(return_value=[
+            {"_id": "p1", "rows": [{"status": "todo", "priority": 2, "count": 1}]}
+        ])
+
+        assert await task_service.rebuild_task_counters() == 1
+        pipeline = task_service.db.tasks.aggregate.call_args[0][0]
+        assert "$match" not in pipeline[0]
+        query, update = task_service.db.projects.update_many.call_args[0]
+        assert query == {"_id": {"$nin": ["p1"]}}
+        assert update["$set"]["task_counters"]["total"] == 0
+
+    async def test_record_task_change_increments_counters(self, task_service):
+        from datetime import datetime
+        from unittest.mock import patch
+        task_service.db.projects.bulk_write = AsyncMock()
+
+        with patch("app.services.task_service.user_service.record_task_changes", new=AsyncMock()) as record:
+            await task_service.record_task_change(
+                {"project_id": "project123", "status": "in_progress", "priority": 3,
+                 "due_date": datetime(2000, 1, 1), "progress": {"estimated_hours": 5}},
+                {"project_id": "project123", "status": "done", "priority": 3,
+                 "due_date": datetime(2000, 1, 1), "progress": {"estimated_hours": 5, "actual_hours": 6}}
+            )
+            record.assert_called_once()
+
+        [operation] = task_service.db.projects.bulk_write.call_args[0][0]
+        assert operation._filter == {"_id": "project123", "task_counters": {"$exists": True}}
+        assert operation._doc["$inc"] == {
+            "task_counters.by_status.in_progress": -1,
+            "task_counters.by_status.done": 1,
+            "task_counters.completed_weight": 3,
+            "task_counters.overdue": -1,
+            "task_counters.actual_hours": 6
+        }
+
+    async def test_record_task_change_moves_between_projects(self, task_service):
+        from unittest.mock import patch
+        task_service.db.projects.bulk_write = AsyncMock()
+
+        with patch("app.services.task_service.user_service.record_task_changes", new=AsyncMock()):
+            await task_service.record_task_change(
+                {"project_id": "p1", "status": "todo", "priority": 2},
+                {"project_id": "p2", "status": "todo", "priority": 2}
+            )
+
+        operations = task_service.db.projects.bulk_write.call_args[0][0]
+        updates = {operation._filter["_id"]: operation._doc["$inc"] for operation in operations}
+        assert updates["p1"]["task_counters.total"] == -1
+        assert updates["p2"]["task_counters.by_priority.2"] == 1
+
+    async def test_assign_task_smart_uses_single_aggregation(self, task_service):
+        from unittest.mock import patch
+        task_service.db.projects.find_one = AsyncMock(return_value={"team_members": ["alice", "bob", "carol"]})
+        task_service.db.tasks.aggregate = MagicMock()
+        task_service.db.tasks.aggregate.return_value.to_list = AsyncMock(return_value=[
+            {"_id": "alice", "active_tasks": 4, "estimated_hours": 10},
+            {"_id": "bob", "active_tasks": 2, "estimated_hours": 30}
+        ])
+        task_service.db.tasks.find_one_and_update = AsyncMock(return_value={"_id": "task123", "assignee_id": None})
+        task_service.db.tasks.count_documents = AsyncMock()
+
+        with patch('app.services.task_service.user_service') as mock_user_service:
+            mock_user_service.record_task_change = AsyncMock()
+            assignee = await task_service.assign_task_smart("task123", "project123")
+
+        assert assignee == "carol"
+        task_service.db.tasks.aggregate.assert_called_once()
+        task_service.db.tasks.count_documents.assert_not_called()
+
+    async def test_assign_tasks_batch_balances_with_heap(self, task_service):
+        from unittest.mock import patch
+        task_service.db.projects.find_one = AsyncMock(return_value={"team_members": ["alice", "bob"]})
+        task_service.db.tasks.aggregate = MagicMock()
+        task_service.db.tasks.aggregate.return_value.to_list = AsyncMock(return_value=[
+            {"_id": "alice", "active_tasks": 2, "estimated_hours": 0}
+        ])
+        task_service.db.tasks.find = MagicMock()
+        task_service.db.tasks.find.return_value.to_list = AsyncMock(return_value=[
+            {"_id": f"task{i}", "project_id": "project123", "priority": 1} for i in range(4)
+        ])
+        task_service.db.tasks.bulk_write = AsyncMock()
+
+        with patch('app.services.task_service.user_service') as mock_user_service:
+            mock_user_service.record_task_changes = AsyncMock()
+            assignments = await task_service.assign_tasks_batch(
+                ["task0", "task1", "task2", "task3"], "project123"
+            )
+
+        # bob starts with no load, so he takes three tasks before alice catches up
+        assert list(assignments.values()).count("bob") == 3
+        assert list(assignments.values()).count("alice") == 1
+        operations = task_service.db.tasks.bulk_write.call_args[0][0]
+        assert len(operations) == 4
+
+    async def test_assign_tasks_batch_weights_hours_and_skill(self, task_service):
+        from unittest.mock import patch
+        task_service.db.projects.find_one = AsyncMock(return_value={"team_members": ["junior", "senior"]})
+        task_service.db.tasks.aggregate = MagicMock()
+        task_service.db.tasks.aggregate.return_value.to_list = AsyncMock(return_value=[])
+        task_service.db.tasks.find = MagicMock()
+        task_service.db.tasks.find.return_value.to_list = AsyncMock(return_value=[
+            {"_id": "big", "priority": 1, "progress": {"estimated_hours": 20}},
+            {"_id": "small1", "priority": 1, "progress": {"estimated_hours": 2}},
+            {"_id": "small2", "priority": 1, "progress": {"estimated_hours": 2}}
+        ])
+        task_service.db.tasks.bulk_write = AsyncMock()
+
+        with patch('app.services.task_service.user_service') as mock_user_service:
+            mock_user_service.record_task_changes = AsyncMock()
+            assignments = await task_service.assign_tasks_batch(
+                ["big", "small1", "small2"], "project123",
+                weight_by_hours=True, skill_levels={"junior": 1, "senior": 5}
+            )
+
+        assert assignments["big"] == "junior"
+        assert assignments["small1"] == "senior"
+        assert assignments["small2"] == "senior"
+
+    async def test_validate_dependencies_loads_graph_once(self, task_service):
+        from app.models.task import TaskDependency
+        task_service.db.tasks.find = MagicMock()
+        task_service.db.tasks.find.return_value.to_list = AsyncMock(return_value=[
+            {"_id": "a", "status": "done", "dependencies": []},
+            {"_id": "b", "status": "todo", "dependencies": [{"task_id": "a"}]},
+            {"_id": "c", "status": "todo", "dependencies": [{"task_id": "b"}]}
+        ])
+
+        assert await task_service.validate_dependencies("c", [TaskDependency(task_id="a")], project_id="project123")
+        assert not await task_service.validate_dependencies("a", [TaskDependency(task_id="c")], project_id="project123")
+        assert not await task_service.validate_dependencies("c", [TaskDependency(task_id="missing")], project_id="project123")
+        task_service.db.tasks.find.assert_called_once()
+
+    async def test_can_start_task_uses_graph(self, task_service):
+        task_service.db.tasks.find_one = AsyncMock(return_value={"_id": "c", "project_id": "project123"})
+        task_service.db.tasks.find = MagicMock()
+        task_service.db.tasks.find.return_value.to_list = AsyncMock(return_value=[
+            {"_id": "a", "status": "done", "dependencies": []},
+            {"_id": "b", "status": "todo", "dependencies": []},
+            {"_id": "c", "status": "todo", "dependencies": [{"task_id": "a"}, {"task_id": "b"}]}
+        ])
+
+        assert await task_service.can_start_task("c") is False
+        task_service._sync_dependency_graph("project123", "b", status="done")
+        assert await task_service.can_start_task("c") is True
+        task_service.db.tasks.find.assert_called_once()
+
+    async def test_service_created_before_connect_uses_live_database(self):
+        from unittest.mock import patch
+        import app.main  # noqa: F401 - creates the service singletons before any connection
+        from app import database
+        from app.models.task import TaskCreate
+        from app.models.user import User
+        from app.services.task_service import task_service
+        user = User(username="user123", email="user123@example.com")
+        live_db = AsyncMock()
+        live_db.tasks.insert_one = AsyncMock(return_value=MagicMock(inserted_id=ObjectId()))
+
+        with patch.object(database, "database", live_db), \
+                patch("app.services.user_service.user_service.record_task_changes", new=AsyncMock()), \
+                patch("app.services.task_service.manager.publish", new=AsyncMock()):
+            assert task_service.db is live_db
+            await task_service.create_task(
+                TaskCreate(title="a", project_id="project123", dependencies=[], tags=[]), user
+            )
+
+        live_db.tasks.insert_one.assert_awaited_once()
+        # The counters are adjusted after the insert through the same live handle
+        live_db.projects.bulk_write.assert_awaited_once()
+
+    async def test_created_task_can_be_a_dependency_immediately(self, task_service):
+        from unittest.mock import patch
+        from app.models.task import TaskCreate, TaskDependency
+        from app.models.user import User
+        user = User(username="user123", email="user123@example.com")
+        task_service.db.tasks.find = MagicMock()
+        task_service.db.tasks.find.return_value.to_list = AsyncMock(return_value=[
+            {"_id": "a", "status": "todo", "dependencies": []}
+        ])
+        new_id = ObjectId()
+        task_service.db.tasks.insert_one = AsyncMock(return_value=MagicMock(inserted_id=new_id))
+        task_service.record_task_change = AsyncMock()
+        await task_service.get_dependency_graph("project123")
+
+        with patch("app.services.task_service.manager.publish", new=AsyncMock()):
+            task = await task_service.create_task(
+                TaskCreate(title="b", project_id="project123", dependencies=[], tags=[]), user
+            )
+
+        assert task.id == str(new_id)
+        assert await task_service.validate_dependencies("a", [TaskDependency(task_id=task.id)], project_id="project123")
+        assert await task_service.validate_dependencies(task.id, [TaskDependency(task_id="a")], project_id="project123")
+        # The cached graph was updated in place rather than reloaded
+        task_service.db.tasks.find.assert_called_once()
+
+    async def test_counter_maintenance_jobs_queue_their_next_run(self, task_service):
+        from unittest.mock import patch
+        task_service.refresh_overdue_task_counters = AsyncMock(side_effect=RuntimeError("database down"))
+
+        with patch("app.services.task_service.job_queue.enqueue_periodic", new=AsyncMock()) as enqueue_periodic:
+            await task_service.schedule_counter_maintenance(overdue_interval_seconds=300, repair_interval_seconds=3600)
+            assert [call.args for call in enqueue_periodic.await_args_list] == [
+                ("tasks.refresh_overdue_counters", 300), ("tasks.rebuild_counters", 3600)
+            ]
+            enqueue_periodic.reset_mock()
+
+            # A failed run still queues the next one
+            with pytest.raises(RuntimeError):
+                await task_service._refresh_overdue_job(interval_seconds=300)
+            enqueue_periodic.assert_awaited_once_with("tasks.refresh_overdue_counters", 300)
+
+    async def test_bulk_create_tasks_authorizes_once_and_reports_per_item(self, task_service):
+        from unittest.mock import patch
+        from pymongo.errors import BulkWriteError
+        from app.models.task import TaskCreate
+        from app.models.user import User
+        user = User(username="user123", email="user123@example.com")
+        task_service.db.projects.find = MagicMock()
+        task_service.db.projects.find.return_value.to_list = AsyncMock(return_value=[{"_id": "p1"}])
+        task_service.db.tasks.bulk_write = AsyncMock(side_effect=BulkWriteError({
+            "writeErrors": [{"index": 1, "errmsg": "duplicate key"}]
+        }))
+        task_service.record_task_changes = AsyncMock()
+        tasks = [
+            TaskCreate(title="a", project_id="p1"),
+            TaskCreate(title="b", project_id="p2"),
+            TaskCreate(title="c", project_id="p1"),
+            TaskCreate(title="d", project_id="p1")
+        ]
+
+        with patch("app.services.task_service.manager.publish", new=AsyncMock()) as broadcast:
+            results = await task_service.bulk_create_tasks(tasks, user)
+
+        assert [result["status"] for result in results] == ["created", "error", "error", "created"]
+        assert results[1]["error"] == "Project not found or not authorized"
+        assert results[2]["error"] == "duplicate key"
+        task_service.db.projects.find.assert_called_once()
+        assert task_service.db.projects.find.call_args[0][0]["_id"]["$in"] in (["p1", "p2"], ["p2", "p1"])
+        operations = task_service.db.tasks.bulk_write.call_args[0][0]
+        assert len(operations) == 3
+        # Same _id type as single inserts
+        assert all(isinstance(operation._doc["_id"], ObjectId) for operation in operations)
+        assert results[0]["task_id"] == str(operations[0]._doc["_id"])
+        assert task_service.db.tasks.bulk_write.call_args.kwargs["ordered"] is False
+        assert len(task_service.record_task_changes.call_args[0][0]) == 2
+        broadcast.assert_called_once()
+        assert broadcast.call_args[0][:2] == ("project:p1", "tasks_bulk_created")
+        assert broadcast.call_args[0][2]["count"] == 2
+
+    async def test_bulk_update_tasks_uses_previous_state_for_counters(self, task_service):
+        from unittest.mock import patch
+        from app.models.task import TaskUpdate
+        from app.models.user import User
+        user = User(username="user123", email="user123@example.com")
+        task_service.db.tasks.find = MagicMock()
+        task_service.db.tasks.find.return_value.to_list = AsyncMock(return_value=[
+            {"_id": "t1", "project_id": "p1", "status": "todo"},
+            {"_id": "t2", "project_id": "p2", "status": "todo"}
+        ])
+        task_service.db.projects.find = MagicMock()
+        task_service.db.projects.find.return_value.to_list = AsyncMock(return_value=[{"_id": "p1"}])
+        task_service.db.tasks.bulk_write = AsyncMock()
+        task_service.record_task_changes = AsyncMock()
+
+        with patch("app.services.task_service.manager.publish", new=AsyncMock()):
+            results = await task_service.bulk_update_tasks([
+                ("t1", TaskUpdate(status="done")),
+                ("t2", TaskUpdate(status="done")),
+                ("missing", TaskUpdate(status="done"))
+            ], user)
+
+        assert [result["status"] for result in results] == ["updated", "error", "error"]
+        [operation] = task_service.db.tasks.bulk_write.call_args[0][0]
+        assert operation._filter == {"_id": "t1"}
+        [(before, after)] = task_service.record_task_changes.call_args[0][0]
+        assert before["status"] == "todo" and after["status"] == "done"
+
+    async def test_bulk_update_tasks_updates_a_repeated_id_once(self, task_service):
+        from unittest.mock import patch
+        from app.models.task import TaskUpdate
+        from app.models.user import User
+        user = User(username="user123", email="user123@example.com")
+        task_service.db.tasks.find = MagicMock()
+        task_service.db.tasks.find.return_value.to_list = AsyncMock(return_value=[
+            {"_id": "t1", "project_id": "p1", "status": "todo"}
+        ])
+        task_service.db.projects.find = MagicMock()
+        task_service.db.projects.find.return_value.to_list = AsyncMock(return_value=[{"_id": "p1"}])
+        task_service.db.tasks.bulk_write = AsyncMock()
+        task_service.record_task_changes = AsyncMock()
+
+        with patch("app.services.task_service.manager.publish", new=AsyncMock()):
+            results = await task_service.bulk_update_tasks([
+                ("t1", TaskUpdate(status="in_progress")),
+                ("t1", TaskUpdate(status="done"))
+            ], user)
+
+        assert [result["status"] for result in results] == ["updated", "error"]
+        [operation] = task_service.db.tasks.bulk_write.call_args[0][0]
+        assert operation._filter == {"_id": "t1"}
+        # The task's counters move once, from its stored state
+        [(before, after)] = task_service.record_task_changes.call_args[0][0]
+        assert before["status"] == "todo" and after["status"] == "in_progress"
+
+    async def test_bulk_update_tasks_rejects_cycle_across_items(self, task_service):
+        from unittest.mock import patch
+        from app.models.task import TaskDependency, TaskUpdate
+        from app.models.user import User
+        user = User(username="user123", email="user123@example.com")
+        task_service.db.tasks.find = MagicMock()
+        task_service.db.tasks.find.return_value.to_list = AsyncMock(return_value=[
+            {"_id": "a", "project_id": "p1", "status": "todo", "dependencies": []},
+            {"_id": "b", "project_id": "p1", "status": "todo", "dependencies": []}
+        ])
+        task_service.db.projects.find = MagicMock()
+        task_service.db.projects.find.return_value.to_list = AsyncMock(return_value=[{"_id": "p1"}])
+        task_service.db.tasks.bulk_write = AsyncMock()
+        task_service.record_task_changes = AsyncMock()
+
+        with patch("app.services.task_service.manager.publish", new=AsyncMock()):
+            results = await task_service.bulk_update_tasks([
+                ("a", TaskUpdate(dependencies=[TaskDependency(task_id="b")])),
+                ("b", TaskUpdate(dependencies=[TaskDependency(task_id="a")]))
+            ], user)
+
+        assert [result["status"] for result in results] == ["updated", "error"]
+        assert results[1]["error"] == "Invalid or circular task dependencies"
+        [operation] = task_service.db.tasks.bulk_write.call_args[0][0]
+        assert operation._filter == {"_id": "a"}
+
+    async def test_bulk_delete_tasks(self, task_service):
+        from unittest.mock import patch
+        from app.models.user import User
+        user = User(username="user123", email="user123@example.com")
+        task_service.db.tasks.find = MagicMock()
+        task_service.db.tasks.find.return_value.to_list = AsyncMock(return_value=[
+            {"_id": "t1", "project_id": "p1", "status": "todo"}
+        ])
+        task_service.db.projects.find = MagicMock()
+        task_service.db.projects.find.return_value.to_list = AsyncMock(return_value=[{"_id": "p1"}])
+        task_service.db.tasks.bulk_write = AsyncMock()
+        task_service.record_task_changes = AsyncMock()
+
+        with patch("app.services.task_service.manager.publish", new=AsyncMock()) as broadcast:
+            results = await task_service.bulk_delete_tasks(["t1", "t1"], user)
+
+        # A repeated id is only deleted once
+        assert [result["status"] for result in results] == ["deleted", "error"]
+        task_service.record_task_changes.assert_called_once()
+        assert broadcast.call_args[0][1] == "tasks_bulk_deleted"
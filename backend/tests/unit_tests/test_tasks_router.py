@@ -25,7 +25,7 @@ class TestTasksRouter:
     @pytest.fixture
     def client(self, mock_db):
         """Create a test client with mocked database"""
-        with patch('app.routers.tasks.get_database', return_value=mock_db):
+        with patch('app.repository.get_database', return_value=mock_db):
             with patch('app.routers.auth.get_database', return_value=mock_db):
                 with patch('app.services.auth_service.get_database', return_value=mock_db):
                     client = TestClient(app)
@@ -463,3 +463,83 @@ class TestTasksRouter:
         assert response.status_code == 401
         data = response.json()
         assert "Not authenticated" in data["detail"]
+
+
+class TestTasksRouterCaches:
+    """The task routes keep the cached dependency graph and schedule in step with their writes"""
+
+    @pytest.fixture
+    def mock_db(self):
+        return AsyncMock()
+
+    @pytest.fixture
+    def task_service(self, mock_db):
+        from app.services.task_service import task_service
+        from app.services.dependency_graph import DependencyGraph
+        graph = DependencyGraph.from_tasks([
+            {"_id": "a", "status": "todo", "dependencies": []},
+            {"_id": "b", "status": "todo", "dependencies": [{"task_id": "a"}]}
+        ])
+        with patch.object(task_service, "db", mock_db), \
+                patch.dict(task_service._dependency_graphs, {"project123": (graph, datetime.utcnow())}, clear=True), \
+                patch.object(task_service, "record_task_change", new=AsyncMock()), \
+                patch("app.services.task_service.manager.publish", new=AsyncMock()):
+            yield task_service
+
+    @pytest.fixture
+    def invalidate_schedule(self):
+        with patch("app.services.project_service.project_service.invalidate_schedule") as invalidate:
+            yield invalidate
+
+    @pytest.fixture
+    def client(self, mock_db, task_service):
+        from fastapi import FastAPI
+        from app.routers.tasks import router as tasks_router, get_current_user
+        test_app = FastAPI()
+        test_app.include_router(tasks_router, prefix="/tasks")
+        test_app.dependency_overrides[get_current_user] = lambda: User(
+            username="testuser", email="test@example.com"
+        )
+        mock_db.projects.find_one = AsyncMock(return_value={"_id": "project123"})
+        with patch('app.repository.get_database', return_value=mock_db):
+            yield TestClient(test_app)
+
+    def test_create_task_adds_node_to_cached_graph(self, client, mock_db, task_service, invalidate_schedule):
+        mock_db.tasks.insert_one = AsyncMock(return_value=MagicMock(inserted_id="c"))
+
+        response = client.post("/tasks/", json={
+            "title": "Task C", "project_id": "project123", "dependencies": [], "tags": []
+        })
+
+        assert response.status_code == 200
+        graph = task_service._dependency_graphs["project123"][0]
+        assert "c" in graph
+        task_service.record_task_change.assert_called_once()
+        invalidate_schedule.assert_called_once_with("project123")
+
+    def test_status_update_reaches_cached_graph(self, client, mock_db, task_service):
+        task = {"_id": "a", "title": "Task A", "project_id": "project123", "status": "todo",
+                "dependencies": [], "tags": []}
+        mock_db.tasks.find_one = AsyncMock(return_value=task)
+        mock_db.tasks.find_one_and_update = AsyncMock(return_value=task)
+        graph = task_service._dependency_graphs["project123"][0]
+        assert not graph.can_start("b")
+
+        response = client.put("/tasks/a", json={"status": "done"})
+
+        assert response.status_code == 200
+        assert response.json()["status"] == "done"
+        assert graph.can_start("b")
+        task_service.record_task_change.assert_called_once()
+
+    def test_delete_task_invalidates_graph_and_schedule(self, client, mock_db, task_service, invalidate_schedule):
+        task = {"_id": "a", "title": "Task A", "project_id": "project123", "status": "todo"}
+        mock_db.tasks.find_one = AsyncMock(return_value=task)
+        mock_db.tasks.find_one_and_delete = AsyncMock(return_value=task)
+
+        response = client.delete("/tasks/a")
+
+        assert response.status_code == 200
+        assert "project123" not in task_service._dependency_graphs
+        task_service.record_task_change.assert_called_once_with(task, None)
+        invalidate_schedule.assert_called_once_with("project123")
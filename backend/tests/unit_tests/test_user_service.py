@@ -92,19 +92,18 @@ class TestUserService:
         existing_user = User(username="testuser", email="old@example.com", role="user")
         current_user = User(username="testuser", email="test@example.com", role="admin")
         user_service.get_user = AsyncMock(return_value=existing_user)
-        user_service.db.users.find_one = AsyncMock(side_effect=[
-            None,  # First call for checking duplicate email
-            {      # Second call for getting updated user
-                "username": "testuser",
-                "email": user_update_data.email,
-                "full_name": user_update_data.full_name
-            }
-        ])
-        user_service.db.users.update_one = AsyncMock()
+        user_service.db.users.find_one = AsyncMock(return_value=None)  # No duplicate email
+        user_service.db.users.find_one_and_update = AsyncMock(return_value={
+            "username": "testuser",
+            "email": user_update_data.email,
+            "full_name": user_update_data.full_name
+        })
 
         updated_user = await user_service.update_user("testuser", user_update_data, current_user)
         assert updated_user.email == user_update_data.email
         assert updated_user.full_name == user_update_data.full_name
+        # The updated document comes back with the write; it is not read again
+        user_service.db.users.find_one.assert_called_once()
 
     @pytest.mark.asyncio
     async def test_change_password_success(self, user_service):
@@ -124,8 +123,7 @@ class TestUserService:
     @pytest.mark.asyncio
     async def test_disable_user_admin_only(self, user_service):
         user_service.db = MagicMock()
-        user_service.db.users.update_one = AsyncMock()
-        user_service.db.users.find_one = AsyncMock(return_value={
+        user_service.db.users.find_one_and_update = AsyncMock(return_value={
             "username": "testuser",
             "email": "test@example.com",
             "disabled": True
@@ -134,6 +132,9 @@ class TestUserService:
 
         updated_user = await user_service.disable_user("testuser", current_user)
         assert updated_user.disabled is True
+        query, update = user_service.db.users.find_one_and_update.call_args[0]
+        assert query == {"username": "testuser"}
+        assert update["$set"]["disabled"] is True
 
     @pytest.mark.asyncio
     async def test_disable_user_self_disable_error(self, user_service):
@@ -167,3 +168,89 @@ class TestUserService:
         current_user = User(username="testuser", email="test@example.com", role="user")
         with pytest.raises(HTTPException):
             await user_service.get_users(current_user)
+
+    @pytest.mark.asyncio
+    async def test_get_user_stats_from_materialized_document(self, user_service):
+        from datetime import datetime
+        user_service.db = MagicMock()
+        user_service.get_user = AsyncMock(return_value=User(username="testuser", email="test@example.com"))
+        user_service.db.user_stats.find_one = AsyncMock(return_value={
+            "_id": "testuser",
+            "owned_projects": 1,
+            "member_projects": 3,
+            "total_tasks": 8,
+            "completed_tasks": 2,
+            "overdue_tasks": 1,
+            "rebuilt_at": datetime.utcnow()
+        })
+
+        stats = await user_service.get_user_stats("testuser", None)
+        assert stats["member_projects"] == 3
+        assert stats["completion_rate"] == 25.0
+        user_service.db.projects.aggregate.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_get_user_stats_rebuilds_with_facet(self, user_service):
+        user_service.db = MagicMock()
+        user_service.get_user = AsyncMock(return_value=User(username="testuser", email="test@example.com"))
+        user_service.db.user_stats.find_one = AsyncMock(return_value=None)
+        user_service.db.user_stats.update_one = AsyncMock()
+        user_service.db.projects.aggregate.return_value.to_list = AsyncMock(return_value=[{
+            "owned_projects": [{"count": 2}],
+            "member_projects": [{"count": 4}],
+            "total_tasks": [{"count": 10}],
+            "completed_tasks": [{"count": 5}],
+            "overdue_tasks": []
+        }])
+
+        stats = await user_service.get_user_stats("testuser", None)
+        assert stats["owned_projects"] == 2
+        assert stats["overdue_tasks"] == 0
+        assert stats["completion_rate"] == 50.0
+        pipeline = user_service.db.projects.aggregate.call_args[0][0]
+        assert "$facet" in pipeline[-1]
+        user_service.db.user_stats.update_one.assert_called_once()
+
+    @pytest.mark.asyncio
+    async def test_record_task_change_moves_between_assignees(self, user_service):
+        user_service.db = MagicMock()
+        user_service.db.user_stats.bulk_write = AsyncMock()
+
+        await user_service.record_task_change(
+            {"assignee_id": "alice", "status": "todo"},
+            {"assignee_id": "bob", "status": "done"}
+        )
+
+        operations = user_service.db.user_stats.bulk_write.call_args[0][0]
+        updates = {op._filter["_id"]: op._doc["$inc"] for op in operations}
+        assert updates == {
+            "alice": {"total_tasks": -1},
+            "bob": {"total_tasks": 1, "completed_tasks": 1}
+        }
+
+    @pytest.mark.asyncio
+    async def test_refresh_overdue_counts(self, user_service):
+        user_service.db = MagicMock()
+        user_service.db.tasks.aggregate.return_value.to_list = AsyncMock(return_value=[
+            {"_id": "alice", "count": 3}
+        ])
+        user_service.db.user_stats.bulk_write = AsyncMock()
+        user_service.db.user_stats.update_many = AsyncMock()
+
+        refreshed = await user_service.refresh_overdue_counts()
+        assert refreshed == 1
+        reset_filter = user_service.db.user_stats.update_many.call_args[0][0]
+        assert reset_filter == {"_id": {"$nin": ["alice"]}}
+
+    async def test_service_created_before_connect_uses_live_database(self):
+        import app.main  # noqa: F401 - creates the service singletons before any connection
+        from app import database
+        from app.services.user_service import user_service
+        live_db = MagicMock()
+        live_db.user_stats.bulk_write = AsyncMock()
+
+        with patch.object(database, "database", live_db):
+            assert user_service.db is live_db
+            await user_service.record_project_change(None, {"owner_id": "alice", "team_members": ["alice"]})
+
+        live_db.user_stats.bulk_write.assert_awaited_once()
@@ -0,0 +1,68 @@
+import pytest
+from datetime import datetime, timedelta
+from app.services.utilization_engine import (
+    daily_allocated, average_allocated, monthly_buckets, slice_buckets, utilization_percentages
+)
+
+START = datetime(2024, 1, 1)
+
+
+def allocation(start, end, quantity):
+    return {"task_id": "task", "allocated_quantity": quantity, "start_date": start, "end_date": end}
+
+
+class TestUtilizationEngine:
+    def test_full_days(self):
+        buckets = daily_allocated([allocation(START + timedelta(days=1), START + timedelta(days=3), 2)], START, 5)
+        assert buckets == [0.0, 2.0, 2.0, 0.0, 0.0]
+
+    def test_partial_days_are_duration_weighted(self):
+        buckets = daily_allocated([
+            allocation(START + timedelta(hours=12), START + timedelta(days=2, hours=6), 4)
+        ], START, 3)
+        assert buckets == [2.0, 4.0, 1.0]
+
+    def test_allocation_within_a_single_day(self):
+        buckets = daily_allocated([allocation(START + timedelta(hours=6), START + timedelta(hours=12), 4)], START, 2)
+        assert buckets == [1.0, 0.0]
+
+    def test_clipped_and_open_ended(self):
+        buckets = daily_allocated([
+            allocation(START - timedelta(days=10), START + timedelta(days=1), 1),
+            allocation(START + timedelta(days=2), None, 3)
+        ], START, 4)
+        assert buckets == [1.0, 0.0, 3.0, 3.0]
+
+    def test_average_allocated_weights_by_overlap(self):
+        # 10 units for one day and 2 units for three days over a four day period
+        average = average_allocated([
+            allocation(START, START + timedelta(days=1), 10),
+            allocation(START, START + timedelta(days=3), 2)
+        ], START, START + timedelta(days=4))
+        assert average == 4.0
+
+    def test_utilization_percentages(self):
+        assert utilization_percentages([1.0, 2.0], 4) == [25.0, 50.0]
+        assert utilization_percentages([1.0], None) == [0.0]
+
+    def test_monthly_buckets_round_trip(self):
+        resource = {"_id": "r1", "project_id": "p1", "quantity": 2}
+        allocations = [allocation(datetime(2024, 1, 30), datetime(2024, 2, 2), 1)]
+        buckets = monthly_buckets(resource, allocations, datetime(2024, 1, 15), datetime(2024, 2, 10))
+        assert [b["_id"] for b in buckets] == ["r1:2024-01", "r1:2024-02"]
+        assert len(buckets[1]["utilization"]) == 29
+
+        values = slice_buckets(buckets, datetime(2024, 1, 29), 5)
+        assert values == [0.0, 50.0, 50.0, 50.0, 0.0]
+        assert slice_buckets(buckets, datetime(2024, 3, 1), 1) == [None]
+
+    def test_heatmap_sized_matrix_is_fast(self):
+        import time
+        resources = [
+            [allocation(START + timedelta(days=d, hours=r % 24), START + timedelta(days=d + 3), 1) for d in range(0, 90, 2)]
+            for r in range(300)
+        ]
+        began = time.perf_counter()
+        matrix = [daily_allocated(allocations, START, 90) for allocations in resources]
+        assert len(matrix) == 300 and len(matrix[0]) == 90
+        assert time.perf_counter() - began < 0.2
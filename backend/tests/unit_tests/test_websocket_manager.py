@@ -0,0 +1,390 @@
+import asyncio
+import json
+import time
+import pytest
+import pytest_asyncio
+from unittest.mock import AsyncMock, MagicMock, patch
+from app.services.websocket_manager import ConnectionManager
+from app.services.event_broker import InMemoryBroker, RedisBroker, CHANNEL_PREFIX, LOG_PREFIX
+
+
+def make_socket():
+    websocket = MagicMock()
+    websocket.accept = AsyncMock()
+    websocket.send_text = AsyncMock()
+    return websocket
+
+
+# Hubs created by the fixture, whose queues drain() waits on
+_hubs = []
+
+
+@pytest_asyncio.fixture
+async def manager():
+    hub = ConnectionManager()
+    _hubs.append(hub)
+    yield hub
+    for websocket in list(hub.active_connections):
+        hub.disconnect(websocket)
+    await drain()
+    _hubs.remove(hub)
+
+
+def _queued():
+    return sum(connection.queue.qsize() for hub in _hubs for connection in hub.active_connections.values())
+
+
+async def drain():
+    """
+    Let the connections' sender tasks flush their queues; a stalled connection's
+    queue never empties, so give up after a tenth of a second
+    """
+    await asyncio.sleep(0.005)
+    for _ in range(20):
+        if not _queued():
+            break
+        await asyncio.sleep(0.005)
+    # The last message taken from a queue is sent on the sender's next step
+    await asyncio.sleep(0.001)
+
+
+def sent(websocket):
+    return [json.loads(call.args[0]) for call in websocket.send_text.await_args_list]
+
+
+@pytest.mark.asyncio
+class TestConnectionManager:
+    async def test_publish_reaches_only_topic_subscribers(self, manager):
+        member, outsider = make_socket(), make_socket()
+        member_connection = await manager.connect(member, "alice")
+        await manager.connect(outsider, "bob")
+        with patch("app.repository.projects.find_accessible", new=AsyncMock(return_value={"_id": "p1"})):
+            assert await manager.subscribe(member_connection, "project:p1")
+
+        seq = await manager.publish("project:p1", "task_updated", {"id": "t1", "status": "done"})
+        await drain()
+
+        assert seq == 1
+        assert sent(member) == [
+            {"event": "task_updated", "data": {"id": "t1", "status": "done"}, "topic": "project:p1", "seq": 1}
+        ]
+        outsider.send_text.assert_not_awaited()
+
+    async def test_subscribe_checks_membership(self, manager):
+        connection = await manager.connect(make_socket(), "alice")
+        with patch("app.repository.projects.find_accessible", new=AsyncMock(return_value=None)) as find:
+            assert not await manager.subscribe(connection, "project:p2")
+        find.assert_awaited_once_with("p2", "alice")
+        assert not await manager.subscribe(connection, "user:bob")
+        assert await manager.subscribe(connection, "user:alice")
+        assert "project:p2" not in manager.topics
+
+    async def test_slow_client_does_not_stall_others(self, manager):
+        stalled = asyncio.Event()
+        slow, fast = make_socket(), make_socket()
+
+        async def stall(message):
+            await stalled.wait()
+
+        slow.send_text = AsyncMock(side_effect=stall)
+        slow_connection = await manager.connect(slow, "alice")
+        await manager.connect(fast, "alice")
+        slow_connection.queue = asyncio.Queue(maxsize=1)
+
+        for index in range(3):
+            await manager.publish("user:alice", "notification", {"index": index})
+        await drain()
+
+        assert [message["data"]["index"] for message in sent(fast)] == [0, 1, 2]
+        assert slow_connection.dropped >= 1
+        stalled.set()
+
+    async def test_failed_send_disconnects_connection(self, manager):
+        broken = make_socket()
+        broken.send_text = AsyncMock(side_effect=RuntimeError("closed"))
+        await manager.connect(broken, "alice")
+
+        await manager.publish("user:alice", "notification", {})
+        await drain()
+
+        assert broken not in manager.active_connections
+        assert "user:alice" not in manager.topics
+
+    async def test_disconnect_removes_subscriptions(self, manager):
+        websocket = make_socket()
+        connection = await manager.connect(websocket, "alice")
+        manager.disconnect(websocket)
+        manager.disconnect(websocket)
+
+        assert manager.topics == {}
+        assert connection.topics == set()
+
+    async def test_relay_detects_sequence_gaps(self, manager):
+        websocket = make_socket()
+        await manager.connect(websocket, "alice")
+
+        await manager.relay("user:alice", 1, '{"seq": 1}')
+        await manager.relay("user:alice", 4, '{"seq": 4}')
+        await manager.relay("user:alice", 3, '{"seq": 3}')
+        await drain()
+
+        assert manager.gaps == 1
+        assert manager.last_seq["user:alice"] == 4
+        assert len(sent(websocket)) == 3
+
+    async def test_publish_failure_does_not_raise(self, manager):
+        manager.broker.publish = AsyncMock(side_effect=ConnectionError("redis down"))
+        assert await manager.publish("project:p1", "task_updated", {}) == 0
+
+
+@pytest.mark.asyncio
+class TestEventBrokers:
+    async def test_in_memory_broker_numbers_events_per_topic(self):
+        broker = InMemoryBroker()
+        handler = AsyncMock()
+        await broker.start(handler)
+
+        assert await broker.publish("project:p1", "task_created", {"id": "t1"}) == 1
+        assert await broker.publish("project:p1", "task_updated", {"id": "t1"}) == 2
+        assert await broker.publish("project:p2", "task_created", {"id": "t2"}) == 1
+
+        topic, seq, message = handler.await_args_list[1].args
+        assert (topic, seq) == ("project:p1", 2)
+        assert json.loads(message) == {"event": "task_updated", "data": {"id": "t1"}, "topic": "project:p1", "seq": 2}
+
+    async def test_redis_broker_publishes_and_relays_framed_messages(self):
+        broker = RedisBroker("redis://localhost:6379/0")
+        broker.client = MagicMock()
+        broker.client.incr = AsyncMock(return_value=7)
+        broker.client.publish = AsyncMock()
+        pipe = MagicMock()
+        pipe.execute = AsyncMock()
+        broker.client.pipeline.return_value.__aenter__ = AsyncMock(return_value=pipe)
+        broker.client.pipeline.return_value.__aexit__ = AsyncMock(return_value=False)
+
+        assert await broker.publish("project:p1", "task_created", {"id": "t1"}) == 7
+        channel, payload = broker.client.publish.await_args.args
+        assert channel == f"{CHANNEL_PREFIX}project:p1"
+        assert payload.startswith("7 ")
+
+        async def listen():
+            yield {"type": "psubscribe", "channel": f"{CHANNEL_PREFIX}*", "data": 1}
+            yield {"type": "pmessage", "channel": channel, "data": payload}
+            raise asyncio.CancelledError
+
+        broker._pubsub = MagicMock()
+        broker._pubsub.listen = listen
+        broker.handler = AsyncMock()
+        with pytest.raises(asyncio.CancelledError):
+            await broker._listen()
+        broker.handler.assert_awaited_once_with("project:p1", 7, payload[2:])
+
+        # The event is logged under its sequence number, in a capped log expiring when idle
+        pipe.zadd.assert_called_once_with(f"{LOG_PREFIX}project:p1", {payload: 7})
+        pipe.zremrangebyrank.assert_called_once_with(f"{LOG_PREFIX}project:p1", 0, -201)
+        pipe.expire.assert_called_once()
+
+    async def test_redis_broker_reads_events_since_from_the_log(self):
+        broker = RedisBroker("redis://localhost:6379/0")
+        broker.client = MagicMock()
+        pipe = MagicMock()
+        pipe.execute = AsyncMock(return_value=["9", ['8 {"seq": 8}', '9 {"seq": 9}']])
+        broker.client.pipeline.return_value.__aenter__ = AsyncMock(return_value=pipe)
+        broker.client.pipeline.return_value.__aexit__ = AsyncMock(return_value=False)
+
+        assert await broker.events_since("project:p1", 7) == (9, [(8, '{"seq": 8}'), (9, '{"seq": 9}')])
+        pipe.zrangebyscore.assert_called_once_with(f"{LOG_PREFIX}project:p1", "(7", "+inf")
+
+    async def test_in_memory_broker_drops_idle_logs(self):
+        broker = InMemoryBroker()
+        await broker.start(AsyncMock())
+        await broker.publish("project:p1", "task_created", {"id": "t1"})
+        await broker.publish("project:p2", "task_created", {"id": "t2"})
+        broker._recorded_at["project:p1"] -= 7200
+
+        broker.drop_idle_logs(time.monotonic())
+
+        assert list(broker.logs) == ["project:p2"]
+        assert await broker.events_since("project:p1", 0) == (1, [])
+
+
+@pytest.mark.asyncio
+class TestEventCoalescing:
+    async def test_updates_to_one_entity_merge_into_one_delta(self, manager):
+        manager.coalesce_window = 0.01
+        websocket = make_socket()
+        await manager.connect(websocket, "alice")
+
+        await manager.publish("user:alice", "task_updated", {"id": "t1", "status": "in_progress"}, entity_id="t1")
+        await manager.publish("user:alice", "task_updated", {"id": "t2", "priority": 1}, entity_id="t2")
+        await manager.publish("user:alice", "task_updated", {"id": "t1", "status": "done", "progress": 100}, entity_id="t1")
+        await asyncio.sleep(0.03)
+
+        assert [message["data"] for message in sent(websocket)] == [
+            {"id": "t1", "status": "done", "progress": 100},
+            {"id": "t2", "priority": 1}
+        ]
+        assert manager.coalesced == 1
+
+    async def test_immediate_event_flushes_held_updates_first(self, manager):
+        manager.coalesce_window = 10
+        websocket = make_socket()
+        await manager.connect(websocket, "alice")
+
+        await manager.publish("user:alice", "task_updated", {"id": "t1", "status": "done"}, entity_id="t1")
+        await manager.publish("user:alice", "tasks_bulk_deleted", {"task_ids": ["t1"]})
+        await drain()
+
+        assert [message["event"] for message in sent(websocket)] == ["task_updated", "tasks_bulk_deleted"]
+        assert manager._flushes == {}
+
+
+@pytest.mark.asyncio
+class TestReplay:
+    async def test_resubscribe_replays_missed_events(self, manager):
+        for index in range(5):
+            await manager.publish("user:alice", "notification", {"index": index})
+        websocket = make_socket()
+        connection = await manager.connect(websocket, "alice")
+
+        assert await manager.subscribe(connection, "user:alice", last_id=3)
+        await drain()
+
+        assert [message["seq"] for message in sent(websocket)] == [4, 5]
+
+    async def test_gap_beyond_buffer_requires_resync(self, manager):
+        with patch("app.services.event_broker.REPLAY_BUFFER_SIZE", 2):
+            for index in range(5):
+                await manager.publish("user:alice", "notification", {"index": index})
+        websocket = make_socket()
+        connection = await manager.connect(websocket, "alice")
+
+        assert await manager.replay(connection, "user:alice", 1) == -1
+        assert await manager.replay(connection, "user:alice", 5) == 0
+        # A client ahead of the log (e.g. after a sequence reset) must refetch too
+        assert await manager.replay(connection, "user:alice", 9) == -1
+        await drain()
+
+        assert [message["event"] for message in sent(websocket)] == ["resync_required", "resync_required"]
+        assert sent(websocket)[0]["data"] == {"topic": "user:alice", "last_id": 5}
+
+    async def test_replay_survives_a_restart(self, manager):
+        for index in range(3):
+            await manager.publish("user:alice", "notification", {"index": index})
+        # A new process starts with nothing relayed yet but shares the broker's log
+        restarted = ConnectionManager()
+        _hubs.append(restarted)
+        restarted.broker = manager.broker
+        restarted.broker.handler = restarted.relay
+        websocket = make_socket()
+        connection = await restarted.connect(websocket, "alice")
+
+        assert await restarted.subscribe(connection, "user:alice", last_id=1)
+        await drain()
+        restarted.disconnect(websocket)
+        _hubs.remove(restarted)
+
+        assert [message["seq"] for message in sent(websocket)] == [2, 3]
+
+    async def test_events_relayed_during_replay_follow_it_once(self, manager):
+        for index in range(2):
+            await manager.publish("user:alice", "notification", {"index": index})
+        websocket = make_socket()
+        connection = await manager.connect(websocket, "alice")
+        read_log = manager.broker.events_since
+
+        async def slow_read(topic, last_id):
+            log = await read_log(topic, last_id)
+            # Published while the log was being read: relayed live, and logged too late
+            await manager.relay(topic, 2, '{"seq": 2}')
+            await manager.relay(topic, 3, '{"seq": 3}')
+            return log
+
+        with patch.object(manager.broker, "events_since", new=slow_read):
+            assert await manager.subscribe(connection, "user:alice", last_id=0) is True
+        await drain()
+
+        assert [message["seq"] for message in sent(websocket)] == [1, 2, 3]
+
+    async def test_unsubscribed_topics_are_not_tracked(self, manager):
+        websocket = make_socket()
+        await manager.connect(websocket, "alice")
+        await manager.publish("project:p1", "task_created", {})
+        await manager.publish("user:alice", "notification", {})
+        manager.disconnect(websocket)
+
+        assert manager.last_seq == {}
+
+
+@pytest.mark.asyncio
+class TestBackpressure:
+    async def test_overflowing_connection_is_evicted(self, manager):
+        stalled = asyncio.Event()
+
+        async def stall(message):
+            await stalled.wait()
+
+        slow = make_socket()
+        slow.send_text = AsyncMock(side_effect=stall)
+        slow.close = AsyncMock()
+        connection = await manager.connect(slow, "alice")
+        connection.queue = asyncio.Queue(maxsize=1)
+
+        for index in range(3):
+            await manager.publish("user:alice", "notification", {"index": index})
+        await drain()
+
+        assert slow not in manager.active_connections
+        slow.close.assert_awaited_once_with(code=1013)
+        assert manager.metrics()["evictions"] == 1
+        stalled.set()
+
+    async def test_drop_oldest_keeps_newest_messages(self, manager):
+        connection = await manager.connect(make_socket(), "alice")
+        connection.stop()
+        connection.queue = asyncio.Queue(maxsize=2)
+        connection.overflow_policy = "drop_oldest"
+
+        for message in ("a", "b", "c"):
+            assert connection.offer(message)
+
+        assert [connection.queue.get_nowait() for _ in range(2)] == ["b", "c"]
+        assert manager.metrics()["dropped_messages"] == 1
+
+    async def test_inbound_rate_limit(self, manager):
+        connection = await manager.connect(make_socket(), "alice")
+        with patch("app.services.websocket_manager.time.monotonic", return_value=connection._refilled_at):
+            allowed = [connection.allow_inbound() for _ in range(25)]
+
+        assert allowed.count(True) == 20
+        assert manager.metrics()["rate_limited_messages"] == 5
+
+    async def test_sender_pings_idle_connection(self, manager):
+        websocket = make_socket()
+        with patch("app.services.websocket_manager.HEARTBEAT_INTERVAL_SECONDS", 0.01):
+            await manager.connect(websocket, "alice")
+            await asyncio.sleep(0.03)
+
+        assert sent(websocket)[0] == {"event": "ping", "data": {}}
+
+
+class TestMetricsEndpoint:
+    def test_metrics_are_admin_only(self):
+        from fastapi import FastAPI
+        from fastapi.testclient import TestClient
+        from app.models.user import User
+        from app.routers import ws_router
+        from app.routers.auth import get_current_user
+        app = FastAPI()
+        app.include_router(ws_router, prefix="/ws")
+        client = TestClient(app)
+
+        assert client.get("/ws/metrics").status_code == 401
+        app.dependency_overrides[get_current_user] = lambda: User(username="bob", email="bob@example.com")
+        assert client.get("/ws/metrics").status_code == 403
+        app.dependency_overrides[get_current_user] = lambda: User(
+            username="admin", email="admin@example.com", role="admin"
+        )
+        response = client.get("/ws/metrics")
+        assert response.status_code == 200
+        assert "connections" in response.json()
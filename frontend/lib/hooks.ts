@@ -1,5 +1,6 @@
 import { useState, useEffect } from 'react'
 import { apiClient } from './api'
+import { authService } from './auth'
 
 // GitHub data types
 interface GitHubCommit {
@@ -401,7 +402,9 @@ export function useDeleteProject() {
 }
 
 // Real-time updates hook (WebSocket/SSE)
-export function useRealtimeUpdates(endpoint: string) {
+// Events for the user's own topic arrive automatically; pass topics such as
+// `project:<id>` to also receive a project's events
+export function useRealtimeUpdates(endpoint: string, topics: string[] = []) {
   const [data, setData] = useState<any>(null)
   const [connected, setConnected] = useState(false)
   const [error, setError] = useState<string | null>(null)
@@ -411,6 +414,8 @@ export function useRealtimeUpdates(endpoint: string) {
     let reconnectTimeout: NodeJS.Timeout | null = null
     const maxReconnectAttempts = 5
     let reconnectAttempts = 0
+    // Last event id seen per topic, sent on reconnect so the server replays what was missed
+    const lastIds: Record<string, number> = {}
 
     const connect = () => {
       if (reconnectAttempts >= maxReconnectAttempts) {
@@ -418,19 +423,33 @@ export function useRealtimeUpdates(endpoint: string) {
         return
       }
 
-      const wsUrl = `${process.env.NEXT_PUBLIC_WS_URL || 'ws://localhost:8000'}${endpoint}`
+      const token = authService.getToken()
+      const wsUrl = `${process.env.NEXT_PUBLIC_WS_URL || 'ws://localhost:8000'}${endpoint}?token=${encodeURIComponent(token || '')}`
       ws = new WebSocket(wsUrl)
 
       ws.onopen = () => {
         setConnected(true)
         setError(null)
         reconnectAttempts = 0
+        const resumeTopics = Array.from(new Set([...topics, ...Object.keys(lastIds)]))
+        resumeTopics.forEach((topic) => ws?.send(JSON.stringify({ action: 'subscribe', topic, last_id: lastIds[topic] })))
         console.log('WebSocket connected')
       }
 
       ws.onmessage = (event) => {
         try {
           const message = JSON.parse(event.data)
+          if (message.event === 'ping') {
+            // Heartbeat: the server closes connections that stay silent
+            ws?.send(JSON.stringify({ action: 'pong' }))
+            return
+          }
+          if (message.topic && typeof message.seq === 'number') {
+            lastIds[message.topic] = Math.max(lastIds[message.topic] || 0, message.seq)
+          } else if (message.event === 'resync_required') {
+            // Missed events are gone: consumers refetch, and replay resumes from the latest id
+            lastIds[message.data.topic] = message.data.last_id
+          }
           setData(message)
         } catch (err) {
           console.error('Failed to parse WebSocket message:', err)
@@ -463,7 +482,7 @@ export function useRealtimeUpdates(endpoint: string) {
         clearTimeout(reconnectTimeout)
       }
     }
-  }, [endpoint])
+  }, [endpoint, topics.join(',')])
 
   return { data, connected, error }
 }
@@ -53,7 +53,10 @@ if ! lsof -i :8000 > /dev/null 2>&1; then
     echo "Starting backend server..."
     cd backend
     source venv/bin/activate
-    nohup uvicorn app.main:app --reload --host 0.0.0.0 --port 8000 > ../backend.log 2>&1 &
+    # permessage-deflate compresses every frame per connection; enable it only when
+    # bandwidth matters more than CPU (WS_PER_MESSAGE_DEFLATE=true)
+    nohup uvicorn app.main:app --reload --host 0.0.0.0 --port 8000 \
+        --ws-per-message-deflate "${WS_PER_MESSAGE_DEFLATE:-false}" > ../backend.log 2>&1 &
     cd ..
 fi
 